@@ -1,3 +1,11 @@
 __version__ = "0.1.0"
 
 # Master Plan IT (MPIT) app package
+
+import sys
+
+if "frappe" in sys.modules:
+    # Inside a Frappe process (web, worker, migrate, console, tests): install the per-site
+    # rounding resolver of the core before any kernel runs. Plain imports of
+    # master_plan_it.core (worker tests, benchmarks) stay Frappe-free.
+    from master_plan_it import amounts  # noqa: F401
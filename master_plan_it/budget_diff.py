@@ -0,0 +1,230 @@
+"""
+FILE: master_plan_it/budget_diff.py
+SCOPO: Diff a livello di riga tra N budget per source_key: ogni chiave è classificata rispetto al budget di riferimento (added/removed/changed/unchanged) con i delta per campo; riepilogo per Cost Center e drill-down su richiesta.
+INPUT: Elenco budget (il primo è il riferimento) o preset (Live vs Snapshot dell'anno, anno su anno); filtro Cost Center per il drill-down.
+OUTPUT/SIDE EFFECTS: Solo letture SQL: righe raggruppate per (chiave, budget) ordinate per chiave e unite in streaming (sorted merge), senza caricare documenti.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Iterator
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt, getdate
+
+from master_plan_it.master_plan_it.doctype.mpit_year.mpit_year import get_live_budget
+
+BASELINE = "baseline"
+ADDED = "added"
+REMOVED = "removed"
+CHANGED = "changed"
+UNCHANGED = "unchanged"
+
+MODES = ("Two Budgets", "Live vs Snapshots", "Year over Year")
+
+# Compared between the baseline and each other budget (amounts summed over the lines sharing a key).
+COMPARED_FIELDS = (
+	"cost_center",
+	"vendor",
+	"line_kind",
+	"recurrence_rule",
+	"period_start_date",
+	"period_end_date",
+	"qty",
+	"unit_price",
+	"vat_rate",
+	"monthly_amount",
+	"annual_net",
+	"annual_vat",
+	"annual_gross",
+)
+_DATE_FIELDS = frozenset({"period_start_date", "period_end_date"})
+_NUMBER_FIELDS = frozenset({"qty", "unit_price", "vat_rate", "monthly_amount", "annual_net", "annual_vat", "annual_gross"})
+
+# Generated lines carry their source_key; manual lines (Allowance) are matched by cost center, kind and description.
+_DIFF_KEY = (
+	"COALESCE(NULLIF(source_key, ''), "
+	"CONCAT('LINE::', COALESCE(cost_center, ''), '::', COALESCE(line_kind, ''), '::', COALESCE(description, '')))"
+)
+
+
+def resolve_budgets(
+	mode: str,
+	year: str | None = None,
+	budget_a: str | None = None,
+	budget_b: str | None = None,
+	years_back: int = 1,
+) -> list[str]:
+	"""Budgets to compare, baseline first.
+
+	- Two Budgets: budget_a (baseline), budget_b
+	- Live vs Snapshots: the year's Live budget, then its Snapshots by creation
+	- Year over Year: the Live budgets of `years_back` previous years and of `year`, oldest first
+	"""
+	if mode == "Two Budgets":
+		if not budget_a or not budget_b:
+			frappe.throw(_("Budget A and Budget B are required."))
+		if budget_a == budget_b:
+			frappe.throw(_("Budget A and Budget B must be different budgets."))
+		return [budget_a, budget_b]
+	if mode not in MODES:
+		frappe.throw(_("Unsupported comparison mode: {0}").format(mode))
+	if not year:
+		frappe.throw(_("Year is required for comparison mode {0}.").format(_(mode)))
+
+	if mode == "Live vs Snapshots":
+		live = get_live_budget(year)
+		snapshots = frappe.get_all(
+			"MPIT Budget",
+			filters={"year": year, "budget_type": "Snapshot", "docstatus": ["<", 2]},
+			order_by="creation asc",
+			pluck="name",
+		)
+		return ([live] if live else []) + snapshots
+
+	years = [str(cint(year) - offset) for offset in range(max(1, cint(years_back)), -1, -1)]
+	return [live for live in (get_live_budget(y) for y in years) if live]
+
+
+def iter_keys(budgets: list[str], cost_center: str | None = None) -> Iterator[tuple[str, dict[str, dict]]]:
+	"""(diff key, {budget: aggregated row}) in key order.
+
+	SQL groups lines by (key, budget) and sorts by key; consecutive rows with the same key are
+	merged here, so only one key is held in memory at a time. With `cost_center`, only keys with
+	a line of that cost center in any of the budgets.
+	"""
+	values = {"budgets": tuple(budgets), "cost_center": cost_center}
+	scope = ""
+	if cost_center:
+		scope = f"""AND {_DIFF_KEY} IN (
+			SELECT {_DIFF_KEY} FROM `tabMPIT Budget Line`
+			WHERE parent IN %(budgets)s AND parenttype = 'MPIT Budget' AND parentfield = 'lines'
+				AND cost_center = %(cost_center)s
+		)"""
+	rows = frappe.db.sql(
+		f"""
+		SELECT
+			{_DIFF_KEY} AS diff_key,
+			parent AS budget,
+			COUNT(*) AS line_count,
+			MIN(cost_center) AS cost_center,
+			MIN(vendor) AS vendor,
+			MIN(line_kind) AS line_kind,
+			MIN(description) AS description,
+			MIN(contract) AS contract,
+			MIN(project) AS project,
+			MIN(recurrence_rule) AS recurrence_rule,
+			MIN(period_start_date) AS period_start_date,
+			MAX(period_end_date) AS period_end_date,
+			SUM(qty) AS qty,
+			MIN(unit_price) AS unit_price,
+			MIN(vat_rate) AS vat_rate,
+			SUM(ROUND(monthly_amount, 2)) AS monthly_amount,
+			SUM(ROUND(annual_net, 2)) AS annual_net,
+			SUM(ROUND(annual_vat, 2)) AS annual_vat,
+			SUM(ROUND(annual_gross, 2)) AS annual_gross
+		FROM `tabMPIT Budget Line`
+		WHERE parent IN %(budgets)s AND parenttype = 'MPIT Budget' AND parentfield = 'lines' {scope}
+		GROUP BY diff_key, parent
+		ORDER BY diff_key, parent
+		""",
+		values,
+		as_dict=True,
+		as_iterator=True,
+	)
+	current_key, by_budget = None, {}
+	for row in rows:
+		if row.diff_key != current_key:
+			if by_budget:
+				yield current_key, by_budget
+			current_key, by_budget = row.diff_key, {}
+		by_budget[row.budget] = row
+	if by_budget:
+		yield current_key, by_budget
+
+
+def classify(baseline: dict | None, other: dict | None) -> tuple[str | None, dict[str, list]]:
+	"""Status of a key in `other` relative to `baseline`, and {field: [old, new]} for changed fields."""
+	if baseline is None and other is None:
+		return None, {}
+	if baseline is None:
+		return ADDED, {}
+	if other is None:
+		return REMOVED, {}
+	changes = {
+		field: [_comparable(field, baseline.get(field)), _comparable(field, other.get(field))]
+		for field in COMPARED_FIELDS
+		if _comparable(field, baseline.get(field)) != _comparable(field, other.get(field))
+	}
+	return (CHANGED if changes else UNCHANGED), changes
+
+
+def diff(budgets: list[str], cost_center: str | None = None, only_changed: bool = True) -> Iterator[dict]:
+	"""Line-level records, one per key: annual net per budget, status and field deltas vs the baseline."""
+	baseline_budget = budgets[0]
+	for key, by_budget in iter_keys(budgets, cost_center):
+		baseline = by_budget.get(baseline_budget)
+		statuses, changes = {baseline_budget: BASELINE if baseline else None}, {}
+		for budget in budgets[1:]:
+			statuses[budget], changes[budget] = classify(baseline, by_budget.get(budget))
+		if only_changed and all(status in (BASELINE, UNCHANGED, None) for status in statuses.values()):
+			continue
+		reference = baseline or next(row for row in by_budget.values())
+		yield {
+			"source_key": key,
+			"cost_center": reference.cost_center,
+			"vendor": reference.vendor,
+			"line_kind": reference.line_kind,
+			"description": reference.description,
+			"contract": reference.contract,
+			"project": reference.project,
+			"annual_net": {budget: flt(by_budget[budget].annual_net, 2) if budget in by_budget else None for budget in budgets},
+			"status": statuses,
+			"changes": changes,
+		}
+
+
+def summarize(budgets: list[str]) -> list[dict]:
+	"""Per cost center (of the baseline line, else of the first budget having the key): totals and counts.
+
+	Counts of added/removed/changed keys are relative to the baseline for every other budget.
+	"""
+	by_cost_center: dict[str, dict] = {}
+	for record in diff(budgets, only_changed=False):
+		entry = by_cost_center.setdefault(
+			record["cost_center"] or "",
+			{
+				"cost_center": record["cost_center"],
+				"annual_net": dict.fromkeys(budgets, 0.0),
+				ADDED: dict.fromkeys(budgets[1:], 0),
+				REMOVED: dict.fromkeys(budgets[1:], 0),
+				CHANGED: dict.fromkeys(budgets[1:], 0),
+			},
+		)
+		for budget, amount in record["annual_net"].items():
+			entry["annual_net"][budget] += flt(amount)
+		for budget in budgets[1:]:
+			status = record["status"][budget]
+			if status in (ADDED, REMOVED, CHANGED):
+				entry[status][budget] += 1
+	return [by_cost_center[key] for key in sorted(by_cost_center)]
+
+
+@frappe.whitelist()
+def get_lines(budgets, cost_center: str | None = None, only_changed: int = 1) -> list[dict]:
+	"""Drill-down of one cost center (report JS): line-level records of the compared budgets."""
+	budgets = frappe.parse_json(budgets) if isinstance(budgets, str) else list(budgets or [])
+	if len(budgets) < 2:
+		frappe.throw(_("Select at least two budgets to compare."))
+	for budget in budgets:
+		frappe.has_permission("MPIT Budget", "read", budget, throw=True)
+	return list(diff(budgets, cost_center=cost_center or None, only_changed=bool(cint(only_changed))))
+
+
+def _comparable(field: str, value):
+	if field in _NUMBER_FIELDS:
+		return flt(value, 2)
+	if field in _DATE_FIELDS:
+		return str(getdate(value)) if value else None
+	return value or None
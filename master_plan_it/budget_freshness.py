@@ -0,0 +1,177 @@
+"""
+FILE: master_plan_it/budget_freshness.py
+SCOPO: Freschezza dei budget Live: ogni evento sorgente riceve una sequenza monotona (Redis INCR) per anno, con i Cost Center coinvolti; ogni refresh completato registra la sequenza più alta incorporata (testata per il refresh completo, partizione per quello parziale).
+INPUT: record_source_change(years, cost_centers) da budget_refresh_hooks (dopo il commit); current_seq()/mark_refreshed()/mark_partitions_refreshed() dal refresh del Budget; get_budget_freshness() per form, API e metriche.
+OUTPUT/SIDE EFFECTS: Sorted set Redis per anno (membro "seq:timestamp" o "seq:timestamp:[cost center JSON]"), potato dopo ogni refresh; stato "Up to date" / "Pending" con numero di modifiche in attesa e lag in secondi.
+"""
+
+from __future__ import annotations
+
+import json
+import time
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt
+
+from master_plan_it import budget_partitions, metrics
+
+SEQ_KEY = "mpit_source_change_seq"
+CHANGES_KEY = "mpit_source_changes"
+BUDGET_DOCTYPE = "MPIT Budget"
+
+
+def record_source_change(years: list[str], cost_centers: list[str] | None = None) -> None:
+	"""Stamp a source change for each year once the current transaction commits.
+
+	Stamping after commit guarantees that a refresh reading sequence S at its start also
+	sees the committed source rows of every change numbered <= S. `cost_centers` are the
+	partitions the change affects (None: the whole budget).
+	"""
+	years = sorted({str(year) for year in years if year})
+	cost_centers = sorted({cc for cc in cost_centers if cc}) if cost_centers else None
+	if years:
+		frappe.db.after_commit.add(lambda: _stamp(years, cost_centers))
+
+
+def current_seq() -> int:
+	"""Highest sequence stamped so far (read by a refresh before it loads its sources)."""
+	cache = frappe.cache()
+	return cint(_text(_raw(cache, "get", cache.make_key(SEQ_KEY))))
+
+
+def mark_refreshed(year: str, seq: int) -> None:
+	"""After commit: observe staleness of the changes the refresh incorporated and drop them."""
+	frappe.db.after_commit.add(lambda: _trim(str(year), cint(seq)))
+
+
+def mark_partitions_refreshed(year: str, budget: str) -> None:
+	"""After a partial refresh commits: drop the changes now incorporated by every partition they touch."""
+	header_seq = cint(frappe.db.get_value(BUDGET_DOCTYPE, budget, "refreshed_change_seq"))
+	partition_seqs = budget_partitions.get_partition_seqs(budget)
+	frappe.db.after_commit.add(lambda: _trim_incorporated(str(year), header_seq, partition_seqs))
+
+
+def get_budget_freshness(budget: str | frappe._dict | None = None) -> dict:
+	"""Freshness of a Live budget: status, pending changes, lag (seconds since the oldest pending change)."""
+	row = budget if isinstance(budget, dict) else frappe.db.get_value(
+		BUDGET_DOCTYPE, budget, ["name", "year", "budget_type", "refreshed_change_seq", "last_refreshed_at"], as_dict=True
+	)
+	if not row:
+		frappe.throw(_("Budget {0} not found.").format(budget))
+	if row.budget_type != "Live":
+		return {"budget": row.name, "status": "Not Applicable", "pending": 0, "lag_seconds": 0}
+
+	pending, oldest = _pending(str(row.year), cint(row.refreshed_change_seq), budget_partitions.get_partition_seqs(row.name))
+	return {
+		"budget": row.name,
+		"year": row.year,
+		"status": "Pending" if pending else "Up to date",
+		"pending": pending,
+		"lag_seconds": flt(max(0.0, time.time() - oldest), 1) if oldest else 0,
+		"refreshed_change_seq": cint(row.refreshed_change_seq),
+		"last_refreshed_at": row.last_refreshed_at,
+	}
+
+
+@frappe.whitelist()
+def get_freshness(budget: str) -> dict:
+	"""API: freshness of a Live budget (see get_budget_freshness)."""
+	frappe.has_permission(BUDGET_DOCTYPE, "read", budget, throw=True)
+	return get_budget_freshness(budget)
+
+
+def get_live_freshness() -> list[dict]:
+	"""Freshness of every draft Live budget (metrics gauges / alerting)."""
+	rows = frappe.get_all(
+		BUDGET_DOCTYPE,
+		filters={"budget_type": "Live", "docstatus": 0},
+		fields=["name", "year", "budget_type", "refreshed_change_seq", "last_refreshed_at"],
+	)
+	return [get_budget_freshness(row) for row in rows]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Internals
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def _stamp(years: list[str], cost_centers: list[str] | None = None) -> None:
+	cache = frappe.cache()
+	now = time.time()
+	scope = f":{json.dumps(cost_centers, separators=(',', ':'))}" if cost_centers else ""
+	for year in years:
+		seq = _next_seq(cache)
+		_raw(cache, "zadd", _changes_key(cache, year), {f"{seq}:{now}{scope}": seq})
+
+
+def _next_seq(cache) -> int:
+	"""INCR the site sequence; after a Redis reset, restart above the highest recorded refresh."""
+	key = cache.make_key(SEQ_KEY)
+	seq = cint(_raw(cache, "incr", key))
+	if seq == 1:
+		floor = cint(frappe.db.sql(f"select max(refreshed_change_seq) from `tab{BUDGET_DOCTYPE}`")[0][0])
+		if floor >= seq:
+			seq = cint(_raw(cache, "incrby", key, floor))
+	return seq
+
+
+def _trim(year: str, seq: int) -> None:
+	cache = frappe.cache()
+	key = _changes_key(cache, year)
+	incorporated = _raw(cache, "zrangebyscore", key, "-inf", seq, 0, 1)
+	if incorporated:
+		metrics.observe("mpit_refresh_staleness_seconds", max(0.0, time.time() - _member_time(incorporated[0])))
+	_raw(cache, "zremrangebyscore", key, "-inf", seq)
+
+
+def _trim_incorporated(year: str, header_seq: int, partition_seqs: dict[str, int]) -> None:
+	cache = frappe.cache()
+	key = _changes_key(cache, year)
+	members = _raw(cache, "zrangebyscore", key, f"({header_seq}", "+inf") or []
+	incorporated = [member for member in members if _is_incorporated(member, header_seq, partition_seqs)]
+	if incorporated:
+		metrics.observe("mpit_refresh_staleness_seconds", max(0.0, time.time() - _member_time(incorporated[0])))
+		_raw(cache, "zrem", key, *incorporated)
+
+
+def _pending(year: str, refreshed_seq: int, partition_seqs: dict[str, int] | None = None) -> tuple[int, float | None]:
+	"""Changes after the header sequence not yet incorporated by every partition they touch (count, oldest time)."""
+	cache = frappe.cache()
+	members = _raw(cache, "zrangebyscore", _changes_key(cache, year), f"({refreshed_seq}", "+inf") or []
+	pending = [member for member in members if not _is_incorporated(member, refreshed_seq, partition_seqs or {})]
+	return len(pending), (min(_member_time(member) for member in pending) if pending else None)
+
+
+def _is_incorporated(member, header_seq: int, partition_seqs: dict[str, int]) -> bool:
+	seq, _ts, cost_centers = _member_parts(member)
+	if seq <= header_seq:
+		return True
+	return bool(cost_centers) and all(partition_seqs.get(cc, 0) >= seq for cc in cost_centers)
+
+
+def _changes_key(cache, year: str) -> str:
+	return cache.make_key(f"{CHANGES_KEY}:{year}")
+
+
+def _member_parts(member) -> tuple[int, float, list[str] | None]:
+	"""(seq, timestamp, cost centers or None for the whole budget) of a sorted-set member."""
+	parts = _text(member).split(":", 2)
+	return cint(parts[0]), flt(parts[1]), (json.loads(parts[2]) if len(parts) > 2 else None)
+
+
+def _member_time(member) -> float:
+	return _member_parts(member)[1]
+
+
+def _raw(cache, command: str, *args):
+	"""Run a plain Redis command (RedisWrapper's helpers pickle values)."""
+	pipe = cache.pipeline()
+	getattr(pipe, command)(*args)
+	return pipe.execute()[0]
+
+
+def _text(value) -> str:
+	if value is None:
+		return ""
+	return value.decode() if isinstance(value, bytes) else str(value)
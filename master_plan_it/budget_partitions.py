@@ -0,0 +1,140 @@
+"""
+FILE: master_plan_it/budget_partitions.py
+SCOPO: Partizioni per Cost Center delle righe dei budget Live: unità di refresh e di lock indipendente, con subtotali e sequenza di refresh propri; i totali di testata sono ricalcolati dalle righe dopo ogni sync.
+INPUT: Refresh del Budget (lock prima della pipeline, sync dopo la scrittura delle righe); letture da budget_freshness (sequenze per partizione).
+OUTPUT/SIDE EFFECTS: Righe MPIT Budget Partition (lock FOR UPDATE, subtotali da un GROUP BY sulle righe), UPDATE dei totali di MPIT Budget (testata bloccata, lettura con lock delle righe) senza toccare `modified`.
+"""
+
+from __future__ import annotations
+
+import datetime
+
+import frappe
+from frappe.utils import cint, flt
+
+PARTITION_DOCTYPE = "MPIT Budget Partition"
+TOTAL_FIELDS = ("total_amount_annual", "total_amount_net", "total_amount_vat", "total_amount_gross")
+
+
+def partition_name(budget: str, cost_center: str) -> str:
+	"""Deterministic partition name (mirrors the DocType autoname format)."""
+	return f"BP-{budget}-{cost_center}"
+
+
+def lock(budget: str, year: str, cost_centers: list[str] | None) -> None:
+	"""Row-lock the partitions a refresh rewrites (every partition of the budget when None).
+
+	Refreshes of different cost centers proceed in parallel, refreshes of the same partition
+	serialize. Locks are always taken partitions first (by name), budget header last (totals),
+	so concurrent refreshes cannot deadlock.
+	"""
+	if cost_centers is None:
+		frappe.db.sql(
+			f"select name from `tab{PARTITION_DOCTYPE}` where budget = %s order by name for update", (budget,)
+		)
+		return
+	for cost_center in cost_centers:
+		_ensure(budget, year, cost_center)
+	frappe.db.sql(
+		f"select name from `tab{PARTITION_DOCTYPE}` where name in %s order by name for update",
+		(tuple(sorted(partition_name(budget, cost_center) for cost_center in cost_centers)),),
+	)
+
+
+def sync(
+	budget, cost_centers: list[str] | None, change_seq: int, refreshed_at: datetime.datetime
+) -> None:
+	"""Recompute subtotals of the refreshed partitions and the header totals from the stored lines.
+
+	A full refresh (cost_centers None) rewrites every partition and drops empty ones; a partial
+	refresh rewrites only its partitions. Header totals are never moved by a subtotal delta:
+	lines are also deleted or edited outside the refresh (contract deletion, manual lines), which
+	leaves the other partition subtotals stale, so the header is aggregated from every line.
+	"""
+	subtotals = _subtotals(budget.name, cost_centers)
+	stamp = {"refreshed_change_seq": cint(change_seq), "last_refreshed_at": refreshed_at}
+
+	if cost_centers is None:
+		existing = set(frappe.get_all(PARTITION_DOCTYPE, filters={"budget": budget.name}, pluck="cost_center"))
+		empty = existing - set(subtotals)
+		if empty:
+			frappe.db.delete(PARTITION_DOCTYPE, {"budget": budget.name, "cost_center": ["in", list(empty)]})
+		for cost_center, values in subtotals.items():
+			if cost_center not in existing:
+				_ensure(budget.name, budget.year, cost_center)
+			frappe.db.set_value(PARTITION_DOCTYPE, partition_name(budget.name, cost_center), {**values, **stamp})
+		_set_header_totals(budget.name, subtotals)
+		return
+
+	for cost_center in cost_centers:
+		values = subtotals.get(cost_center) or {"line_count": 0, **dict.fromkeys(TOTAL_FIELDS, 0.0)}
+		frappe.db.set_value(PARTITION_DOCTYPE, partition_name(budget.name, cost_center), {**values, **stamp})
+	# Header row first: refreshes of other partitions serialize here, and the locking read then
+	# sees their committed lines rather than this transaction's snapshot.
+	frappe.db.sql("select name from `tabMPIT Budget` where name = %s for update", (budget.name,))
+	_set_header_totals(budget.name, _subtotals(budget.name, None, locking=True))
+
+
+def get_partition_seqs(budget: str) -> dict[str, int]:
+	"""Refresh sequence of each partition of a budget (see budget_freshness)."""
+	return {
+		row.cost_center: cint(row.refreshed_change_seq)
+		for row in frappe.get_all(
+			PARTITION_DOCTYPE, filters={"budget": budget}, fields=["cost_center", "refreshed_change_seq"]
+		)
+	}
+
+
+def delete_for_budget(budget: str) -> None:
+	"""Drop the partitions of a deleted budget."""
+	frappe.db.delete(PARTITION_DOCTYPE, {"budget": budget})
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Internals
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def _ensure(budget: str, year: str, cost_center: str) -> None:
+	if frappe.db.exists(PARTITION_DOCTYPE, partition_name(budget, cost_center)):
+		return
+	frappe.get_doc(
+		{"doctype": PARTITION_DOCTYPE, "budget": budget, "year": year, "cost_center": cost_center}
+	).insert(ignore_permissions=True, ignore_if_duplicate=True)
+
+
+def _subtotals(budget: str, cost_centers: list[str] | None, locking: bool = False) -> dict[str, dict]:
+	"""Line count and rounded totals per cost center, same rounding as the header totals."""
+	condition = "and cost_center in %(cost_centers)s" if cost_centers is not None else ""
+	lock_clause = "lock in share mode" if locking else ""
+	rows = frappe.db.sql(
+		f"""
+		select
+			cost_center,
+			count(*),
+			coalesce(sum(round(annual_amount, 2)), 0),
+			coalesce(sum(round(annual_net, 2)), 0),
+			coalesce(sum(round(annual_vat, 2)), 0),
+			coalesce(sum(round(annual_gross, 2)), 0)
+		from `tabMPIT Budget Line`
+		where parent = %(budget)s and parenttype = 'MPIT Budget' and parentfield = 'lines'
+			and cost_center is not null {condition}
+		group by cost_center
+		{lock_clause}
+		""",
+		{"budget": budget, "cost_centers": tuple(cost_centers or ())},
+	)
+	return {
+		row[0]: {"line_count": cint(row[1]), **{field: flt(value, 2) for field, value in zip(TOTAL_FIELDS, row[2:])}}
+		for row in rows
+	}
+
+
+def _set_header_totals(budget: str, subtotals: dict[str, dict]) -> None:
+	totals = {field: flt(sum(values[field] for values in subtotals.values()), 2) for field in TOTAL_FIELDS}
+	frappe.db.set_value(
+		"MPIT Budget",
+		budget,
+		{**totals, "total_amount_monthly": flt(totals["total_amount_net"] / 12.0, 2)},
+		update_modified=False,
+	)
@@ -2,13 +2,14 @@
 FILE: master_plan_it/budget_refresh_hooks.py
 SCOPO: Handler per doc_events che triggera auto-refresh dei budget Live quando cambiano sorgenti validate.
 INPUT: Eventi Frappe (on_update, after_submit, on_cancel, on_trash) su Contract, Planned Item, Addendum.
-OUTPUT/SIDE EFFECTS: Enqueue refresh per budget LIVE degli anni nell'orizzonte (current + next); skip per Draft o anni chiusi.
+OUTPUT/SIDE EFFECTS: Enqueue refresh per budget LIVE degli anni nell'orizzonte (current + next), limitato alle partizioni dei Cost Center coinvolti quando noti, e stamp della sequenza di modifica (budget_freshness); skip per Draft o anni chiusi.
 """
 
 from __future__ import annotations
 
 import frappe
 from frappe.utils import getdate, nowdate
+from master_plan_it import budget_freshness, slow_trace
 
 
 def _get_horizon_years() -> set[str]:
@@ -27,8 +28,12 @@ def _extract_years_from_dates(start_date, end_date) -> list[str]:
     return list(years)
 
 
-def _trigger_refresh(years: list[str]) -> None:
-    """Enqueue budget refresh for specified years if within horizon."""
+def _trigger_refresh(years: list[str], cost_centers: list[str] | None = None) -> None:
+    """Enqueue budget refresh for specified years if within horizon.
+
+    `cost_centers` limits the refresh to those partitions; None (or an unknown cost
+    center) refreshes the whole budget.
+    """
     if not years:
         return
 
@@ -37,8 +42,12 @@ def _trigger_refresh(years: list[str]) -> None:
     horizon = _get_horizon_years()
     years_in_horizon = [y for y in years if y in horizon]
 
+    if cost_centers is not None and not all(cost_centers):
+        cost_centers = None
+
     if years_in_horizon:
-        enqueue_budget_refresh(years_in_horizon)
+        budget_freshness.record_source_change(years_in_horizon, cost_centers)
+        enqueue_budget_refresh(years_in_horizon, cost_centers)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -48,6 +57,7 @@ def _trigger_refresh(years: list[str]) -> None:
 VALID_CONTRACT_STATUSES = {"Active", "Pending Renewal", "Renewed"}
 
 
+@slow_trace.traced("Doc Event")
 def on_contract_change(doc, method: str) -> None:
 	"""Handle contract changes: trigger refresh only for validated statuses.
 	
@@ -56,12 +66,14 @@ def on_contract_change(doc, method: str) -> None:
 	"""
 	prev = doc.get_doc_before_save()
 	prev_status = prev.status if prev else None
+	# Lines move between partitions when the cost center changes: refresh both.
+	cost_centers = sorted({doc.cost_center, prev.cost_center if prev else doc.cost_center}, key=str)
 
 	# Draft: trigger only on regression from a valid status, else skip
 	if doc.status == "Draft":
 		if prev_status in VALID_CONTRACT_STATUSES:
 			years = _extract_years_from_dates(doc.start_date, doc.end_date) or _get_horizon_years()
-			_trigger_refresh(years)
+			_trigger_refresh(years, cost_centers)
 		return
 
 	# Skip Cancelled/Expired unless they were previously valid (transition case)
@@ -78,7 +90,7 @@ def on_contract_change(doc, method: str) -> None:
 		horizon = _get_horizon_years()
 		years = list(horizon)
 
-	_trigger_refresh(years)
+	_trigger_refresh(years, cost_centers)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -86,6 +98,7 @@ def on_contract_change(doc, method: str) -> None:
 # ─────────────────────────────────────────────────────────────────────────────
 
 
+@slow_trace.traced("Doc Event")
 def on_planned_item_change(doc, method: str) -> None:
 	"""Handle Planned Item changes: trigger refresh when submitted items change.
 	
@@ -114,7 +127,12 @@ def on_planned_item_change(doc, method: str) -> None:
 	else:
 		years = _extract_years_from_dates(doc.start_date, doc.end_date)
 
-	_trigger_refresh(years)
+	# Planned Item lines belong to the partition of their project's cost center (old and new project).
+	projects = {doc.project, prev.project if prev else doc.project}
+	cost_centers = [
+		frappe.db.get_value("MPIT Project", project, "cost_center") if project else None for project in projects
+	]
+	_trigger_refresh(years, cost_centers)
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -122,6 +140,7 @@ def on_planned_item_change(doc, method: str) -> None:
 # ─────────────────────────────────────────────────────────────────────────────
 
 
+@slow_trace.traced("Doc Event")
 def on_addendum_change(doc, method: str) -> None:
     """Handle Budget Addendum submit/cancel: trigger refresh for affected year.
     
@@ -134,7 +153,7 @@ def on_addendum_change(doc, method: str) -> None:
     # Get year string from Link field
     year_str = str(doc.year)
 
-    _trigger_refresh([year_str])
+    _trigger_refresh([year_str], [doc.cost_center])
 
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -0,0 +1,109 @@
+"""
+FILE: master_plan_it/budget_refresh_lock.py
+SCOPO: Lock advisory Redis per budget (o partizione Cost Center) attorno al refresh da sorgenti, con coalescenza: al massimo un refresh in corso e uno in attesa.
+INPUT: run_coalesced(budget, cost_centers, refresh) dal refresh del Budget (job e pulsante manuale); request_rerun() all'enqueue dei job.
+OUTPUT/SIDE EFFECTS: Chiavi Redis di lock (token, TTL `mpit_refresh_lock_ttl`) e di "rerun requested"; commit tra un giro di refresh e il successivo.
+"""
+
+from __future__ import annotations
+
+from collections.abc import Callable
+
+import frappe
+from frappe.utils import cint
+
+LOCK_KEY = "mpit_budget_refresh_lock"
+RERUN_KEY = "mpit_budget_refresh_rerun"
+DEFAULT_TTL = 900
+
+# Delete the lock only if this process still owns it (it may have expired and been re-taken).
+_RELEASE_SCRIPT = """
+if redis.call('get', KEYS[1]) == ARGV[1] then
+	return redis.call('del', KEYS[1])
+end
+return 0
+"""
+_REQUEST_RERUN_SCRIPT = """
+if redis.call('exists', KEYS[1]) == 1 then
+	return redis.call('set', KEYS[2], 1, 'EX', ARGV[1]) and 1
+end
+return 0
+"""
+
+
+def run_coalesced(budget: str, cost_centers: list[str] | None, refresh: Callable[[], None]) -> bool:
+	"""Run `refresh` holding the lock of the budget scope; return False if coalesced instead.
+
+	A caller that finds the lock held does not wait: it sets the "rerun requested" flag and
+	returns. The holder checks the flag after each run, commits (so the next run reads the
+	sources committed meanwhile) and runs once more; every request arriving during a run
+	is served by the same rerun.
+	"""
+	cache = frappe.cache()
+	scope = scope_key(budget, cost_centers)
+	lock_key = cache.make_key(f"{LOCK_KEY}:{scope}")
+	rerun_key = cache.make_key(f"{RERUN_KEY}:{scope}")
+	ttl = cint(frappe.conf.get("mpit_refresh_lock_ttl")) or DEFAULT_TTL
+	token = frappe.generate_hash(length=16)
+
+	ran = False
+	while True:
+		if not _raw(cache, "set", lock_key, token, nx=True, ex=ttl):
+			_raw(cache, "set", rerun_key, 1, ex=ttl)
+			return ran
+		try:
+			while True:
+				refresh()
+				ran = True
+				if not _raw(cache, "delete", rerun_key):
+					break
+				frappe.db.commit()
+				_raw(cache, "expire", lock_key, ttl)
+		finally:
+			_raw(cache, "eval", _RELEASE_SCRIPT, 1, lock_key, token)
+		# A request may have found the lock held between the last check and the release.
+		if not _raw(cache, "exists", rerun_key):
+			return ran
+		frappe.db.commit()
+
+
+def request_rerun(budget: str, cost_centers: list[str] | None = None) -> bool:
+	"""Ask a running refresh of the budget scope to run once more; False when none is running.
+
+	Used on enqueue: a deduplicated job id is skipped while the job is started, so a source
+	change committed during the run would otherwise wait for the next event.
+	"""
+	cache = frappe.cache()
+	scope = scope_key(budget, cost_centers)
+	ttl = cint(frappe.conf.get("mpit_refresh_lock_ttl")) or DEFAULT_TTL
+	return bool(
+		_raw(
+			cache,
+			"eval",
+			_REQUEST_RERUN_SCRIPT,
+			2,
+			cache.make_key(f"{LOCK_KEY}:{scope}"),
+			cache.make_key(f"{RERUN_KEY}:{scope}"),
+			ttl,
+		)
+	)
+
+
+def is_running(budget: str, cost_centers: list[str] | None = None) -> bool:
+	"""Whether a refresh of the budget scope currently holds the lock."""
+	cache = frappe.cache()
+	return bool(_raw(cache, "exists", cache.make_key(f"{LOCK_KEY}:{scope_key(budget, cost_centers)}")))
+
+
+def scope_key(budget: str, cost_centers: list[str] | None) -> str:
+	"""Lock scope: the whole budget, or its cost center partitions (same scopes as the refresh job ids)."""
+	if not cost_centers:
+		return budget
+	return f"{budget}:cc:{','.join(sorted(cost_centers))}"
+
+
+def _raw(cache, command: str, *args, **kwargs):
+	"""Run a plain Redis command (RedisWrapper's helpers pickle values)."""
+	pipe = cache.pipeline()
+	getattr(pipe, command)(*args, **kwargs)
+	return pipe.execute()[0]
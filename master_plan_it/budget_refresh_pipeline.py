@@ -0,0 +1,355 @@
+"""
+FILE: master_plan_it/budget_refresh_pipeline.py
+SCOPO: Refresh dei budget Live come pipeline a blocchi con memoria limitata: sorgenti lette per chiave (keyset su name) → payload generati dal core → diff con le righe salvate dello stesso blocco → scritture in batch; opzionalmente limitato ad alcune partizioni (Cost Center).
+INPUT: Documento MPIT Budget Live e limiti dell'anno fiscale; site_config mpit_refresh_chunk_size (default 1000), mpit_refresh_workers / mpit_refresh_parallel_min_sources (process pool, vedi core.parallel).
+OUTPUT/SIDE EFFECTS: Insert/update/delete diretti su `tabMPIT Budget Line` (la child table non viene mai caricata per intero) e sui fatti di cassa `tabMPIT Cashflow Entry` (cashflow, stesso passaggio); le righe confermate dal refresh ricevono `modified` = inizio refresh, le righe generate non confermate vengono rimosse; restituisce le statistiche per il log di refresh (righe, nuove/aggiornate/rimosse, picco memoria).
+"""
+
+from __future__ import annotations
+
+import datetime
+import resource
+import sys
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager, nullcontext
+from typing import Iterator
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt, now_datetime
+
+from master_plan_it import cashflow, mpit_defaults
+from master_plan_it.core import cashflow as core_cashflow, lines as core_lines, parallel as core_parallel
+from master_plan_it.core.errors import CoreValidationError
+from master_plan_it.master_plan_it.doctype.mpit_budget import mpit_budget
+
+LINE_DOCTYPE = "MPIT Budget Line"
+DEFAULT_CHUNK_SIZE = 1000
+# Below this many source records the process pool is not worth forking.
+PARALLEL_MIN_SOURCES = 5000
+
+# Columns owned by the refresh: compared with the stored row to skip unchanged lines.
+STORED_FIELDS = mpit_budget.STORED_LINE_FIELDS
+FIELD_DEFAULTS = {"qty": 1, "recurrence_rule": "Monthly"}
+
+
+def run(
+	budget, year_start: datetime.date, year_end: datetime.date, cost_centers: list[str] | None = None
+) -> dict:
+	"""Stream sources, upsert generated lines chunk by chunk, drop lines no longer generated.
+
+	`cost_centers` limits sources and lines to those partitions (see budget_partitions).
+	Header totals are maintained afterwards; `budget.lines` is not touched (reload to read them).
+	"""
+	chunk_size = cint(frappe.conf.get("mpit_refresh_chunk_size")) or DEFAULT_CHUNK_SIZE
+	workers = _parallel_workers()
+	trace_memory = bool(frappe.conf.get("mpit_refresh_trace_memory")) and not tracemalloc.is_tracing()
+	if trace_memory:
+		tracemalloc.start()
+	try:
+		writer = _LineWriter(budget, year_start, year_end, cost_centers)
+		# The cash-out facts of the refreshed partitions are derived data: rebuilt from scratch.
+		cashflow.clear(budget.name, cost_centers)
+		payment_count = 0
+		# One worker pool for the whole refresh: forking per source chunk would repeat the startup cost.
+		with core_parallel.process_pool(workers) if workers > 1 else nullcontext() as executor:
+			for payloads, payments in generate_chunks(year_start, year_end, chunk_size, workers, cost_centers, executor):
+				writer.write(payloads)
+				cashflow.insert(budget.name, budget.year, payments, writer.stamp)
+				payment_count += len(payments)
+		writer.delete_stale()
+		stats = writer.stats
+		stats["payments"] = payment_count
+		if trace_memory:
+			stats["peak_traced_mb"] = flt(tracemalloc.get_traced_memory()[1] / 2**20, 1)
+	finally:
+		if trace_memory:
+			tracemalloc.stop()
+	stats.update(chunk_size=chunk_size, workers=workers, peak_rss_mb=_peak_rss_mb())
+	return stats
+
+
+def generate_chunks(
+	year_start: datetime.date,
+	year_end: datetime.date,
+	chunk_size: int,
+	workers: int = 0,
+	cost_centers: list[str] | None = None,
+	executor: ProcessPoolExecutor | None = None,
+) -> Iterator[tuple[list[dict], list[dict]]]:
+	"""(line payloads, payment events) per source chunk: contracts (with their terms) first, then Planned Items (with their projects).
+
+	Payments (core.cashflow) come from the records already loaded for the lines: no extra source fetch.
+	With workers > 1 the lines of each chunk are generated on `executor` (core.parallel.process_pool),
+	or on a pool forked for that chunk when none is given.
+	"""
+	source_chunk = chunk_size * max(workers, 1)
+	for contracts, terms_by_contract in _contract_chunks(source_chunk, cost_centers):
+		with _core_errors_as_validation():
+			if workers > 1:
+				payloads = core_parallel.generate_lines(
+					contracts, terms_by_contract, [], {}, year_start, year_end,
+					workers=workers, chunk_size=chunk_size, executor=executor,
+				)
+			else:
+				payloads = core_lines.generate_contract_lines(contracts, terms_by_contract, year_start, year_end)
+		yield payloads, core_cashflow.generate_contract_payments(contracts, terms_by_contract, year_start, year_end)
+
+	for items, projects in _planned_item_chunks(source_chunk, cost_centers):
+		with _core_errors_as_validation():
+			if workers > 1:
+				payloads = core_parallel.generate_lines(
+					[], {}, items, projects, year_start, year_end,
+					workers=workers, chunk_size=chunk_size, executor=executor,
+				)
+			else:
+				payloads = core_lines.generate_planned_item_lines(items, projects, year_start, year_end)
+		yield payloads, core_cashflow.generate_planned_item_payments(items, projects, year_start, year_end)
+
+
+def rebuild_cashflow(budget: str, year: str, year_start: datetime.date, year_end: datetime.date) -> int:
+	"""Regenerate every cash-out fact of a Live budget from its sources, leaving its lines untouched (backfill).
+
+	Returns the number of payment events written.
+	"""
+	chunk_size = cint(frappe.conf.get("mpit_refresh_chunk_size")) or DEFAULT_CHUNK_SIZE
+	stamp = now_datetime()
+	cashflow.clear(budget)
+	payment_count = 0
+	for contracts, terms_by_contract in _contract_chunks(chunk_size):
+		payments = core_cashflow.generate_contract_payments(contracts, terms_by_contract, year_start, year_end)
+		cashflow.insert(budget, year, payments, stamp)
+		payment_count += len(payments)
+	for items, projects in _planned_item_chunks(chunk_size):
+		payments = core_cashflow.generate_planned_item_payments(items, projects, year_start, year_end)
+		cashflow.insert(budget, year, payments, stamp)
+		payment_count += len(payments)
+	return payment_count
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Writer
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+class _LineWriter:
+	"""Diffs each chunk against the stored lines with the same source keys and writes in batches."""
+
+	def __init__(
+		self, budget, year_start: datetime.date, year_end: datetime.date, cost_centers: list[str] | None = None
+	) -> None:
+		self.budget = budget
+		self.cost_centers = cost_centers
+		self.year_start = year_start
+		self.year_end = year_end
+		self.default_vat = mpit_defaults.get_default_vat_rate()
+		# Lines confirmed by this run carry this stamp; older generated lines are stale.
+		self.stamp = now_datetime()
+		self.next_idx = cint(
+			frappe.db.sql(
+				f"select max(idx) from `tab{LINE_DOCTYPE}` where parent = %s and parenttype = 'MPIT Budget'",
+				(budget.name,),
+			)[0][0]
+		) + 1
+		self.stats = {"lines": 0, "inserted": 0, "updated": 0, "unchanged": 0, "deleted": 0, "chunks": 0, "max_chunk_lines": 0}
+
+	def write(self, payloads: list[dict]) -> None:
+		payloads = [payload for payload in payloads if payload.get("source_key")]
+		if not payloads:
+			return
+		stored = {
+			row.source_key: row
+			for row in frappe.get_all(
+				LINE_DOCTYPE,
+				filters={
+					**self._parent_filters(),
+					"is_generated": 1,
+					"source_key": ["in", [payload["source_key"] for payload in payloads]],
+				},
+				fields=["name", "idx", *STORED_FIELDS],
+			)
+		}
+
+		lines = []
+		for payload in payloads:
+			line = frappe._dict(FIELD_DEFAULTS)
+			line.update({key: value for key, value in payload.items() if value is not None or key not in FIELD_DEFAULTS})
+			existing = stored.get(line.source_key)
+			if existing:
+				line.name, line.idx = existing.name, existing.idx
+			else:
+				line.idx = self.next_idx
+				self.next_idx += 1
+			lines.append(line)
+		mpit_budget.compute_lines_amounts(lines, self.budget.year, self.year_start, self.year_end, self.default_vat)
+
+		new_rows, unchanged = [], []
+		for line in lines:
+			existing = stored.get(line.source_key)
+			if not existing:
+				new_rows.append(line)
+			elif any(mpit_budget.stored_line_value(field, line.get(field)) != mpit_budget.stored_line_value(field, existing.get(field)) for field in STORED_FIELDS):
+				frappe.db.set_value(
+					LINE_DOCTYPE,
+					line.name,
+					{
+						**{field: mpit_budget.stored_line_value(field, line.get(field)) for field in STORED_FIELDS},
+						"modified": self.stamp,
+						"modified_by": frappe.session.user,
+					},
+					update_modified=False,
+				)
+				self.stats["updated"] += 1
+			else:
+				unchanged.append(line.name)
+
+		if unchanged:
+			frappe.db.sql(
+				f"update `tab{LINE_DOCTYPE}` set modified = %s where name in %s", (self.stamp, tuple(unchanged))
+			)
+		if new_rows:
+			self._insert(new_rows)
+
+		self.stats["inserted"] += len(new_rows)
+		self.stats["unchanged"] += len(unchanged)
+		self.stats["lines"] += len(lines)
+		self.stats["chunks"] += 1
+		self.stats["max_chunk_lines"] = max(self.stats["max_chunk_lines"], len(lines))
+
+	def delete_stale(self) -> None:
+		"""Remove generated lines not confirmed by this run (source gone, out of year, new source key)."""
+		filters = {**self._parent_filters(), "is_generated": 1, "modified": ["<", self.stamp]}
+		if self.cost_centers is not None:
+			filters["cost_center"] = ["in", self.cost_centers]
+		stale = frappe.db.count(LINE_DOCTYPE, filters)
+		if stale:
+			frappe.db.delete(LINE_DOCTYPE, filters)
+		self.stats["deleted"] = stale
+
+	def _insert(self, lines: list[frappe._dict]) -> None:
+		user = frappe.session.user
+		standard = ["name", "creation", "modified", "owner", "modified_by", "docstatus", "parent", "parenttype", "parentfield", "idx"]
+		values = [
+			[
+				frappe.generate_hash(length=10),
+				self.stamp,
+				self.stamp,
+				user,
+				user,
+				0,
+				self.budget.name,
+				"MPIT Budget",
+				"lines",
+				line.idx,
+				*(mpit_budget.stored_line_value(field, line.get(field)) for field in STORED_FIELDS),
+			]
+			for line in lines
+		]
+		frappe.db.bulk_insert(LINE_DOCTYPE, standard + list(STORED_FIELDS), values)
+
+	def _parent_filters(self) -> dict:
+		return {"parent": self.budget.name, "parenttype": "MPIT Budget", "parentfield": "lines"}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Sources (keyset pagination on name)
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def _contract_chunks(size: int, cost_centers: list[str] | None = None) -> Iterator[tuple[list, dict[str, list]]]:
+	filters = {"status": ["in", list(core_lines.CONTRACT_STATUSES)]}
+	if cost_centers is not None:
+		filters["cost_center"] = ["in", cost_centers]
+	for rows in _keyset_pages(
+		"MPIT Contract",
+		filters,
+		core_lines.record_fields(core_lines.ContractRecord),
+		size,
+	):
+		contracts = [core_lines.from_row(core_lines.ContractRecord, row) for row in rows]
+		terms_by_contract: dict[str, list] = {}
+		for row in frappe.get_all(
+			"MPIT Contract Term",
+			filters={"parent": ["in", [contract.name for contract in contracts]]},
+			fields=core_lines.record_fields(core_lines.ContractTermRecord),
+			order_by="parent, from_date asc",
+		):
+			terms_by_contract.setdefault(row.parent, []).append(core_lines.from_row(core_lines.ContractTermRecord, row))
+		yield contracts, terms_by_contract
+
+
+def _planned_item_chunks(size: int, cost_centers: list[str] | None = None) -> Iterator[tuple[list, dict]]:
+	filters = {"docstatus": 1, "is_covered": 0}
+	if cost_centers is not None:
+		# Planned Item lines take the cost center of their project.
+		projects = frappe.get_all("MPIT Project", filters={"cost_center": ["in", cost_centers]}, pluck="name")
+		if not projects:
+			return
+		filters["project"] = ["in", projects]
+	for rows in _keyset_pages(
+		"MPIT Planned Item",
+		filters,
+		core_lines.record_fields(core_lines.PlannedItemRecord),
+		size,
+	):
+		items = [core_lines.from_row(core_lines.PlannedItemRecord, row) for row in rows]
+		projects = {
+			row.name: core_lines.from_row(core_lines.ProjectRecord, row)
+			for row in frappe.get_all(
+				"MPIT Project",
+				filters={"name": ["in", list({item.project for item in items if item.project})]},
+				fields=core_lines.record_fields(core_lines.ProjectRecord),
+			)
+		}
+		yield items, projects
+
+
+def _keyset_pages(doctype: str, filters: dict, fields: list[str], size: int) -> Iterator[list]:
+	last_name = None
+	while True:
+		page_filters = dict(filters)
+		if last_name is not None:
+			page_filters["name"] = [">", last_name]
+		rows = frappe.get_all(doctype, filters=page_filters, fields=fields, order_by="name asc", limit_page_length=size)
+		if rows:
+			yield rows
+		if len(rows) < size:
+			return
+		last_name = rows[-1].name
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Helpers
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def _parallel_workers() -> int:
+	"""Process-pool size for line generation (site_config), 0 = serial.
+
+	`mpit_refresh_workers` enables the pool; below `mpit_refresh_parallel_min_sources`
+	source records (default 5000) forking costs more than it saves.
+	"""
+	workers = cint(frappe.conf.get("mpit_refresh_workers"))
+	if workers <= 1 or not core_parallel.can_fork():
+		return 0
+	min_sources = cint(frappe.conf.get("mpit_refresh_parallel_min_sources") or PARALLEL_MIN_SOURCES)
+	sources = frappe.db.count("MPIT Contract", {"status": ["in", list(core_lines.CONTRACT_STATUSES)]})
+	sources += frappe.db.count("MPIT Planned Item", {"docstatus": 1, "is_covered": 0})
+	return workers if sources >= min_sources else 0
+
+
+@contextmanager
+def _core_errors_as_validation():
+	"""Re-raise core validation errors as translated frappe.throw messages."""
+	try:
+		yield
+	except CoreValidationError as exc:
+		frappe.throw(_(exc.message).format(*exc.format_args))
+
+
+def _peak_rss_mb() -> float:
+	"""High-water resident memory of this worker process."""
+	peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+	# ru_maxrss is in KiB on Linux, bytes on macOS
+	return flt(peak / (2**20 if sys.platform == "darwin" else 2**10), 1)
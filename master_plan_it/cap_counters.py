@@ -0,0 +1,304 @@
+"""
+FILE: master_plan_it/cap_counters.py
+SCOPO: Contatori incrementali di consumo Cap per (year, cost_center): Allowance dello Snapshot corrente, totale Addendum, Actual Verified.
+INPUT: doc_events su MPIT Actual Entry (on_update/on_trash), MPIT Budget Addendum (on_submit/on_cancel), MPIT Budget (on_submit/on_cancel); letture da get_cap_for_cost_center/get_cost_center_summary.
+OUTPUT/SIDE EFFECTS: Aggiorna MPIT Cap Counter per delta (UPDATE atomico), invalida il mirror Redis; rebuild da sorgenti su riga mancante/Snapshot cambiato e via scheduler giornaliero.
+"""
+
+from __future__ import annotations
+
+import frappe
+from frappe.utils import flt, now
+
+from master_plan_it import metrics, slow_trace
+from master_plan_it.master_plan_it.doctype.mpit_year import mpit_year
+
+COUNTER_DOCTYPE = "MPIT Cap Counter"
+CACHE_KEY = "mpit_cap_counters"
+COUNTER_FIELDS = ("snapshot_budget", "snapshot_allowance", "addendum_total", "verified_actual")
+
+
+def counter_name(year: str | int, cost_center: str) -> str:
+	"""Deterministic counter name (mirrors the DocType autoname format)."""
+	return f"CAP-{year}-{cost_center}"
+
+
+def get_counters(year: str | int, cost_center: str) -> dict:
+	"""Return Cap counters for (year, cost_center): Redis mirror, then DB row, then rebuild from sources.
+
+	A row recorded against a Snapshot that is no longer the year's current one is rebuilt on read,
+	so a missed Snapshot event cannot leave a stale allowance behind.
+	"""
+	year = str(year)
+	name = counter_name(year, cost_center)
+	snapshot = mpit_year.get_current_snapshot(year)
+
+	cached = frappe.cache().hget(CACHE_KEY, name)
+	if cached and cached.get("snapshot_budget") == snapshot:
+		metrics.inc("mpit_cache_requests_total", cache="cap_counters", result="hit")
+		return cached
+	metrics.inc("mpit_cache_requests_total", cache="cap_counters", result="miss")
+
+	row = frappe.db.get_value(COUNTER_DOCTYPE, name, COUNTER_FIELDS, as_dict=True)
+	if not row or (row.snapshot_budget or None) != snapshot:
+		row = _rebuild_counter(year, cost_center)
+
+	payload = _payload(row)
+	frappe.cache().hset(CACHE_KEY, name, payload)
+	return payload
+
+
+def get_counters_batch(year: str | int, cost_centers: list[str]) -> dict[str, dict]:
+	"""Return Cap counters for many cost centers of a year with a single query.
+
+	Cost centers without a row have no Cap sources and get zero counters. If any row was
+	recorded against another Snapshot, the whole year is rebuilt once before reading.
+	"""
+	year = str(year)
+	if not cost_centers:
+		return {}
+	snapshot = mpit_year.get_current_snapshot(year)
+	rows = _read_rows(year, cost_centers)
+	if any((row.snapshot_budget or None) != snapshot for row in rows.values()):
+		rebuild_year(year)
+		rows = _read_rows(year, cost_centers)
+
+	empty = frappe._dict(snapshot_budget=snapshot)
+	return {cost_center: _payload(rows.get(cost_center, empty)) for cost_center in cost_centers}
+
+
+def apply_delta(
+	year: str | int | None,
+	cost_center: str | None,
+	*,
+	addendum: float = 0.0,
+	actual: float = 0.0,
+	persisted: bool = True,
+) -> None:
+	"""Adjust the addendum/actual counters of (year, cost_center) by a delta.
+
+	`persisted` tells whether the source change is already written in the current transaction:
+	when the counter row is missing it is rebuilt from sources, and the delta is applied on top
+	only if the sources do not reflect it yet (e.g. on_trash runs before the row is deleted).
+	"""
+	if not year or not cost_center:
+		return
+	addendum = flt(addendum, 2)
+	actual = flt(actual, 2)
+	if not addendum and not actual:
+		return
+
+	year = str(year)
+	name = counter_name(year, cost_center)
+	if not frappe.db.exists(COUNTER_DOCTYPE, name):
+		_rebuild_counter(year, cost_center)
+		if persisted:
+			_invalidate(name)
+			return
+
+	frappe.db.sql(
+		"""
+		UPDATE `tabMPIT Cap Counter`
+		SET addendum_total = addendum_total + %(addendum)s,
+			verified_actual = verified_actual + %(actual)s,
+			modified = %(now)s
+		WHERE name = %(name)s
+		""",
+		{"addendum": addendum, "actual": actual, "now": now(), "name": name},
+	)
+	_invalidate(name)
+
+
+def rebuild_year(year: str | int) -> None:
+	"""Recompute every counter of a year from sources with grouped queries (one per measure)."""
+	year = str(year)
+	snapshot = mpit_year.get_current_snapshot(year)
+
+	allowance = {}
+	if snapshot:
+		allowance = _grouped_totals(
+			"""
+			SELECT cost_center, SUM(annual_net)
+			FROM `tabMPIT Budget Line`
+			WHERE parent = %(snapshot)s AND parenttype = 'MPIT Budget' AND line_kind = 'Allowance'
+				AND cost_center IS NOT NULL
+			GROUP BY cost_center
+			""",
+			{"snapshot": snapshot},
+		)
+	addendum = _grouped_totals(
+		"""
+		SELECT cost_center, SUM(delta_amount)
+		FROM `tabMPIT Budget Addendum`
+		WHERE year = %(year)s AND docstatus = 1 AND cost_center IS NOT NULL
+		GROUP BY cost_center
+		""",
+		{"year": year},
+	)
+	actual = _grouped_totals(
+		"""
+		SELECT cost_center, SUM(amount_net)
+		FROM `tabMPIT Actual Entry`
+		WHERE year = %(year)s AND status = 'Verified' AND cost_center IS NOT NULL
+		GROUP BY cost_center
+		""",
+		{"year": year},
+	)
+
+	cost_centers = set(allowance) | set(addendum) | set(actual)
+	for name in frappe.get_all(
+		COUNTER_DOCTYPE,
+		filters={"year": year, "cost_center": ("not in", list(cost_centers) or [""])},
+		pluck="name",
+	):
+		frappe.delete_doc(COUNTER_DOCTYPE, name, ignore_permissions=True, force=True)
+
+	for cost_center in cost_centers:
+		_write_counter(
+			year,
+			cost_center,
+			{
+				"snapshot_budget": snapshot,
+				"snapshot_allowance": allowance.get(cost_center, 0.0),
+				"addendum_total": addendum.get(cost_center, 0.0),
+				"verified_actual": actual.get(cost_center, 0.0),
+			},
+		)
+
+	frappe.cache().delete_value(CACHE_KEY)
+
+
+def rebuild_all() -> None:
+	"""Scheduler entry point: realign all counters with sources (repairs drift from concurrent first writes)."""
+	for year in frappe.get_all("MPIT Year", pluck="name"):
+		rebuild_year(year)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# doc_events handlers
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+@slow_trace.traced("Doc Event")
+def on_actual_entry_change(doc, method: str | None = None) -> None:
+	"""Move the Verified amount between counters when status, scope or amount change."""
+	is_trash = method == "on_trash"
+	old = _actual_contribution(doc if is_trash else doc.get_doc_before_save())
+	new = None if is_trash else _actual_contribution(doc)
+	if old == new:
+		return
+	if old:
+		apply_delta(old[0], old[1], actual=-old[2], persisted=not is_trash)
+	if new:
+		apply_delta(new[0], new[1], actual=new[2])
+
+
+@slow_trace.traced("Doc Event")
+def on_addendum_change(doc, method: str | None = None) -> None:
+	"""Add the Addendum delta on submit, remove it on cancel."""
+	sign = -1 if method == "on_cancel" else 1
+	apply_delta(doc.year, doc.cost_center, addendum=sign * flt(doc.delta_amount, 2))
+
+
+@slow_trace.traced("Doc Event")
+def on_snapshot_change(doc, method: str | None = None) -> None:
+	"""Reload allowance counters when the year's current Snapshot may have changed."""
+	if doc.budget_type != "Snapshot" or not doc.year:
+		return
+	rebuild_year(doc.year)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Internals
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def _actual_contribution(doc) -> tuple[str, str, float] | None:
+	if not doc or doc.status != "Verified" or not doc.year or not doc.cost_center:
+		return None
+	return (str(doc.year), doc.cost_center, flt(doc.amount_net, 2))
+
+
+def _rebuild_counter(year: str, cost_center: str) -> dict:
+	"""Recompute a single counter from sources and persist it."""
+	snapshot = mpit_year.get_current_snapshot(year)
+	allowance = 0.0
+	if snapshot:
+		allowance = _scalar(
+			"""
+			SELECT SUM(annual_net) FROM `tabMPIT Budget Line`
+			WHERE parent = %(snapshot)s AND parenttype = 'MPIT Budget'
+				AND line_kind = 'Allowance' AND cost_center = %(cost_center)s
+			""",
+			{"snapshot": snapshot, "cost_center": cost_center},
+		)
+	values = {
+		"snapshot_budget": snapshot,
+		"snapshot_allowance": allowance,
+		"addendum_total": _scalar(
+			"""
+			SELECT SUM(delta_amount) FROM `tabMPIT Budget Addendum`
+			WHERE year = %(year)s AND cost_center = %(cost_center)s AND docstatus = 1
+			""",
+			{"year": year, "cost_center": cost_center},
+		),
+		"verified_actual": _scalar(
+			"""
+			SELECT SUM(amount_net) FROM `tabMPIT Actual Entry`
+			WHERE year = %(year)s AND cost_center = %(cost_center)s AND status = 'Verified'
+			""",
+			{"year": year, "cost_center": cost_center},
+		),
+	}
+	_write_counter(year, cost_center, values)
+	return frappe._dict(values)
+
+
+def _write_counter(year: str, cost_center: str, values: dict) -> None:
+	name = counter_name(year, cost_center)
+	if frappe.db.exists(COUNTER_DOCTYPE, name):
+		frappe.db.set_value(COUNTER_DOCTYPE, name, values, update_modified=False)
+		return
+	frappe.get_doc(
+		{"doctype": COUNTER_DOCTYPE, "year": year, "cost_center": cost_center, **values}
+	).insert(ignore_permissions=True, ignore_if_duplicate=True)
+
+
+def _read_rows(year: str, cost_centers: list[str]) -> dict[str, frappe._dict]:
+	rows = frappe.get_all(
+		COUNTER_DOCTYPE,
+		filters={"year": year, "cost_center": ("in", cost_centers)},
+		fields=["cost_center", *COUNTER_FIELDS],
+	)
+	return {row.cost_center: row for row in rows}
+
+
+def _invalidate(name: str) -> None:
+	# Drop the mirror now and again on rollback, so uncommitted deltas are never served.
+	frappe.cache().hdel(CACHE_KEY, name)
+	frappe.db.after_rollback.add(lambda: frappe.cache().hdel(CACHE_KEY, name))
+
+
+def _payload(row) -> dict:
+	snapshot_allowance = flt(row.get("snapshot_allowance"), 2)
+	addendum_total = flt(row.get("addendum_total"), 2)
+	verified_actual = flt(row.get("verified_actual"), 2)
+	cap_total = flt(snapshot_allowance + addendum_total, 2)
+	return {
+		"snapshot_budget": row.get("snapshot_budget") or None,
+		"snapshot_allowance": snapshot_allowance,
+		"addendum_total": addendum_total,
+		"cap_total": cap_total,
+		"verified_actual": verified_actual,
+		"remaining": flt(cap_total - verified_actual, 2) if cap_total > verified_actual else 0.0,
+		"over_cap": flt(verified_actual - cap_total, 2) if verified_actual > cap_total else 0.0,
+	}
+
+
+def _grouped_totals(query: str, params: dict) -> dict[str, float]:
+	return {row[0]: flt(row[1], 2) for row in frappe.db.sql(query, params)}
+
+
+def _scalar(query: str, params: dict) -> float:
+	result = frappe.db.sql(query, params)
+	return flt(result[0][0] if result else 0, 2)
@@ -0,0 +1,88 @@
+"""
+FILE: master_plan_it/cashflow.py
+SCOPO: Tabella dei fatti di cassa (uscite nette per mese di pagamento) dei budget Live, materializzata dal refresh nello stesso passaggio della generazione righe (core.cashflow), e letture aggregate per il report MPIT Cashflow.
+INPUT: Eventi di pagamento per blocco di sorgenti da budget_refresh_pipeline; budget, Cost Center, vendor e tipo sorgente per le letture.
+OUTPUT/SIDE EFFECTS: Delete/insert in batch su `tabMPIT Cashflow Entry` (le righe dei Cost Center rigenerati sono sostituite); letture GROUP BY per mese.
+"""
+
+from __future__ import annotations
+
+import datetime
+
+import frappe
+from frappe.utils import flt, getdate
+
+CASHFLOW_DOCTYPE = "MPIT Cashflow Entry"
+PAYMENT_FIELDS = ("month", "source_type", "source_key", "contract", "project", "vendor", "cost_center", "amount_net")
+
+
+def clear(budget: str, cost_centers: list[str] | None = None) -> None:
+	"""Drop the cash-out rows a refresh regenerates (every row of the budget when cost_centers is None)."""
+	filters = {"budget": budget}
+	if cost_centers is not None:
+		filters["cost_center"] = ["in", cost_centers]
+	frappe.db.delete(CASHFLOW_DOCTYPE, filters)
+
+
+def insert(budget: str, year: str, payments: list[dict], stamp: datetime.datetime) -> None:
+	"""Bulk insert the payment events of one source chunk."""
+	if not payments:
+		return
+	user = frappe.session.user
+	standard = ["name", "creation", "modified", "owner", "modified_by", "docstatus", "budget", "year"]
+	values = [
+		[
+			frappe.generate_hash(length=10),
+			stamp,
+			stamp,
+			user,
+			user,
+			0,
+			budget,
+			year,
+			*(payment.get(field) for field in PAYMENT_FIELDS),
+		]
+		for payment in payments
+	]
+	frappe.db.bulk_insert(CASHFLOW_DOCTYPE, standard + list(PAYMENT_FIELDS), values)
+
+
+def delete_for_budget(budget: str) -> None:
+	"""Drop the cash-out rows of a deleted budget."""
+	frappe.db.delete(CASHFLOW_DOCTYPE, {"budget": budget})
+
+
+def get_month_totals(
+	budget: str,
+	cost_centers: list[str] | None = None,
+	vendor: str | None = None,
+	source_type: str | None = None,
+) -> dict[tuple[str, str | None], dict[datetime.date, float]]:
+	"""Cash-out per (cost center, vendor) and payment month, summed in SQL."""
+	conditions = ["budget = %(budget)s"]
+	if cost_centers:
+		conditions.append("cost_center in %(cost_centers)s")
+	if vendor:
+		conditions.append("vendor = %(vendor)s")
+	if source_type:
+		conditions.append("source_type = %(source_type)s")
+	rows = frappe.db.sql(
+		f"""
+		select cost_center, vendor, month, sum(amount_net) as amount
+		from `tab{CASHFLOW_DOCTYPE}`
+		where {" and ".join(conditions)}
+		group by cost_center, vendor, month
+		order by cost_center, vendor, month
+		""",
+		{
+			"budget": budget,
+			"cost_centers": tuple(cost_centers or ()),
+			"vendor": vendor,
+			"source_type": source_type,
+		},
+		as_dict=True,
+	)
+	totals: dict[tuple, dict] = {}
+	for row in rows:
+		totals.setdefault((row.cost_center, row.vendor), {})[getdate(row.month)] = flt(row.amount, 2)
+	return totals
@@ -0,0 +1,6 @@
+"""
+FILE: master_plan_it/core/__init__.py
+SCOPO: Core puro del motore budget (nessun import di Frappe): arrotondamenti, importi/IVA, periodi, generazione righe, proiezione mensile e calendario di cassa da record dataclass.
+INPUT: Valori Python e dataclass (ContractRecord, ContractTermRecord, ProjectRecord, PlannedItemRecord).
+OUTPUT/SIDE EFFECTS: Nessuno. Importabile in worker leggeri, benchmark e test senza bench/site; i moduli dell'app (amounts, tax, annualization, MPIT Budget) sono adapter sottili.
+"""
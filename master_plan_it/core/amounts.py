@@ -0,0 +1,330 @@
+"""
+FILE: master_plan_it/core/amounts.py
+SCOPO: Calcolo importi delle righe (qty × unit_price, mensile ↔ annuale per ricorrenza, split netto/IVA/lordo, annualizzazione per overlap), scalare e colonnare.
+INPUT: Valori Python (qty, unit_price, monthly/annual, vat_rate, includes_vat, recurrence_rule, overlap_months) o colonne di valori.
+OUTPUT/SIDE EFFECTS: Nessuno; arrotondamento a 2 decimali via core.numbers.flt.
+
+Priorità:
+1. unit_price valorizzato: qty × unit_price in base alla ricorrenza
+2. solo monthly_amount: annual = monthly × 12
+3. solo annual_amount: monthly = annual / 12
+4. altrimenti annual_amount è il valore master
+"""
+
+from __future__ import annotations
+
+from typing import Sequence
+
+from master_plan_it.core.numbers import flt
+
+LINE_AMOUNT_FIELDS = (
+	"monthly_amount",
+	"annual_amount",
+	"amount_net",
+	"amount_vat",
+	"amount_gross",
+	"annual_net",
+	"annual_vat",
+	"annual_gross",
+)
+
+
+def get_recurrence_multiplier(recurrence_rule: str) -> int:
+	"""Return the number of periods per year for a given recurrence rule.
+	
+	Args:
+		recurrence_rule: Monthly, Quarterly, Annual, None
+	
+	Returns:
+		Number of periods per year (e.g., 12 for Monthly, 4 for Quarterly)
+	"""
+	if recurrence_rule == "Monthly":
+		return 12
+	elif recurrence_rule == "Quarterly":
+		return 4
+	elif recurrence_rule == "Annual":
+		return 1
+	else:  # None or unrecognized
+		return 1
+
+
+def compute_amounts(
+	qty: float | None,
+	unit_price: float | None,
+	monthly_amount: float | None,
+	annual_amount: float | None,
+	recurrence_rule: str | None = "Monthly",
+) -> dict:
+	"""Compute monthly and annual amounts from input values.
+	
+	Priority:
+	1. qty × unit_price (if unit_price is set)
+	2. monthly_amount → annual (if monthly is set and annual is empty)
+	3. annual_amount → monthly (if annual is set)
+	
+	Args:
+		qty: Quantity (default behavior: 1 if None)
+		unit_price: Price per unit per period
+		monthly_amount: Monthly amount (input or calculated)
+		annual_amount: Annual amount (input or calculated)
+		recurrence_rule: How often the cost recurs
+	
+	Returns:
+		dict with keys: monthly_amount, annual_amount
+	"""
+	monthly, annual = _period_amounts(qty, unit_price, monthly_amount, annual_amount, recurrence_rule)
+	return {
+		"monthly_amount": monthly,
+		"annual_amount": annual,
+	}
+
+
+def compute_vat_split(
+	amount: float,
+	vat_rate: float | None,
+	amount_includes_vat: bool = False,
+) -> dict:
+	"""Compute net, VAT, and gross amounts from an input amount.
+	
+	Args:
+		amount: The input amount (annual_amount typically)
+		vat_rate: VAT rate as percentage (e.g., 22 for 22%)
+		amount_includes_vat: Whether the input amount includes VAT
+	
+	Returns:
+		dict with keys: amount_net, amount_vat, amount_gross
+	"""
+	net, vat, gross = _vat_split(amount, vat_rate, amount_includes_vat)
+	return {
+		"amount_net": net,
+		"amount_vat": vat,
+		"amount_gross": gross,
+	}
+
+
+def compute_line_amounts(
+	qty: float | None,
+	unit_price: float | None,
+	monthly_amount: float | None,
+	annual_amount: float | None,
+	vat_rate: float | None,
+	amount_includes_vat: bool = False,
+	recurrence_rule: str | None = "Monthly",
+	overlap_months: int = 12,
+) -> dict:
+	"""Compute all amounts for a budget line or expense.
+	
+	This is the main entry point that combines amount calculation with VAT split.
+	
+	Args:
+		qty: Quantity
+		unit_price: Price per unit per period
+		monthly_amount: Monthly amount
+		annual_amount: Annual amount
+		vat_rate: VAT rate as percentage
+		amount_includes_vat: Whether input amounts include VAT
+		recurrence_rule: Recurrence rule for unit_price calculation
+		overlap_months: Number of months the period overlaps with fiscal year (1-12)
+	
+	Returns:
+		dict with all computed values
+	"""
+	return dict(zip(LINE_AMOUNT_FIELDS, _line_amounts_row(
+		qty,
+		unit_price,
+		monthly_amount,
+		annual_amount,
+		vat_rate,
+		amount_includes_vat,
+		recurrence_rule,
+		overlap_months,
+	)))
+
+
+def compute_line_amounts_batch(
+	qty: Sequence,
+	unit_price: Sequence,
+	monthly_amount: Sequence,
+	annual_amount: Sequence,
+	vat_rate: Sequence,
+	amount_includes_vat: Sequence,
+	recurrence_rule: Sequence,
+	overlap_months: Sequence,
+) -> dict[str, list[float]]:
+	"""Columnar compute_line_amounts for many lines at once.
+	
+	Args are equal-length sequences (lists, tuples or NumPy arrays), one per
+	compute_line_amounts argument. Every row goes through the same arithmetic as the
+	scalar function, so each value is identical to it; the batch form skips the
+	per-row keyword calls and intermediate dicts.
+	
+	Returns:
+		dict of LINE_AMOUNT_FIELDS → list of values, in input order
+	"""
+	columns = [_as_list(column) for column in (
+		qty,
+		unit_price,
+		monthly_amount,
+		annual_amount,
+		vat_rate,
+		amount_includes_vat,
+		recurrence_rule,
+		overlap_months,
+	)]
+	size = len(columns[0])
+	if any(len(column) != size for column in columns):
+		raise ValueError("compute_line_amounts_batch: all columns must have the same length")
+	
+	if not size:
+		return {field: [] for field in LINE_AMOUNT_FIELDS}
+	row_fn = _line_amounts_row
+	rows = [row_fn(*row) for row in zip(*columns)]
+	return {field: list(values) for field, values in zip(LINE_AMOUNT_FIELDS, zip(*rows))}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Internals (shared by the scalar and batch entry points)
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def _line_amounts_row(
+	qty,
+	unit_price,
+	monthly_amount,
+	annual_amount,
+	vat_rate,
+	amount_includes_vat,
+	recurrence_rule,
+	overlap_months,
+) -> tuple[float, ...]:
+	"""One line, as a tuple in LINE_AMOUNT_FIELDS order."""
+	# Step 1: Compute monthly/annual amounts
+	monthly, annual = _period_amounts(qty, unit_price, monthly_amount, annual_amount, recurrence_rule)
+	
+	# Step 2: Compute VAT split based on annual amount
+	net, vat, gross = _vat_split(annual, vat_rate, amount_includes_vat)
+	
+	# Step 3: Compute annualized values based on overlap
+	# If overlap is less than 12 months, scale the amounts proportionally
+	# EXCEPT if recurrence is "None" (Flat Amount), in which case we take full amount.
+	if recurrence_rule == "None":
+		overlap_ratio = 1.0
+	else:
+		overlap_ratio = overlap_months / 12.0 if overlap_months else 1.0
+	
+	# Annualized values consider overlap with fiscal year
+	return (
+		monthly,
+		annual,
+		net,
+		vat,
+		gross,
+		flt(net * overlap_ratio, 2),
+		flt(vat * overlap_ratio, 2),
+		flt(gross * overlap_ratio, 2),
+	)
+
+
+def _period_amounts(qty, unit_price, monthly_amount, annual_amount, recurrence_rule) -> tuple[float, float]:
+	"""(monthly_amount, annual_amount); see compute_amounts."""
+	qty = flt(qty) or 1.0
+	unit_price = flt(unit_price)
+	monthly_amount = flt(monthly_amount)
+	annual_amount = flt(annual_amount)
+	
+	# Priority 1: Calculate from qty × unit_price
+	if unit_price > 0:
+		line_total_per_period = qty * unit_price
+		
+		if recurrence_rule == "Monthly":
+			# unit_price is per month
+			computed_monthly = line_total_per_period
+			computed_annual = flt(computed_monthly * 12, 2)
+		elif recurrence_rule == "Quarterly":
+			# unit_price is per quarter
+			computed_annual = flt(line_total_per_period * 4, 2)
+			computed_monthly = flt(computed_annual / 12, 2)
+		elif recurrence_rule == "Annual":
+			# unit_price is per year
+			computed_annual = flt(line_total_per_period, 2)
+			computed_monthly = flt(computed_annual / 12, 2)
+		elif recurrence_rule == "None":
+			# Flat amount: annual = monthly = total
+			computed_annual = flt(line_total_per_period, 2)
+			computed_monthly = flt(line_total_per_period, 2)
+		else:
+			# Unknown: default to annual/one-time logic (divide by 12)
+			# This keeps backward compatibility for weird values
+			computed_annual = flt(line_total_per_period, 2)
+			computed_monthly = flt(computed_annual / 12, 2)
+		
+		return computed_monthly, computed_annual
+	
+	# Priority 2: Bidirectional monthly ↔ annual
+	if monthly_amount > 0 and annual_amount == 0:
+		# User entered monthly, calculate annual
+		if recurrence_rule == "None":
+			computed_annual = flt(monthly_amount, 2)
+		else:
+			computed_annual = flt(monthly_amount * 12, 2)
+		return monthly_amount, computed_annual
+	
+	if annual_amount > 0 and monthly_amount == 0:
+		# User entered annual, calculate monthly
+		if recurrence_rule == "None":
+			computed_monthly = flt(annual_amount, 2)
+		else:
+			computed_monthly = flt(annual_amount / 12, 2)
+		return computed_monthly, annual_amount
+	
+	# Both set or both empty: use annual as master (or 0 if empty)
+	if annual_amount > 0:
+		if recurrence_rule == "None":
+			computed_monthly = flt(annual_amount, 2)
+		else:
+			computed_monthly = flt(annual_amount / 12, 2)
+		return computed_monthly, annual_amount
+	
+	if monthly_amount > 0:
+		if recurrence_rule == "None":
+			computed_annual = flt(monthly_amount, 2)
+		else:
+			computed_annual = flt(monthly_amount * 12, 2)
+		return monthly_amount, computed_annual
+	
+	# All zeros
+	return 0.0, 0.0
+
+
+def _vat_split(amount, vat_rate, amount_includes_vat) -> tuple[float, float, float]:
+	"""(amount_net, amount_vat, amount_gross); see compute_vat_split."""
+	amount = flt(amount, 2)
+	vat_rate = flt(vat_rate, 2)
+	
+	if not amount:
+		return 0.0, 0.0, 0.0
+	
+	if not vat_rate:
+		# No VAT: net = gross = amount
+		return amount, 0.0, amount
+	
+	vat_multiplier = vat_rate / 100.0
+	
+	if amount_includes_vat:
+		# Amount is gross, calculate net
+		gross = amount
+		net = flt(gross / (1 + vat_multiplier), 2)
+		vat = flt(gross - net, 2)
+	else:
+		# Amount is net, calculate gross
+		net = amount
+		vat = flt(net * vat_multiplier, 2)
+		gross = flt(net + vat, 2)
+	
+	return net, vat, gross
+
+
+def _as_list(column) -> list:
+	# NumPy arrays: tolist() yields Python scalars, so rounding matches the scalar path.
+	to_list = getattr(column, "tolist", None)
+	return to_list() if to_list else list(column)
@@ -0,0 +1,168 @@
+"""
+FILE: master_plan_it/core/cashflow.py
+SCOPO: Calendario di cassa (uscite nette per mese di pagamento) di contratti e Planned Item, distinto dall'equivalente mensile delle righe Live, senza Frappe.
+INPUT: Record di core.lines già caricati per la generazione delle righe (contratti con termini, Planned Item con progetti) e limiti dell'anno fiscale.
+OUTPUT/SIDE EFFECTS: Nessuno; eventi di pagamento (mese, source_key della riga corrispondente, importo netto) da materializzare durante il refresh.
+
+Regole:
+- contratti: un pagamento anticipato per ciclo di fatturazione (Monthly ogni mese, Quarterly ogni 3 mesi, Annual
+  all'anniversario) a partire dal mese di inizio del termine o del contratto (senza data: inizio anno),
+  per l'importo del ciclo (amount_net del termine, current_amount al netto IVA); mesi fuori dall'anno esclusi
+- termini e fallback su current_amount come in core.lines (stessi confini, stessi source_key)
+- Planned Item: stessa distribuzione delle righe Live (il mese di spend_date / start / end, altrimenti ogni mese)
+"""
+
+from __future__ import annotations
+
+import datetime
+
+from master_plan_it.core.lines import (
+	APPROVED_PROJECT_STATE,
+	ContractRecord,
+	ContractTermRecord,
+	PlannedItemRecord,
+	ProjectRecord,
+	planned_item_periods,
+)
+from master_plan_it.core.numbers import flt
+from master_plan_it.core.periods import overlap_months, to_date
+from master_plan_it.core.projection import month_index, month_start
+from master_plan_it.core.tax import split_net_vat_gross
+
+CONTRACT = "Contract"
+PLANNED_ITEM = "Planned Item"
+# Months between two payments; other billing cycles are paid monthly (as their lines are accrued).
+PAYMENT_CYCLE_MONTHS = {"Monthly": 1, "Quarterly": 3, "Annual": 12}
+
+
+def payment_months(anchor: int, cycle: int, first: int, last: int) -> range:
+	"""Month indexes anchor + k * cycle (k >= 0) between first and last, inclusive."""
+	if last < first:
+		return range(0)
+	start = anchor if first <= anchor else anchor + -(-(first - anchor) // cycle) * cycle
+	return range(start, last + 1, cycle)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Contracts
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def generate_contract_payments(
+	contracts: list[ContractRecord],
+	terms_by_contract: dict[str, list[ContractTermRecord]],
+	year_start: datetime.date,
+	year_end: datetime.date,
+) -> list[dict]:
+	"""Payment events of validated contracts in the year (contracts without cost center are skipped)."""
+	payments: list[dict] = []
+	for contract in contracts:
+		if not contract.cost_center:
+			continue
+		terms = terms_by_contract.get(contract.name) or []
+		term_payments = contract_term_payments(contract, terms, year_start, year_end) if terms else None
+		if term_payments is not None:
+			payments.extend(term_payments)
+		else:
+			payments.extend(contract_flat_payments(contract, year_start, year_end))
+	return payments
+
+
+def contract_term_payments(
+	contract: ContractRecord, terms: list[ContractTermRecord], year_start: datetime.date, year_end: datetime.date
+) -> list[dict] | None:
+	"""Payments of each term overlapping the year; None when no term overlaps (flat fallback, as the lines)."""
+	contract_start = to_date(contract.start_date) if contract.start_date else year_start
+	contract_end = to_date(contract.end_date) if contract.end_date else year_end
+	payments: list[dict] = []
+	overlapping = False
+
+	for i, term in enumerate(terms):
+		term_start = to_date(term.from_date)
+		if term.to_date:
+			term_end = to_date(term.to_date)
+		elif i + 1 < len(terms):
+			term_end = to_date(terms[i + 1].from_date) - datetime.timedelta(days=1)
+		else:
+			term_end = contract_end
+
+		period_start = max(term_start, contract_start, year_start)
+		period_end = min(term_end, contract_end, year_end)
+		if overlap_months(period_start, period_end, year_start, year_end) <= 0:
+			continue
+		overlapping = True
+
+		cycle = PAYMENT_CYCLE_MONTHS.get(term.billing_cycle or "Monthly", 1)
+		amount = term.amount_net if cycle > 1 else (term.monthly_amount_net or term.amount_net)
+		# Billing runs from the term start (not before the contract start), not from the year start.
+		anchor = max(term_start, to_date(contract.start_date)) if contract.start_date else term_start
+		payments.extend(
+			_contract_payment(contract, month, flt(amount or 0, 2), f"CONTRACT::{contract.name}::TERM::{term.name}")
+			for month in payment_months(month_index(anchor), cycle, month_index(period_start), month_index(period_end))
+		)
+	return payments if overlapping else None
+
+
+def contract_flat_payments(contract: ContractRecord, year_start: datetime.date, year_end: datetime.date) -> list[dict]:
+	"""Payments of current_amount (net of VAT) once per billing cycle from the contract start."""
+	contract_start = to_date(contract.start_date) if contract.start_date else year_start
+	period_start = max(contract_start, year_start)
+	period_end = min(to_date(contract.end_date) if contract.end_date else year_end, year_end)
+	if overlap_months(period_start, period_end, year_start, year_end) <= 0:
+		return []
+
+	amount, _vat, _gross = split_net_vat_gross(
+		contract.current_amount or 0, contract.vat_rate, bool(contract.current_amount_includes_vat)
+	)
+	cycle = PAYMENT_CYCLE_MONTHS.get(contract.billing_cycle or "Monthly", 1)
+	return [
+		_contract_payment(contract, month, amount, f"CONTRACT::{contract.name}")
+		for month in payment_months(month_index(contract_start), cycle, month_index(period_start), month_index(period_end))
+	]
+
+
+def _contract_payment(contract: ContractRecord, month: int, amount: float, source_key: str) -> dict:
+	return {
+		"month": month_start(month),
+		"source_type": CONTRACT,
+		"source_key": source_key,
+		"contract": contract.name,
+		"project": None,
+		"vendor": contract.vendor,
+		"cost_center": contract.cost_center,
+		"amount_net": amount,
+	}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Planned Items
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def generate_planned_item_payments(
+	items: list[PlannedItemRecord],
+	projects: dict[str, ProjectRecord],
+	year_start: datetime.date,
+	year_end: datetime.date,
+) -> list[dict]:
+	"""Payment events of Planned Items of Approved projects: each month of their Live line periods."""
+	payments: list[dict] = []
+	for item in items:
+		project = projects.get(item.project)
+		if not project or project.workflow_state != APPROVED_PROJECT_STATE or not project.cost_center:
+			continue
+		for period_start, period_end, monthly_amount in planned_item_periods(item, year_start, year_end):
+			payments.extend(
+				{
+					"month": month_start(month),
+					"source_type": PLANNED_ITEM,
+					"source_key": f"PLANNED_ITEM::{item.name}::{period_start.isoformat()}",
+					"contract": None,
+					"project": project.name,
+					"vendor": None,
+					"cost_center": project.cost_center,
+					"amount_net": flt(monthly_amount, 2),
+				}
+				for month in range(month_index(period_start), month_index(period_end) + 1)
+			)
+	return payments
@@ -0,0 +1,21 @@
+"""
+FILE: master_plan_it/core/errors.py
+SCOPO: Errore di validazione del core, tradotto in frappe.throw dagli adapter.
+INPUT: Messaggio in inglese con placeholder {0}, {1}... e relativi argomenti.
+OUTPUT/SIDE EFFECTS: Nessuno.
+"""
+
+from __future__ import annotations
+
+
+class CoreValidationError(ValueError):
+	"""Invalid source data. `message` is the untranslated template, `format_args` its arguments."""
+
+	def __init__(self, message: str, *args) -> None:
+		super().__init__(message.format(*args))
+		self.message = message
+		self.format_args = args
+
+	def __reduce__(self):
+		# Keep the template when raised in a worker process (core.parallel).
+		return (self.__class__, (self.message, *self.format_args))
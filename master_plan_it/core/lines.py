@@ -0,0 +1,306 @@
+"""
+FILE: master_plan_it/core/lines.py
+SCOPO: Generazione delle righe Live del Budget da contratti (termini o importo corrente) e Planned Item di progetti approvati, senza Frappe.
+INPUT: Dataclass ContractRecord/ContractTermRecord/ProjectRecord/PlannedItemRecord (campi come le colonne delle DocType) e limiti dell'anno fiscale.
+OUTPUT/SIDE EFFECTS: Lista di payload riga (dict con source_key stabile) pronti per l'upsert su MPIT Budget; CoreValidationError su dati sorgente incompleti.
+"""
+
+from __future__ import annotations
+
+import datetime
+from dataclasses import dataclass, fields
+
+from master_plan_it.core.errors import CoreValidationError
+from master_plan_it.core.numbers import flt
+from master_plan_it.core.periods import month_bounds, overlap_months, to_date
+
+CONTRACT_STATUSES = ("Active", "Pending Renewal", "Renewed")
+APPROVED_PROJECT_STATE = "Approved"
+
+
+@dataclass(frozen=True)
+class ContractRecord:
+	name: str
+	cost_center: str | None = None
+	start_date: datetime.date | None = None
+	end_date: datetime.date | None = None
+	billing_cycle: str | None = None
+	current_amount: float | None = None
+	current_amount_includes_vat: int | None = None
+	vat_rate: float | None = None
+	vendor: str | None = None
+	description: str | None = None
+	status: str | None = None
+	auto_renew: int | None = None
+	monthly_amount_net: float | None = None
+
+
+@dataclass(frozen=True)
+class ContractTermRecord:
+	name: str
+	parent: str
+	from_date: datetime.date
+	to_date: datetime.date | None = None
+	amount_net: float | None = None
+	monthly_amount_net: float | None = None
+	billing_cycle: str | None = None
+
+
+@dataclass(frozen=True)
+class ProjectRecord:
+	name: str
+	title: str | None = None
+	workflow_state: str | None = None
+	cost_center: str | None = None
+
+
+@dataclass(frozen=True)
+class PlannedItemRecord:
+	name: str
+	project: str | None = None
+	description: str | None = None
+	amount: float | None = None
+	amount_net: float | None = None
+	start_date: datetime.date | None = None
+	end_date: datetime.date | None = None
+	spend_date: datetime.date | None = None
+	distribution: str | None = None
+
+
+def record_fields(record_type: type) -> list[str]:
+	"""Column names to fetch for a record dataclass."""
+	return [field.name for field in fields(record_type)]
+
+
+def from_row(record_type: type, row: dict):
+	"""Build a record from a DB row dict, ignoring extra keys."""
+	return record_type(**{name: row.get(name) for name in record_fields(record_type)})
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Contracts
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def generate_contract_lines(
+	contracts: list[ContractRecord],
+	terms_by_contract: dict[str, list[ContractTermRecord]],
+	year_start: datetime.date,
+	year_end: datetime.date,
+) -> list[dict]:
+	"""Lines for validated contracts: one per term overlapping the year, else one from current_amount.
+
+	`terms_by_contract` lists each contract's terms ordered by from_date.
+	"""
+	lines: list[dict] = []
+	for contract in contracts:
+		if not contract.cost_center:
+			raise CoreValidationError(
+				"Contract {0} is missing Cost Center. Please set it to include in Forecast.", contract.name
+			)
+
+		# Check if contract has terms - use them if present, otherwise fall back to current_amount
+		terms = terms_by_contract.get(contract.name) or []
+		term_lines = contract_term_lines(contract, terms, year_start, year_end) if terms else []
+		if term_lines:
+			lines.extend(term_lines)
+		else:
+			# No terms, or terms not covering this year: flat amount with billing_cycle
+			lines.extend(contract_flat_lines(contract, year_start, year_end))
+	return lines
+
+
+def contract_term_lines(
+	contract: ContractRecord, terms: list[ContractTermRecord], year_start: datetime.date, year_end: datetime.date
+) -> list[dict]:
+	"""Generate budget lines for each contract term overlapping the year."""
+	lines = []
+	contract_start = to_date(contract.start_date) if contract.start_date else year_start
+	contract_end = to_date(contract.end_date) if contract.end_date else year_end
+
+	for i, term in enumerate(terms):
+		term_start = to_date(term.from_date)
+
+		# Determine term end: use to_date, or next term start - 1, or contract end
+		if term.to_date:
+			term_end = to_date(term.to_date)
+		elif i + 1 < len(terms):
+			term_end = to_date(terms[i + 1].from_date) - datetime.timedelta(days=1)
+		else:
+			term_end = contract_end
+
+		# Clip to year bounds
+		period_start = max(term_start, contract_start, year_start)
+		period_end = min(term_end, contract_end, year_end)
+
+		if overlap_months(period_start, period_end, year_start, year_end) <= 0:
+			continue
+
+		billing = term.billing_cycle or "Monthly"
+		lines.append(
+			contract_line_payload(
+				contract,
+				period_start=period_start,
+				period_end=period_end,
+				monthly_amount=flt(term.monthly_amount_net or term.amount_net or 0, 6),
+				unit_price=flt(term.amount_net or 0, 6),
+				recurrence_rule="Monthly" if billing == "Monthly" else billing,
+				source_key=f"CONTRACT::{contract.name}::TERM::{term.name}",
+			)
+		)
+	return lines
+
+
+def contract_flat_lines(contract: ContractRecord, year_start: datetime.date, year_end: datetime.date) -> list[dict]:
+	"""Single line from current_amount and billing_cycle, clipped to the year."""
+	period_start = max(to_date(contract.start_date) if contract.start_date else year_start, year_start)
+	period_end = min(to_date(contract.end_date) if contract.end_date else year_end, year_end)
+	if overlap_months(period_start, period_end, year_start, year_end) <= 0:
+		return []
+
+	billing = contract.billing_cycle or "Monthly"
+	base_amount = flt(contract.current_amount or 0, 6)
+	monthly_amount = flt(base_amount, 6)
+	recurrence_rule = "Monthly"
+	if billing == "Quarterly":
+		monthly_amount = flt((base_amount) * 4 / 12, 6)
+		recurrence_rule = "Quarterly"
+	elif billing == "Annual":
+		monthly_amount = flt((base_amount) / 12, 6)
+		recurrence_rule = "Annual"
+	# Other -> treat as monthly, recurrence_rule stays Monthly
+
+	return [
+		contract_line_payload(
+			contract,
+			period_start=period_start,
+			period_end=period_end,
+			monthly_amount=monthly_amount,
+			unit_price=flt(base_amount, 6),
+			recurrence_rule=recurrence_rule,
+			source_key=f"CONTRACT::{contract.name}",
+		)
+	]
+
+
+def contract_line_payload(
+	contract: ContractRecord,
+	period_start: datetime.date,
+	period_end: datetime.date,
+	monthly_amount: float,
+	unit_price: float,
+	recurrence_rule: str,
+	source_key: str,
+) -> dict:
+	return {
+		"line_kind": "Contract",
+		"source_key": source_key,
+		"vendor": contract.vendor,
+		"description": contract.description or contract.name,
+		"contract": contract.name,
+		"project": None,
+		"cost_center": contract.cost_center,
+		"monthly_amount": monthly_amount,
+		"annual_amount": 0,
+		"unit_price": unit_price,
+		"amount_includes_vat": contract.current_amount_includes_vat,
+		"vat_rate": contract.vat_rate,
+		"recurrence_rule": recurrence_rule,
+		"period_start_date": period_start,
+		"period_end_date": period_end,
+		"is_generated": 1,
+	}
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Planned Items
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def generate_planned_item_lines(
+	items: list[PlannedItemRecord],
+	projects: dict[str, ProjectRecord],
+	year_start: datetime.date,
+	year_end: datetime.date,
+) -> list[dict]:
+	"""Lines for submitted, uncovered Planned Items of Approved projects (other workflow states are skipped)."""
+	lines: list[dict] = []
+	for item in items:
+		project = projects.get(item.project)
+		if not project:
+			raise CoreValidationError("Planned Item {0}: linked project missing.", item.name)
+		if project.workflow_state != APPROVED_PROJECT_STATE:
+			continue
+		if not project.cost_center:
+			raise CoreValidationError(
+				"Project {0} is missing Cost Center required by Planned Item {1}.", project.name, item.name
+			)
+
+		recurrence_rule = "None" if (item.spend_date or item.distribution in ("start", "end")) else "Monthly"
+		for period_start, period_end, monthly_amount in planned_item_periods(item, year_start, year_end):
+			lines.append(
+				{
+					"line_kind": "Planned Item",
+					"source_key": f"PLANNED_ITEM::{item.name}::{period_start.isoformat()}",
+					"vendor": None,
+					"description": item.description or project.title,
+					"contract": None,
+					"project": project.name,
+					"cost_center": project.cost_center,
+					"monthly_amount": monthly_amount,
+					"annual_amount": 0,
+					"amount_includes_vat": 0,
+					"vat_rate": 0,
+					"recurrence_rule": recurrence_rule,
+					"period_start_date": period_start,
+					"period_end_date": period_end,
+					"is_generated": 1,
+				}
+			)
+	return lines
+
+
+def planned_item_periods(
+	item: PlannedItemRecord, year_start: datetime.date, year_end: datetime.date
+) -> list[tuple[datetime.date, datetime.date, float]]:
+	"""Return list of (period_start, period_end, monthly_amount) respecting spend_date/distribution."""
+	# Prefer amount_net (computed from VAT), fallback to amount for backward compat
+	amount = flt(item.amount_net or item.amount or 0)
+	if amount == 0:
+		return []
+
+	distribution = (item.distribution or "all").lower()
+
+	if item.spend_date:
+		spend = to_date(item.spend_date)
+		if spend < year_start or spend > year_end:
+			return []
+		month_start, month_end = month_bounds(spend)
+		return [(month_start, month_end, amount)]
+
+	start = to_date(item.start_date)
+	end = to_date(item.end_date)
+	total_months = overlap_months(start, end, start, end)
+	if total_months <= 0:
+		return []
+
+	period_start = max(start, year_start)
+	period_end = min(end, year_end)
+	if period_end < period_start:
+		return []
+
+	if distribution == "start":
+		first_month_start, first_month_end = month_bounds(start)
+		if first_month_end < year_start or first_month_start > year_end:
+			return []
+		return [(first_month_start, first_month_end, amount)]
+	if distribution == "end":
+		last_month_start, last_month_end = month_bounds(end)
+		if last_month_end < year_start or last_month_start > year_end:
+			return []
+		return [(last_month_start, last_month_end, amount)]
+
+	if overlap_months(period_start, period_end, year_start, year_end) <= 0:
+		return []
+
+	return [(period_start, period_end, amount / total_months)]
@@ -0,0 +1,103 @@
+"""
+FILE: master_plan_it/core/numbers.py
+SCOPO: flt()/rounded() senza Frappe, con gli stessi metodi di arrotondamento di frappe.utils (System Settings > Rounding Method).
+INPUT: Valori numerici o stringhe; metodo di arrotondamento esplicito del contesto (set_rounding_method) o risolto a ogni chiamata dal resolver registrato dall'adapter.
+OUTPUT/SIDE EFFECTS: Override per contesto (ContextVar: thread/task) e resolver di processo registrato una volta; nessuno stato per sito.
+"""
+
+from __future__ import annotations
+
+import math
+from contextvars import ContextVar
+from typing import Callable
+
+BANKERS_LEGACY = "Banker's Rounding (legacy)"
+BANKERS = "Banker's Rounding"
+COMMERCIAL = "Commercial Rounding"
+ROUNDING_METHODS = (BANKERS_LEGACY, BANKERS, COMMERCIAL)
+
+# Explicit method for the current thread/task (worker processes, tests); None defers to the resolver.
+_rounding_method: ContextVar[str | None] = ContextVar("mpit_rounding_method", default=None)
+# Returns the method of whatever site the caller is serving (installed by master_plan_it.amounts).
+_resolver: Callable[[], str | None] | None = None
+
+
+def set_rounding_method(method: str | None) -> None:
+	"""Pin the rounding method for the current context (unknown → Frappe default); None unpins it."""
+	if method is not None and method not in ROUNDING_METHODS:
+		method = BANKERS_LEGACY
+	_rounding_method.set(method)
+
+
+def set_rounding_method_resolver(resolver: Callable[[], str | None] | None) -> None:
+	"""Register the callable that returns the rounding method when none is pinned."""
+	global _resolver
+	_resolver = resolver
+
+
+def get_rounding_method() -> str:
+	method = _rounding_method.get()
+	if method is None and _resolver is not None:
+		method = _resolver()
+	return method if method in ROUNDING_METHODS else BANKERS_LEGACY
+
+
+def flt(value, precision: int | None = None) -> float:
+	"""Convert to float (0.0 when not numeric) and optionally round, like frappe.utils.flt."""
+	if isinstance(value, str):
+		value = value.replace(",", "")
+	try:
+		num = float(value)
+		if precision is not None:
+			num = rounded(num, precision)
+	except Exception:
+		num = 0.0
+	return num
+
+
+def rounded(num: float, precision: int = 0) -> float:
+	"""Round with the configured method (same algorithms as frappe.utils.rounded)."""
+	precision = int(precision or 0)
+	method = get_rounding_method()
+	if method == BANKERS:
+		return _bankers_rounding(num, precision)
+	if method == COMMERCIAL:
+		return _round_away_from_zero(num, precision)
+	return _bankers_rounding_legacy(num, precision)
+
+
+def _bankers_rounding_legacy(num: float, precision: int) -> float:
+	multiplier = 10**precision
+	# avoid rounding errors
+	num = round(num * multiplier if precision else num, 8)
+	floor_num = math.floor(num)
+	decimal_part = num - floor_num
+	if not precision and decimal_part == 0.5:
+		num = floor_num if (floor_num % 2 == 0) else floor_num + 1
+	elif decimal_part == 0.5:
+		num = floor_num + 1
+	else:
+		num = round(num)
+	return (num / multiplier) if precision else num
+
+
+def _bankers_rounding(num: float, precision: int) -> float:
+	multiplier = 10**precision
+	num = round(num * multiplier, (9 - precision))
+	if num == 0:
+		return 0.0
+	floor_num = math.floor(num)
+	decimal_part = num - floor_num
+	epsilon = 2.0 ** (math.log(abs(num), 2) - 52.0)
+	if abs(decimal_part - 0.5) < epsilon:
+		num = floor_num if (floor_num % 2 == 0) else floor_num + 1
+	else:
+		num = round(num)
+	return num / multiplier
+
+
+def _round_away_from_zero(num: float, precision: int) -> float:
+	if num == 0:
+		return 0.0
+	epsilon = 2.0 ** (math.log(abs(num), 2) - 52.0)
+	return round(num + math.copysign(epsilon, num), precision)
@@ -0,0 +1,123 @@
+"""
+FILE: master_plan_it/core/periods.py
+SCOPO: Calcoli temporali del motore budget senza Frappe: mesi di overlap con l'anno fiscale, annualizzazione per ricorrenza, limiti del mese.
+INPUT: Date (datetime.date o stringhe ISO), regola di ricorrenza, mesi di overlap.
+OUTPUT/SIDE EFFECTS: Nessuno.
+
+Rule A: una riga con overlap ZERO con l'anno fiscale è bloccata in validazione (controller).
+"""
+
+from __future__ import annotations
+
+import calendar
+import datetime
+from typing import Literal
+
+from master_plan_it.core.numbers import flt
+
+RecurrenceRule = Literal["Monthly", "Quarterly", "Annual", "None"]
+SUPPORTED_RECURRENCE_RULES = frozenset({"Monthly", "Quarterly", "Annual", "None", None})
+
+
+def to_date(value: datetime.date | datetime.datetime | str) -> datetime.date:
+	"""Date from a date, datetime or ISO string (YYYY-MM-DD[...])."""
+	if isinstance(value, datetime.datetime):
+		return value.date()
+	if isinstance(value, datetime.date):
+		return value
+	return datetime.date.fromisoformat(str(value)[:10])
+
+
+def overlap_months(
+	period_start: datetime.date | str,
+	period_end: datetime.date | str,
+	year_start: datetime.date,
+	year_end: datetime.date
+) -> int:
+	"""
+	Calculate number of calendar months touched by a period within a fiscal year.
+	Partial months count as 1 if any day overlaps.
+	"""
+	overlap_start = max(to_date(period_start), year_start)
+	overlap_end = min(to_date(period_end), year_end)
+
+	if overlap_start > overlap_end:
+		return 0
+
+	# Distinct (year, month) pairs between the two dates, both included.
+	return (overlap_end.year - overlap_start.year) * 12 + overlap_end.month - overlap_start.month + 1
+
+
+def month_bounds(dt: datetime.date) -> tuple[datetime.date, datetime.date]:
+	"""First and last day of the month containing `dt`."""
+	last_day = calendar.monthrange(dt.year, dt.month)[1]
+	return datetime.date(dt.year, dt.month, 1), datetime.date(dt.year, dt.month, last_day)
+
+
+def annualize(
+	amount_net: float,
+	recurrence_rule: RecurrenceRule,
+	overlap_months_count: int,
+	precision: int = 2
+) -> float:
+	"""
+	Calculate annualized amount based on recurrence rule and overlap.
+	
+	Args:
+		amount_net: The net amount for the period
+		recurrence_rule: "Monthly", "Quarterly", "Annual", or "None"
+		overlap_months_count: Number of months of overlap with fiscal year
+		precision: Decimal precision (default: 2)
+	
+	Returns:
+		float: Annualized net amount
+	Examples:
+		>>> # Monthly: 100/month × 12 months overlap = 1200
+		>>> annualize(100, "Monthly", 12)
+		1200.0
+		
+		>>> # Quarterly: 300/quarter × 4 quarters (12 months) = 1200
+		>>> annualize(300, "Quarterly", 12)
+		1200.0
+		
+		>>> # Annual: 1200/year, full overlap = 1200
+		>>> annualize(1200, "Annual", 12)
+		1200.0
+		
+		>>> # Partial overlap: Monthly 100 × 3 months Q1 only = 300
+		>>> annualize(100, "Monthly", 3)
+		300.0
+		
+		>>> # None: amount is already annual, just return it
+		>>> annualize(1200, "None", 12)
+		1200.0
+	"""
+	if overlap_months_count == 0:
+		# Rule A enforcement happens in controller validate()
+		return 0.0
+	
+	if recurrence_rule == "None":
+		# Amount is already annual (no recurrence)
+		return flt(amount_net, precision)
+	
+	if recurrence_rule == "Monthly":
+		# amount_net is per-month, multiply by overlap months
+		return flt(amount_net * overlap_months_count, precision)
+	
+	if recurrence_rule == "Quarterly":
+		# amount_net is per-quarter (3 months)
+		# Calculate number of complete quarters in overlap
+		quarters = overlap_months_count / 3.0
+		return flt(amount_net * quarters, precision)
+	
+	if recurrence_rule == "Annual":
+		# amount_net is per-year (12 months)
+		# Pro-rate based on overlap
+		return flt(amount_net * (overlap_months_count / 12.0), precision)
+	
+	# Unknown recurrence rule - treat as None
+	return flt(amount_net, precision)
+
+
+def is_supported_recurrence_rule(recurrence_rule: str | None) -> bool:
+	return recurrence_rule in SUPPORTED_RECURRENCE_RULES
@@ -0,0 +1,247 @@
+"""
+FILE: master_plan_it/core/projection.py
+SCOPO: Proiezione mensile (importi netti) di contratti e Planned Item su una finestra di mesi arbitraria, anche pluriennale, senza Frappe.
+INPUT: Record di core.lines (contratti con termini, Planned Item con progetti), primo mese e numero di mesi della finestra.
+OUTPUT/SIDE EFFECTS: Nessuno; serie mensili per chiave di raggruppamento (cost center, tipo sorgente, vendor); totali per Cost Center e mese di righe di budget già calcolate (line_totals).
+
+Regole:
+- contratti: un periodo per termine (fine = to_date, inizio del termine successivo - 1 o fine contratto), altrimenti monthly_amount_net;
+  i contratti auto_renew proseguono dopo end_date all'ultimo importo mensile, rinnovati per cicli della durata del contratto
+  (o del billing_cycle) con indicizzazione percentuale opzionale a ogni rinnovo
+- Planned Item: stessa distribuzione delle righe Live (spend_date, start/end, all su tutti i mesi del periodo)
+- un mese toccato anche parzialmente conta intero, come overlap_months
+"""
+
+from __future__ import annotations
+
+import datetime
+from dataclasses import dataclass
+
+from master_plan_it.core.lines import (
+	APPROVED_PROJECT_STATE,
+	CONTRACT_STATUSES,
+	ContractRecord,
+	ContractTermRecord,
+	PlannedItemRecord,
+	ProjectRecord,
+	planned_item_periods,
+)
+from master_plan_it.core.numbers import flt
+from master_plan_it.core.periods import to_date
+
+CONTRACT = "Contract"
+PLANNED_ITEM = "Planned Item"
+GROUP_FIELDS = ("cost_center", "source_type", "vendor")
+# Renewal length when the contract has no start/end dates to measure its own term.
+RENEWAL_CYCLE_MONTHS = {"Monthly": 1, "Quarterly": 3, "Annual": 12}
+DEFAULT_RENEWAL_MONTHS = 12
+_DAYS_PER_MONTH = 365.25 / 12
+
+
+@dataclass(frozen=True)
+class Segment:
+	"""A monthly net amount over months first_month..last_month (month indexes, inclusive; None = open-ended)."""
+
+	first_month: int
+	last_month: int | None
+	monthly_amount: float
+
+
+def month_index(value: datetime.date | str) -> int:
+	"""Months since year 0: consecutive months have consecutive indexes."""
+	value = to_date(value)
+	return value.year * 12 + value.month - 1
+
+
+def month_start(index: int) -> datetime.date:
+	return datetime.date(index // 12, index % 12 + 1, 1)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Sources → segments
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def renewal_months(contract: ContractRecord) -> int:
+	"""Length of one renewal: the contract's own term in months, else its billing cycle."""
+	if contract.start_date and contract.end_date:
+		days = (to_date(contract.end_date) - to_date(contract.start_date)).days + 1
+		if days > 0:
+			return max(1, round(days / _DAYS_PER_MONTH))
+	return RENEWAL_CYCLE_MONTHS.get(contract.billing_cycle, DEFAULT_RENEWAL_MONTHS)
+
+
+def contract_segments(
+	contract: ContractRecord,
+	terms: list[ContractTermRecord],
+	indexation: float = 0.0,
+	until_month: int | None = None,
+) -> list[Segment]:
+	"""Periods of a contract with their monthly net amount (terms ordered by from_date).
+
+	With `indexation` (percent per renewal) the auto-renew continuation is split into renewal
+	cycles up to `until_month`, each priced `indexation`% above the previous one.
+	"""
+	contract_start = to_date(contract.start_date) if contract.start_date else None
+	contract_end = to_date(contract.end_date) if contract.end_date else None
+
+	segments: list[Segment] = []
+	for i, term in enumerate(terms):
+		term_start = to_date(term.from_date)
+		if term.to_date:
+			term_end = to_date(term.to_date)
+		elif i + 1 < len(terms):
+			term_end = to_date(terms[i + 1].from_date) - datetime.timedelta(days=1)
+		else:
+			term_end = contract_end
+
+		start = max(term_start, contract_start) if contract_start else term_start
+		end = min(filter(None, (term_end, contract_end)), default=None)
+		if end and end < start:
+			continue
+		segments.append(
+			Segment(
+				month_index(start),
+				month_index(end) if end else None,
+				flt(term.monthly_amount_net or term.amount_net or 0, 6),
+			)
+		)
+
+	if not segments:
+		# Without a start date the contract runs from before any window (as Live lines from year start).
+		segments.append(
+			Segment(
+				month_index(contract_start) if contract_start else 0,
+				month_index(contract_end) if contract_end else None,
+				flt(contract.monthly_amount_net or 0, 6),
+			)
+		)
+
+	last = segments[-1]
+	if not (contract.auto_renew and last.last_month is not None and contract_end):
+		return segments
+	# Renewal continues the contract after its end date from the last monthly amount.
+	start = month_index(contract_end) + 1
+	if not indexation or until_month is None:
+		segments.append(Segment(start, None, last.monthly_amount))
+		return segments
+	cycle, amount = renewal_months(contract), last.monthly_amount
+	while start <= until_month:
+		amount *= 1 + indexation / 100
+		segments.append(Segment(start, start + cycle - 1, flt(amount, 6)))
+		start += cycle
+	return segments
+
+
+def planned_item_segments(item: PlannedItemRecord, window_start: datetime.date, window_end: datetime.date) -> list[Segment]:
+	"""Periods of a Planned Item within the window, distributed as its Live budget lines."""
+	return [
+		Segment(month_index(start), month_index(end), flt(amount, 6))
+		for start, end, amount in planned_item_periods(item, window_start, window_end)
+	]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Projection
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def project(
+	contracts: list[ContractRecord],
+	terms_by_contract: dict[str, list[ContractTermRecord]],
+	items: list[PlannedItemRecord],
+	projects: dict[str, ProjectRecord],
+	first_month: int,
+	months: int,
+	group_by: tuple[str, ...] = ("cost_center", "source_type"),
+	indexation: float = 0.0,
+	sources: tuple[str, ...] = (CONTRACT, PLANNED_ITEM),
+) -> dict[tuple, list[float]]:
+	"""Monthly net amounts over the window per group key (values of `group_by`, from GROUP_FIELDS).
+
+	All contracts and Planned Items are projected in a single pass (`sources` limits the kinds);
+	`indexation` is the percent increase of auto-renew contracts at each renewal.
+
+	Each segment is added once to a per-group difference array (+amount at its first month,
+	-amount after its last), so the cost is one step per segment whatever its length; a
+	running sum per group turns the differences into monthly amounts.
+
+	Skipped: contracts not in CONTRACT_STATUSES or without cost center, Planned Items of
+	missing or not Approved projects or projects without cost center.
+	"""
+	if months <= 0:
+		return {}
+	last_month = first_month + months - 1
+	window_start = month_start(first_month)
+	window_end = month_start(last_month + 1) - datetime.timedelta(days=1)
+	deltas: dict[tuple, list[float]] = {}
+
+	def add(values: dict, segments: list[Segment]) -> None:
+		key = tuple(values[field] for field in group_by)
+		for segment in segments:
+			first = max(segment.first_month, first_month)
+			last = last_month if segment.last_month is None else min(segment.last_month, last_month)
+			if last < first or not segment.monthly_amount:
+				continue
+			diff = deltas.get(key)
+			if diff is None:
+				diff = deltas[key] = [0.0] * (months + 1)
+			diff[first - first_month] += segment.monthly_amount
+			diff[last - first_month + 1] -= segment.monthly_amount
+
+	for contract in contracts if CONTRACT in sources else ():
+		if contract.status not in CONTRACT_STATUSES or not contract.cost_center:
+			continue
+		add(
+			{"cost_center": contract.cost_center, "source_type": CONTRACT, "vendor": contract.vendor},
+			contract_segments(contract, terms_by_contract.get(contract.name) or [], indexation, last_month),
+		)
+
+	for item in items if PLANNED_ITEM in sources else ():
+		project_record = projects.get(item.project)
+		if not project_record or project_record.workflow_state != APPROVED_PROJECT_STATE or not project_record.cost_center:
+			continue
+		add(
+			{"cost_center": project_record.cost_center, "source_type": PLANNED_ITEM, "vendor": None},
+			planned_item_segments(item, window_start, window_end),
+		)
+
+	result: dict[tuple, list[float]] = {}
+	for key, diff in deltas.items():
+		running, values = 0.0, []
+		for delta in diff[:months]:
+			running += delta
+			values.append(flt(running, 2))
+		result[key] = values
+	return result
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Live lines
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def line_totals(lines: list, year_start: datetime.date, year_end: datetime.date) -> dict:
+	"""Annual net per cost center and per month of the year (lines spread evenly over their months).
+
+	`lines` are budget lines (rows or objects with cost_center, annual_net, period_start_date,
+	period_end_date); a line without period dates covers the whole year.
+	"""
+	first = month_index(year_start)
+	months = month_index(year_end) - first + 1
+	by_cost_center: dict[str, float] = {}
+	by_month = [0.0] * months
+	for line in lines:
+		annual_net = flt(line.annual_net, 2)
+		by_cost_center[line.cost_center] = by_cost_center.get(line.cost_center, 0.0) + annual_net
+		start = max(month_index(line.period_start_date or year_start), first)
+		end = min(month_index(line.period_end_date or year_end), first + months - 1)
+		if end < start:
+			continue
+		for offset in range(start - first, end - first + 1):
+			by_month[offset] += annual_net / (end - start + 1)
+	return {
+		"cost_centers": {key: flt(value, 2) for key, value in by_cost_center.items()},
+		"months": [flt(value, 2) for value in by_month],
+		"total": flt(sum(by_cost_center.values()), 2),
+	}
@@ -0,0 +1,80 @@
+"""
+FILE: master_plan_it/core/tax.py
+SCOPO: Split netto/IVA/lordo con precisione a 2 decimali e risoluzione dell'aliquota IVA (riga > default), senza Frappe.
+INPUT: Importo, aliquota percentuale, flag IVA inclusa; aliquota di riga e default da MPIT Settings.
+OUTPUT/SIDE EFFECTS: Nessuno; l'errore "IVA mancante" è sollevato dall'adapter master_plan_it.tax.
+"""
+
+from __future__ import annotations
+
+from master_plan_it.core.numbers import flt
+
+
+def split_net_vat_gross(
+	amount: float,
+	vat_rate_pct: float | None,
+	includes_vat: bool,
+	precision: int = 2
+) -> tuple[float, float, float]:
+	"""
+	Split an amount into net, vat, and gross components.
+	
+	Args:
+		amount: The input amount (can be net or gross depending on includes_vat)
+		vat_rate_pct: VAT rate as percentage (e.g., 22.0 for 22%). Can be None if amount is 0.
+		includes_vat: True if amount includes VAT (gross), False if amount is net
+		precision: Decimal precision for rounding (default: 2)
+	
+	Returns:
+		tuple: (net, vat, gross) all rounded to specified precision
+	
+	Examples:
+		>>> split_net_vat_gross(100.0, 22.0, False, 2)
+		(100.0, 22.0, 122.0)  # Input is net
+		
+		>>> split_net_vat_gross(122.0, 22.0, True, 2)
+		(100.0, 22.0, 122.0)  # Input is gross
+		
+		>>> split_net_vat_gross(0.0, None, False, 2)
+		(0.0, 0.0, 0.0)  # Zero amount
+	"""
+	# Handle zero amount
+	if not amount or flt(amount, precision) == 0:
+		return (0.0, 0.0, 0.0)
+	
+	# VAT rate is required for non-zero amounts (will be validated in controller)
+	if vat_rate_pct is None:
+		# This will be caught by strict VAT validation in validate()
+		# For calculation purposes, treat as 0
+		vat_rate_pct = 0.0
+	
+	# Convert percentage to decimal
+	vat_rate = flt(vat_rate_pct, precision) / 100.0
+	
+	if includes_vat:
+		# Input is gross, extract net and vat
+		gross = flt(amount, precision)
+		net = flt(gross / (1 + vat_rate), precision)
+		vat = flt(gross - net, precision)
+	else:
+		# Input is net, calculate gross and vat
+		net = flt(amount, precision)
+		gross = flt(net * (1 + vat_rate), precision)
+		vat = flt(gross - net, precision)
+	
+	return (net, vat, gross)
+
+
+def resolve_vat_rate(amount: float, vat_rate: float | None, default_vat_rate: float | None) -> float | None:
+	"""
+	VAT rate to use under strict VAT rules, or None when a non-zero amount has no rate at all.
+	
+	Priority: row vat_rate > default (MPIT Settings). A zero amount falls back to 0.
+	"""
+	if vat_rate is not None:
+		return flt(vat_rate, 2)
+	if default_vat_rate is not None:
+		return flt(default_vat_rate, 2)
+	if not amount or flt(amount, 2) == 0:
+		return 0.0
+	return None
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+"""MPIT DevTools: end-to-end benchmark (budget engine, reports, chart sources)
+
+ENTRYPOINT
+- bench --site <site> execute master_plan_it.devtools.benchmark.run --kwargs "{'scale': 'small'}"
+
+Loads the synthetic dataset (devtools.synthetic_data) when missing, then times the hot
+entry points and writes a JSON result to sites/<site>/mpit_benchmarks/<sha>-<scale>.json.
+Each case runs `repeat` times and reports min/median/max wall time; mutating cases
+(refresh_from_sources, create_snapshot) are rolled back after every run, so results are
+comparable across commits on the same dataset.
+"""
+
+from __future__ import annotations
+
+import datetime
+import json
+import os
+import statistics
+import subprocess
+import time
+from typing import Callable, Dict, List, Tuple
+
+import frappe
+
+from master_plan_it.devtools import synthetic_data
+from master_plan_it.master_plan_it.doctype.mpit_year import mpit_year
+
+CHART_SOURCES = [
+    "mpit_actual_entries_by_kind",
+    "mpit_actual_entries_by_status",
+    "mpit_budget_totals",
+    "mpit_budgets_by_type",
+    "mpit_cap_vs_actual_by_cost_center",
+    "mpit_contracts_by_status",
+    "mpit_monthly_plan_vs_actual",
+    "mpit_planned_items_coverage",
+    "mpit_projects_by_status",
+]
+
+
+def run(scale: str = "small", seed: int = 42, repeat: int = 3, output: str | None = None) -> dict:
+    """Run the benchmark suite and return (and persist) the JSON-serialisable result."""
+    frappe.set_user("Administrator")
+    if not frappe.db.exists("MPIT Contract", {"name": ("like", f"{synthetic_data.PREFIX}%")}):
+        synthetic_data.generate(scale=scale, seed=seed)
+
+    year = str(datetime.date.today().year)
+    live_budget, snapshot = _prepare_budgets(year)
+    root = f"{synthetic_data.PREFIX}CC Root"
+
+    results = []
+    for name, fn, mutating in _cases(year, live_budget, snapshot, root):
+        case = _time_case(name, fn, repeat, mutating)
+        results.append(case)
+        print(f"{name:<55} " + (f"median {case['median_ms']:>10.1f} ms" if case["runs"] else f"FAILED {case['error']}"))
+
+    result = {
+        "git_sha": _git_sha(),
+        "timestamp": datetime.datetime.now().isoformat(timespec="seconds"),
+        "site": frappe.local.site,
+        "scale": scale,
+        "seed": seed,
+        "repeat": repeat,
+        "year": year,
+        "counts": _counts(),
+        "results": results,
+    }
+    path = output or frappe.get_site_path("mpit_benchmarks", f"{result['git_sha'][:12]}-{scale}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w") as f:
+        json.dump(result, f, indent=1, default=str)
+    print(f"Benchmark written to {path}")
+    return result
+
+
+def _cases(year: str, live_budget: str, snapshot: str, root: str) -> List[Tuple[str, Callable, bool]]:
+    from master_plan_it.master_plan_it.doctype.mpit_budget import mpit_budget
+    from master_plan_it.master_plan_it.report.mpit_actual_entries import mpit_actual_entries
+    from master_plan_it.master_plan_it.report.mpit_budget_diff import mpit_budget_diff
+    from master_plan_it.master_plan_it.report.mpit_monthly_plan import mpit_monthly_plan
+    from master_plan_it.master_plan_it.report.mpit_overview import mpit_overview
+    from master_plan_it.master_plan_it.report.mpit_renewals_window import mpit_renewals_window
+
+    cases: List[Tuple[str, Callable, bool]] = [
+        ("budget.refresh_from_sources", lambda: mpit_budget.refresh_from_sources(live_budget), True),
+        ("budget.create_snapshot", lambda: mpit_budget.create_snapshot(live_budget), True),
+        ("budget.get_cost_center_summaries(root)",
+         lambda: mpit_budget.get_cost_center_summaries(year, root=root, include_group_totals=1), False),
+        ("report.mpit_overview", lambda: mpit_overview.execute({"year": year}), False),
+        ("report.mpit_overview(cost_center tree)",
+         lambda: mpit_overview.execute({"year": year, "cost_center": root, "include_children": 1}), False),
+        ("report.mpit_monthly_plan", lambda: mpit_monthly_plan.execute({"year": year}), False),
+        ("report.mpit_actual_entries", lambda: mpit_actual_entries.execute({"year": year}), False),
+        ("report.mpit_renewals_window", lambda: mpit_renewals_window.execute({"days": 90}), False),
+        ("report.mpit_budget_diff",
+         lambda: mpit_budget_diff.execute({"budget_a": snapshot, "budget_b": live_budget, "group_by": "CostCenter+Vendor"}),
+         False),
+    ]
+    for source in CHART_SOURCES:
+        module = frappe.get_module(f"master_plan_it.master_plan_it.dashboard_chart_source.{source}.{source}")
+        cases.append((f"chart.{source}", lambda m=module: m.get(filters={"year": year}), False))
+    return cases
+
+
+def _time_case(name: str, fn: Callable, repeat: int, mutating: bool) -> dict:
+    timings: List[float] = []
+    error = None
+    for _ in range(max(1, int(repeat))):
+        frappe.clear_messages()
+        started = time.perf_counter()
+        try:
+            fn()
+        except Exception as exc:
+            error = f"{type(exc).__name__}: {exc}"
+            frappe.db.rollback()
+            break
+        timings.append((time.perf_counter() - started) * 1000)
+        if mutating:
+            frappe.db.rollback()
+    return {
+        "name": name,
+        "runs": len(timings),
+        "min_ms": round(min(timings), 2) if timings else None,
+        "median_ms": round(statistics.median(timings), 2) if timings else None,
+        "max_ms": round(max(timings), 2) if timings else None,
+        "error": error,
+    }
+
+
+def _prepare_budgets(year: str) -> Tuple[str, str]:
+    """Ensure the year has a refreshed Live budget and a Snapshot to diff against (committed once)."""
+    live_budget = mpit_year.get_live_budget(year)
+    if not live_budget:
+        live_budget = frappe.get_doc({
+            "doctype": "MPIT Budget",
+            "year": year,
+            "budget_type": "Live",
+            "workflow_state": "Active",
+        }).insert(ignore_permissions=True).name
+        frappe.get_doc("MPIT Budget", live_budget).refresh_from_sources()
+        frappe.db.commit()
+
+    snapshot = mpit_year.get_current_snapshot(year) or frappe.db.get_value(
+        "MPIT Budget", {"year": year, "budget_type": "Snapshot"}, "name"
+    )
+    if not snapshot:
+        from master_plan_it.master_plan_it.doctype.mpit_budget import mpit_budget
+
+        snapshot = mpit_budget.create_snapshot(live_budget)
+        frappe.db.commit()
+    return live_budget, snapshot
+
+
+def _counts() -> Dict[str, int]:
+    return {
+        doctype: frappe.db.count(doctype)
+        for doctype in (
+            "MPIT Cost Center",
+            "MPIT Vendor",
+            "MPIT Contract",
+            "MPIT Contract Term",
+            "MPIT Project",
+            "MPIT Planned Item",
+            "MPIT Actual Entry",
+            "MPIT Budget Line",
+        )
+    }
+
+
+def _git_sha() -> str:
+    try:
+        return subprocess.check_output(
+            ["git", "rev-parse", "HEAD"],
+            cwd=frappe.get_app_path("master_plan_it"),
+            stderr=subprocess.DEVNULL,
+            text=True,
+        ).strip()
+    except Exception:
+        return "unknown"
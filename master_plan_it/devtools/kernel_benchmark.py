@@ -0,0 +1,265 @@
+# -*- coding: utf-8 -*-
+"""MPIT DevTools: micro-benchmarks for the pure money and calendar kernels
+
+ENTRYPOINT
+- bench --site <site> execute master_plan_it.devtools.kernel_benchmark.run
+- bench --site <site> execute master_plan_it.devtools.kernel_benchmark.run --kwargs "{'update_baseline': 1}"
+- python -c "from master_plan_it.devtools import kernel_benchmark; kernel_benchmark.run()"  (no site needed)
+
+Times the Frappe-free core kernels amounts.compute_line_amounts (scalar and batch), amounts.compute_vat_split,
+tax.split_net_vat_gross, periods.overlap_months and periods.annualize on deterministic input sets
+(every recurrence rule, VAT included/excluded, partial-year and multi-year periods).
+
+Timings are stored as a ratio to a fixed pure-Python calibration loop measured in the
+same process. Each ratio is the median over several rounds (each round the best of a few
+passes), which absorbs scheduler noise on shared or single-CPU hosts. Ratios still depend
+on the interpreter and CPU architecture, so the baseline file records the environment it
+was measured in and check() refuses to compare across environments.
+A kernel regresses when its ratio exceeds the baseline by more than the threshold in every
+one of `attempts` independent measurements.
+"""
+
+from __future__ import annotations
+
+import datetime
+import json
+import os
+import platform
+import random
+import statistics
+import timeit
+from typing import Callable, Dict, List, Optional, Tuple
+
+from master_plan_it.core import amounts, tax
+from master_plan_it.core import periods as core_periods
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "kernel_baselines.json")
+DEFAULT_THRESHOLD = 0.5
+DEFAULT_ROUNDS = 5
+DEFAULT_ATTEMPTS = 3
+SEED = 20260101
+SAMPLE_SIZE = 500
+
+RECURRENCE_RULES = ["Monthly", "Quarterly", "Annual", "None"]
+VAT_RATES = [None, 0, 4, 10, 22]
+
+
+def run(
+    update_baseline: int = 0,
+    threshold: float = DEFAULT_THRESHOLD,
+    rounds: int = DEFAULT_ROUNDS,
+    attempts: int = DEFAULT_ATTEMPTS,
+) -> dict:
+    """Measure every kernel, compare with the stored baselines and optionally record new ones."""
+    threshold = float(threshold)
+    results = measure(rounds=rounds)
+    baselines = load_baselines()
+
+    for name, row in results.items():
+        base = baselines.get(name, {}).get("ratio")
+        delta = f"{(row['ratio'] / base - 1) * 100:+6.1f}%" if base else "   (new)"
+        print(f"{name:<28} {row['ns_per_call']:>10.0f} ns/call  ratio {row['ratio']:>8.3f}  {delta}")
+
+    if int(update_baseline):
+        save_baselines(results)
+        print(f"Baselines written to {BASELINE_PATH}")
+        return {"results": results, "regressions": [], "threshold": threshold}
+
+    mismatch = environment_mismatch()
+    if mismatch:
+        print(f"Baselines not comparable ({mismatch}); re-record them with update_baseline=1")
+        return {"results": results, "regressions": [], "threshold": threshold, "skipped": mismatch}
+
+    regressions = check(baselines, threshold, rounds=rounds, attempts=attempts, first=results)
+    if regressions:
+        print("Regressions beyond {0:.0%}: {1}".format(threshold, ", ".join(regressions)))
+    return {"results": results, "regressions": regressions, "threshold": threshold}
+
+
+def measure(rounds: int = DEFAULT_ROUNDS, names: Optional[List[str]] = None) -> Dict[str, dict]:
+    """Return {kernel: {ns_per_call, ratio}} as the median over `rounds` rounds.
+
+    Every round re-times the calibration loop next to the kernels, so a slow spell on the
+    host inflates both sides of the ratio instead of only the kernel.
+    """
+    kernels = _kernels()
+    if names is not None:
+        kernels = {name: kernels[name] for name in names}
+    numbers = {name: _calls_for(fn) for name, fn in kernels.items()}
+    calibration_number = _calls_for(_calibration_loop)
+
+    samples: Dict[str, List[Tuple[float, float]]] = {name: [] for name in kernels}
+    for _ in range(max(1, int(rounds))):
+        calibration = _best_ns_per_call(_calibration_loop, calibration_number)
+        for name, fn in kernels.items():
+            ns = _best_ns_per_call(fn, numbers[name])
+            samples[name].append((ns, ns / calibration))
+
+    return {
+        name: {
+            "ns_per_call": round(statistics.median(ns for ns, _ in rows), 1),
+            "ratio": round(statistics.median(ratio for _, ratio in rows), 4),
+        }
+        for name, rows in samples.items()
+    }
+
+
+def compare(results: Dict[str, dict], baselines: Dict[str, dict], threshold: float = DEFAULT_THRESHOLD) -> List[str]:
+    """Return the kernels whose ratio grew more than `threshold` over the baseline."""
+    regressions = []
+    for name, row in results.items():
+        base = baselines.get(name, {}).get("ratio")
+        if base and row["ratio"] > base * (1 + threshold):
+            regressions.append(name)
+    return regressions
+
+
+def check(
+    baselines: Dict[str, dict],
+    threshold: float = DEFAULT_THRESHOLD,
+    rounds: int = DEFAULT_ROUNDS,
+    attempts: int = DEFAULT_ATTEMPTS,
+    first: Optional[Dict[str, dict]] = None,
+) -> List[str]:
+    """Return the kernels that exceed the threshold in every one of `attempts` measurements.
+
+    Only the kernels still over the threshold are re-measured, so a one-off slow pass on
+    unchanged code is discarded while a real slowdown fails every attempt.
+    """
+    results = first if first is not None else measure(rounds=rounds)
+    regressions = compare(results, baselines, threshold)
+    for _ in range(max(1, int(attempts)) - 1):
+        if not regressions:
+            break
+        regressions = compare(measure(rounds=rounds, names=regressions), baselines, threshold)
+    return regressions
+
+
+def environment() -> Dict[str, str]:
+    """Interpreter and architecture the calibration ratios depend on."""
+    return {
+        "python": f"{platform.python_implementation()} {platform.python_version_tuple()[0]}.{platform.python_version_tuple()[1]}",
+        "machine": platform.machine(),
+    }
+
+
+def environment_mismatch() -> str:
+    """Describe how the running environment differs from the baselines' one ("" when comparable)."""
+    recorded = _read_baseline_file().get("environment") or {}
+    current = environment()
+    return ", ".join(
+        f"{key} {recorded.get(key) or '?'} != {value}" for key, value in current.items() if recorded.get(key) != value
+    )
+
+
+def load_baselines() -> Dict[str, dict]:
+    return _read_baseline_file().get("kernels") or {}
+
+
+def save_baselines(results: Dict[str, dict]) -> None:
+    with open(BASELINE_PATH, "w") as f:
+        json.dump({"environment": environment(), "kernels": results}, f, indent=1, sort_keys=True)
+        f.write("\n")
+
+
+def _read_baseline_file() -> dict:
+    if not os.path.exists(BASELINE_PATH):
+        return {}
+    with open(BASELINE_PATH) as f:
+        return json.load(f)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Input distributions
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def _kernels() -> Dict[str, Callable[[], None]]:
+    line_inputs, vat_inputs, periods, annualize_inputs = _inputs()
+
+    def line_amounts():
+        for args in line_inputs:
+            amounts.compute_line_amounts(*args)
+
+    line_columns = list(zip(*line_inputs))
+
+    def line_amounts_batch():
+        amounts.compute_line_amounts_batch(*line_columns)
+
+    def vat_split():
+        for amount, rate, includes in vat_inputs:
+            amounts.compute_vat_split(amount, rate, includes)
+
+    def split_net_vat_gross():
+        for amount, rate, includes in vat_inputs:
+            tax.split_net_vat_gross(amount, rate, includes)
+
+    def overlap_months():
+        for start, end, year_start, year_end in periods:
+            core_periods.overlap_months(start, end, year_start, year_end)
+
+    def annualize():
+        for amount, rule, months in annualize_inputs:
+            core_periods.annualize(amount, rule, months)
+
+    return {
+        "compute_line_amounts": line_amounts,
+        "compute_line_amounts_batch": line_amounts_batch,
+        "compute_vat_split": vat_split,
+        "split_net_vat_gross": split_net_vat_gross,
+        "overlap_months": overlap_months,
+        "annualize": annualize,
+    }
+
+
+def _inputs() -> Tuple[list, list, list, list]:
+    rng = random.Random(SEED)
+    line_inputs, vat_inputs, periods, annualize_inputs = [], [], [], []
+    year_start, year_end = datetime.date(2026, 1, 1), datetime.date(2026, 12, 31)
+
+    for i in range(SAMPLE_SIZE):
+        rule = RECURRENCE_RULES[i % len(RECURRENCE_RULES)]
+        rate = rng.choice(VAT_RATES)
+        includes = bool(i % 2)
+        amount = round(rng.uniform(0, 25_000), 2)
+        # Alternate the amount entry paths: unit price, monthly only, annual only, both set.
+        mode = i % 4
+        qty = rng.choice([None, 1, 2, 5])
+        unit_price = amount if mode == 0 else None
+        monthly = amount if mode in (1, 3) else None
+        annual = round(amount * 12, 2) if mode in (2, 3) else None
+        months = rng.randint(1, 12)
+        line_inputs.append((qty, unit_price, monthly, annual, rate, includes, rule, months))
+        vat_inputs.append((amount if i % 10 else 0, rate, includes))
+
+        # Periods: fully inside, straddling either boundary, spanning several years, or outside.
+        start = datetime.date(rng.randint(2024, 2027), rng.randint(1, 12), rng.randint(1, 28))
+        end = start + datetime.timedelta(days=rng.choice([15, 45, 180, 365, 730, 1095]))
+        periods.append((start, end, year_start, year_end))
+        annualize_inputs.append((amount, rule, rng.choice([0, months])))
+
+    return line_inputs, vat_inputs, periods, annualize_inputs
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Timing
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def _calibration_loop() -> None:
+    # Mix of float arithmetic, rounding and branching comparable to the kernels' own work.
+    total = 0.0
+    for i in range(SAMPLE_SIZE):
+        value = i * 1.2345
+        total += round(value / 1.22, 2) if i % 2 else round(value * 0.22, 2)
+
+
+def _calls_for(fn: Callable[[], None], target_seconds: float = 0.05) -> int:
+    """Number of calls per timed pass so that one pass lasts about `target_seconds`."""
+    elapsed = timeit.timeit(fn, number=1)
+    return max(1, int(target_seconds / max(elapsed, 1e-9)))
+
+
+def _best_ns_per_call(fn: Callable[[], None], number: int, passes: int = 3) -> float:
+    best = min(timeit.Timer(fn).repeat(repeat=passes, number=number))
+    return best / number / SAMPLE_SIZE * 1e9
@@ -0,0 +1,320 @@
+# -*- coding: utf-8 -*-
+"""MPIT DevTools: synthetic large-tenant data (deterministic, scale-parameterized)
+
+ENTRYPOINT
+- bench --site <site> execute master_plan_it.devtools.synthetic_data.generate --kwargs "{'scale': 'small'}"
+- bench --site <site> execute master_plan_it.devtools.synthetic_data.purge
+
+Bulk-loads realistic data for performance work: a cost center tree, vendors, contracts
+with multi-term pricing, approved projects with submitted planned items across years,
+and actual entries. Rows are written with frappe.db.bulk_insert (controllers bypassed);
+derived amounts use the same tax/VAT helpers as the controllers. Every record name
+starts with SYN- so the dataset can be purged. Same scale + seed => same dataset.
+Use on dedicated benchmark sites only.
+"""
+
+from __future__ import annotations
+
+import datetime
+import random
+from typing import Dict, List
+
+import frappe
+from frappe.utils import add_days, add_months, flt, now
+
+from master_plan_it import tax
+
+PREFIX = "SYN-"
+
+SCALES: Dict[str, Dict[str, int]] = {
+    "tiny": {"cost_center_groups": 2, "cost_centers_per_group": 3, "vendors": 10, "contracts": 50, "projects": 10, "planned_items": 100, "actual_entries": 1_000},
+    "small": {"cost_center_groups": 4, "cost_centers_per_group": 5, "vendors": 100, "contracts": 500, "projects": 100, "planned_items": 2_500, "actual_entries": 25_000},
+    "medium": {"cost_center_groups": 8, "cost_centers_per_group": 10, "vendors": 500, "contracts": 2_500, "projects": 500, "planned_items": 12_500, "actual_entries": 125_000},
+    "large": {"cost_center_groups": 20, "cost_centers_per_group": 10, "vendors": 2_000, "contracts": 10_000, "projects": 2_000, "planned_items": 50_000, "actual_entries": 500_000},
+}
+
+BILLING_CYCLES = ["Monthly", "Monthly", "Quarterly", "Annual"]
+CONTRACT_STATUSES = ["Active", "Active", "Active", "Pending Renewal", "Renewed", "Draft", "Expired"]
+VAT_RATES = [0, 4, 10, 22, 22, 22]
+CHUNK_SIZE = 5_000
+
+
+def generate(scale: str = "small", seed: int = 42, base_year: int | None = None) -> dict:
+    """Load the synthetic dataset for `scale` and return the generated counts."""
+    if scale not in SCALES:
+        frappe.throw(f"Unknown scale {scale!r}. Use one of: {', '.join(SCALES)}")
+    if frappe.db.exists("MPIT Contract", {"name": ("like", f"{PREFIX}%")}):
+        frappe.throw("Synthetic data already present. Run purge() first.")
+
+    size = SCALES[scale]
+    rng = random.Random(seed)
+    base_year = int(base_year or datetime.date.today().year)
+    years = [base_year - 1, base_year, base_year + 1]
+
+    for year in years:
+        _ensure_year(year)
+    cost_centers = _create_cost_center_tree(size)
+    vendors = _bulk_vendors(size["vendors"])
+    contracts = _bulk_contracts(rng, size["contracts"], years, vendors, cost_centers)
+    projects = _bulk_projects(rng, size["projects"], years, cost_centers)
+    planned_items = _bulk_planned_items(rng, size["planned_items"], years, projects)
+    actuals = _bulk_actual_entries(rng, size["actual_entries"], years, contracts, projects, cost_centers)
+
+    from master_plan_it import cap_counters
+
+    cap_counters.rebuild_all()
+    frappe.db.commit()
+
+    counts = {
+        "scale": scale,
+        "seed": seed,
+        "years": years,
+        "cost_centers": len(cost_centers),
+        "vendors": len(vendors),
+        "contracts": len(contracts),
+        "projects": len(projects),
+        "planned_items": planned_items,
+        "actual_entries": actuals,
+    }
+    print(counts)
+    return counts
+
+
+def purge() -> None:
+    """Delete every SYN- record (bulk SQL, children first)."""
+    like = f"{PREFIX}%"
+    for table, column in (
+        ("MPIT Contract Term", "parent"),
+        ("MPIT Budget Line", "contract"),
+        ("MPIT Budget Line", "project"),
+        ("MPIT Actual Entry", "name"),
+        ("MPIT Planned Item", "name"),
+        ("MPIT Contract", "name"),
+        ("MPIT Project", "name"),
+        ("MPIT Vendor", "name"),
+    ):
+        frappe.db.sql(f"DELETE FROM `tab{table}` WHERE `{column}` LIKE %s", (like,))
+    for name in frappe.get_all(
+        "MPIT Cost Center", filters={"name": ("like", like)}, pluck="name", order_by="lft desc"
+    ):
+        frappe.delete_doc("MPIT Cost Center", name, force=True, ignore_permissions=True)
+
+    from master_plan_it import cap_counters
+
+    cap_counters.rebuild_all()
+    frappe.db.commit()
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Builders
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def _ensure_year(year: int) -> None:
+    if frappe.db.exists("MPIT Year", str(year)):
+        return
+    frappe.get_doc({
+        "doctype": "MPIT Year",
+        "year": year,
+        "start_date": f"{year}-01-01",
+        "end_date": f"{year}-12-31",
+    }).insert(ignore_permissions=True)
+
+
+def _create_cost_center_tree(size: dict) -> List[str]:
+    """Tree through the controller (nested set bounds must be real); returns leaf names."""
+    root = _insert_cost_center(f"{PREFIX}CC Root", None, 1)
+    leaves = []
+    for g in range(size["cost_center_groups"]):
+        group = _insert_cost_center(f"{PREFIX}CC G{g:02d}", root, 1)
+        for c in range(size["cost_centers_per_group"]):
+            leaves.append(_insert_cost_center(f"{PREFIX}CC G{g:02d} L{c:02d}", group, 0))
+    frappe.db.commit()
+    return leaves
+
+
+def _insert_cost_center(name: str, parent: str | None, is_group: int) -> str:
+    return frappe.get_doc({
+        "doctype": "MPIT Cost Center",
+        "cost_center_name": name,
+        "parent_mpit_cost_center": parent,
+        "is_group": is_group,
+    }).insert(ignore_permissions=True).name
+
+
+def _bulk_vendors(count: int) -> List[str]:
+    names = [f"{PREFIX}Vendor {i:05d}" for i in range(count)]
+    _bulk("MPIT Vendor", ["vendor_name", "is_active"], [[name, 1] for name in names], names)
+    return names
+
+
+def _bulk_contracts(rng, count, years, vendors, cost_centers) -> List[dict]:
+    contracts, rows, names, term_rows, term_names = [], [], [], [], []
+    for i in range(count):
+        name = f"{PREFIX}CT-{i:06d}"
+        start = datetime.date(rng.choice(years[:2]), rng.randint(1, 12), 1)
+        end = add_days(add_months(start, rng.choice([12, 24, 36])), -1)
+        billing = rng.choice(BILLING_CYCLES)
+        vat_rate = rng.choice(VAT_RATES)
+        includes_vat = rng.random() < 0.3
+        amount = flt(rng.uniform(50, 5000), 2)
+        net, vat, gross = tax.split_net_vat_gross(amount, vat_rate, includes_vat)
+        status = rng.choice(CONTRACT_STATUSES)
+        contract = {
+            "name": name,
+            "cost_center": rng.choice(cost_centers),
+            "vendor": rng.choice(vendors),
+            "status": status,
+        }
+        contracts.append(contract)
+        names.append(name)
+        rows.append([
+            f"Synthetic contract {i}", contract["vendor"], status, contract["cost_center"], start, end,
+            int(rng.random() < 0.5), end, amount, int(includes_vat), vat_rate, billing,
+            _monthly(net, billing), net, vat, gross,
+        ])
+        # One to three pricing terms (yearly price steps) for a third of the contracts
+        if rng.random() < 0.33:
+            term_start = start
+            for t in range(rng.randint(1, 3)):
+                term_amount = flt(amount * (1 + 0.05 * t), 2)
+                t_net, t_vat, t_gross = tax.split_net_vat_gross(term_amount, vat_rate, includes_vat)
+                term_end = add_days(add_months(term_start, 12), -1)
+                term_names.append(f"{name}-T{t}")
+                term_rows.append([
+                    name, "MPIT Contract", "terms", t + 1, term_start, term_end, term_amount,
+                    int(includes_vat), vat_rate, billing, t_net, t_vat, t_gross, _monthly(t_net, billing),
+                ])
+                term_start = add_months(term_start, 12)
+
+    _bulk(
+        "MPIT Contract",
+        ["description", "vendor", "status", "cost_center", "start_date", "end_date", "auto_renew",
+         "next_renewal_date", "current_amount", "current_amount_includes_vat", "vat_rate", "billing_cycle",
+         "monthly_amount_net", "current_amount_net", "current_amount_vat", "current_amount_gross"],
+        rows,
+        names,
+    )
+    _bulk(
+        "MPIT Contract Term",
+        ["parent", "parenttype", "parentfield", "idx", "from_date", "to_date", "amount",
+         "amount_includes_vat", "vat_rate", "billing_cycle", "amount_net", "amount_vat", "amount_gross",
+         "monthly_amount_net"],
+        term_rows,
+        term_names,
+        include_idx=False,
+    )
+    return contracts
+
+
+def _bulk_projects(rng, count, years, cost_centers) -> List[dict]:
+    projects, rows, names = [], [], []
+    for i in range(count):
+        name = f"{PREFIX}PRJ-{i:05d}"
+        year = rng.choice(years)
+        project = {"name": name, "cost_center": rng.choice(cost_centers), "year": year}
+        projects.append(project)
+        names.append(name)
+        rows.append([f"Synthetic project {i}", "Approved", "In Progress", project["cost_center"],
+            datetime.date(year, 1, 1), datetime.date(year + 1, 12, 31)])
+    _bulk("MPIT Project", ["title", "workflow_state", "operational_status", "cost_center", "start_date", "end_date"], rows, names)
+    return projects
+
+
+def _bulk_planned_items(rng, count, years, projects) -> int:
+    rows, names = [], []
+    for i in range(count):
+        project = rng.choice(projects)
+        start = datetime.date(project["year"], rng.randint(1, 12), 1)
+        end = add_days(add_months(start, rng.choice([1, 3, 6, 12, 18])), -1)
+        spend_date = add_days(start, rng.randint(0, 27)) if rng.random() < 0.2 else None
+        amount = flt(rng.uniform(100, 20000), 2)
+        vat_rate = rng.choice(VAT_RATES)
+        net, vat, gross = tax.split_net_vat_gross(amount, vat_rate, False)
+        names.append(f"{PREFIX}PI-{i:06d}")
+        rows.append([project["name"], f"Synthetic planned item {i}", start, end, spend_date,
+            rng.choice(["all", "all", "start", "end"]), amount, 0, vat_rate, net, vat, gross,
+            rng.choice(["Estimate", "Quote"]), 0, 0])
+    _bulk(
+        "MPIT Planned Item",
+        ["project", "description", "start_date", "end_date", "spend_date", "distribution", "amount",
+         "amount_includes_vat", "vat_rate", "amount_net", "amount_vat", "amount_gross", "item_type",
+         "is_covered", "out_of_horizon"],
+        rows,
+        names,
+        docstatus=1,
+    )
+    return count
+
+
+def _bulk_actual_entries(rng, count, years, contracts, projects, cost_centers) -> int:
+    rows, names = [], []
+    for i in range(count):
+        year = rng.choice(years)
+        posting = datetime.date(year, rng.randint(1, 12), rng.randint(1, 28))
+        kind_roll = rng.random()
+        contract = project = None
+        if kind_roll < 0.6:
+            contract = rng.choice(contracts)
+            cost_center, entry_kind = contract["cost_center"], "Delta"
+        elif kind_roll < 0.8:
+            project = rng.choice(projects)
+            cost_center, entry_kind = project["cost_center"], "Delta"
+        else:
+            cost_center, entry_kind = rng.choice(cost_centers), "Allowance Spend"
+        amount = flt(rng.uniform(10, 3000), 2)
+        vat_rate = rng.choice(VAT_RATES)
+        includes_vat = rng.random() < 0.5
+        net, vat, gross = tax.split_net_vat_gross(amount, vat_rate, includes_vat)
+        names.append(f"{PREFIX}ACT-{i:07d}")
+        rows.append([str(year), posting, "Verified" if rng.random() < 0.7 else "Recorded", entry_kind,
+            vat_rate, amount, int(includes_vat), contract["name"] if contract else None, cost_center,
+            project["name"] if project else None, net, vat, gross, f"Synthetic actual {i}"])
+    _bulk(
+        "MPIT Actual Entry",
+        ["year", "posting_date", "status", "entry_kind", "vat_rate", "amount", "amount_includes_vat",
+         "contract", "cost_center", "project", "amount_net", "amount_vat", "amount_gross", "description"],
+        rows,
+        names,
+    )
+    return count
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Helpers
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def _monthly(net: float, billing: str) -> float:
+    """Monthly net equivalent (same rule as MPIT Contract / Contract Term)."""
+    if billing == "Quarterly":
+        return flt(net * 4 / 12, 2)
+    if billing == "Annual":
+        return flt(net / 12, 2)
+    return flt(net, 2)
+
+
+def _bulk(
+    doctype: str,
+    fields: List[str],
+    rows: List[list],
+    names: List[str],
+    docstatus: int = 0,
+    include_idx: bool = True,
+) -> None:
+    """bulk_insert with standard columns, committing per chunk to keep transactions small."""
+    if not rows:
+        return
+    timestamp = now()
+    standard = ["name", "creation", "modified", "owner", "modified_by", "docstatus"]
+    if include_idx:
+        standard.append("idx")
+    for start in range(0, len(rows), CHUNK_SIZE):
+        values = []
+        for name, row in zip(names[start:start + CHUNK_SIZE], rows[start:start + CHUNK_SIZE]):
+            meta = [name, timestamp, timestamp, "Administrator", "Administrator", docstatus]
+            if include_idx:
+                meta.append(0)
+            values.append(meta + list(row))
+        frappe.db.bulk_insert(doctype, standard + fields, values)
+        frappe.db.commit()
@@ -0,0 +1,254 @@
+"""
+FILE: master_plan_it/exports.py
+SCOPO: Export in streaming (CSV/XLSX) delle righe budget e delle actual entries, con memoria costante rispetto al numero di righe.
+INPUT: start_export()/download() whitelisted dai report MPIT Overview (modalità budget: budget, cost_center, include_children, vendor) e MPIT Actual Entries (stessi filtri del report).
+OUTPUT/SIDE EFFECTS: Cursore server-side non bufferizzato scritto a blocchi su file temporaneo servito in download; oltre `mpit_export_inline_rows` righe job in background che crea un File privato e notifica il link all'utente.
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import os
+import tempfile
+from decimal import Decimal
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt, now_datetime
+
+from master_plan_it.master_plan_it.utils import cost_center_scope
+from master_plan_it.master_plan_it.utils.dashboard_utils import normalize_dashboard_filters
+
+# Above this many rows the export runs as a background job (override with "mpit_export_inline_rows")
+DEFAULT_INLINE_ROWS = 50_000
+FORMATS = {
+	"CSV": ("csv", "text/csv; charset=utf-8"),
+	"Excel": ("xlsx", "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"),
+}
+
+BUDGET_LINE_COLUMNS = (
+	("cost_center", "Cost Center"),
+	("vendor", "Vendor"),
+	("line_kind", "Line Kind"),
+	("description", "Description"),
+	("contract", "Contract"),
+	("project", "Project"),
+	("source_key", "Source Key"),
+	("is_generated", "Generated"),
+	("recurrence_rule", "Recurrence"),
+	("period_start_date", "Period Start"),
+	("period_end_date", "Period End"),
+	("qty", "Qty"),
+	("unit_price", "Unit Price"),
+	("monthly_amount", "Monthly"),
+	("annual_amount", "Annual Amount"),
+	("amount_includes_vat", "VAT Included"),
+	("vat_rate", "VAT Rate"),
+	("annual_net", "Annual Net"),
+	("annual_vat", "Annual VAT"),
+	("annual_gross", "Annual Gross"),
+)
+ACTUAL_ENTRY_COLUMNS = (
+	("name", "ID"),
+	("year", "Year"),
+	("posting_date", "Date"),
+	("status", "Status"),
+	("entry_kind", "Entry Kind"),
+	("cost_center", "Cost Center"),
+	("contract", "Contract"),
+	("project", "Project"),
+	("amount", "Amount"),
+	("amount_includes_vat", "VAT Included"),
+	("vat_rate", "VAT Rate"),
+	("amount_net", "Net Amount"),
+	("amount_vat", "VAT Amount"),
+	("amount_gross", "Gross Amount"),
+	("description", "Description"),
+)
+
+
+@frappe.whitelist()
+def start_export(kind: str, filters=None, file_format: str = "CSV") -> dict:
+	"""Check the export and size it: small ones are downloaded directly, large ones run in background."""
+	filters = _parse_filters(filters)
+	spec = _get_spec(kind, filters, file_format)
+	rows = _count_rows(spec)
+	if rows <= _inline_rows():
+		return {"queued": False, "rows": rows}
+	frappe.enqueue(
+		"master_plan_it.exports.export_to_file",
+		queue="long",
+		timeout=3600,
+		kind=kind,
+		filters=filters,
+		file_format=file_format,
+		user=frappe.session.user,
+	)
+	return {"queued": True, "rows": rows}
+
+
+@frappe.whitelist()
+def download(kind: str, filters=None, file_format: str = "CSV"):
+	"""Stream the export as a file download (rows written to a temporary file, never held in memory).
+
+	Only exports within the inline limit are built in the request; larger ones go through start_export.
+	"""
+	from werkzeug.wrappers import Response
+	from werkzeug.wsgi import wrap_file
+
+	filters = _parse_filters(filters)
+	spec = _get_spec(kind, filters, file_format)
+	if _count_rows(spec) > _inline_rows():
+		frappe.throw(_("This export is too large to download directly: start it again to receive the file when ready."))
+	fileobj = tempfile.TemporaryFile()
+	write(spec, fileobj)
+	fileobj.seek(0)
+	response = Response(wrap_file(frappe.local.request.environ, fileobj), mimetype=spec.mimetype, direct_passthrough=True)
+	response.headers["Content-Disposition"] = f'attachment; filename="{spec.file_name}"'
+	return response
+
+
+def export_to_file(kind: str, filters: dict, file_format: str, user: str) -> str:
+	"""Background job: write the export into a private File of the user and send them the link."""
+	spec = _get_spec(kind, frappe._dict(filters), file_format)
+	path = frappe.get_site_path("private", "files", spec.file_name)
+	with open(path, "wb") as fileobj:
+		write(spec, fileobj)
+	file_doc = frappe.get_doc({
+		"doctype": "File",
+		"file_name": spec.file_name,
+		"file_url": f"/private/files/{spec.file_name}",
+		"is_private": 1,
+		"file_size": os.path.getsize(path),
+	})
+	file_doc.owner = user
+	file_doc.insert(ignore_permissions=True)
+	frappe.publish_realtime(
+		"msgprint",
+		_("Export ready: {0}").format(f'<a href="{file_doc.file_url}" target="_blank">{spec.file_name}</a>'),
+		user=user,
+	)
+	return file_doc.file_url
+
+
+def write(spec: frappe._dict, fileobj) -> int:
+	"""Write header and rows of the export to a binary file object; return the row count.
+
+	Rows come from an unbuffered server-side cursor and go straight to the writer, so memory
+	does not grow with the row count (openpyxl write-only mode spools rows to disk).
+	"""
+	query = f"SELECT {', '.join(f'`{field}`' for field, _label in spec.columns)} {spec.source} ORDER BY {spec.order_by}"
+	header = [_(label) for _field, label in spec.columns]
+	count = 0
+	if spec.extension == "csv":
+		text = io.TextIOWrapper(fileobj, encoding="utf-8", newline="", write_through=True)
+		writer = csv.writer(text)
+		writer.writerow(header)
+		with frappe.db.unbuffered_cursor():
+			for row in frappe.db.sql(query, spec.values, as_iterator=True):
+				writer.writerow([_csv_value(value) for value in row])
+				count += 1
+		text.detach()
+		return count
+
+	from openpyxl import Workbook
+
+	workbook = Workbook(write_only=True)
+	sheet = workbook.create_sheet(spec.sheet_title)
+	sheet.append(header)
+	with frappe.db.unbuffered_cursor():
+		for row in frappe.db.sql(query, spec.values, as_iterator=True):
+			sheet.append(list(row))
+			count += 1
+	workbook.save(fileobj)
+	return count
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Export definitions
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def _get_spec(kind: str, filters: frappe._dict, file_format: str) -> frappe._dict:
+	"""Columns, FROM/WHERE clause, order and file naming of an export (permission checked)."""
+	if file_format not in FORMATS:
+		frappe.throw(_("Unsupported export format: {0}").format(file_format))
+	extension, mimetype = FORMATS[file_format]
+
+	if kind == "budget_lines":
+		spec = _budget_lines_spec(filters)
+	elif kind == "actual_entries":
+		spec = _actual_entries_spec(filters)
+	else:
+		frappe.throw(_("Unsupported export: {0}").format(kind))
+
+	stamp = f"{now_datetime().strftime('%Y%m%d-%H%M%S')}-{frappe.generate_hash(length=6)}"
+	spec.update(
+		extension=extension,
+		mimetype=mimetype,
+		file_name=f"{frappe.scrub(spec.sheet_title)}-{stamp}.{extension}",
+	)
+	return spec
+
+
+def _budget_lines_spec(filters: frappe._dict) -> frappe._dict:
+	"""Lines of one budget with the MPIT Overview budget-mode filters (cost center subtree, vendor)."""
+	if not filters.get("budget"):
+		frappe.throw(_("Select a Budget to export its lines."))
+	frappe.has_permission("MPIT Budget", "read", filters.budget, throw=True)
+
+	conditions = ["parent = %(budget)s", "parenttype = 'MPIT Budget'", "parentfield = 'lines'"]
+	values = {"budget": filters.budget}
+	cost_centers = cost_center_scope.resolve_cost_centers(filters.get("cost_center"), cint(filters.get("include_children")))
+	if cost_centers:
+		conditions.append("cost_center IN %(cost_centers)s")
+		values["cost_centers"] = tuple(cost_centers)
+	if filters.get("vendor"):
+		conditions.append("vendor = %(vendor)s")
+		values["vendor"] = filters.vendor
+
+	return frappe._dict(
+		columns=BUDGET_LINE_COLUMNS,
+		source=f"FROM `tabMPIT Budget Line` WHERE {' AND '.join(conditions)}",
+		values=values,
+		order_by="idx",
+		sheet_title=filters.budget,
+	)
+
+
+def _actual_entries_spec(filters: frappe._dict) -> frappe._dict:
+	"""Actual entries with the MPIT Actual Entries report filters, in report order."""
+	from master_plan_it.master_plan_it.report.mpit_actual_entries import mpit_actual_entries
+
+	frappe.has_permission("MPIT Actual Entry", "read", throw=True)
+	where_clause, values = mpit_actual_entries.get_conditions(filters)
+	return frappe._dict(
+		columns=ACTUAL_ENTRY_COLUMNS,
+		source=f"FROM `tabMPIT Actual Entry` WHERE 1=1 {where_clause}",
+		values=values,
+		order_by="posting_date DESC, name DESC",
+		sheet_title=f"Actual Entries {filters.get('year') or ''}".strip(),
+	)
+
+
+def _count_rows(spec: frappe._dict) -> int:
+	return cint(frappe.db.sql(f"SELECT COUNT(*) {spec.source}", spec.values)[0][0])
+
+
+def _inline_rows() -> int:
+	"""Largest export built inside a request (site_config mpit_export_inline_rows)."""
+	return cint(frappe.conf.get("mpit_export_inline_rows")) or DEFAULT_INLINE_ROWS
+
+
+def _parse_filters(filters) -> frappe._dict:
+	return frappe._dict(normalize_dashboard_filters(filters) or {})
+
+
+def _csv_value(value):
+	"""Numbers at column precision, without trailing zeros or scientific notation."""
+	if isinstance(value, Decimal):
+		return f"{value.normalize():f}"
+	if isinstance(value, float):
+		return f"{flt(value, 9):.9f}".rstrip("0").rstrip(".")
+	return value
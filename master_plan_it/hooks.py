@@ -17,6 +17,13 @@ after_install = "master_plan_it.setup.install.after_install"
 after_sync = "master_plan_it.setup.install.after_sync"
 after_migrate = "master_plan_it.setup.install.after_migrate"
 
+# SQL statement count / DB time per request and job (enabled by site_config `mpit_query_stats`);
+# engine metrics buffered per process are pushed to Redis when the request/job ends.
+before_request = ["master_plan_it.query_stats.before_request"]
+after_request = ["master_plan_it.query_stats.after_request", "master_plan_it.metrics.flush"]
+before_job = ["master_plan_it.query_stats.before_job"]
+after_job = ["master_plan_it.query_stats.after_job", "master_plan_it.metrics.flush"]
+
 fixtures = [
     {"dt": "Role", "filters": [["name", "in", ["vCIO Manager", "Client Editor", "Client Viewer"]]]},
     # Workflow components - order matters: Actions and States before Workflows
@@ -29,6 +36,8 @@ fixtures = [
 scheduler_events = {
     "daily": [
         "master_plan_it.budget_refresh_hooks.realign_planned_items_horizon",
+        "master_plan_it.cap_counters.rebuild_all",
+        "master_plan_it.slow_trace.purge_expired",
     ],
 }
 
@@ -46,7 +55,30 @@ doc_events = {
         "on_trash": "master_plan_it.budget_refresh_hooks.on_planned_item_change",
     },
     "MPIT Budget Addendum": {
+        "on_submit": "master_plan_it.cap_counters.on_addendum_change",
         "after_submit": "master_plan_it.budget_refresh_hooks.on_addendum_change",
-        "on_cancel": "master_plan_it.budget_refresh_hooks.on_addendum_change",
+        "on_cancel": [
+            "master_plan_it.budget_refresh_hooks.on_addendum_change",
+            "master_plan_it.cap_counters.on_addendum_change",
+        ],
+    },
+    # Cap consumption counters (MPIT Cap Counter): delta updates on Verified actuals,
+    # rebuild of the year when the current Snapshot changes.
+    "MPIT Actual Entry": {
+        "on_update": "master_plan_it.cap_counters.on_actual_entry_change",
+        "on_trash": "master_plan_it.cap_counters.on_actual_entry_change",
+    },
+    "MPIT Budget": {
+        "on_submit": "master_plan_it.cap_counters.on_snapshot_change",
+        "on_cancel": "master_plan_it.cap_counters.on_snapshot_change",
+    },
+    # Cached subtree scopes used by reports/chart sources (include_children).
+    "MPIT Cost Center": {
+        "on_update": "master_plan_it.master_plan_it.utils.cost_center_scope.clear_cache",
+        "after_rename": "master_plan_it.master_plan_it.utils.cost_center_scope.clear_cache",
+        "on_trash": "master_plan_it.master_plan_it.utils.cost_center_scope.clear_cache",
     },
 }
+
+# Counters and partitions are derived data: never block deleting a Year, Cost Center or Budget.
+ignore_links_on_delete = ["MPIT Cap Counter", "MPIT Budget Partition"]
@@ -10,6 +10,8 @@ import datetime
 
 import frappe
 from frappe import _
+from master_plan_it.master_plan_it.utils.cost_center_scope import resolve_cost_centers
+from master_plan_it import slow_trace
 
 
 def get_config():
@@ -36,6 +38,7 @@ def _resolve_year(filters) -> str | None:
 	return frappe.db.get_value("MPIT Year", {}, "name", order_by="year desc")
 
 
+@slow_trace.traced("Chart")
 def get_data(filters=None):
 	filters = frappe._dict(filters or {})
 	year = _resolve_year(filters)
@@ -98,8 +101,8 @@ def get(
 
 	filters = frappe._dict(filters or {})
 
-	# Compatibilita: filtro UI usa cost_center singolo; i tuoi get_data usano cost_centers lista
+	# Compatibilita: filtro UI usa cost_center singolo (+ include_children); get_data usa cost_centers lista
 	if filters.get("cost_center") and not filters.get("cost_centers"):
-		filters.cost_centers = [filters.cost_center]
+		filters.cost_centers = resolve_cost_centers(filters.cost_center, filters.get("include_children"))
 
 	return get_data(filters)
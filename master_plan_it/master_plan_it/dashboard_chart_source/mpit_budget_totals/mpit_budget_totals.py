@@ -20,6 +20,9 @@ import datetime
 import frappe
 from frappe import _
 from frappe.utils import flt
+from master_plan_it.master_plan_it.doctype.mpit_year import mpit_year
+from master_plan_it.master_plan_it.utils.cost_center_scope import resolve_cost_centers
+from master_plan_it import slow_trace
 
 
 def get_config():
@@ -50,11 +53,7 @@ def _sum(sql: str, params: dict) -> float:
 
 
 def _get_live_total(year: str) -> float:
-	budget = frappe.db.get_value(
-		"MPIT Budget",
-		{"year": year, "budget_type": "Live", "docstatus": 0},
-		"name",
-	)
+	budget = mpit_year.get_live_budget(year)
 	if not budget:
 		return 0.0
 
@@ -65,12 +64,7 @@ def _get_live_total(year: str) -> float:
 
 
 def _get_snapshot_total(year: str) -> float:
-	budget = frappe.db.get_value(
-		"MPIT Budget",
-		{"year": year, "budget_type": "Snapshot", "docstatus": 1},
-		"name",
-		order_by="modified desc",
-	)
+	budget = mpit_year.get_current_snapshot(year)
 	if not budget:
 		return 0.0
 
@@ -102,6 +96,7 @@ def _get_actual_total(year: str) -> float:
 	)
 
 
+@slow_trace.traced("Chart")
 def get_data(filters=None):
 	filters = frappe._dict(filters or {})
 	year = _resolve_year(filters)
@@ -161,8 +156,8 @@ def get(
 
 	filters = frappe._dict(filters or {})
 
-	# Compatibilita: filtro UI usa cost_center singolo; i tuoi get_data usano cost_centers lista
+	# Compatibilita: filtro UI usa cost_center singolo (+ include_children); get_data usa cost_centers lista
 	if filters.get("cost_center") and not filters.get("cost_centers"):
-		filters.cost_centers = [filters.cost_center]
+		filters.cost_centers = resolve_cost_centers(filters.cost_center, filters.get("include_children"))
 
 	return get_data(filters)
@@ -11,6 +11,7 @@ import datetime
 import frappe
 from frappe import _
 from master_plan_it.master_plan_it.utils.dashboard_utils import normalize_dashboard_filters
+from master_plan_it import slow_trace
 
 
 def get_config():
@@ -37,6 +38,7 @@ def _resolve_year(filters) -> str | None:
 	return frappe.db.get_value("MPIT Year", {}, "name", order_by="year desc")
 
 
+@slow_trace.traced("Chart")
 def get_data(filters=None):
 	filters = normalize_dashboard_filters(filters)
 	year = _resolve_year(filters)
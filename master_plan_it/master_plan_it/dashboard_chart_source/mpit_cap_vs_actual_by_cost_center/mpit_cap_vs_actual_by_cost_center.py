@@ -14,6 +14,9 @@ import datetime
 import frappe
 from frappe import _
 from frappe.utils import cint, flt
+from master_plan_it.master_plan_it.doctype.mpit_year import mpit_year
+from master_plan_it.master_plan_it.utils.cost_center_scope import resolve_cost_centers
+from master_plan_it import slow_trace
 
 
 def get_config():
@@ -24,6 +27,7 @@ def get_config():
 	}
 
 
+@slow_trace.traced("Chart")
 def get_data(filters=None):
 	filters = frappe._dict(filters or {})
 	today = datetime.date.today()
@@ -41,11 +45,7 @@ def get_data(filters=None):
 	cap_map: dict[str, float] = {}
 	actual_map: dict[str, float] = {}
 
-	live_budget = frappe.db.get_value(
-		"MPIT Budget",
-		{"year": year, "budget_type": "Live", "docstatus": 0},
-		"name",
-	)
+	live_budget = mpit_year.get_live_budget(year)
 	if live_budget:
 		params = {"parent": live_budget}
 		if cost_centers:
@@ -63,12 +63,7 @@ def get_data(filters=None):
 			if row.cost_center:
 				plan_map[row.cost_center] = flt(row.total)
 
-	snapshot_budget = frappe.db.get_value(
-		"MPIT Budget",
-		{"year": year, "budget_type": "Snapshot", "docstatus": 1},
-		"name",
-		order_by="modified desc",
-	)
+	snapshot_budget = mpit_year.get_current_snapshot(year)
 	if snapshot_budget:
 		params = {"parent": snapshot_budget}
 		if cost_centers:
@@ -159,8 +154,8 @@ def get(
 
 	filters = frappe._dict(filters or {})
 
-	# Compatibilita: filtro UI usa cost_center singolo; i tuoi get_data usano cost_centers lista
+	# Compatibilita: filtro UI usa cost_center singolo (+ include_children); get_data usa cost_centers lista
 	if filters.get("cost_center") and not filters.get("cost_centers"):
-		filters.cost_centers = [filters.cost_center]
+		filters.cost_centers = resolve_cost_centers(filters.cost_center, filters.get("include_children"))
 
 	return get_data(filters)
@@ -8,6 +8,8 @@ from __future__ import annotations
 
 import frappe
 from frappe import _
+from master_plan_it.master_plan_it.utils.cost_center_scope import resolve_cost_centers
+from master_plan_it import slow_trace
 
 
 def get_config():
@@ -17,6 +19,7 @@ def get_config():
 	}
 
 
+@slow_trace.traced("Chart")
 def get_data(filters=None):
 	filters = frappe._dict(filters or {})
 	cost_centers = filters.get("cost_centers") or None
@@ -70,8 +73,8 @@ def get(
 
 	filters = frappe._dict(filters or {})
 
-	# Compatibilita: filtro UI usa cost_center singolo; i tuoi get_data usano cost_centers lista
+	# Compatibilita: filtro UI usa cost_center singolo (+ include_children); get_data usa cost_centers lista
 	if filters.get("cost_center") and not filters.get("cost_centers"):
-		filters.cost_centers = [filters.cost_center]
+		filters.cost_centers = resolve_cost_centers(filters.cost_center, filters.get("include_children"))
 
 	return get_data(filters)
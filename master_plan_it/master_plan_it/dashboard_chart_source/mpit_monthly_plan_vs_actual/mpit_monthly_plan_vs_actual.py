@@ -14,7 +14,10 @@ import datetime
 import frappe
 from frappe import _
 from frappe.utils import flt, getdate
+from master_plan_it.master_plan_it.doctype.mpit_year import mpit_year
 from master_plan_it.master_plan_it.utils.dashboard_utils import normalize_dashboard_filters
+from master_plan_it.master_plan_it.utils.cost_center_scope import resolve_cost_centers
+from master_plan_it import slow_trace
 
 
 def get_config():
@@ -25,6 +28,7 @@ def get_config():
 	}
 
 
+@slow_trace.traced("Chart")
 def get_data(filters=None):
 	filters = normalize_dashboard_filters(filters)
 	filters = frappe._dict(filters or {})
@@ -41,11 +45,7 @@ def get_data(filters=None):
 	plan = [0.0] * 12
 	actual = [0.0] * 12
 
-	live_budget = frappe.db.get_value(
-		"MPIT Budget",
-		{"year": year, "budget_type": "Live", "docstatus": 0},
-		"name",
-	)
+	live_budget = mpit_year.get_live_budget(year)
 	if live_budget:
 		params = {"parent": live_budget}
 		if cost_centers:
@@ -120,9 +120,9 @@ def get(
 
 	filters = frappe._dict(filters or {})
 
-	# Compatibilita: filtro UI usa cost_center singolo; i tuoi get_data usano cost_centers lista
+	# Compatibilita: filtro UI usa cost_center singolo (+ include_children); get_data usa cost_centers lista
 	if filters.get("cost_center") and not filters.get("cost_centers"):
-		filters.cost_centers = [filters.cost_center]
+		filters.cost_centers = resolve_cost_centers(filters.cost_center, filters.get("include_children"))
 
 	return get_data(filters)
 
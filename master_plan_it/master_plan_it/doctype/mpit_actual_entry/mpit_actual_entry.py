@@ -11,8 +11,9 @@ from frappe import _
 from frappe.model.document import Document
 from frappe.model.naming import getseries
 from frappe.utils import flt, getdate
-from master_plan_it import mpit_defaults, tax
+from master_plan_it import cap_counters, mpit_defaults, tax
 from master_plan_it.master_plan_it.doctype.mpit_planned_item import mpit_planned_item
+from master_plan_it.master_plan_it.doctype.mpit_project import mpit_project
 
 
 class MPITActualEntry(Document):
@@ -44,13 +45,8 @@ class MPITActualEntry(Document):
 		self._update_project_totals()
 
 	def _update_project_totals(self) -> None:
-		if not self.project:
-			return
-		try:
-			project_doc = frappe.get_doc("MPIT Project", self.project)
-			project_doc.save(ignore_permissions=True)
-		except Exception as e:
-			pass
+		# Totals only: a full Project save per entry would re-run validation and versioning.
+		mpit_project.update_project_totals(self.project)
 
 	def validate(self):
 		self._set_year_from_posting_date()
@@ -58,6 +54,7 @@ class MPITActualEntry(Document):
 		self._autofill_cost_center()
 		self._enforce_entry_kind_rules()
 		self._enforce_status_rules()
+		self._warn_if_over_cap()
 
 	def _autofill_cost_center(self) -> None:
 		"""Copy cost center from contract or project if missing."""
@@ -123,6 +120,29 @@ class MPITActualEntry(Document):
 			if "vCIO Manager" not in frappe.get_roles():
 				frappe.throw(_("Only vCIO Manager can revert a Verified entry to Recorded."))
 
+	def _warn_if_over_cap(self) -> None:
+		"""Alert (non-blocking) when verifying this entry pushes the cost center over its Cap."""
+		if self.status != "Verified" or not self.cost_center or not self.year:
+			return
+		prev = self.get_doc_before_save()
+		if prev and prev.status == "Verified":
+			return
+		counters = cap_counters.get_counters(self.year, self.cost_center)
+		if not counters["snapshot_budget"]:
+			return
+		projected = flt(counters["verified_actual"] + flt(self.amount_net, 2), 2)
+		if projected > counters["cap_total"]:
+			frappe.msgprint(
+				_("Verified actual for Cost Center {0} ({1}) will exceed the Cap of {2} by {3}.").format(
+					self.cost_center,
+					self.year,
+					counters["cap_total"],
+					flt(projected - counters["cap_total"], 2),
+				),
+				indicator="orange",
+				alert=True,
+			)
+
 	def _sync_planned_item_coverage(self) -> None:
 		"""Set/clear Planned Item coverage when an Actual Entry (Delta) is verified."""
 		prev = self.get_doc_before_save()
@@ -216,3 +236,10 @@ def get_mpit_year(posting_date):
 		{"date": posting},
 	)
 	return res[0][0] if res else None
+
+
+def on_doctype_update():
+	"""Composite indexes for Verified actual aggregates by year/cost center and by project, and the report keyset."""
+	frappe.db.add_index("MPIT Actual Entry", ["year", "status", "cost_center"])
+	frappe.db.add_index("MPIT Actual Entry", ["project", "status", "entry_kind"])
+	frappe.db.add_index("MPIT Actual Entry", ["posting_date", "name"])
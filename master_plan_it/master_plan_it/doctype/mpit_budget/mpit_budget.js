@@ -1,6 +1,6 @@
 /**
  * FILE: master_plan_it/doctype/mpit_budget/mpit_budget.js
- * SCOPO: Gestisce UI Budget (default IVA su nuove righe, refresh sorgenti per Live).
+ * SCOPO: Gestisce UI Budget (default IVA su nuove righe, refresh sorgenti e indicatore di freschezza per Live).
  * INPUT: Eventi Frappe form (lines_add, pulsante refresh_from_sources).
  * OUTPUT/SIDE EFFECTS: Applica default VAT alle righe nuove, chiama refresh server-side e ricarica il documento con messaggio all’utente.
  */
@@ -76,6 +76,28 @@ frappe.ui.form.on("MPIT Budget", {
 			}, __("Actions"));
 		}
 
+		// Freshness: does the Live budget already include the latest source changes?
+		if (frm.doc.budget_type === "Live" && !frm.is_new()) {
+			frappe.call({
+				method: "master_plan_it.budget_freshness.get_freshness",
+				args: { budget: frm.doc.name },
+				callback: function (r) {
+					const info = r.message;
+					if (!info) {
+						return;
+					}
+					if (info.pending) {
+						frm.dashboard.add_indicator(
+							__("{0} changes pending (lag {1}s)", [info.pending, Math.round(info.lag_seconds)]),
+							"orange"
+						);
+					} else {
+						frm.dashboard.add_indicator(__("Up to date"), "green");
+					}
+				},
+			});
+		}
+
 		// Show warning banner for year-closed budgets
 		if (frm.doc.budget_type === "Live" && frm.doc.year) {
 			frm.__is_year_closed = false;
@@ -8,15 +8,50 @@ OUTPUT/SIDE EFFECTS: Genera nomi deterministici, applica invarianti (Approved so
 from __future__ import annotations
 
 from datetime import date
-import calendar
+import time
 
 import frappe
 from frappe import _
 from frappe.model.document import Document
 from frappe.model.naming import getseries
-from frappe.utils import add_days, cint, flt, getdate as _getdate, nowdate
+from frappe.utils import cint, flt, getdate as _getdate, now_datetime, nowdate
 from frappe.query_builder.functions import Coalesce, Sum
-from master_plan_it import amounts, annualization, mpit_defaults
+from master_plan_it import amounts, annualization, budget_freshness, budget_partitions, budget_refresh_lock, cap_counters, cashflow, metrics, mpit_defaults, slow_trace
+from master_plan_it.core import periods as core_periods
+from master_plan_it.master_plan_it.doctype.mpit_year import mpit_year
+from master_plan_it.master_plan_it.utils import cost_center_scope
+
+
+GENERATED_LINE_GUARDED_FIELDS = (
+	"vendor",
+	"description",
+	"line_kind",
+	"source_key",
+	"qty",
+	"unit_price",
+	"monthly_amount",
+	"annual_amount",
+	"amount_includes_vat",
+	"vat_rate",
+	"recurrence_rule",
+	"period_start_date",
+	"period_end_date",
+	"contract",
+	"project",
+	"cost_center",
+)
+
+# Line columns compared with the stored row: edited lines on save, unchanged lines in the refresh pipeline.
+STORED_LINE_FIELDS = tuple(dict.fromkeys(("is_generated", *GENERATED_LINE_GUARDED_FIELDS, *amounts.LINE_AMOUNT_FIELDS)))
+_DATE_LINE_FIELDS = frozenset({"period_start_date", "period_end_date"})
+_CHECK_LINE_FIELDS = frozenset({"is_generated", "amount_includes_vat"})
+_FLOAT_LINE_FIELDS = frozenset({"qty", "unit_price", "vat_rate", *amounts.LINE_AMOUNT_FIELDS})
+_LINE_TOTAL_FIELDS = {
+	"total_amount_annual": "annual_amount",
+	"total_amount_net": "annual_net",
+	"total_amount_vat": "annual_vat",
+	"total_amount_gross": "annual_gross",
+}
 
 
 class MPITBudget(Document):
@@ -56,22 +91,58 @@ class MPITBudget(Document):
 	def validate(self):
 		self._enforce_budget_type_rules()
 		self._enforce_status_invariants()
-		self._enforce_live_no_manual_lines()
-		self._enforce_snapshot_manual_line_rules()
-		self._compute_lines_amounts()
-		self._compute_totals()
+		# Only new/edited lines are validated and recomputed; stored lines passed at their own save.
+		changes = self._get_line_changes()
+		self._enforce_live_no_manual_lines(changes.dirty)
+		self._enforce_snapshot_manual_line_rules(changes.dirty)
+		self._compute_lines_amounts(changes.dirty)
+		if changes.full:
+			self._compute_totals()
+		else:
+			self._apply_totals_delta(changes)
 		if not getattr(self.flags, "skip_generated_guard", False):
-			self._enforce_generated_lines_read_only()
+			self._enforce_generated_lines_read_only(changes.dirty)
+
+	def _get_line_changes(self) -> frappe._dict:
+		"""Lines new or edited relative to the stored document, and stored lines removed.
+
+		`full` is set when there is no stored state to diff against (insert) or when the year
+		changed (periods and annualization depend on it): every line is dirty then.
+		"""
+		previous = self.get_doc_before_save()
+		if not previous or str(previous.year) != str(self.year):
+			return frappe._dict(full=True, dirty=list(self.lines), previous={}, removed=[])
+
+		stored = {line.name: line for line in previous.lines}
+		current = {line.name for line in self.lines if line.name}
+		dirty = [
+			line
+			for line in self.lines
+			if line.name not in stored
+			or any(
+				stored_line_value(field, line.get(field)) != stored_line_value(field, stored[line.name].get(field))
+				for field in STORED_LINE_FIELDS
+			)
+		]
+		return frappe._dict(
+			full=False,
+			dirty=dirty,
+			previous=stored,
+			removed=[line for name, line in stored.items() if name not in current],
+		)
 
 	def _autofill_cost_centers(self) -> None:
-		"""Fill cost_center on lines from contract or project if empty."""
-		for line in self.lines:
-			if line.cost_center:
-				continue
+		"""Fill cost_center on lines from contract or project if empty (one lookup per source DocType)."""
+		missing = [line for line in self.lines if not line.cost_center]
+		if not missing:
+			return
+		contract_ccs = _cost_centers_by_name("MPIT Contract", {line.contract for line in missing if line.contract})
+		project_ccs = _cost_centers_by_name("MPIT Project", {line.project for line in missing if line.project})
+		for line in missing:
 			if line.contract:
-				line.cost_center = frappe.db.get_value("MPIT Contract", line.contract, "cost_center")
+				line.cost_center = contract_ccs.get(line.contract)
 			if not line.cost_center and line.project:
-				line.cost_center = frappe.db.get_value("MPIT Project", line.project, "cost_center")
+				line.cost_center = project_ccs.get(line.project)
 
 	def _enforce_budget_type_rules(self) -> None:
 		"""Validate Live/Snapshot semantics."""
@@ -86,23 +157,23 @@ class MPITBudget(Document):
 		elif self.budget_type != "Snapshot":
 			frappe.throw(_("Unsupported Budget Type: {0}").format(self.budget_type))
 	
-	def _enforce_live_no_manual_lines(self) -> None:
+	def _enforce_live_no_manual_lines(self, lines: list | None = None) -> None:
 		"""Live budgets are system-managed: block manual lines."""
 		if self.budget_type != "Live":
 			return
 		if frappe.flags.in_test and getattr(frappe.flags, "allow_live_manual_lines", False):
 			return
-		for line in self.lines:
+		for line in self.lines if lines is None else lines:
 			if not getattr(line, "is_generated", 0):
 				frappe.throw(
 					_("Live budgets are system-managed. Remove manual line at position {0}.").format(line.idx)
 				)
 
-	def _enforce_snapshot_manual_line_rules(self) -> None:
+	def _enforce_snapshot_manual_line_rules(self, lines: list | None = None) -> None:
 		"""Snapshot budgets allow manual lines only for Allowance while in Draft."""
 		if self.budget_type != "Snapshot":
 			return
-		for line in self.lines:
+		for line in self.lines if lines is None else lines:
 			if getattr(line, "is_generated", 0):
 				continue
 			if line.line_kind != "Allowance":
@@ -113,13 +184,46 @@ class MPITBudget(Document):
 				frappe.throw(_("Snapshot budget line {0}: Cost Center is required.").format(line.idx))
 
 	@frappe.whitelist()
-	def refresh_from_sources(self, is_manual: int = 0, reason: str | None = None) -> None:
+	def refresh_from_sources(
+		self, is_manual: int = 0, reason: str | None = None, cost_centers: list[str] | str | None = None
+	) -> None:
 		"""Generate/refresh Live budget lines from contracts/projects (idempotent).
 		
 		Args:
 			is_manual: 1 if triggered by user action (allows refresh on closed years)
 			reason: optional reason provided by the user for manual refresh
+			cost_centers: refresh only these partitions (default: the whole budget)
 		"""
+		if isinstance(cost_centers, str):
+			cost_centers = frappe.parse_json(cost_centers)
+		cost_centers = sorted({cc for cc in cost_centers if cc}) if cost_centers else None
+		def run() -> None:
+			started = time.perf_counter()
+			try:
+				with slow_trace.trace(
+					"Engine",
+					"refresh_from_sources",
+					{"budget": self.name, "is_manual": is_manual, "cost_centers": cost_centers},
+				):
+					line_count = self._refresh_from_sources(is_manual, reason, cost_centers)
+			except Exception:
+				metrics.inc("mpit_refresh_total", outcome="error")
+				raise
+			metrics.observe_refresh(line_count, time.perf_counter() - started)
+
+		# One running and at most one pending refresh per budget (partition): a refresh already
+		# in progress runs once more instead of racing with this one.
+		if not budget_refresh_lock.run_coalesced(self.name, cost_centers, run):
+			metrics.inc("mpit_refresh_total", outcome="coalesced")
+			if cint(is_manual):
+				frappe.msgprint(
+					_("A refresh of this budget is already running: it will run once more to include your request.")
+				)
+
+	def _refresh_from_sources(
+		self, is_manual: int = 0, reason: str | None = None, cost_centers: list[str] | None = None
+	) -> int | None:
+		"""Run the refresh; return the number of generated lines, or None when skipped."""
 		if self.budget_type != "Live":
 			frappe.throw(_("Only Live budgets can be refreshed."))
 
@@ -129,7 +233,7 @@ class MPITBudget(Document):
 
 		if year_closed and not manual:
 			self._add_timeline_comment(_("Auto-refresh skipped: year {0} is closed.").format(self.year))
-			return
+			return None
 
 		if not self._within_horizon():
 			self._add_timeline_comment(_("Refresh on out-of-horizon year (manual only): proceed with caution."))
@@ -140,16 +244,53 @@ class MPITBudget(Document):
 				_("Manual refresh on closed year by {0}. Reason: {1}").format(frappe.session.user, note)
 			)
 
-		generated_lines: list[dict] = []
-
-		generated_lines.extend(self._generate_contract_lines(year_start, year_end))
-		generated_lines.extend(self._generate_planned_item_lines(year_start, year_end))
-
-		self._upsert_generated_lines(generated_lines)
-		self.flags.skip_generated_guard = True
-		self.flags.ignore_version = True
-		self.save(ignore_permissions=True, ignore_version=True)
-		self._add_timeline_comment(_("Budget refreshed from sources."))
+		# Partitions (one per cost center) are the unit of locking: other cost centers refresh in parallel.
+		budget_partitions.lock(self.name, self.year, cost_centers)
+
+		# Every source change stamped up to here is committed, so the lines below include it.
+		change_seq = budget_freshness.current_seq()
+
+		# Chunked pipeline: lines are written directly, the child table is never loaded whole.
+		from master_plan_it import budget_refresh_pipeline
+
+		stats = budget_refresh_pipeline.run(self, year_start, year_end, cost_centers)
+		refreshed_at = now_datetime()
+		budget_partitions.sync(self, cost_centers, change_seq, refreshed_at)
+		if cost_centers is None:
+			header = {
+				"refreshed_change_seq": max(cint(self.refreshed_change_seq), change_seq),
+				"last_refreshed_at": refreshed_at,
+				"modified": refreshed_at,
+			}
+			frappe.db.set_value("MPIT Budget", self.name, header, update_modified=False)
+			self.update(header)
+			budget_freshness.mark_refreshed(self.year, self.refreshed_change_seq)
+		else:
+			# Partial refresh: the header sequence still covers only full refreshes; `modified` is
+			# left alone so open forms do not hit timestamp mismatches.
+			budget_freshness.mark_partitions_refreshed(self.year, self.name)
+		self.update(
+			frappe.db.get_value(
+				"MPIT Budget", self.name, [*budget_partitions.TOTAL_FIELDS, "total_amount_monthly"], as_dict=True
+			)
+		)
+		self.notify_update()
+
+		summary = _("{0} lines ({1} new, {2} updated, {3} removed) in chunks of {4}; peak memory {5} MB.").format(
+			stats["lines"],
+			stats["inserted"],
+			stats["updated"],
+			stats["deleted"],
+			stats["chunk_size"],
+			stats.get("peak_traced_mb", stats["peak_rss_mb"]),
+		)
+		if cost_centers is None:
+			self._add_timeline_comment(_("Budget refreshed from sources: {0}").format(summary))
+		else:
+			self._add_timeline_comment(
+				_("Cost centers {0} refreshed from sources: {1}").format(", ".join(cost_centers), summary)
+			)
+		return stats["lines"]
 
 	def _within_horizon(self) -> bool:
 		today = _getdate(nowdate())
@@ -169,310 +310,12 @@ class MPITBudget(Document):
 		except Exception:
 			frappe.log_error(frappe.get_traceback(), "MPIT Budget refresh timeline comment failed")
 
-	def _generate_contract_lines(self, year_start: date, year_end: date) -> list[dict]:
-		lines: list[dict] = []
-		allowed_status = {"Active", "Pending Renewal", "Renewed"}
-		# Batch-fetch all needed fields to avoid N+1 queries
-		contracts = frappe.get_all(
-			"MPIT Contract",
-			filters={"status": ["in", list(allowed_status)]},
-			fields=[
-				"name",
-				"status",
-				"cost_center",
-				"start_date",
-				"end_date",
-				"billing_cycle",
-				"current_amount",
-				"current_amount_includes_vat",
-				"vat_rate",
-				"vendor",
-				"description",
-			],
-		)
-		
-		# Batch-fetch all terms for these contracts to avoid N+1 queries
-		contract_names = [c.name for c in contracts]
-		all_terms = {}
-		if contract_names:
-			terms_data = frappe.get_all(
-				"MPIT Contract Term",
-				filters={"parent": ["in", contract_names]},
-				fields=["name", "parent", "from_date", "to_date", "amount_net", "monthly_amount_net", "billing_cycle"],
-				order_by="parent, from_date asc"
-			)
-			for term in terms_data:
-				all_terms.setdefault(term.parent, []).append(term)
-		
-		for contract in contracts:
-			if not contract.cost_center:
-				frappe.throw(_("Contract {0} is missing Cost Center. Please set it to include in Forecast.").format(contract.name))
-			
-			# Check if contract has terms - use them if present, otherwise fall back to current_amount
-			terms = all_terms.get(contract.name, [])
-			if terms:
-				term_lines = self._generate_contract_term_lines(contract, terms, year_start, year_end)
-				if term_lines:
-					lines.extend(term_lines)
-				else:
-					# Terms exist but don't cover this year - fallback to current_amount
-					lines.extend(self._generate_contract_flat_lines(contract, year_start, year_end))
-			else:
-				# No terms defined - use flat amount with billing_cycle
-				lines.extend(self._generate_contract_flat_lines(contract, year_start, year_end))
-		return lines
-
-	def _generate_contract_term_lines(self, contract, terms: list, year_start: date, year_end: date) -> list[dict]:
-		"""Generate budget lines for each contract term overlapping the year."""
-
-		lines = []
-		contract_start = _getdate(contract.start_date) if contract.start_date else year_start
-		contract_end = _getdate(contract.end_date) if contract.end_date else year_end
-
-		for i, term in enumerate(terms):
-			term_start = _getdate(term.from_date)
-			
-			# Determine term end: use to_date, or next term start - 1, or contract end
-			if term.to_date:
-				term_end = _getdate(term.to_date)
-			elif i + 1 < len(terms):
-				next_start = _getdate(terms[i + 1].from_date)
-				term_end = add_days(next_start, -1)
-			else:
-				term_end = contract_end
-
-			# Clip to year bounds
-			period_start = max(term_start, contract_start, year_start)
-			period_end = min(term_end, contract_end, year_end)
-
-			months = annualization.overlap_months(period_start, period_end, year_start, year_end)
-			if months <= 0:
-				continue
-
-			monthly_amount = flt(term.monthly_amount_net or term.amount_net or 0, 6)
-			billing = term.billing_cycle or "Monthly"
-			recurrence_rule = "Monthly" if billing == "Monthly" else billing
-
-			source_key = f"CONTRACT::{contract.name}::TERM::{term.name}"
-			lines.append(
-				self._build_line_payload(
-					contract=contract,
-					period_start=period_start,
-					period_end=period_end,
-					monthly_amount=monthly_amount,
-					unit_price=flt(term.amount_net or 0, 6),
-					recurrence_rule=recurrence_rule,
-					source_key=source_key,
-				)
-			)
-		return lines
-
-	def _generate_contract_flat_lines(self, contract, year_start: date, year_end: date) -> list[dict]:
-		lines = []
-		period_start = max(_getdate(contract.start_date) if contract.start_date else year_start, year_start)
-		period_end = min(_getdate(contract.end_date) if contract.end_date else year_end, year_end)
-		months = annualization.overlap_months(period_start, period_end, year_start, year_end)
-		if months <= 0:
-			return lines
-
-		billing = contract.billing_cycle or "Monthly"
-		base_amount = flt(contract.current_amount or 0, 6)
-		monthly_amount = flt(base_amount, 6)
-		recurrence_rule = "Monthly"
-		unit_price = flt(base_amount, 6)
-		if billing == "Quarterly":
-			monthly_amount = flt((base_amount) * 4 / 12, 6)
-			recurrence_rule = "Quarterly"
-		elif billing == "Annual":
-			monthly_amount = flt((base_amount) / 12, 6)
-			recurrence_rule = "Annual"
-		# Other -> treat as monthly, recurrence_rule stays Monthly
-
-		source_key = f"CONTRACT::{contract.name}"
-		lines.append(
-			self._build_line_payload(
-				contract=contract,
-				period_start=period_start,
-				period_end=period_end,
-				monthly_amount=monthly_amount,
-				unit_price=unit_price,
-				recurrence_rule=recurrence_rule,
-				source_key=source_key,
-			)
-		)
-		return lines
-
-	def _generate_planned_item_lines(self, year_start: date, year_end: date) -> list[dict]:
-		lines: list[dict] = []
-		items = frappe.get_all(
-			"MPIT Planned Item",
-			filters={"docstatus": 1, "is_covered": 0},
-			fields=[
-				"name",
-				"project",
-				"description",
-				"amount",
-				"amount_net",
-				"start_date",
-				"end_date",
-				"spend_date",
-				"distribution",
-			],
-		)
-		if not items:
-			return lines
-
-		project_map = {
-			p.name: p
-			for p in frappe.get_all(
-				"MPIT Project",
-				filters={"name": ["in", [i.project for i in items if i.project]]},
-				fields=["name", "title", "workflow_state", "cost_center"],
-			)
-		}
-
-		# v3 inclusion rules updated for workflow:
-		# - workflow_state == "Approved": included (operational_status is ignored)
-		# - Draft, Proposed, Rejected, Cancelled: excluded
-		allowed_workflow_state = "Approved"
+	_month_bounds = staticmethod(core_periods.month_bounds)
 
-		for item in items:
-			project = project_map.get(item.project)
-			if not project:
-				frappe.throw(_("Planned Item {0}: linked project missing.").format(item.name))
-			if project.workflow_state != allowed_workflow_state:
-				continue
-			if not project.cost_center:
-				frappe.throw(
-					_("Project {0} is missing Cost Center required by Planned Item {1}.").format(
-						project.name, item.name
-					)
-				)
-
-			periods = self._planned_item_periods(item, year_start, year_end)
-			if not periods:
-				continue
-
-			for period_start, period_end, monthly_amount in periods:
-				source_key = f"PLANNED_ITEM::{item.name}::{period_start.isoformat()}"
-				lines.append(
-					{
-						"line_kind": "Planned Item",
-						"source_key": source_key,
-						"vendor": None,
-						"description": item.description or project.title,
-						"contract": None,
-						"project": project.name,
-						"cost_center": project.cost_center,
-						"monthly_amount": monthly_amount,
-						"annual_amount": 0,
-						"amount_includes_vat": 0,
-						"vat_rate": 0,
-						"recurrence_rule": "None" if (item.spend_date or item.distribution in ("start", "end")) else "Monthly",
-						"period_start_date": period_start,
-						"period_end_date": period_end,
-						"is_generated": 1,
-					}
-				)
-
-		return lines
-
-	def _planned_item_periods(self, item, year_start: date, year_end: date) -> list[tuple[date, date, float]]:
-		"""Return list of (period_start, period_end, monthly_amount) respecting spend_date/distribution."""
-		# Prefer amount_net (computed from VAT), fallback to amount for backward compat
-		amount = flt(item.amount_net or item.amount or 0)
-		if amount == 0:
-			return []
-
-		distribution = (item.distribution or "all").lower()
-
-		if item.spend_date:
-			spend = _getdate(item.spend_date)
-			if spend < year_start or spend > year_end:
-				return []
-			month_start, month_end = self._month_bounds(spend)
-			return [(month_start, month_end, amount)]
-
-		start = _getdate(item.start_date)
-		end = _getdate(item.end_date)
-		total_months = annualization.overlap_months(start, end, start, end)
-		if total_months <= 0:
-			return []
-
-		period_start = max(start, year_start)
-		period_end = min(end, year_end)
-		if period_end < period_start:
-			return []
-
-		if distribution == "start":
-			first_month_start, first_month_end = self._month_bounds(start)
-			if first_month_end < year_start or first_month_start > year_end:
-				return []
-			return [(first_month_start, first_month_end, amount)]
-		if distribution == "end":
-			last_month_start, last_month_end = self._month_bounds(end)
-			if last_month_end < year_start or last_month_start > year_end:
-				return []
-			return [(last_month_start, last_month_end, amount)]
-
-		months_in_year = annualization.overlap_months(period_start, period_end, year_start, year_end)
-		if months_in_year <= 0:
-			return []
-
-		monthly_amount = amount / total_months
-		return [(period_start, period_end, monthly_amount)]
-
-	@staticmethod
-	def _month_bounds(dt: date) -> tuple[date, date]:
-		last_day = calendar.monthrange(dt.year, dt.month)[1]
-		month_start = date(dt.year, dt.month, 1)
-		month_end = date(dt.year, dt.month, last_day)
-		return month_start, month_end
-
-	def _build_line_payload(self, contract, period_start: date, period_end: date, monthly_amount: float, unit_price: float, recurrence_rule: str, source_key: str) -> dict:
-		return {
-			"line_kind": "Contract",
-			"source_key": source_key,
-			"vendor": contract.vendor,
-			"description": contract.description or contract.name,
-			"contract": contract.name,
-			"project": None,
-			"cost_center": contract.cost_center,
-			"monthly_amount": monthly_amount,
-			"annual_amount": 0,
-			"unit_price": unit_price,
-			"amount_includes_vat": contract.current_amount_includes_vat,
-			"vat_rate": contract.vat_rate,
-			"recurrence_rule": recurrence_rule,
-			"period_start_date": period_start,
-			"period_end_date": period_end,
-			"is_generated": 1,
-		}
-
-	def _upsert_generated_lines(self, generated: list[dict]) -> None:
-		existing = {line.source_key: line for line in self.lines if getattr(line, "is_generated", 0)}
-		seen = set()
-		to_delete = []
-
-		for payload in generated:
-			sk = payload.get("source_key")
-			if not sk:
-				continue
-			seen.add(sk)
-			if sk in existing:
-				line = existing[sk]
-				for k, v in payload.items():
-					setattr(line, k, v)
-			else:
-				self.append("lines", payload)
-
-		# delete stale generated lines
-		for sk, line in existing.items():
-			if sk not in seen:
-				to_delete.append(line)
-
-		for line in to_delete:
-			self.remove(line)
+	def after_insert(self):
+		"""Keep the MPIT Year Live pointer aligned (one Live per year)."""
+		if self.budget_type == "Live":
+			mpit_year.set_budget_pointer(self.year, mpit_year.LIVE_BUDGET_FIELD, self.name)
 
 	def on_update(self):
 		if self.is_new():
@@ -484,9 +327,17 @@ class MPITBudget(Document):
 			frappe.throw(_("Snapshot budgets are immutable."))
 
 	def on_trash(self):
-		"""Reset series counter if this was the last Snapshot in sequence."""
+		"""Release MPIT Year pointers and reset series counter if this was the last Snapshot in sequence."""
+		if self.budget_type == "Live":
+			if mpit_year.get_live_budget(self.year) == self.name:
+				mpit_year.set_budget_pointer(self.year, mpit_year.LIVE_BUDGET_FIELD, None)
+			budget_partitions.delete_for_budget(self.name)
+			cashflow.delete_for_budget(self.name)
+			return
 		if self.budget_type != "Snapshot":
 			return
+		if mpit_year.get_current_snapshot(self.year) == self.name:
+			mpit_year.recompute_current_snapshot(self.year)
 		from master_plan_it.naming_utils import reset_series_on_delete
 		prefix, digits, middle = mpit_defaults.get_budget_series(
 			year=self.year, budget_type="Snapshot"
@@ -494,35 +345,26 @@ class MPITBudget(Document):
 		series_prefix = f"{prefix}{middle}"
 		reset_series_on_delete(self.name, series_prefix, digits)
 
-	def _enforce_generated_lines_read_only(self) -> None:
+	def _enforce_generated_lines_read_only(self, lines: list | None = None) -> None:
 		"""Prevent editing generated lines."""
-		for line in self.lines:
-			if not line.is_generated or not line.name:
-				continue
-			# fetch persisted row
-			existing = frappe.db.get_value(
+		generated = [line for line in (self.lines if lines is None else lines) if line.is_generated and line.name]
+		if not generated:
+			return
+		# fetch persisted rows in one query
+		persisted = {
+			row.pop("name"): row
+			for row in frappe.get_all(
 				"MPIT Budget Line",
-				line.name,
-				[
-					"vendor",
-					"description",
-					"line_kind",
-					"source_key",
-					"qty",
-					"unit_price",
-					"monthly_amount",
-					"annual_amount",
-					"amount_includes_vat",
-					"vat_rate",
-					"recurrence_rule",
-					"period_start_date",
-					"period_end_date",
-					"contract",
-					"project",
-					"cost_center",
-				],
-				as_dict=True,
+				filters={
+					"parent": self.name,
+					"parenttype": "MPIT Budget",
+					"name": ["in", [line.name for line in generated]],
+				},
+				fields=["name", *GENERATED_LINE_GUARDED_FIELDS],
 			)
+		}
+		for line in generated:
+			existing = persisted.get(line.name)
 			if not existing:
 				continue
 			for field, old_value in existing.items():
@@ -540,65 +382,14 @@ class MPITBudget(Document):
 				if new_value != old_value:
 					frappe.throw(frappe._("Generated line {0} is read-only (field {1}).").format(line.name, field))
 	
-	def _compute_lines_amounts(self):
-		"""Compute all amounts for Budget Lines using bidirectional logic."""
-		# Get global defaults once
-		default_vat = mpit_defaults.get_default_vat_rate()
-		
+	def _compute_lines_amounts(self, lines: list | None = None):
+		"""Compute all amounts for Budget Lines (default: every line) using bidirectional logic."""
+		lines = self.lines if lines is None else lines
+		if not lines:
+			return
 		# Get fiscal year bounds from year field
 		year_start, year_end = annualization.get_year_bounds(self.year)
-		
-		for line in self.lines:
-			if not line.cost_center:
-				frappe.throw(_("Line {0}: Cost Center is required.").format(line.idx))
-			# Apply VAT rate default if not specified
-			if line.vat_rate is None and default_vat is not None:
-				line.vat_rate = default_vat
-			
-			# Validate recurrence rule consistency
-			annualization.validate_recurrence_rule(line.recurrence_rule)
-			
-			# Calculate overlap months for annualization
-			if line.period_start_date and line.period_end_date:
-				overlap_months_count = annualization.overlap_months(
-					line.period_start_date,
-					line.period_end_date,
-					year_start,
-					year_end
-				)
-				
-				# Rule A: Block save if zero overlap
-				if overlap_months_count == 0:
-					frappe.throw(
-						frappe._(
-							"Line {0}: Period ({1} to {2}) has zero overlap with fiscal year {3}. Cannot save budget line with no temporal overlap."
-						).format(line.idx, line.period_start_date, line.period_end_date, self.year)
-					)
-			else:
-				# No period specified: treat as full year overlap
-				overlap_months_count = 12
-			
-			# Use unified amounts module for all calculations
-			result = amounts.compute_line_amounts(
-				qty=flt(line.qty) or 1,
-				unit_price=flt(line.unit_price),
-				monthly_amount=flt(line.monthly_amount),
-				annual_amount=flt(line.annual_amount),
-				recurrence_rule=line.recurrence_rule or "Monthly",
-				vat_rate=flt(line.vat_rate),
-				amount_includes_vat=bool(line.amount_includes_vat),
-				overlap_months=overlap_months_count
-			)
-			
-			# Update line with calculated values
-			line.monthly_amount = result["monthly_amount"]
-			line.annual_amount = result["annual_amount"]
-			line.amount_net = result["amount_net"]
-			line.amount_vat = result["amount_vat"]
-			line.amount_gross = result["amount_gross"]
-			line.annual_net = result["annual_net"]
-			line.annual_vat = result["annual_vat"]
-			line.annual_gross = result["annual_gross"]
+		compute_lines_amounts(lines, self.year, year_start, year_end, mpit_defaults.get_default_vat_rate())
 
 	def _enforce_status_invariants(self) -> None:
 		"""Keep workflow_state aligned with budget type.
@@ -663,6 +454,15 @@ class MPITBudget(Document):
 		if self.workflow_state != "Approved":
 			self.workflow_state = "Approved"
 			self.db_set("workflow_state", "Approved")
+		# The latest submitted Snapshot becomes the year's Cap reference.
+		mpit_year.set_budget_pointer(self.year, mpit_year.CURRENT_SNAPSHOT_FIELD, self.name)
+
+	def on_cancel(self):
+		"""Fall back to the previous submitted Snapshot when the current one is cancelled."""
+		if self.budget_type != "Snapshot":
+			return
+		if mpit_year.get_current_snapshot(self.year) == self.name:
+			mpit_year.recompute_current_snapshot(self.year)
 
 	def _compute_totals(self):
 		total_monthly = 0.0
@@ -685,33 +485,138 @@ class MPITBudget(Document):
 		self.total_amount_vat = flt(total_vat, 2)
 		self.total_amount_gross = flt(total_gross, 2)
 
+	def _apply_totals_delta(self, changes: frappe._dict) -> None:
+		"""Move the stored header totals by the edited lines: + new values, - stored values of edited/removed lines."""
+		if not changes.dirty and not changes.removed:
+			return
+		previous = self.get_doc_before_save()
+		totals = {field: flt(previous.get(field)) for field in _LINE_TOTAL_FIELDS}
+		replaced = [changes.previous[line.name] for line in changes.dirty if line.name in changes.previous]
+		for field, line_field in _LINE_TOTAL_FIELDS.items():
+			totals[field] += sum(flt(line.get(line_field), 2) for line in changes.dirty)
+			totals[field] -= sum(flt(line.get(line_field), 2) for line in (*replaced, *changes.removed))
+		for field, total in totals.items():
+			self.set(field, flt(total, 2))
+		# Weighted average (Total Net / 12), as in _compute_totals
+		self.total_amount_monthly = flt(self.total_amount_net / 12.0, 2)
+
+
+def compute_lines_amounts(lines: list, year: str, year_start: date, year_end: date, default_vat: float | None) -> None:
+	"""Validate periods (Rule A) and set amount fields on budget lines (child docs or payload dicts).
+
+	Shared by validate() and the chunked refresh pipeline (budget_refresh_pipeline).
+	"""
+	overlaps: list[int] = []
+	for line in lines:
+		if not line.cost_center:
+			frappe.throw(_("Line {0}: Cost Center is required.").format(line.idx))
+		# Apply VAT rate default if not specified
+		if line.vat_rate is None and default_vat is not None:
+			line.vat_rate = default_vat
+		
+		# Validate recurrence rule consistency
+		annualization.validate_recurrence_rule(line.recurrence_rule)
+		
+		# Calculate overlap months for annualization
+		if line.period_start_date and line.period_end_date:
+			overlap_months_count = annualization.overlap_months(
+				line.period_start_date,
+				line.period_end_date,
+				year_start,
+				year_end
+			)
+			
+			# Rule A: Block save if zero overlap
+			if overlap_months_count == 0:
+				frappe.throw(
+					frappe._(
+						"Line {0}: Period ({1} to {2}) has zero overlap with fiscal year {3}. Cannot save budget line with no temporal overlap."
+					).format(line.idx, line.period_start_date, line.period_end_date, year)
+				)
+		else:
+			# No period specified: treat as full year overlap
+			overlap_months_count = 12
+		
+		overlaps.append(overlap_months_count)
+	
+	# Use unified amounts module for all calculations (one columnar call for every line)
+	result = amounts.compute_line_amounts_batch(
+		qty=[flt(line.qty) or 1 for line in lines],
+		unit_price=[flt(line.unit_price) for line in lines],
+		monthly_amount=[flt(line.monthly_amount) for line in lines],
+		annual_amount=[flt(line.annual_amount) for line in lines],
+		vat_rate=[flt(line.vat_rate) for line in lines],
+		amount_includes_vat=[bool(line.amount_includes_vat) for line in lines],
+		recurrence_rule=[line.recurrence_rule or "Monthly" for line in lines],
+		overlap_months=overlaps,
+	)
+	
+	# Update lines with calculated values
+	for field in amounts.LINE_AMOUNT_FIELDS:
+		for line, value in zip(lines, result[field]):
+			setattr(line, field, value)
+
+
+def stored_line_value(field: str, value):
+	"""Budget line value as stored in its column (what a Document insert would write)."""
+	if field in _FLOAT_LINE_FIELDS:
+		# Currency/Float/Percent columns keep 9 decimals
+		return flt(value, 9)
+	if field in _CHECK_LINE_FIELDS:
+		return cint(value)
+	if field in _DATE_LINE_FIELDS:
+		return _getdate(value) if value else None
+	return value if value not in ("", None) else None
+
 
 def update_budget_totals(budget_name: str) -> None:
 	"""Recompute and persist totals for an existing budget without client scripts."""
 	if not budget_name:
 		return
 
-	budget = frappe.get_doc("MPIT Budget", budget_name)
-	budget._compute_totals()
+	frappe.db.set_value("MPIT Budget", budget_name, get_budget_totals(budget_name))
 
-	totals = {
-		"total_amount_monthly": flt(budget.total_amount_monthly, 2),
-		"total_amount_annual": flt(budget.total_amount_annual, 2),
-		"total_amount_net": flt(budget.total_amount_net, 2),
-		"total_amount_vat": flt(budget.total_amount_vat, 2),
-		"total_amount_gross": flt(budget.total_amount_gross, 2),
-	}
 
-	frappe.db.set_value("MPIT Budget", budget_name, totals)
+def get_budget_totals(budget_name: str) -> dict:
+	"""Header totals aggregated in SQL from the stored lines (same rules as _compute_totals)."""
+	row = frappe.db.sql(
+		"""
+		select
+			coalesce(sum(round(annual_amount, 2)), 0),
+			coalesce(sum(round(annual_net, 2)), 0),
+			coalesce(sum(round(annual_vat, 2)), 0),
+			coalesce(sum(round(annual_gross, 2)), 0)
+		from `tabMPIT Budget Line`
+		where parent = %s and parenttype = 'MPIT Budget' and parentfield = 'lines'
+		""",
+		(budget_name,),
+	)[0]
+	total_annual, total_net, total_vat, total_gross = (flt(value) for value in row)
+	return {
+		# Weighted average (Total Net / 12), as in _compute_totals
+		"total_amount_monthly": flt(total_net / 12.0, 2),
+		"total_amount_annual": flt(total_annual, 2),
+		"total_amount_net": flt(total_net, 2),
+		"total_amount_vat": flt(total_vat, 2),
+		"total_amount_gross": flt(total_gross, 2),
+	}
 
 
 @frappe.whitelist()
-def refresh_from_sources(budget: str) -> None:
-	"""Public API to refresh a budget from sources."""
+def refresh_from_sources(budget: str, cost_centers: list[str] | str | None = None) -> None:
+	"""Public API to refresh a budget from sources (optionally only some cost center partitions)."""
 	if not budget:
 		frappe.throw(_("Budget name is required"))
-	doc = frappe.get_doc("MPIT Budget", budget)
-	doc.refresh_from_sources()
+	doc = _get_budget_header(budget)
+	doc.refresh_from_sources(cost_centers=cost_centers)
+
+
+def _get_budget_header(budget: str) -> "MPITBudget":
+	"""MPIT Budget without its child table: the refresh pipeline writes lines directly, so jobs stay bounded in memory."""
+	header = frappe.db.get_value("MPIT Budget", budget, "*", as_dict=True)
+	if not header:
+		frappe.throw(_("Budget {0} not found.").format(budget))
+	return frappe.get_doc({"doctype": "MPIT Budget", **header})
 
 
 @frappe.whitelist()
@@ -774,43 +679,12 @@ def get_cap_for_cost_center(year: str, cost_center: str) -> dict:
 	if not year or not cost_center:
 		frappe.throw(_("Year and Cost Center are required"))
 
-	# Get approved Snapshot for this year
-	snapshot_name = frappe.db.get_value(
-		"MPIT Budget",
-		filters={
-			"year": year,
-			"budget_type": "Snapshot",
-			"docstatus": 1,
-		},
-		fieldname="name",
-		order_by="modified desc",
-	)
-
-	snapshot_amount = 0.0
-	if snapshot_name:
-		# Sum Allowance lines for this cost center from the Snapshot (Query Builder)
-		BudgetLine = frappe.qb.DocType("MPIT Budget Line")
-		result = (
-			frappe.qb.from_(BudgetLine)
-			.select(Coalesce(Sum(BudgetLine.annual_net), 0).as_("total"))
-			.where(BudgetLine.parent == snapshot_name)
-			.where(BudgetLine.cost_center == cost_center)
-			.where(BudgetLine.line_kind == "Allowance")
-		).run(as_dict=True)
-		snapshot_amount = flt(result[0].total if result else 0, 2)
-
-	# Sum approved Addendums for this year + cost center (Query Builder)
-	Addendum = frappe.qb.DocType("MPIT Budget Addendum")
-	add_result = (
-		frappe.qb.from_(Addendum)
-		.select(Coalesce(Sum(Addendum.delta_amount), 0).as_("total"))
-		.where(Addendum.year == year)
-		.where(Addendum.cost_center == cost_center)
-		.where(Addendum.docstatus == 1)
-	).run(as_dict=True)
-	addendum_total = flt(add_result[0].total if add_result else 0, 2)
-
-	cap_total = flt(snapshot_amount + addendum_total, 2)
+	# O(1) read from the running Cap counters (Redis mirror, MPIT Cap Counter row as fallback)
+	counters = cap_counters.get_counters(year, cost_center)
+	snapshot_name = counters["snapshot_budget"]
+	snapshot_amount = counters["snapshot_allowance"]
+	addendum_total = counters["addendum_total"]
+	cap_total = counters["cap_total"]
 
 	return {
 		"snapshot_name": snapshot_name,
@@ -827,15 +701,7 @@ def get_cost_center_summary(year: str, cost_center: str) -> dict:
 		frappe.throw(_("Year and Cost Center are required"))
 
 	plan = 0.0
-	actual = 0.0
-	snapshot_amount = 0.0
-	addendum_total = 0.0
-	cap_total = 0.0
-	live_budget = frappe.db.get_value(
-		"MPIT Budget",
-		{"year": year, "budget_type": "Live", "docstatus": 0},
-		"name",
-	)
+	live_budget = mpit_year.get_live_budget(year)
 	if live_budget:
 		BudgetLine = frappe.qb.DocType("MPIT Budget Line")
 		plan_result = (
@@ -846,48 +712,15 @@ def get_cost_center_summary(year: str, cost_center: str) -> dict:
 		).run(as_dict=True)
 		plan = flt(plan_result[0].total if plan_result else 0)
 
-	# Cap (snapshot allowance + addendum)
-	snapshot_budget = frappe.db.get_value(
-		"MPIT Budget",
-		{"year": year, "budget_type": "Snapshot", "docstatus": 1},
-		"name",
-		order_by="modified desc",
-	)
-	if snapshot_budget:
-		BudgetLine = frappe.qb.DocType("MPIT Budget Line")
-		allowance_result = (
-			frappe.qb.from_(BudgetLine)
-			.select(Coalesce(Sum(BudgetLine.annual_net), 0).as_("total"))
-			.where(BudgetLine.parent == snapshot_budget)
-			.where(BudgetLine.cost_center == cost_center)
-			.where(BudgetLine.line_kind == "Allowance")
-		).run(as_dict=True)
-		snapshot_amount = flt(allowance_result[0].total if allowance_result else 0)
-
-	Addendum = frappe.qb.DocType("MPIT Budget Addendum")
-	add_result = (
-		frappe.qb.from_(Addendum)
-		.select(Coalesce(Sum(Addendum.delta_amount), 0).as_("total"))
-		.where(Addendum.year == year)
-		.where(Addendum.cost_center == cost_center)
-		.where(Addendum.docstatus == 1)
-	).run(as_dict=True)
-	addendum_total = flt(add_result[0].total if add_result else 0)
-	cap_total = flt(snapshot_amount + addendum_total)
-
-	# Actual (Verified)
-	ActualEntry = frappe.qb.DocType("MPIT Actual Entry")
-	actual_result = (
-		frappe.qb.from_(ActualEntry)
-		.select(Coalesce(Sum(ActualEntry.amount_net), 0).as_("total"))
-		.where(ActualEntry.year == year)
-		.where(ActualEntry.status == "Verified")
-		.where(ActualEntry.cost_center == cost_center)
-	).run(as_dict=True)
-	actual = flt(actual_result[0].total if actual_result else 0)
-
-	remaining = cap_total - actual if cap_total > actual else 0
-	over_cap = actual - cap_total if actual > cap_total else 0
+	# Cap (snapshot allowance + addendum) and Verified actual from the running counters
+	counters = cap_counters.get_counters(year, cost_center)
+	snapshot_budget = counters["snapshot_budget"]
+	snapshot_amount = counters["snapshot_allowance"]
+	addendum_total = counters["addendum_total"]
+	cap_total = counters["cap_total"]
+	actual = counters["verified_actual"]
+	remaining = counters["remaining"]
+	over_cap = counters["over_cap"]
 
 	return {
 		"year": year,
@@ -904,11 +737,136 @@ def get_cost_center_summary(year: str, cost_center: str) -> dict:
 	}
 
 
-def enqueue_budget_refresh(years: list[str] | None = None) -> None:
+@frappe.whitelist()
+def get_cost_center_summaries(
+	year: str,
+	cost_centers: list[str] | str | None = None,
+	root: str | None = None,
+	include_group_totals: int | bool = 0,
+) -> list[dict]:
+	"""Batch variant of get_cost_center_summary for tree views.
+
+	Scope is either an explicit list of cost centers or the subtree under `root` (nested set).
+	Plan comes from one grouped query on the Live budget, Cap/Actual from one read of the
+	Cap counters. With `include_group_totals`, group nodes report the sum of their subtree.
+	Rows are returned in tree order (lft).
+	"""
+	if not year:
+		frappe.throw(_("Year is required"))
+	if isinstance(cost_centers, str):
+		cost_centers = frappe.parse_json(cost_centers)
+	if not cost_centers and not root:
+		frappe.throw(_("Cost Centers or a root Cost Center are required"))
+	include_group_totals = cint(include_group_totals)
+
+	requested, scope = _resolve_summary_scope(cost_centers, root, include_group_totals)
+	if not requested:
+		return []
+
+	scope_names = [node.name for node in scope]
+	live_budget = mpit_year.get_live_budget(year)
+	plan_by_cc = {}
+	if live_budget:
+		BudgetLine = frappe.qb.DocType("MPIT Budget Line")
+		plan_by_cc = {
+			row.cost_center: flt(row.total)
+			for row in (
+				frappe.qb.from_(BudgetLine)
+				.select(BudgetLine.cost_center, Sum(BudgetLine.annual_net).as_("total"))
+				.where(BudgetLine.parent == live_budget)
+				.where(BudgetLine.cost_center.isin(scope_names))
+				.groupby(BudgetLine.cost_center)
+			).run(as_dict=True)
+		}
+	counters = cap_counters.get_counters_batch(year, scope_names)
+	snapshot_budget = mpit_year.get_current_snapshot(year)
+
+	rows = []
+	for node in requested:
+		rolled_up = bool(include_group_totals and node.is_group)
+		members = [node]
+		if rolled_up:
+			members = [m for m in scope if node.lft <= m.lft and m.rgt <= node.rgt]
+		plan = flt(sum(plan_by_cc.get(m.name, 0) for m in members), 2)
+		snapshot_amount = flt(sum(counters[m.name]["snapshot_allowance"] for m in members), 2)
+		addendum_total = flt(sum(counters[m.name]["addendum_total"] for m in members), 2)
+		actual = flt(sum(counters[m.name]["verified_actual"] for m in members), 2)
+		cap_total = flt(snapshot_amount + addendum_total, 2)
+		rows.append({
+			"year": year,
+			"cost_center": node.name,
+			"parent_mpit_cost_center": node.parent_mpit_cost_center,
+			"is_group": node.is_group,
+			"rolled_up": rolled_up,
+			"plan": plan,
+			"snapshot_allowance": snapshot_amount,
+			"addendum_total": addendum_total,
+			"cap_total": cap_total,
+			"actual": actual,
+			"remaining": flt(cap_total - actual, 2) if cap_total > actual else 0,
+			"over_cap": flt(actual - cap_total, 2) if actual > cap_total else 0,
+			"live_budget": live_budget,
+			"snapshot_budget": snapshot_budget,
+		})
+	return rows
+
+
+def _resolve_summary_scope(
+	cost_centers: list[str] | None, root: str | None, include_group_totals: int
+) -> tuple[list, list]:
+	"""Return (requested nodes, nodes whose values are needed) ordered by lft."""
+	CostCenter = frappe.qb.DocType("MPIT Cost Center")
+	fields = (
+		CostCenter.name,
+		CostCenter.lft,
+		CostCenter.rgt,
+		CostCenter.is_group,
+		CostCenter.parent_mpit_cost_center,
+	)
+	if root:
+		nodes = cost_center_scope.get_subtree(root)
+		return nodes, nodes
+
+	requested = (
+		frappe.qb.from_(CostCenter)
+		.select(*fields)
+		.where(CostCenter.name.isin(list(cost_centers)))
+		.orderby(CostCenter.lft)
+	).run(as_dict=True)
+	groups = [node for node in requested if node.is_group]
+	if not include_group_totals or not groups:
+		return requested, requested
+
+	# One nested-set self join pulls every descendant of the requested groups.
+	Parent = frappe.qb.DocType("MPIT Cost Center").as_("parent_cc")
+	descendants = (
+		frappe.qb.from_(CostCenter)
+		.join(Parent)
+		.on((CostCenter.lft >= Parent.lft) & (CostCenter.rgt <= Parent.rgt))
+		.select(*fields)
+		.distinct()
+		.where(Parent.name.isin([node.name for node in groups]))
+	).run(as_dict=True)
+	scope = {node.name: node for node in requested}
+	scope.update({node.name: node for node in descendants})
+	return requested, sorted(scope.values(), key=lambda node: node.lft)
+
+
+def _cost_centers_by_name(doctype: str, names: set[str]) -> dict[str, str]:
+	if not names:
+		return {}
+	return dict(
+		frappe.get_all(doctype, filters={"name": ["in", list(names)]}, fields=["name", "cost_center"], as_list=True)
+	)
+
+
+def enqueue_budget_refresh(years: list[str] | None = None, cost_centers: list[str] | None = None) -> None:
 	"""Enqueue refresh for Live budgets in the specified years.
 	
 	Called by doc_events handlers when sources change.
 	Skips years outside rolling horizon (current + next).
+	With `cost_centers`, one job per affected partition is enqueued (deduplicated per
+	budget and cost center); auto-created budgets always get a full refresh.
 	"""
 	from frappe.utils import nowdate as _nowdate
 
@@ -934,6 +892,7 @@ def enqueue_budget_refresh(years: list[str] | None = None) -> None:
 		fields=["name", "year"],
 	)
 	live_budgets = [r.name for r in live_budget_rows]
+	created_budgets = set()
 
 	# Build existing years set from fetched data (no additional queries)
 	existing_years = {str(r.year) for r in live_budget_rows}
@@ -947,22 +906,36 @@ def enqueue_budget_refresh(years: list[str] | None = None) -> None:
 			doc.workflow_state = "Active"
 			doc.insert(ignore_permissions=True)
 			live_budgets.append(doc.name)
+			created_budgets.add(doc.name)
 			doc.add_comment("Comment", _("Auto-created Live budget for year {0} (auto-refresh event).").format(year))
 		except Exception:
 			frappe.log_error(frappe.get_traceback(), f"Failed to auto-create Live budget for year {year}")
 
+	cost_centers = sorted({cc for cc in cost_centers if cc}) if cost_centers else None
 	for budget_name in live_budgets:
-		try:
-			frappe.enqueue(
-				"master_plan_it.master_plan_it.doctype.mpit_budget.mpit_budget.refresh_from_sources",
-				budget=budget_name,
-				queue="short",
-				# job_id required when deduplicate=True to avoid duplicate jobs per budget
-				job_id=f"mpit-budget-refresh-{budget_name}",
-				deduplicate=True,
-			)
-		except Exception:
-			frappe.log_error(
-				frappe.get_traceback(),
-				f"Failed to enqueue budget refresh for {budget_name}",
-			)
+		if cost_centers is None or budget_name in created_budgets:
+			scopes = [(None, f"mpit-budget-refresh-{budget_name}")]
+		else:
+			scopes = [([cc], f"mpit-budget-refresh-{budget_name}-cc-{cc}") for cc in cost_centers]
+		for scope, job_id in scopes:
+			try:
+				frappe.enqueue(
+					"master_plan_it.master_plan_it.doctype.mpit_budget.mpit_budget.refresh_from_sources",
+					budget=budget_name,
+					cost_centers=scope,
+					queue="short",
+					# job_id required when deduplicate=True to avoid duplicate jobs per budget/partition
+					job_id=job_id,
+					deduplicate=True,
+					# Run after the source change is committed (and stamped, see budget_freshness).
+					enqueue_after_commit=True,
+				)
+				# A started job keeps its job id, so the enqueue above is skipped: let it run once more.
+				frappe.db.after_commit.add(
+					lambda budget_name=budget_name, scope=scope: budget_refresh_lock.request_rerun(budget_name, scope)
+				)
+			except Exception:
+				frappe.log_error(
+					frappe.get_traceback(),
+					f"Failed to enqueue budget refresh for {budget_name}",
+				)
@@ -350,7 +350,7 @@ class TestMPITBudget(FrappeTestCase):
 		self.assertIn("allowance", str(ctx.exception).lower())
 
 	# ═══════════════════════════════════════════════════════════════════════════
-	# TOTALS COMPUTATION TESTS (2 tests)
+	# TOTALS COMPUTATION TESTS (5 tests)
 	# ═══════════════════════════════════════════════════════════════════════════
 
 	def test_totals_aggregated_from_lines(self):
@@ -504,6 +504,79 @@ class TestMPITBudget(FrappeTestCase):
 		self.assertAlmostEqual(budget.total_amount_vat, expected_vat, places=2)
 		self.assertAlmostEqual(budget.total_amount_gross, expected_gross, places=2)
 
+	def _allowance_snapshot(self, monthly_amounts: list[float]):
+		return frappe.get_doc({
+			"doctype": "MPIT Budget",
+			"year": self.test_year,
+			"budget_type": "Snapshot",
+			"workflow_state": "Draft",
+			"lines": [
+				{
+					"doctype": "MPIT Budget Line",
+					"cost_center": self.test_cost_center,
+					"line_kind": "Allowance",
+					"monthly_amount": monthly_amount,
+					"amount_includes_vat": 0,
+					"vat_rate": 22,
+					"recurrence_rule": "Monthly",
+				}
+				for monthly_amount in monthly_amounts
+			],
+		}).insert()
+
+	def test_save_recomputes_only_edited_lines(self):
+		"""
+		Test: Saving recomputes new/edited lines only and moves totals by their delta.
+		
+		Failure indicates: _get_line_changes() or _apply_totals_delta() issue.
+		"""
+		from unittest.mock import patch
+
+		from master_plan_it.master_plan_it.doctype.mpit_budget import mpit_budget
+
+		budget = self._allowance_snapshot([100, 200, 300])
+		budget.reload()
+		budget.lines[1].vat_rate = 10
+		budget.append("lines", {
+			"cost_center": self.test_cost_center,
+			"line_kind": "Allowance",
+			"monthly_amount": 50,
+			"amount_includes_vat": 0,
+			"vat_rate": 0,
+			"recurrence_rule": "Monthly",
+		})
+		with patch.object(mpit_budget, "compute_lines_amounts", wraps=mpit_budget.compute_lines_amounts) as compute:
+			budget.save()
+		self.assertEqual(len(compute.call_args.args[0]), 2)
+
+		self.assertEqual(flt(budget.lines[1].annual_vat, 2), 240)
+		self.assertEqual(flt(budget.total_amount_net, 2), 7800)
+		self.assertEqual(flt(budget.total_amount_vat, 2), 264 + 240 + 792)
+		totals = mpit_budget.get_budget_totals(budget.name)
+		for field, value in totals.items():
+			self.assertEqual(flt(budget.get(field), 2), value, field)
+
+		# Saving without edits recomputes nothing
+		with patch.object(mpit_budget, "compute_lines_amounts") as compute:
+			budget.save()
+		compute.assert_not_called()
+
+	def test_removed_lines_move_totals_by_delta(self):
+		"""
+		Test: Removing a line subtracts its stored amounts from the header totals.
+		
+		Failure indicates: _apply_totals_delta() ignores removed lines.
+		"""
+		from master_plan_it.master_plan_it.doctype.mpit_budget import mpit_budget
+
+		budget = self._allowance_snapshot([100, 200])
+		budget.reload()
+		budget.remove(budget.lines[0])
+		budget.save()
+		self.assertEqual(flt(budget.total_amount_net, 2), 2400)
+		self.assertEqual(flt(budget.total_amount_monthly, 2), 200)
+		self.assertEqual(mpit_budget.get_budget_totals(budget.name)["total_amount_gross"], flt(budget.total_amount_gross, 2))
+
 	# ═══════════════════════════════════════════════════════════════════════════
 	# REFRESH FROM SOURCES TESTS (4 tests)
 	# ═══════════════════════════════════════════════════════════════════════════
@@ -512,7 +585,7 @@ class TestMPITBudget(FrappeTestCase):
 		"""
 		Test: refresh_from_sources() creates lines from active contracts.
 		
-		Failure indicates: _generate_contract_lines() issue.
+		Failure indicates: core.lines.generate_contract_lines() issue.
 		"""
 		contract_name = self._create_test_contract()
 		budget = self._create_live_budget()
@@ -527,7 +600,7 @@ class TestMPITBudget(FrappeTestCase):
 		"""
 		Test: refresh_from_sources() creates lines from planned items.
 		
-		Failure indicates: _generate_planned_item_lines() issue.
+		Failure indicates: core.lines.generate_planned_item_lines() issue.
 		"""
 		project_name = self._create_test_project()
 		self._create_test_planned_item(project_name)
@@ -556,7 +629,7 @@ class TestMPITBudget(FrappeTestCase):
 		"""
 		Test: Multiple refresh calls produce same result (idempotent).
 		
-		Failure indicates: _upsert_generated_lines() not doing proper update.
+		Failure indicates: budget_refresh_pipeline._LineWriter not doing proper update.
 		"""
 		self._create_test_contract()
 		budget = self._create_live_budget()
@@ -630,7 +703,7 @@ class TestMPITBudget(FrappeTestCase):
 		"""
 		Test: Contract with Terms that don't overlap budget year falls back to current_amount.
 		
-		Failure indicates: _generate_contract_lines() Terms fallback issue.
+		Failure indicates: core.lines.generate_contract_lines() Terms fallback issue.
 		
 		Scenario:
 		- Contract start_date in test_year
@@ -681,7 +754,7 @@ class TestMPITBudget(FrappeTestCase):
 		"""
 		Test: Distribution 'all' spreads amount across all months.
 		
-		Failure indicates: _planned_item_periods() all distribution.
+		Failure indicates: core.lines.planned_item_periods() all distribution.
 		"""
 		project_name = self._create_test_project()
 		self._create_test_planned_item(project_name, amount=1200, distribution="all")
@@ -699,7 +772,7 @@ class TestMPITBudget(FrappeTestCase):
 		"""
 		Test: Distribution 'start' places full amount in first month.
 		
-		Failure indicates: _planned_item_periods() start distribution.
+		Failure indicates: core.lines.planned_item_periods() start distribution.
 		"""
 		project_name = self._create_test_project()
 		self._create_test_planned_item(project_name, amount=1200, distribution="start")
@@ -716,7 +789,7 @@ class TestMPITBudget(FrappeTestCase):
 		"""
 		Test: Distribution 'end' places full amount in last month.
 		
-		Failure indicates: _planned_item_periods() end distribution.
+		Failure indicates: core.lines.planned_item_periods() end distribution.
 		"""
 		project_name = self._create_test_project()
 		self._create_test_planned_item(project_name, amount=1200, distribution="end")
@@ -784,6 +857,30 @@ class TestMPITBudget(FrappeTestCase):
 		self.assertEqual(snapshot.workflow_state, "Approved")
 		self.assertEqual(snapshot.docstatus, 1)
 
+	def test_year_pointers_follow_budget_lifecycle(self):
+		"""
+		Test: MPIT Year tracks the Live budget and the latest submitted Snapshot.
+
+		Failure indicates: after_insert/on_submit/on_cancel pointer maintenance.
+		"""
+		from master_plan_it.master_plan_it.doctype.mpit_year import mpit_year
+
+		live = self._create_live_budget()
+		self.assertEqual(mpit_year.get_live_budget(self.test_year), live.name)
+
+		first = self._create_snapshot_budget()
+		first.submit()
+		second = self._create_snapshot_budget()
+		second.submit()
+		self.assertEqual(mpit_year.get_current_snapshot(self.test_year), second.name)
+
+		# Touching an older snapshot must not change the pointer
+		frappe.db.set_value("MPIT Budget", first.name, "title", "Touched")
+		self.assertEqual(mpit_year.get_current_snapshot(self.test_year), second.name)
+
+		second.cancel()
+		self.assertEqual(mpit_year.get_current_snapshot(self.test_year), first.name)
+
 	def test_snapshot_is_immutable_after_submit(self):
 		"""
 		Test: Submitted Snapshot prevents modifications to lines.
@@ -973,6 +1070,122 @@ class TestMPITBudget(FrappeTestCase):
 		self.assertIn("cap_total", result)
 		self.assertIn("actual", result)
 
+	def test_get_cost_center_summaries_batch_and_rollup(self):
+		"""
+		Test: batch summaries match the single-node API and group nodes roll up their subtree.
+		
+		Failure indicates: grouped queries or nested-set rollup broken.
+		"""
+		from master_plan_it.master_plan_it.doctype.mpit_budget.mpit_budget import (
+			get_cost_center_summaries,
+			get_cost_center_summary,
+		)
+		
+		group = frappe.get_doc({
+			"doctype": "MPIT Cost Center",
+			"cost_center_name": f"_Test CC Group {self._test_uuid}",
+			"is_group": 1,
+		}).insert().name
+		children = [
+			frappe.get_doc({
+				"doctype": "MPIT Cost Center",
+				"cost_center_name": f"_Test CC Child {idx} {self._test_uuid}",
+				"parent_mpit_cost_center": group,
+				"is_group": 0,
+			}).insert().name
+			for idx in (1, 2)
+		]
+		snapshot = frappe.get_doc({
+			"doctype": "MPIT Budget",
+			"year": self.test_year,
+			"budget_type": "Snapshot",
+			"workflow_state": "Draft",
+			"lines": [
+				{
+					"doctype": "MPIT Budget Line",
+					"cost_center": cost_center,
+					"line_kind": "Allowance",
+					"monthly_amount": 100,
+					"recurrence_rule": "Monthly",
+					"is_generated": 1,
+				}
+				for cost_center in children
+			],
+		})
+		snapshot.flags.skip_generated_guard = True
+		snapshot.insert()
+		snapshot.submit()
+		
+		rows = get_cost_center_summaries(self.test_year, root=group, include_group_totals=1)
+		by_name = {row["cost_center"]: row for row in rows}
+		self.assertEqual([row["cost_center"] for row in rows][0], group)
+		for cost_center in children:
+			single = get_cost_center_summary(self.test_year, cost_center)
+			self.assertEqual(by_name[cost_center]["cap_total"], single["cap_total"])
+			self.assertEqual(by_name[cost_center]["actual"], single["actual"])
+		self.assertTrue(by_name[group]["rolled_up"])
+		self.assertEqual(
+			by_name[group]["cap_total"],
+			flt(sum(by_name[cost_center]["cap_total"] for cost_center in children), 2),
+		)
+		
+		flat = get_cost_center_summaries(self.test_year, cost_centers=[group])
+		self.assertEqual(flat[0]["cap_total"], 0)
+
+	def test_cap_counters_track_sources(self):
+		"""
+		Test: Cap counters follow Snapshot approval, Addendum submit/cancel and Verified transitions.
+		
+		Failure indicates: a delta hook is missing or counters drift from a rebuild.
+		"""
+		from master_plan_it import cap_counters
+		
+		snapshot = self._create_snapshot_budget()
+		snapshot.submit()
+		allowance = flt(snapshot.lines[0].annual_net, 2)
+		counters = cap_counters.get_counters(self.test_year, self.test_cost_center)
+		self.assertEqual(counters["snapshot_budget"], snapshot.name)
+		self.assertEqual(counters["snapshot_allowance"], allowance)
+		
+		addendum = frappe.get_doc({
+			"doctype": "MPIT Budget Addendum",
+			"year": self.test_year,
+			"cost_center": self.test_cost_center,
+			"delta_amount": 300,
+			"reason": "Test addendum",
+			"reference_snapshot": snapshot.name,
+		})
+		addendum.insert()
+		addendum.submit()
+		self.assertEqual(
+			cap_counters.get_counters(self.test_year, self.test_cost_center)["cap_total"], flt(allowance + 300, 2)
+		)
+		
+		entry = frappe.get_doc({
+			"doctype": "MPIT Actual Entry",
+			"posting_date": f"{self._year_value}-03-15",
+			"entry_kind": "Allowance Spend",
+			"cost_center": self.test_cost_center,
+			"amount": 200,
+			"vat_rate": 0,
+			"status": "Verified",
+		})
+		entry.insert()
+		counters = cap_counters.get_counters(self.test_year, self.test_cost_center)
+		self.assertEqual(counters["verified_actual"], 200)
+		self.assertEqual(counters["addendum_total"], 300)
+		
+		entry.status = "Recorded"
+		entry.save()
+		addendum.cancel()
+		counters = cap_counters.get_counters(self.test_year, self.test_cost_center)
+		self.assertEqual(counters["verified_actual"], 0)
+		self.assertEqual(counters["cap_total"], allowance)
+		
+		# Delta-maintained counters must match a full rebuild
+		cap_counters.rebuild_year(self.test_year)
+		self.assertEqual(cap_counters.get_counters(self.test_year, self.test_cost_center), counters)
+
 	def test_refresh_from_sources_api(self):
 		"""
 		Test: Whitelisted refresh_from_sources() API works.
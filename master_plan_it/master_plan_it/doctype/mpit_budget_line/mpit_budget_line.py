@@ -1,6 +1,7 @@
 # Copyright (c) 2025, DOT and contributors
 # For license information, please see license.txt
 
+import frappe
 from frappe.model.document import Document
 from ..mpit_budget.mpit_budget import update_budget_totals
 
@@ -18,3 +19,8 @@ class MPITBudgetLine(Document):
 	def _update_parent_totals(self):
 		if self.parent and getattr(self, "parenttype", None) == "MPIT Budget":
 			update_budget_totals(self.parent)
+
+
+def on_doctype_update():
+	"""Composite index for per-budget cost center / line kind aggregates (Cap, Overview, counters)."""
+	frappe.db.add_index("MPIT Budget Line", ["parent", "cost_center", "line_kind"])
@@ -0,0 +1,9 @@
+# Copyright (c) 2026, DOT and contributors
+# For license information, please see license.txt
+
+from frappe.model.document import Document
+
+
+class MPITBudgetPartition(Document):
+	# Rows are written only by master_plan_it.budget_partitions (refresh of a Live budget).
+	pass
@@ -0,0 +1,9 @@
+# Copyright (c) 2026, DOT and contributors
+# For license information, please see license.txt
+
+from frappe.model.document import Document
+
+
+class MPITCashflowEntry(Document):
+	# Rows are written only by master_plan_it.cashflow (refresh of a Live budget).
+	pass
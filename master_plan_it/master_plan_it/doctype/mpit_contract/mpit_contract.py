@@ -193,3 +193,9 @@ class MPITContract(Document):
 		# Set coverage when linked and valid
 		if self.planned_item and current_valid:
 			mpit_planned_item.set_coverage(self.planned_item, "MPIT Contract", self.name)
+
+
+def on_doctype_update():
+	"""Indexes for the budget engine status filter and the renewals window."""
+	frappe.db.add_index("MPIT Contract", ["status"])
+	frappe.db.add_index("MPIT Contract", ["next_renewal_date", "end_date"])
@@ -29,14 +29,16 @@ frappe.ui.form.on("MPIT Cost Center", {
 
 async function load_summary(frm) {
 	try {
+		// Group nodes show the rolled-up totals of their subtree (one batch call).
 		const r = await frappe.call({
-			method: "master_plan_it.master_plan_it.doctype.mpit_budget.mpit_budget.get_cost_center_summary",
+			method: "master_plan_it.master_plan_it.doctype.mpit_budget.mpit_budget.get_cost_center_summaries",
 			args: {
 				year: frm.__mpit_summary_year,
-				cost_center: frm.doc.name,
+				cost_centers: [frm.doc.name],
+				include_group_totals: frm.doc.is_group ? 1 : 0,
 			},
 		});
-		const data = r.message || {};
+		const data = (r.message || [])[0] || {};
 		render_fields(frm, data);
 		render_dashboard(frm, data);
 	} catch (e) {
@@ -0,0 +1,49 @@
+frappe.treeview_settings["MPIT Cost Center"] = {
+	onload(treeview) {
+		// One batch call for the whole tree; nodes read from the cached map when rendered.
+		treeview.__mpit_summary_year = new Date().getFullYear().toString();
+		treeview.__mpit_summaries = load_tree_summaries(treeview.__mpit_summary_year);
+	},
+	async onrender(node) {
+		const treeview = frappe.views.trees["MPIT Cost Center"];
+		if (!treeview || !treeview.__mpit_summaries || node.is_root) {
+			return;
+		}
+		const summaries = await treeview.__mpit_summaries;
+		const data = summaries[node.data.value];
+		if (!data || (!data.cap_total && !data.actual)) {
+			return;
+		}
+		const color = data.over_cap > 0 ? "red" : "green";
+		$(`<span class="pull-right text-muted small" style="margin-right: 10px;">
+			<span class="indicator-pill ${color}">${__("Actual {0} / Cap {1}", [
+				format_currency(data.actual),
+				format_currency(data.cap_total),
+			])}</span>
+		</span>`).insertBefore(node.$ul);
+	},
+};
+
+async function load_tree_summaries(year) {
+	try {
+		const roots = await frappe.db.get_list("MPIT Cost Center", {
+			filters: { parent_mpit_cost_center: ["is", "not set"] },
+			pluck: "name",
+			limit: 0,
+		});
+		const results = await Promise.all(
+			roots.map((root) =>
+				frappe.call({
+					method: "master_plan_it.master_plan_it.doctype.mpit_budget.mpit_budget.get_cost_center_summaries",
+					args: { year, root, include_group_totals: 1 },
+				})
+			)
+		);
+		const summaries = {};
+		results.forEach((r) => (r.message || []).forEach((row) => (summaries[row.cost_center] = row)));
+		return summaries;
+	} catch (e) {
+		console.warn("Failed to load Cost Center summaries", e);
+		return {};
+	}
+}
@@ -13,6 +13,7 @@ from frappe.model.document import Document
 from frappe.utils import flt, getdate, nowdate
 
 from master_plan_it import mpit_defaults, tax
+from master_plan_it.master_plan_it.doctype.mpit_project import mpit_project
 
 
 class MPITPlannedItem(Document):
@@ -48,13 +49,8 @@ class MPITPlannedItem(Document):
 		self._update_project_totals()
 
 	def _update_project_totals(self) -> None:
-		if not self.project:
-			return
-		try:
-			project_doc = frappe.get_doc("MPIT Project", self.project)
-			project_doc.save(ignore_permissions=True)
-		except frappe.DoesNotExistError:
-			pass
+		# Totals only: a full Project save per entry would re-run validation and versioning.
+		mpit_project.update_project_totals(self.project)
 
 	def _validate_dates(self) -> None:
 		if not self.start_date or not self.end_date:
@@ -206,3 +202,9 @@ def set_coverage(planned_item: str, covered_by_type: str | None, covered_by_name
 
 	# Save without altering immutable fields
 	doc.save(ignore_permissions=True)
+
+
+def on_doctype_update():
+	"""Composite indexes for the budget engine/horizon filters and per-project lookups."""
+	frappe.db.add_index("MPIT Planned Item", ["docstatus", "is_covered", "out_of_horizon"])
+	frappe.db.add_index("MPIT Planned Item", ["project", "docstatus"])
@@ -45,75 +45,7 @@ class MPITProject(Document):
 		"""Compute totals from Planned Items (Estimate vs Quote), including Verified delta entries."""
 		if not self.name:
 			return
-
-		# Fetch all non-cancelled Planned Items for this project
-		items = frappe.db.get_all(
-			"MPIT Planned Item",
-			filters={"project": self.name, "docstatus": ["!=", 2]},
-			fields=["amount_net", "amount", "is_covered", "item_type"]
-		)
-
-		# Sum ALL Estimate items (baseline)
-		all_estimates = sum(
-			flt(item.amount_net or item.amount or 0)
-			for item in items
-			if item.item_type == "Estimate"
-		)
-
-		# Sum ALL Quote items (baseline)
-		all_quotes = sum(
-			flt(item.amount_net or item.amount or 0)
-			for item in items
-			if item.item_type == "Quote"
-		)
-
-		# Sum Estimate items not covered (for forecast)
-		estimate_uncovered = sum(
-			flt(item.amount_net or item.amount or 0)
-			for item in items
-			if item.item_type == "Estimate" and not item.is_covered
-		)
-
-		# Sum Quote items not covered (for forecast)
-		quote_uncovered = sum(
-			flt(item.amount_net or item.amount or 0)
-			for item in items
-			if item.item_type == "Quote" and not item.is_covered
-		)
-
-		# Get verified deltas from Actual Entries
-		verified_deltas = self._get_verified_deltas()
-
-		# Planned Baseline: prefer quotes if available, else estimates
-		planned_base = all_quotes if all_quotes > 0 else all_estimates
-
-		# Expected Forecast: prefer quotes (uncovered) if available, else estimates (uncovered) + Actuals
-		forecast_base = quote_uncovered if quote_uncovered > 0 else estimate_uncovered
-		expected_total = forecast_base + verified_deltas
-
-		self.planned_total_net = flt(planned_base, 2)
-		self.quoted_total_net = flt(all_quotes, 2)
-		self.expected_total_net = flt(expected_total, 2)
-		
-		self.actual_total_net = flt(verified_deltas, 2)
-		# Variance: Planned - Expected (Positive = Savings/Under Budget, Negative = Overrun)
-		self.variance_net = flt(self.planned_total_net - self.expected_total_net, 2)
-		
-		if self.planned_total_net > 0:
-			self.utilization_pct = flt((self.actual_total_net / self.planned_total_net) * 100, 2)
-		else:
-			self.utilization_pct = 0.0
-
-	def _get_verified_deltas(self) -> float:
-		"""Get sum of verified delta entries for this project."""
-		if not self.name:
-			return 0.0
-		result = frappe.db.sql("""
-			SELECT SUM(COALESCE(amount_net, amount)) AS total
-			FROM `tabMPIT Actual Entry`
-			WHERE project = %s AND status = 'Verified' AND entry_kind = 'Delta'
-		""", (self.name,))
-		return flt(result[0][0] or 0) if result else 0.0
+		self.update(compute_project_totals(self.name))
 
 	def _validate_planned_dates(self) -> None:
 		"""Enforce planned date rules for monthly distribution."""
@@ -126,6 +58,74 @@ class MPITProject(Document):
 				frappe.throw(_("Planned end date cannot be before planned start date."))
 
 
+def compute_project_totals(project: str) -> dict:
+	"""Return the financial totals of a project from its Planned Items and Verified delta entries."""
+	# Fetch all non-cancelled Planned Items for this project
+	items = frappe.db.get_all(
+		"MPIT Planned Item",
+		filters={"project": project, "docstatus": ["!=", 2]},
+		fields=["amount_net", "amount", "is_covered", "item_type"]
+	)
+
+	# Sum ALL Estimate items (baseline)
+	all_estimates = sum(
+		flt(item.amount_net or item.amount or 0)
+		for item in items
+		if item.item_type == "Estimate"
+	)
+
+	# Sum ALL Quote items (baseline)
+	all_quotes = sum(
+		flt(item.amount_net or item.amount or 0)
+		for item in items
+		if item.item_type == "Quote"
+	)
+
+	# Sum Estimate items not covered (for forecast)
+	estimate_uncovered = sum(
+		flt(item.amount_net or item.amount or 0)
+		for item in items
+		if item.item_type == "Estimate" and not item.is_covered
+	)
+
+	# Sum Quote items not covered (for forecast)
+	quote_uncovered = sum(
+		flt(item.amount_net or item.amount or 0)
+		for item in items
+		if item.item_type == "Quote" and not item.is_covered
+	)
+
+	# Get verified deltas from Actual Entries
+	verified_deltas = get_project_actuals_totals(project)["actual_total_net"]
+
+	# Planned Baseline: prefer quotes if available, else estimates
+	planned_base = all_quotes if all_quotes > 0 else all_estimates
+
+	# Expected Forecast: prefer quotes (uncovered) if available, else estimates (uncovered) + Actuals
+	forecast_base = quote_uncovered if quote_uncovered > 0 else estimate_uncovered
+	expected_total = forecast_base + verified_deltas
+
+	planned_total_net = flt(planned_base, 2)
+	expected_total_net = flt(expected_total, 2)
+	actual_total_net = flt(verified_deltas, 2)
+	return {
+		"planned_total_net": planned_total_net,
+		"quoted_total_net": flt(all_quotes, 2),
+		"expected_total_net": expected_total_net,
+		"actual_total_net": actual_total_net,
+		# Variance: Planned - Expected (Positive = Savings/Under Budget, Negative = Overrun)
+		"variance_net": flt(planned_total_net - expected_total_net, 2),
+		"utilization_pct": flt((actual_total_net / planned_total_net) * 100, 2) if planned_total_net > 0 else 0.0,
+	}
+
+
+def update_project_totals(project: str | None) -> None:
+	"""Persist recomputed totals on a project without a full save (used by Planned Item / Actual Entry hooks)."""
+	if not project or not frappe.db.exists("MPIT Project", project):
+		return
+	frappe.db.set_value("MPIT Project", project, compute_project_totals(project), update_modified=False)
+
+
 @frappe.whitelist()
 def get_project_actuals_totals(project: str) -> dict:
 	"""Return verified delta totals for a project (net) without persisting on the Project doc."""
@@ -0,0 +1,12 @@
+// Copyright (c) 2026, DOT and contributors
+// For license information, please see license.txt
+
+frappe.ui.form.on("MPIT Scenario", {
+	refresh(frm) {
+		if (!frm.is_new()) {
+			frm.add_custom_button(__("Compare with Live"), () => {
+				frappe.set_route("query-report", "MPIT Scenario Comparison", { scenario: frm.doc.name });
+			}, __("Actions"));
+		}
+	}
+});
@@ -0,0 +1,12 @@
+# Copyright (c) 2026, DOT and contributors
+# For license information, please see license.txt
+
+from frappe.model.document import Document
+
+from master_plan_it import scenarios
+
+
+class MPITScenario(Document):
+	# Overrides are only read by master_plan_it.scenarios: saving a scenario never touches its sources.
+	def validate(self):
+		scenarios.validate_overrides(self.overrides or [])
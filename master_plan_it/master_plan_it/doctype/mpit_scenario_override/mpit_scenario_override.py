@@ -0,0 +1,9 @@
+# Copyright (c) 2026, DOT and contributors
+# For license information, please see license.txt
+
+from frappe.model.document import Document
+
+
+class MPITScenarioOverride(Document):
+	# Validated by the parent MPIT Scenario (master_plan_it.scenarios.validate_overrides).
+	pass
@@ -0,0 +1,9 @@
+# Copyright (c) 2026, DOT and contributors
+# For license information, please see license.txt
+
+from frappe.model.document import Document
+
+
+class MPITSlowTrace(Document):
+	# Rows are written only by master_plan_it.slow_trace (sampled slow calls) and purged by retention.
+	pass
@@ -7,6 +7,11 @@ from frappe.model.document import Document
 from frappe.utils import getdate
 
 
+# Pointer fields maintained by MPIT Budget lifecycle hooks (read-only on the form).
+LIVE_BUDGET_FIELD = "live_budget"
+CURRENT_SNAPSHOT_FIELD = "current_snapshot"
+
+
 class MPITYear(Document):
 	def validate(self):
 		self._validate_dates()
@@ -15,3 +20,45 @@ class MPITYear(Document):
 		if self.start_date and self.end_date:
 			if getdate(self.start_date) > getdate(self.end_date):
 				frappe.throw(_("Start Date cannot be after End Date"))
+
+
+def get_live_budget(year: str | int | None) -> str | None:
+	"""Return the Live budget of a year from the cached MPIT Year pointer."""
+	return _get_pointer(year, LIVE_BUDGET_FIELD)
+
+
+def get_current_snapshot(year: str | int | None) -> str | None:
+	"""Return the current approved (submitted) Snapshot of a year from the cached MPIT Year pointer."""
+	return _get_pointer(year, CURRENT_SNAPSHOT_FIELD)
+
+
+def set_budget_pointer(year: str | int | None, fieldname: str, budget: str | None) -> None:
+	"""Persist a budget pointer on MPIT Year and drop the cached document (idempotent)."""
+	if not year or not frappe.db.exists("MPIT Year", str(year)):
+		return
+	year_name = str(year)
+	if frappe.db.get_value("MPIT Year", year_name, fieldname) == (budget or None):
+		return
+	frappe.db.set_value("MPIT Year", year_name, fieldname, budget or None, update_modified=False)
+	frappe.clear_document_cache("MPIT Year", year_name)
+
+
+def recompute_current_snapshot(year: str | int | None) -> str | None:
+	"""Point the year to its most recently submitted Snapshot (used after cancel/delete)."""
+	if not year:
+		return None
+	snapshot = frappe.db.get_value(
+		"MPIT Budget",
+		{"year": str(year), "budget_type": "Snapshot", "docstatus": 1},
+		"name",
+		order_by="creation desc",
+	)
+	set_budget_pointer(year, CURRENT_SNAPSHOT_FIELD, snapshot)
+	return snapshot
+
+
+def _get_pointer(year: str | int | None, fieldname: str) -> str | None:
+	if not year:
+		return None
+	# get_cached_value returns None for a missing MPIT Year.
+	return frappe.get_cached_value("MPIT Year", str(year), fieldname) or None
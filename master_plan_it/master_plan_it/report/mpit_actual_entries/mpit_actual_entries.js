@@ -18,6 +18,12 @@ frappe.query_reports["MPIT Actual Entries"] = {
             options: "MPIT Cost Center",
             reqd: 0
         },
+        {
+            fieldname: "include_children",
+            label: __("Include Children"),
+            fieldtype: "Check",
+            default: 0
+        },
         {
             fieldname: "entry_kind",
             label: __("Entry Kind"),
@@ -61,6 +67,10 @@ frappe.query_reports["MPIT Actual Entries"] = {
     ],
 
     onload: function (report) {
+        // Streaming export of every matching row (CSV or Excel)
+        report.page.add_inner_button(__("CSV"), () => this.export_rows(report, "CSV"), __("Export"));
+        report.page.add_inner_button(__("Excel"), () => this.export_rows(report, "Excel"), __("Export"));
+
         // Create container for extra charts below report
         if (!document.getElementById("mpit-actual-extra-charts")) {
             let container = document.createElement("div");
@@ -74,13 +84,21 @@ frappe.query_reports["MPIT Actual Entries"] = {
     },
 
     after_datatable_render: function (datatable) {
-        // Render extra charts from message payload
         let report = frappe.query_report;
-        if (report && report.data && report.data.message && report.data.message.charts) {
+        let message = report && report.raw_data && report.raw_data.message;
+
+        // Rows come one keyset page at a time: offer the next page while there is one
+        report.page.remove_inner_button(__("Load More"));
+        if (message && message.next_cursor) {
+            report.page.add_inner_button(__("Load More"), () => this.load_more(report));
+        }
+
+        // Render extra charts from message payload
+        if (message && message.charts) {
             let container = document.getElementById("mpit-actual-extra-charts");
             if (container) {
                 container.innerHTML = "";
-                let charts = report.data.message.charts;
+                let charts = message.charts;
                 for (let chart_name in charts) {
                     let chart_data = charts[chart_name];
                     let col = document.createElement("div");
@@ -103,5 +121,44 @@ frappe.query_reports["MPIT Actual Entries"] = {
                 }
             }
         }
+    },
+
+    load_more: function (report) {
+        let message = report.raw_data.message;
+        let [after_posting_date, after_name] = message.next_cursor;
+        frappe.call({
+            method: "master_plan_it.master_plan_it.report.mpit_actual_entries.mpit_actual_entries.get_page",
+            args: {
+                filters: report.get_filter_values(),
+                after_posting_date: after_posting_date,
+                after_name: after_name
+            },
+            freeze: true
+        }).then((r) => {
+            message.next_cursor = r.message.next_cursor;
+            report.data = report.data.concat(r.message.rows);
+            report.datatable.refresh(report.data);
+            if (!message.next_cursor) {
+                report.page.remove_inner_button(__("Load More"));
+            }
+        });
+    },
+
+    export_rows: function (report, file_format) {
+        let filters = report.get_filter_values();
+        let args = { kind: "actual_entries", filters: JSON.stringify(filters), file_format: file_format };
+        frappe.call({
+            method: "master_plan_it.exports.start_export",
+            args: args,
+            freeze: true
+        }).then((r) => {
+            if (r.message.queued) {
+                frappe.msgprint(
+                    __("{0} rows: the export runs in background, a download link will be sent when it is ready.", [r.message.rows])
+                );
+                return;
+            }
+            window.open("/api/method/master_plan_it.exports.download?" + $.param(args));
+        });
     }
 };
@@ -6,31 +6,62 @@ MPIT Actual Entries Report
 
 A comprehensive Script Report for Actual Entries with:
 - KPI Cards (Total amounts, counts by status/kind)
-- Detailed table with all entry information
+- Detailed table with all entry information, one keyset page at a time
+  (posting_date, name cursor; next pages via get_page)
 - Charts: Monthly trend, Status distribution, Cost Center breakdown
+  (with Include Children: one bar per subtree node, group nodes rolled up)
+
+KPI cards and charts are SQL GROUP BY aggregates over every matching entry,
+so their cost does not depend on the rows sent to the browser.
 """
 
 from __future__ import annotations
 
 import frappe
 from frappe import _
-from frappe.utils import flt, getdate
+from frappe.utils import cint, flt
+from master_plan_it.master_plan_it.utils.cost_center_scope import resolve_cost_centers
 from master_plan_it.master_plan_it.utils.dashboard_utils import normalize_dashboard_filters
+from master_plan_it import slow_trace
+
+# Rows per page (override with "mpit_report_page_size" in site_config.json)
+DEFAULT_PAGE_SIZE = 500
 
 
+@slow_trace.traced("Report")
 def execute(filters=None):
 	filters = normalize_dashboard_filters(filters)
 	filters = frappe._dict(filters or {})
 	
 	columns = get_columns()
-	data = get_data(filters)
-	report_summary = get_report_summary(filters, data)
-	chart = get_chart(data)
-	message = get_extra_charts(filters, data)
+	where_clause, values = get_conditions(filters)
+	data, next_cursor = get_data(where_clause, values)
+	aggregates = get_aggregates(where_clause, values)
+	report_summary = get_report_summary(aggregates)
+	chart = get_chart(get_monthly_totals(where_clause, values))
+	rolled_up = bool(filters.get("cost_center") and cint(filters.get("include_children")))
+	if rolled_up:
+		cost_center_totals = get_cost_center_rollups(filters.cost_center, where_clause, values)
+	else:
+		cost_center_totals = get_cost_center_totals(where_clause, values)
+	message = get_extra_charts(aggregates, cost_center_totals, rolled_up)
+	message["next_cursor"] = next_cursor
+	message["total_rows"] = sum(row.entries for row in aggregates)
 	
 	return columns, data, None, chart, report_summary, message
 
 
+@frappe.whitelist()
+def get_page(filters=None, after_posting_date: str | None = None, after_name: str | None = None) -> dict:
+	"""Next page of rows after the (posting_date, name) cursor returned by execute or a previous page."""
+	frappe.has_permission("MPIT Actual Entry", "read", throw=True)
+	filters = frappe._dict(normalize_dashboard_filters(frappe.parse_json(filters) if filters else None) or {})
+	where_clause, values = get_conditions(filters)
+	cursor = (after_posting_date, after_name) if after_posting_date and after_name else None
+	rows, next_cursor = get_data(where_clause, values, cursor)
+	return {"rows": rows, "next_cursor": next_cursor}
+
+
 def get_columns():
 	return [
 		{"label": _("ID"), "fieldname": "name", "fieldtype": "Link", "options": "MPIT Actual Entry", "width": 100},
@@ -51,9 +82,9 @@ def get_columns():
 	]
 
 
-def get_data(filters: frappe._dict) -> list[dict]:
+def get_conditions(filters: frappe._dict) -> tuple[str, dict]:
 	"""
-	Fetch actual entries with applied filters.
+	WHERE clause (starting with AND) and values for the report filters.
 	"""
 	conditions = []
 	values = {}
@@ -62,9 +93,10 @@ def get_data(filters: frappe._dict) -> list[dict]:
 		conditions.append("year = %(year)s")
 		values["year"] = filters.year
 	
-	if filters.get("cost_center"):
-		conditions.append("cost_center = %(cost_center)s")
-		values["cost_center"] = filters.cost_center
+	cost_centers = resolve_cost_centers(filters.get("cost_center"), filters.get("include_children"))
+	if cost_centers:
+		conditions.append("cost_center IN %(cost_centers)s")
+		values["cost_centers"] = tuple(cost_centers)
 	
 	if filters.get("entry_kind"):
 		conditions.append("entry_kind = %(entry_kind)s")
@@ -91,6 +123,26 @@ def get_data(filters: frappe._dict) -> list[dict]:
 		values["project"] = filters.project
 	
 	where_clause = " AND " + " AND ".join(conditions) if conditions else ""
+	return where_clause, values
+
+
+def get_page_size() -> int:
+	return cint(frappe.conf.get("mpit_report_page_size")) or DEFAULT_PAGE_SIZE
+
+
+def get_data(where_clause: str, values: dict, cursor: tuple | None = None) -> tuple[list[dict], list | None]:
+	"""
+	One page of entries (newest first) after the optional (posting_date, name) cursor.
+	
+	Returns the rows and the cursor of the next page (None on the last page).
+	"""
+	page_size = get_page_size()
+	values = dict(values, page_size=page_size + 1)
+	keyset = ""
+	if cursor:
+		keyset = """ AND (posting_date < %(after_posting_date)s
+			OR (posting_date = %(after_posting_date)s AND name < %(after_name)s))"""
+		values["after_posting_date"], values["after_name"] = cursor
 	
 	query = f"""
 		SELECT
@@ -110,14 +162,108 @@ def get_data(filters: frappe._dict) -> list[dict]:
 			amount_gross,
 			description
 		FROM `tabMPIT Actual Entry`
-		WHERE 1=1 {where_clause}
+		WHERE 1=1 {where_clause}{keyset}
 		ORDER BY posting_date DESC, name DESC
+		LIMIT %(page_size)s
+	"""
+	
+	rows = frappe.db.sql(query, values, as_dict=1)
+	if len(rows) <= page_size:
+		return rows, None
+	rows = rows[:page_size]
+	return rows, [str(rows[-1].posting_date), rows[-1].name]
+
+
+def get_aggregates(where_clause: str, values: dict) -> list[dict]:
+	"""
+	Entry count and amounts per (status, entry kind): source of the KPI cards and pie charts.
+	"""
+	return frappe.db.sql(
+		f"""
+		SELECT
+			status,
+			entry_kind,
+			COUNT(*) AS entries,
+			COALESCE(SUM(amount_net), 0) AS amount_net,
+			COALESCE(SUM(amount_vat), 0) AS amount_vat,
+			COALESCE(SUM(amount_gross), 0) AS amount_gross
+		FROM `tabMPIT Actual Entry`
+		WHERE 1=1 {where_clause}
+		GROUP BY status, entry_kind
+		ORDER BY status, entry_kind
+		""",
+		values,
+		as_dict=1,
+	)
+
+
+def get_monthly_totals(where_clause: str, values: dict) -> list[dict]:
+	"""
+	Net amount per posting month, oldest first.
 	"""
+	return frappe.db.sql(
+		f"""
+		SELECT
+			YEAR(posting_date) AS posting_year,
+			MONTH(posting_date) AS posting_month,
+			COALESCE(SUM(amount_net), 0) AS amount_net
+		FROM `tabMPIT Actual Entry`
+		WHERE posting_date IS NOT NULL {where_clause}
+		GROUP BY posting_year, posting_month
+		ORDER BY posting_year, posting_month
+		""",
+		values,
+		as_dict=1,
+	)
+
+
+def get_cost_center_totals(where_clause: str, values: dict) -> list[dict]:
+	"""
+	Net amount per cost center.
+	"""
+	return frappe.db.sql(
+		f"""
+		SELECT cost_center, COALESCE(SUM(amount_net), 0) AS amount_net
+		FROM `tabMPIT Actual Entry`
+		WHERE 1=1 {where_clause}
+		GROUP BY cost_center
+		ORDER BY cost_center
+		""",
+		values,
+		as_dict=1,
+	)
+
+
+def get_cost_center_rollups(root: str, where_clause: str, values: dict) -> list[dict]:
+	"""
+	Net amount per node of root's subtree, each including its descendants (tree order).
 	
-	return frappe.db.sql(query, values, as_dict=1)
+	One nested-set join: every entry is summed into each ancestor whose lft/rgt range
+	contains its cost center, grouped by ancestor.
+	"""
+	bounds = frappe.db.get_value("MPIT Cost Center", root, ["lft", "rgt"], as_dict=True)
+	if not bounds:
+		return []
+	return frappe.db.sql(
+		f"""
+		SELECT anc.name AS cost_center, COALESCE(SUM(ae.amount_net), 0) AS amount_net
+		FROM `tabMPIT Cost Center` anc
+		JOIN `tabMPIT Cost Center` node ON node.lft >= anc.lft AND node.rgt <= anc.rgt
+		JOIN (
+			SELECT cost_center, amount_net
+			FROM `tabMPIT Actual Entry`
+			WHERE 1=1 {where_clause}
+		) ae ON ae.cost_center = node.name
+		WHERE anc.lft >= %(root_lft)s AND anc.rgt <= %(root_rgt)s
+		GROUP BY anc.name, anc.lft
+		ORDER BY anc.lft
+		""",
+		dict(values, root_lft=bounds.lft, root_rgt=bounds.rgt),
+		as_dict=1,
+	)
 
 
-def get_report_summary(filters: frappe._dict, data: list[dict]) -> list[dict]:
+def get_report_summary(aggregates: list[dict]) -> list[dict]:
 	"""
 	Generate KPI cards for the report summary.
 	"""
@@ -126,14 +272,14 @@ def get_report_summary(filters: frappe._dict, data: list[dict]) -> list[dict]:
 	# Total Entries
 	summary.append({
 		"label": _("Total Entries"),
-		"value": len(data),
+		"value": sum(row.entries for row in aggregates),
 		"datatype": "Int",
 		"indicator": "blue",
 	})
 	
 	# Count by status
-	recorded_count = sum(1 for row in data if row.get("status") == "Recorded")
-	verified_count = sum(1 for row in data if row.get("status") == "Verified")
+	recorded_count = sum(row.entries for row in aggregates if row.status == "Recorded")
+	verified_count = sum(row.entries for row in aggregates if row.status == "Verified")
 	
 	summary.append({
 		"label": _("Recorded"),
@@ -150,8 +296,8 @@ def get_report_summary(filters: frappe._dict, data: list[dict]) -> list[dict]:
 	})
 	
 	# Count by entry kind
-	delta_count = sum(1 for row in data if row.get("entry_kind") == "Delta")
-	allowance_count = sum(1 for row in data if row.get("entry_kind") == "Allowance Spend")
+	delta_count = sum(row.entries for row in aggregates if row.entry_kind == "Delta")
+	allowance_count = sum(row.entries for row in aggregates if row.entry_kind == "Allowance Spend")
 	
 	summary.append({
 		"label": _("Delta"),
@@ -168,9 +314,9 @@ def get_report_summary(filters: frappe._dict, data: list[dict]) -> list[dict]:
 	})
 	
 	# Total amounts
-	total_net = sum(flt(row.get("amount_net", 0)) for row in data)
-	total_vat = sum(flt(row.get("amount_vat", 0)) for row in data)
-	total_gross = sum(flt(row.get("amount_gross", 0)) for row in data)
+	total_net = sum(flt(row.amount_net) for row in aggregates)
+	total_vat = sum(flt(row.amount_vat) for row in aggregates)
+	total_gross = sum(flt(row.amount_gross) for row in aggregates)
 	
 	summary.append({
 		"label": _("Total Net"),
@@ -196,27 +342,15 @@ def get_report_summary(filters: frappe._dict, data: list[dict]) -> list[dict]:
 	return summary
 
 
-def get_chart(data: list[dict]) -> dict:
+def get_chart(monthly_totals: list[dict]) -> dict:
 	"""
 	Primary chart: Monthly trend of net amounts.
 	"""
-	if not data:
+	if not monthly_totals:
 		return {}
 	
-	# Group by month
-	monthly_data = {}
-	for row in data:
-		if row.get("posting_date"):
-			posting_date = getdate(row.get("posting_date"))
-			month_key = posting_date.strftime("%Y-%m")
-			if month_key not in monthly_data:
-				monthly_data[month_key] = 0
-			monthly_data[month_key] += flt(row.get("amount_net", 0))
-	
-	# Sort by month
-	sorted_months = sorted(monthly_data.keys())
-	labels = [month for month in sorted_months]
-	values = [monthly_data[month] for month in sorted_months]
+	labels = [f"{cint(row.posting_year):04d}-{cint(row.posting_month):02d}" for row in monthly_totals]
+	values = [flt(row.amount_net) for row in monthly_totals]
 	
 	return {
 		"data": {
@@ -231,62 +365,54 @@ def get_chart(data: list[dict]) -> dict:
 	}
 
 
-def get_extra_charts(filters: frappe._dict, data: list[dict]) -> dict:
+def get_extra_charts(aggregates: list[dict], cost_center_totals: list[dict], rolled_up: bool = False) -> dict:
 	"""
 	Additional charts returned via message payload.
 	"""
 	charts = {}
 	
 	# Entries by Status (Pie)
-	if data:
-		status_counts = {}
-		for row in data:
-			status = row.get("status") or _("Unknown")
-			status_counts[status] = status_counts.get(status, 0) + 1
-		
-		if status_counts:
-			charts["entries_by_status"] = {
-				"title": _("Entries by Status"),
-				"type": "pie",
-				"data": {
-					"labels": list(status_counts.keys()),
-					"datasets": [{"values": list(status_counts.values())}],
-				},
-			}
+	status_counts = {}
+	for row in aggregates:
+		status = row.status or _("Unknown")
+		status_counts[status] = status_counts.get(status, 0) + row.entries
+	
+	if status_counts:
+		charts["entries_by_status"] = {
+			"title": _("Entries by Status"),
+			"type": "pie",
+			"data": {
+				"labels": list(status_counts.keys()),
+				"datasets": [{"values": list(status_counts.values())}],
+			},
+		}
 	
 	# Entries by Entry Kind (Pie)
-	if data:
-		kind_counts = {}
-		for row in data:
-			kind = row.get("entry_kind") or _("Unknown")
-			kind_counts[kind] = kind_counts.get(kind, 0) + 1
-		
-		if kind_counts:
-			charts["entries_by_kind"] = {
-				"title": _("Entries by Entry Kind"),
-				"type": "pie",
-				"data": {
-					"labels": list(kind_counts.keys()),
-					"datasets": [{"values": list(kind_counts.values())}],
-				},
-			}
+	kind_counts = {}
+	for row in aggregates:
+		kind = row.entry_kind or _("Unknown")
+		kind_counts[kind] = kind_counts.get(kind, 0) + row.entries
+	
+	if kind_counts:
+		charts["entries_by_kind"] = {
+			"title": _("Entries by Entry Kind"),
+			"type": "pie",
+			"data": {
+				"labels": list(kind_counts.keys()),
+				"datasets": [{"values": list(kind_counts.values())}],
+			},
+		}
 	
 	# Entries by Cost Center (Bar)
-	if data:
-		cc_amounts = {}
-		for row in data:
-			cc = row.get("cost_center") or _("No Cost Center")
-			cc_amounts[cc] = cc_amounts.get(cc, 0) + flt(row.get("amount_net", 0))
-		
-		if cc_amounts:
-			charts["entries_by_cost_center"] = {
-				"title": _("Net Amount by Cost Center"),
-				"type": "bar",
-				"data": {
-					"labels": list(cc_amounts.keys()),
-					"datasets": [{"values": list(cc_amounts.values())}],
-				},
-				"fieldtype": "Currency",
-			}
+	if cost_center_totals:
+		charts["entries_by_cost_center"] = {
+			"title": _("Net Amount by Cost Center (incl. children)") if rolled_up else _("Net Amount by Cost Center"),
+			"type": "bar",
+			"data": {
+				"labels": [row.cost_center or _("No Cost Center") for row in cost_center_totals],
+				"datasets": [{"values": [flt(row.amount_net) for row in cost_center_totals]}],
+			},
+			"fieldtype": "Currency",
+		}
 	
 	return {"charts": charts}
@@ -4,26 +4,61 @@
 frappe.query_reports["MPIT Budget Diff"] = {
 	filters: [
 		// Business filters (from JSON, consolidated here)
+		{
+			fieldname: "mode",
+			label: __("Mode"),
+			fieldtype: "Select",
+			options: "Two Budgets\nLive vs Snapshots\nYear over Year",
+			default: "Two Budgets",
+			on_change: function () {
+				// Budget A/B are only required when comparing two explicit budgets
+				const two_budgets = frappe.query_report.get_filter_value("mode") === "Two Budgets";
+				["budget_a", "budget_b"].forEach((fieldname) => {
+					const filter = frappe.query_report.get_filter(fieldname);
+					filter.df.reqd = two_budgets ? 1 : 0;
+					filter.refresh();
+				});
+				frappe.query_report.refresh();
+			}
+		},
 		{
 			fieldname: "budget_a",
 			label: __("Budget A"),
 			fieldtype: "Link",
 			options: "MPIT Budget",
-			reqd: 1
+			reqd: 1,
+			depends_on: "eval:doc.mode == 'Two Budgets'"
 		},
 		{
 			fieldname: "budget_b",
 			label: __("Budget B"),
 			fieldtype: "Link",
 			options: "MPIT Budget",
-			reqd: 1
+			reqd: 1,
+			depends_on: "eval:doc.mode == 'Two Budgets'"
+		},
+		{
+			fieldname: "year",
+			label: __("Year"),
+			fieldtype: "Link",
+			options: "MPIT Year",
+			default: frappe.defaults.get_user_default("year"),
+			depends_on: "eval:doc.mode != 'Two Budgets'"
+		},
+		{
+			fieldname: "years_back",
+			label: __("Years Back"),
+			fieldtype: "Int",
+			default: 1,
+			depends_on: "eval:doc.mode == 'Year over Year'"
 		},
 		{
 			fieldname: "group_by",
 			label: __("Group By"),
 			fieldtype: "Select",
-			options: "CostCenter+Vendor\nCostCenter",
-			default: "CostCenter+Vendor"
+			options: "CostCenter+Vendor\nCostCenter\nSource",
+			default: "CostCenter+Vendor",
+			depends_on: "eval:doc.mode == 'Two Budgets'"
 		},
 		{
 			fieldname: "only_changed",
@@ -32,5 +67,62 @@ frappe.query_reports["MPIT Budget Diff"] = {
 			default: 1
 		},
 
-	]
+	],
+
+	formatter: function (value, row, column, data, default_formatter) {
+		value = default_formatter(value, row, column, data);
+		// N-way modes: link to the line-level diff of the cost center, loaded on click
+		if (column.fieldname === "cost_center" && data && !data.is_total_row && this.get_budgets().length) {
+			value += ` <a class="mpit-diff-lines small" data-cost-center="${encodeURIComponent(data.cost_center || "")}">${__("Lines")}</a>`;
+		}
+		return value;
+	},
+
+	onload: function (report) {
+		report.page.wrapper.on("click", ".mpit-diff-lines", (e) => {
+			e.preventDefault();
+			this.show_lines(decodeURIComponent($(e.currentTarget).attr("data-cost-center")));
+		});
+	},
+
+	get_budgets: function () {
+		const message = frappe.query_report.raw_data && frappe.query_report.raw_data.message;
+		return (message && message.budgets) || [];
+	},
+
+	show_lines: function (cost_center) {
+		const budgets = this.get_budgets();
+		frappe.call({
+			method: "master_plan_it.budget_diff.get_lines",
+			args: {
+				budgets: budgets,
+				cost_center: cost_center,
+				only_changed: frappe.query_report.get_filter_value("only_changed") ? 1 : 0
+			},
+			freeze: true,
+			callback: (r) => {
+				const lines = r.message || [];
+				const head = budgets.map((b) => `<th class="text-right">${frappe.utils.escape_html(b)}</th>`).join("");
+				const body = lines.map((line) => {
+					const cells = budgets.map((b, i) => {
+						const amount = line.annual_net[b] == null ? "—" : format_currency(line.annual_net[b]);
+						const status = i ? line.status[b] : null;
+						const changes = i && line.changes[b] ? Object.keys(line.changes[b]).join(", ") : "";
+						const title = changes ? ` title="${frappe.utils.escape_html(changes)}"` : "";
+						return `<td class="text-right"${title}>${amount}${status && status !== "unchanged" ? `<br><span class="text-muted small">${__(frappe.utils.to_title_case(status))}</span>` : ""}</td>`;
+					}).join("");
+					const label = frappe.utils.escape_html(line.description || line.source_key);
+					return `<tr><td>${label}<br><span class="text-muted small">${frappe.utils.escape_html(line.vendor || "")}</span></td>${cells}</tr>`;
+				}).join("");
+				const dialog = new frappe.ui.Dialog({
+					title: __("Line Diff: {0}", [cost_center || __("Total")]),
+					size: "extra-large"
+				});
+				dialog.$body.html(lines.length
+					? `<table class="table table-bordered table-sm"><thead><tr><th>${__("Line")}</th>${head}</tr></thead><tbody>${body}</tbody></table>`
+					: `<p class="text-muted">${__("No differences")}</p>`);
+				dialog.show();
+			}
+		});
+	}
 };
@@ -3,19 +3,29 @@ from __future__ import annotations
 import frappe
 from frappe import _
 from master_plan_it.master_plan_it.utils.dashboard_utils import normalize_dashboard_filters
+from master_plan_it import budget_diff, slow_trace
 
-# Report: Budget Diff between two budgets grouped by Cost Center (and optionally Vendor).
-# Inputs: budget_a, budget_b (required), group_by (CostCenter+Vendor or CostCenter), only_changed flag.
-# Outputs: rows with annual/monthly deltas and summary total.
+# Report: Budget Diff between two budgets grouped by Cost Center (and optionally Vendor), or by source line.
+# Inputs: mode (Two Budgets, Live vs Snapshots, Year over Year), budget_a/budget_b (Two Budgets) or year,
+#         group_by (CostCenter+Vendor, CostCenter or Source), only_changed flag.
+# Outputs: rows with annual/monthly deltas and summary total; line-level rows (Source) or one row per
+#          Cost Center with a column group per budget (N-way modes), lines loaded on demand by the JS.
 
 
+@slow_trace.traced("Report")
 def execute(filters=None):
 	filters = normalize_dashboard_filters(filters)
 	filters = frappe._dict(filters or {})
 
+	mode = filters.get("mode") or "Two Budgets"
+	if mode != "Two Budgets":
+		return _execute_matrix(filters, mode)
+
 	_validate_filters(filters)
 	group_by = (filters.get("group_by") or "CostCenter+Vendor").strip()
 	only_changed = frappe.utils.cint(filters.get("only_changed", 1))
+	if group_by == "Source":
+		return _execute_source(filters.budget_a, filters.budget_b, only_changed)
 
 	budget_a = filters.budget_a
 	budget_b = filters.budget_b
@@ -34,8 +44,8 @@ def _validate_filters(filters) -> None:
 		frappe.throw(_("budget_b is required"))
 	if filters.budget_a == filters.budget_b:
 		frappe.throw(_("budget_a and budget_b must be different budgets"))
-	if filters.get("group_by") and filters.get("group_by") not in {"CostCenter+Vendor", "CostCenter"}:
-		frappe.throw(_("group_by must be either 'CostCenter+Vendor' or 'CostCenter'"))
+	if filters.get("group_by") and filters.get("group_by") not in {"CostCenter+Vendor", "CostCenter", "Source"}:
+		frappe.throw(_("group_by must be 'CostCenter+Vendor', 'CostCenter' or 'Source'"))
 
 
 def _build_columns() -> list[dict]:
@@ -164,3 +174,111 @@ def _build_summary(rows: list[dict]) -> list[dict]:
 			"indicator": "green" if (total.get("delta_annual", 0) or 0) >= 0 else "red",
 		},
 	]
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Line-level diff by source_key (master_plan_it.budget_diff)
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def _execute_source(budget_a: str, budget_b: str, only_changed: int):
+	"""One row per source_key of the two budgets, with status and changed fields."""
+	columns = [
+		{"label": _("Source Key"), "fieldname": "source_key", "fieldtype": "Data", "width": 220},
+		{"label": _("Cost Center"), "fieldname": "cost_center", "fieldtype": "Link", "options": "MPIT Cost Center", "width": 180},
+		{"label": _("Vendor"), "fieldname": "vendor", "fieldtype": "Link", "options": "MPIT Vendor", "width": 160},
+		{"label": _("Description"), "fieldname": "description", "fieldtype": "Data", "width": 200},
+		{"label": _("Status"), "fieldname": "status", "fieldtype": "Data", "width": 100},
+		{"label": _("Budget A Annual Net"), "fieldname": "budget_a_annual_net", "fieldtype": "Currency", "width": 140},
+		{"label": _("Budget B Annual Net"), "fieldname": "budget_b_annual_net", "fieldtype": "Currency", "width": 140},
+		{"label": _("Delta Annual (B - A)"), "fieldname": "delta_annual", "fieldtype": "Currency", "width": 150},
+		{"label": _("Changed Fields"), "fieldname": "changed_fields", "fieldtype": "Data", "width": 320},
+	]
+	rows: list[dict] = []
+	total_a = total_b = 0.0
+	for record in budget_diff.diff([budget_a, budget_b], only_changed=bool(only_changed)):
+		planned_a = record["annual_net"][budget_a] or 0.0
+		planned_b = record["annual_net"][budget_b] or 0.0
+		rows.append({
+			"source_key": record["source_key"],
+			"cost_center": record["cost_center"],
+			"vendor": record["vendor"],
+			"description": record["description"],
+			"status": _(record["status"][budget_b].title()),
+			"budget_a_annual_net": planned_a,
+			"budget_b_annual_net": planned_b,
+			"delta_annual": planned_b - planned_a,
+			"changed_fields": _format_changes(record["changes"][budget_b]),
+		})
+		total_a += planned_a
+		total_b += planned_b
+
+	if rows:
+		rows.append({
+			"source_key": _("Total"),
+			"budget_a_annual_net": total_a,
+			"budget_b_annual_net": total_b,
+			"delta_annual": total_b - total_a,
+			"is_total_row": 1,
+		})
+	return columns, rows, None, None, _build_summary(rows)
+
+
+def _execute_matrix(filters, mode: str):
+	"""One row per Cost Center across N budgets: annual net, delta and added/removed/changed lines vs the first."""
+	if not filters.get("year"):
+		frappe.throw(_("Year is required for comparison mode {0}.").format(_(mode)))
+	budgets = budget_diff.resolve_budgets(mode, year=filters.year, years_back=filters.get("years_back") or 1)
+	if len(budgets) < 2:
+		frappe.msgprint(_("At least two budgets are needed for comparison mode {0}.").format(_(mode)))
+		return _build_matrix_columns(budgets), [], {"budgets": budgets}, None, []
+
+	only_changed = frappe.utils.cint(filters.get("only_changed", 1))
+	rows: list[dict] = []
+	totals = dict.fromkeys(budgets, 0.0)
+	for entry in budget_diff.summarize(budgets):
+		changes = {
+			budget: (entry[budget_diff.ADDED][budget], entry[budget_diff.REMOVED][budget], entry[budget_diff.CHANGED][budget])
+			for budget in budgets[1:]
+		}
+		if only_changed and not any(any(counts) for counts in changes.values()):
+			continue
+		row = {"cost_center": entry["cost_center"]}
+		baseline_net = entry["annual_net"][budgets[0]]
+		for i, budget in enumerate(budgets):
+			row[f"b{i}_net"] = entry["annual_net"][budget]
+			totals[budget] += entry["annual_net"][budget]
+			if i:
+				row[f"b{i}_delta"] = entry["annual_net"][budget] - baseline_net
+				row[f"b{i}_changes"] = "+{0} / -{1} / ~{2}".format(*changes[budget])
+		rows.append(row)
+
+	if rows:
+		total_row = {"cost_center": _("Total"), "is_total_row": 1}
+		for i, budget in enumerate(budgets):
+			total_row[f"b{i}_net"] = totals[budget]
+			if i:
+				total_row[f"b{i}_delta"] = totals[budget] - totals[budgets[0]]
+		rows.append(total_row)
+
+	summary = [
+		{"label": budget, "value": frappe.utils.fmt_money(totals[budget]), "indicator": "blue" if not i else "grey"}
+		for i, budget in enumerate(budgets)
+	] if rows else []
+	return _build_matrix_columns(budgets), rows, {"budgets": budgets}, None, summary
+
+
+def _build_matrix_columns(budgets: list[str]) -> list[dict]:
+	columns = [
+		{"label": _("Cost Center"), "fieldname": "cost_center", "fieldtype": "Link", "options": "MPIT Cost Center", "width": 200},
+	]
+	for i, budget in enumerate(budgets):
+		columns.append({"label": budget, "fieldname": f"b{i}_net", "fieldtype": "Currency", "width": 150})
+		if i:
+			columns.append({"label": _("Delta vs {0}").format(budgets[0]), "fieldname": f"b{i}_delta", "fieldtype": "Currency", "width": 150})
+			columns.append({"label": _("Lines +/-/~"), "fieldname": f"b{i}_changes", "fieldtype": "Data", "width": 110})
+	return columns
+
+
+def _format_changes(changes: dict[str, list]) -> str:
+	return "; ".join(f"{field}: {old} → {new}" for field, (old, new) in changes.items())
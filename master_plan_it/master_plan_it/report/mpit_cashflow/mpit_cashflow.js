@@ -0,0 +1,38 @@
+// Copyright (c) 2026, DOT and contributors
+// For license information, please see license.txt
+
+frappe.query_reports["MPIT Cashflow"] = {
+	filters: [
+		{
+			fieldname: "year",
+			label: __("Year"),
+			fieldtype: "Link",
+			options: "MPIT Year",
+			default: frappe.defaults.get_user_default("fiscal_year")
+		},
+		{
+			fieldname: "cost_center",
+			label: __("Cost Center"),
+			fieldtype: "Link",
+			options: "MPIT Cost Center"
+		},
+		{
+			fieldname: "include_children",
+			label: __("Include Children"),
+			fieldtype: "Check",
+			default: 0
+		},
+		{
+			fieldname: "vendor",
+			label: __("Vendor"),
+			fieldtype: "Link",
+			options: "MPIT Vendor"
+		},
+		{
+			fieldname: "source_type",
+			label: __("Source Type"),
+			fieldtype: "Select",
+			options: "\nContract\nPlanned Item"
+		}
+	]
+};
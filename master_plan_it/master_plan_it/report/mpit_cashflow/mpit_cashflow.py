@@ -0,0 +1,123 @@
+from __future__ import annotations
+
+import datetime
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt
+
+from master_plan_it import annualization, cashflow, slow_trace
+from master_plan_it.core import projection as core_projection
+from master_plan_it.master_plan_it.doctype.mpit_year.mpit_year import get_live_budget
+from master_plan_it.master_plan_it.utils.cost_center_scope import resolve_cost_centers
+from master_plan_it.master_plan_it.utils.dashboard_utils import normalize_dashboard_filters
+
+# Report: cash-out calendar of the year's Live budget (payment months by billing cycle), next to the
+#         monthly-equivalent accrual of its lines.
+# Inputs: year (default: current MPIT Year), cost_center (+ include_children), vendor, source_type.
+# Outputs: one row per Cost Center and Vendor with a column per month and total; chart cash-out vs accrual; cards.
+
+MONTH_NAMES = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+
+@slow_trace.traced("Report")
+def execute(filters=None):
+	filters = normalize_dashboard_filters(filters)
+	filters = frappe._dict(filters or {})
+
+	year = filters.get("year") or _current_year()
+	budget = get_live_budget(year) if year else None
+	if not budget:
+		return _get_columns([]), [], _("No Live budget for year {0}.").format(year or "-")
+
+	year_start, year_end = annualization.get_year_bounds(year)
+	first = core_projection.month_index(year_start)
+	months = [core_projection.month_start(first + i) for i in range(core_projection.month_index(year_end) - first + 1)]
+	cost_centers = resolve_cost_centers(filters.get("cost_center"), cint(filters.get("include_children")))
+
+	totals = cashflow.get_month_totals(budget, cost_centers, filters.get("vendor"), filters.get("source_type"))
+	data, cash_out = _get_data(totals, months)
+	accrual = _get_accrual(budget, year_start, year_end, cost_centers, filters)
+	return _get_columns(months), data, None, _build_chart(months, cash_out, accrual), _build_summary(months, cash_out)
+
+
+def _current_year() -> str | None:
+	today = datetime.date.today()
+	return frappe.db.get_value("MPIT Year", {"start_date": ["<=", today], "end_date": [">=", today]}, "name")
+
+
+def _get_columns(months: list[datetime.date]) -> list[dict]:
+	columns = [
+		{"label": _("Cost Center"), "fieldname": "cost_center", "fieldtype": "Link", "options": "MPIT Cost Center", "width": 180},
+		{"label": _("Vendor"), "fieldname": "vendor", "fieldtype": "Link", "options": "MPIT Vendor", "width": 160},
+	]
+	for i, month in enumerate(months, start=1):
+		columns.append({"label": _month_label(month), "fieldname": f"month_{i}", "fieldtype": "Currency", "width": 110})
+	columns.append({"label": _("Total"), "fieldname": "total", "fieldtype": "Currency", "width": 130})
+	return columns
+
+
+def _get_data(totals: dict[tuple, dict], months: list[datetime.date]) -> tuple[list[dict], list[float]]:
+	"""Rows per (Cost Center, Vendor) with the cash-out of each month, and the monthly totals."""
+	rows = []
+	cash_out = [0.0] * len(months)
+	for (cost_center, vendor), by_month in sorted(totals.items(), key=lambda item: (item[0][0] or "", item[0][1] or "")):
+		row = {"cost_center": cost_center, "vendor": vendor}
+		for i, month in enumerate(months):
+			amount = by_month.get(month, 0.0)
+			row[f"month_{i + 1}"] = amount
+			cash_out[i] += amount
+		row["total"] = flt(sum(by_month.values()), 2)
+		rows.append(row)
+	return rows, [flt(amount, 2) for amount in cash_out]
+
+
+def _get_accrual(budget: str, year_start, year_end, cost_centers: list[str] | None, filters) -> list[float]:
+	"""Monthly-equivalent net of the Live lines under the same filters (annual net spread over their months)."""
+	line_filters = {"parent": budget, "parenttype": "MPIT Budget", "parentfield": "lines"}
+	if cost_centers:
+		line_filters["cost_center"] = ["in", cost_centers]
+	if filters.get("vendor"):
+		line_filters["vendor"] = filters.vendor
+	if filters.get("source_type"):
+		line_filters["line_kind"] = filters.source_type
+	lines = frappe.get_all(
+		"MPIT Budget Line",
+		filters=line_filters,
+		fields=["cost_center", "annual_net", "period_start_date", "period_end_date"],
+	)
+	return core_projection.line_totals(lines, year_start, year_end)["months"]
+
+
+def _month_label(month: datetime.date) -> str:
+	return f"{_(MONTH_NAMES[month.month - 1])} {month.year}"
+
+
+def _build_chart(months: list[datetime.date], cash_out: list[float], accrual: list[float]) -> dict:
+	if not any(cash_out) and not any(accrual):
+		return {}
+	return {
+		"data": {
+			"labels": [_month_label(month) for month in months],
+			"datasets": [
+				{"name": _("Cash Out"), "chartType": "bar", "values": cash_out},
+				{"name": _("Monthly Equivalent"), "chartType": "line", "values": accrual},
+			],
+		},
+		"type": "axis-mixed",
+		"fieldtype": "Currency",
+	}
+
+
+def _build_summary(months: list[datetime.date], cash_out: list[float]) -> list[dict]:
+	if not any(cash_out):
+		return []
+	peak = max(range(len(months)), key=lambda i: cash_out[i])
+	return [
+		{"label": _("Total Cash Out"), "value": frappe.utils.fmt_money(sum(cash_out)), "indicator": "blue"},
+		{
+			"label": _("Peak Month"),
+			"value": f"{_month_label(months[peak])}: {frappe.utils.fmt_money(cash_out[peak])}",
+			"indicator": "orange",
+		},
+	]
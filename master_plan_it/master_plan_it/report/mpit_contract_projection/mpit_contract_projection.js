@@ -0,0 +1,50 @@
+// Copyright (c) 2026, DOT and contributors
+// For license information, please see license.txt
+
+frappe.query_reports["MPIT Contract Projection"] = {
+	filters: [
+		{
+			fieldname: "from_year",
+			label: __("From Year"),
+			fieldtype: "Int",
+			default: new Date().getFullYear() + 1
+		},
+		{
+			fieldname: "years",
+			label: __("Years"),
+			fieldtype: "Int",
+			default: 3
+		},
+		{
+			fieldname: "indexation",
+			label: __("Indexation % per Renewal"),
+			fieldtype: "Percent",
+			default: 0
+		},
+		{
+			fieldname: "period",
+			label: __("Period"),
+			fieldtype: "Select",
+			options: "Month\nYear",
+			default: "Year"
+		},
+		{
+			fieldname: "cost_center",
+			label: __("Cost Center"),
+			fieldtype: "Link",
+			options: "MPIT Cost Center"
+		},
+		{
+			fieldname: "include_children",
+			label: __("Include Children"),
+			fieldtype: "Check",
+			default: 0
+		},
+		{
+			fieldname: "vendor",
+			label: __("Vendor"),
+			fieldtype: "Link",
+			options: "MPIT Vendor"
+		}
+	]
+};
@@ -0,0 +1,107 @@
+from __future__ import annotations
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt
+
+from master_plan_it import monthly_projection, slow_trace
+from master_plan_it.core import projection as core_projection
+from master_plan_it.master_plan_it.utils.cost_center_scope import resolve_cost_centers
+from master_plan_it.master_plan_it.utils.dashboard_utils import normalize_dashboard_filters
+
+# Report: recurring contract spend projected over future years (past the Live budget horizon).
+# Inputs: from_year (default next year), years (1-10), indexation % per renewal, period (Month or Year),
+#         cost_center (+ include_children), vendor.
+# Outputs: one row per Cost Center and Vendor with a column per period and total; chart and cards per year.
+
+MONTH_NAMES = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+
+@slow_trace.traced("Report")
+def execute(filters=None):
+	filters = normalize_dashboard_filters(filters)
+	filters = frappe._dict(filters or {})
+
+	first_month, months = monthly_projection.projection_window(filters.get("from_year"), filters.get("years") or 3)
+	periods = _get_periods(first_month, months, filters.get("period") or "Year")
+	projection = monthly_projection.get_projection(
+		first_month,
+		months,
+		("cost_center", "vendor"),
+		flt(filters.get("indexation")),
+		(core_projection.CONTRACT,),
+	)
+
+	data, monthly_totals = _get_data(filters, projection, periods, months)
+	year_totals = {}
+	for _fieldname, label, offsets in _get_periods(first_month, months, "Year"):
+		year_totals[label] = flt(sum(monthly_totals[i] for i in offsets), 2)
+	return _get_columns(periods), data, None, _build_chart(year_totals), _build_summary(year_totals)
+
+
+def _get_periods(first_month, months: int, period: str) -> list[tuple[str, str, list[int]]]:
+	"""(fieldname, label, month offsets) per column: one per month, or one per calendar year."""
+	first = core_projection.month_index(first_month)
+	month_dates = [core_projection.month_start(first + i) for i in range(months)]
+	if period == "Month":
+		return [
+			(f"m_{month:%Y_%m}", f"{_(MONTH_NAMES[month.month - 1])} {month.year}", [i])
+			for i, month in enumerate(month_dates)
+		]
+	periods: dict[int, list[int]] = {}
+	for i, month in enumerate(month_dates):
+		periods.setdefault(month.year, []).append(i)
+	return [(f"y_{year}", str(year), offsets) for year, offsets in periods.items()]
+
+
+def _get_columns(periods: list[tuple[str, str, list[int]]]) -> list[dict]:
+	columns = [
+		{"label": _("Cost Center"), "fieldname": "cost_center", "fieldtype": "Link", "options": "MPIT Cost Center", "width": 180},
+		{"label": _("Vendor"), "fieldname": "vendor", "fieldtype": "Link", "options": "MPIT Vendor", "width": 160},
+	]
+	for fieldname, label, _offsets in periods:
+		columns.append({"label": label, "fieldname": fieldname, "fieldtype": "Currency", "width": 110})
+	columns.append({"label": _("Total"), "fieldname": "total", "fieldtype": "Currency", "width": 130})
+	return columns
+
+
+def _get_data(filters, projection: dict[tuple, list[float]], periods, months: int) -> tuple[list[dict], list[float]]:
+	"""Rows per (Cost Center, Vendor) with period amounts, and the monthly totals of those rows."""
+	cost_centers = resolve_cost_centers(filters.get("cost_center"), cint(filters.get("include_children")))
+	rows = []
+	monthly_totals = [0.0] * months
+	for (cost_center, vendor), amounts in sorted(projection.items(), key=lambda item: (item[0][0], item[0][1] or "")):
+		if cost_centers and cost_center not in cost_centers:
+			continue
+		if filters.get("vendor") and vendor != filters.vendor:
+			continue
+		if not any(amounts):
+			continue
+		row = {"cost_center": cost_center, "vendor": vendor}
+		for fieldname, _label, offsets in periods:
+			row[fieldname] = flt(sum(amounts[i] for i in offsets), 2)
+		row["total"] = flt(sum(amounts), 2)
+		rows.append(row)
+		for i, amount in enumerate(amounts):
+			monthly_totals[i] += amount
+	return rows, monthly_totals
+
+
+def _build_chart(year_totals: dict[str, float]) -> dict:
+	if not any(year_totals.values()):
+		return {}
+	return {
+		"data": {
+			"labels": list(year_totals),
+			"datasets": [{"name": _("Contracts"), "values": list(year_totals.values())}],
+		},
+		"type": "bar",
+		"fieldtype": "Currency",
+	}
+
+
+def _build_summary(year_totals: dict[str, float]) -> list[dict]:
+	return [
+		{"label": year, "value": frappe.utils.fmt_money(total), "indicator": "blue"}
+		for year, total in year_totals.items()
+	]
@@ -1,21 +1,51 @@
 // Copyright (c) 2026, DOT and contributors
 // For license information, please see license.txt
 
-frappe.query_reports["MPIT Monthly Plan v3"] = {
+frappe.query_reports["MPIT Monthly Plan"] = {
     filters: [
         {
             fieldname: "year",
             label: __("Year"),
             fieldtype: "Link",
             options: "MPIT Year",
-            reqd: 1,
             default: frappe.defaults.get_user_default("fiscal_year"),
         },
+        {
+            fieldname: "from_month",
+            label: __("From Month"),
+            fieldtype: "Date",
+            description: __("Start of a rolling window (overrides Year)"),
+        },
+        {
+            fieldname: "months",
+            label: __("Months"),
+            fieldtype: "Select",
+            options: "12\n24\n36",
+            default: "12",
+        },
         {
             fieldname: "cost_center",
             label: __("Cost Center"),
             fieldtype: "Link",
             options: "MPIT Cost Center",
         },
+        {
+            fieldname: "include_children",
+            label: __("Include Children"),
+            fieldtype: "Check",
+            default: 0,
+        },
     ],
+
+    formatter: function (value, row, column, data, default_formatter) {
+        value = default_formatter(value, row, column, data);
+        // Include Children: indent subtree rows and bold group rollups
+        if (data && column.fieldname === "cost_center" && data.indent) {
+            value = `<span style="padding-left: ${data.indent * 16}px">${value}</span>`;
+        }
+        if (data && data.is_group) {
+            value = `<b>${value}</b>`;
+        }
+        return value;
+    },
 };
@@ -1,34 +1,42 @@
 """
-FILE: master_plan_it/report/mpit_monthly_plan_v3/mpit_monthly_plan_v3.py
-SCOPO: Report v3 mensile che rispetta spend_date e distribution (all/start/end) per Planned Items.
-INPUT: Filtri (year obbligatorio, cost_center opzionale).
-OUTPUT: Righe aggregate per Cost Center con colonne mensili (gen-dic), totale annuale.
+FILE: master_plan_it/report/mpit_monthly_plan/mpit_monthly_plan.py
+SCOPO: Piano mensile per Cost Center e sorgente su una finestra di 12, 24 o 36 mesi (anche oltre l'orizzonte dei budget Live), da master_plan_it.monthly_projection.
+INPUT: Filtri (year o from_month per l'inizio della finestra, months, cost_center opzionale, include_children per il sottoalbero).
+OUTPUT: Righe aggregate per Cost Center e sorgente con una colonna per mese della finestra, totale per anno (finestre pluriennali) e totale; con include_children righe in ordine d'albero e nodi gruppo con il rollup dei discendenti.
 """
 
 from __future__ import annotations
 
-import calendar
 from datetime import date
 
 import frappe
 from frappe import _
-from frappe.utils import flt, getdate
+from frappe.utils import cint, flt, getdate
 
-from master_plan_it import annualization
+from master_plan_it import annualization, monthly_projection, slow_trace
+from master_plan_it.core import projection as core_projection
+from master_plan_it.core.projection import CONTRACT, PLANNED_ITEM
+from master_plan_it.master_plan_it.utils import cost_center_scope
 from master_plan_it.master_plan_it.utils.dashboard_utils import normalize_dashboard_filters
 
+WINDOW_MONTHS = (12, 24, 36)
+MONTH_NAMES = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+SOURCE_ORDER = {CONTRACT: 0, PLANNED_ITEM: 1}
 
+
+@slow_trace.traced("Report")
 def execute(filters=None):
 	filters = normalize_dashboard_filters(filters)
 	filters = frappe._dict(filters or {})
 
 	filters.year = _resolve_year(filters)
-	if not filters.year:
+	if not filters.year and not filters.get("from_month"):
 		frappe.throw(_("No MPIT Year found. Please create one or set the Year filter."))
 
-	columns = _get_columns()
-	data = _get_data(filters)
-	chart = _build_chart(data)
+	month_dates = _window_months(*_get_window(filters))
+	columns = _get_columns(month_dates)
+	data = _get_data(filters, month_dates)
+	chart = _build_chart(data, month_dates)
 
 	return columns, data, None, chart
 
@@ -50,22 +58,48 @@ def _resolve_year(filters) -> str | None:
 	return frappe.db.get_value("MPIT Year", {}, "name", order_by="year desc")
 
 
-def _get_columns() -> list[dict]:
+def _get_window(filters) -> tuple[date, int]:
+	"""First month and length of the window: from_month if set, else January of the year."""
+	months = cint(filters.get("months")) or 12
+	if months not in WINDOW_MONTHS:
+		frappe.throw(_("Months must be one of {0}.").format(", ".join(str(m) for m in WINDOW_MONTHS)))
+	if filters.get("from_month"):
+		first = getdate(filters.from_month)
+	else:
+		first = annualization.get_year_bounds(filters.year)[0]
+	return date(first.year, first.month, 1), months
+
+
+def _window_months(first_month: date, months: int) -> list[date]:
+	first = core_projection.month_index(first_month)
+	return [core_projection.month_start(first + i) for i in range(months)]
+
+
+def _get_columns(month_dates: list[date]) -> list[dict]:
 	cols = [
 		{"label": _("Cost Center"), "fieldname": "cost_center", "fieldtype": "Link", "options": "MPIT Cost Center", "width": 180},
 		{"label": _("Source"), "fieldname": "source_type", "fieldtype": "Data", "width": 100},
 	]
 
-	# Add monthly columns
-	month_names = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
-	for i, name in enumerate(month_names, 1):
+	# One column per month of the window
+	for i, month in enumerate(month_dates, 1):
 		cols.append({
-			"label": _(name),
+			"label": _month_label(month),
 			"fieldname": f"month_{i}",
 			"fieldtype": "Currency",
 			"width": 100,
 		})
 
+	years = sorted({month.year for month in month_dates})
+	if len(years) > 1:
+		for year in years:
+			cols.append({
+				"label": _("Total {0}").format(year),
+				"fieldname": f"total_{year}",
+				"fieldtype": "Currency",
+				"width": 120,
+			})
+
 	cols.append({
 		"label": _("Total"),
 		"fieldname": "total",
@@ -76,234 +110,93 @@ def _get_columns() -> list[dict]:
 	return cols
 
 
-def _get_data(filters) -> list[dict]:
-	year = filters.year
-	cost_center_filter = filters.get("cost_center")
-
-	year_start, year_end = annualization.get_year_bounds(year)
-
-	# Get contract lines monthly distribution
-	contract_monthly = _get_contract_monthly(year, year_start, year_end, cost_center_filter)
-
-	# Get planned item lines monthly distribution (respecting spend_date/distribution)
-	planned_monthly = _get_planned_item_monthly(year, year_start, year_end, cost_center_filter)
-
-	# Merge by cost center
-	all_ccs = set(contract_monthly.keys()) | set(planned_monthly.keys())
+def _get_data(filters, month_dates: list[date]) -> list[dict]:
+	projection = monthly_projection.get_projection(month_dates[0], len(month_dates))
+	if filters.get("cost_center") and cint(filters.get("include_children")):
+		return _get_rollup_data(filters.cost_center, projection, month_dates)
 
+	cost_center_filter = cost_center_scope.resolve_cost_centers(filters.get("cost_center"))
 	rows = []
-	for cc in sorted(all_ccs):
-		contract_data = contract_monthly.get(cc, {})
-		planned_data = planned_monthly.get(cc, {})
-
-		# Add contract row for this CC
-		if contract_data:
-			row = {
-				"cost_center": cc,
-				"source_type": "Contract",
-				"total": 0,
-			}
-			for m in range(1, 13):
-				amount = flt(contract_data.get(m, 0), 2)
-				row[f"month_{m}"] = amount
-				row["total"] += amount
-			row["total"] = flt(row["total"], 2)
-			rows.append(row)
-
-		# Add planned item row for this CC
-		if planned_data:
-			row = {
-				"cost_center": cc,
-				"source_type": "Planned Item",
-				"total": 0,
-			}
-			for m in range(1, 13):
-				amount = flt(planned_data.get(m, 0), 2)
-				row[f"month_{m}"] = amount
-				row["total"] += amount
-			row["total"] = flt(row["total"], 2)
-			rows.append(row)
-
-	return rows
-
-
-def _get_contract_monthly(year: str, year_start: date, year_end: date, cost_center_filter: str | None) -> dict[str, dict[int, float]]:
-	"""Get monthly amounts per cost center from Live budget contract lines."""
-	live_budget = frappe.db.get_value(
-		"MPIT Budget",
-		filters={"year": year, "budget_type": "Live", "docstatus": 0},
-		fieldname="name",
-	)
-	if not live_budget:
-		return {}
-
-	filters = {"parent": live_budget, "line_kind": "Contract"}
-	if cost_center_filter:
-		filters["cost_center"] = cost_center_filter
-
-	lines = frappe.get_all(
-		"MPIT Budget Line",
-		filters=filters,
-		fields=["cost_center", "monthly_amount", "period_start_date", "period_end_date"],
-	)
-
-	result: dict[str, dict[int, float]] = {}
-
-	for line in lines:
-		cc = line.cost_center
-		if not cc:
-			continue
-
-		if cc not in result:
-			result[cc] = {m: 0 for m in range(1, 13)}
-
-		# Distribute monthly_amount across overlap months
-		start = getdate(line.period_start_date) if line.period_start_date else year_start
-		end = getdate(line.period_end_date) if line.period_end_date else year_end
-		monthly = flt(line.monthly_amount or 0)
-
-		for month in range(1, 13):
-			month_start = date(year_start.year, month, 1)
-			month_end = date(year_start.year, month, calendar.monthrange(year_start.year, month)[1])
-
-			# Check if month overlaps with line period
-			if start <= month_end and end >= month_start:
-				result[cc][month] += monthly
-
-	return result
-
-
-def _get_planned_item_monthly(year: str, year_start: date, year_end: date, cost_center_filter: str | None) -> dict[str, dict[int, float]]:
-	"""Get monthly amounts per cost center from Planned Items respecting spend_date/distribution and overlap."""
-	items = frappe.get_all(
-		"MPIT Planned Item",
-		filters={"docstatus": 1, "is_covered": 0, "out_of_horizon": 0},
-		fields=[
-			"name",
-			"project",
-			"amount",
-			"start_date",
-			"end_date",
-			"spend_date",
-			"distribution",
-		],
-	)
-
-	if not items:
-		return {}
-
-	# Get project cost centers
-	project_names = list(set(i.project for i in items if i.project))
-	project_ccs = {}
-	if project_names:
-		projects = frappe.get_all(
-			"MPIT Project",
-			filters={"name": ["in", project_names], "workflow_state": "Approved"},
-			fields=["name", "cost_center"],
-		)
-		project_ccs = {p.name: p.cost_center for p in projects}
-
-	result: dict[str, dict[int, float]] = {}
-
-	for item in items:
-		cc = project_ccs.get(item.project)
-		if not cc:
-			continue
-
-		if cost_center_filter and cc != cost_center_filter:
-			continue
-
-		if cc not in result:
-			result[cc] = {m: 0 for m in range(1, 13)}
-
-		amount = flt(item.amount or 0)
-		if amount == 0:
+	for (cc, source_type), amounts in sorted(projection.items(), key=lambda item: (item[0][0], SOURCE_ORDER[item[0][1]])):
+		if cost_center_filter and cc not in cost_center_filter:
 			continue
-
-		distribution = (item.distribution or "all").lower()
-
-		start = getdate(item.start_date) if item.start_date else year_start
-		end = getdate(item.end_date) if item.end_date else year_end
-
-		if end < year_start or start > year_end:
-			continue
-
-		# Case 1: spend_date specified - all amount goes to that month (if in year)
-		if item.spend_date:
-			spend = getdate(item.spend_date)
-			if year_start <= spend <= year_end:
-				result[cc][spend.month] += amount
-			continue
-
-		# Case 2: distribution based on period
-		if distribution == "start":
-			if year_start <= start <= year_end:
-				result[cc][start.month] += amount
-			continue
-
-		if distribution == "end":
-			if year_start <= end <= year_end:
-				result[cc][end.month] += amount
+		if not any(amounts):
 			continue
+		rows.append(_plan_row(cc, source_type, amounts, month_dates))
 
-		period_start = max(start, year_start)
-		period_end = min(end, year_end)
-
-		overlap_months = _get_overlap_month_list(period_start, period_end, year_start)
-		if not overlap_months:
-			continue
-
-		total_months = _get_total_months(start, end)
-		if total_months <= 0:
-			continue
-
-		monthly_amount = amount / total_months
-		for m in overlap_months:
-			result[cc][m] += monthly_amount
+	return rows
 
-	return result
 
+def _get_rollup_data(root: str, projection: dict[tuple, list[float]], month_dates: list[date]) -> list[dict]:
+	"""Rows of root's subtree in tree order, per source; group nodes carry their descendants' amounts."""
+	subtree = cost_center_scope.get_subtree(root)
+	fields = [f"month_{i}" for i in range(1, len(month_dates) + 1)]
+	totals = {}
+	for source_type in SOURCE_ORDER:
+		values_by_cc = {
+			cc: dict(zip(fields, amounts)) for (cc, source), amounts in projection.items() if source == source_type
+		}
+		totals[source_type] = cost_center_scope.rollup(subtree, values_by_cc, fields)
 
-def _get_overlap_month_list(period_start: date, period_end: date, year_start: date) -> list[int]:
-	"""Return list of month numbers (1-12) that overlap with the period."""
-	months = []
-	for month in range(1, 13):
-		month_start = date(year_start.year, month, 1)
-		month_end = date(year_start.year, month, calendar.monthrange(year_start.year, month)[1])
+	rows = []
+	for node in subtree:
+		for source_type in sorted(SOURCE_ORDER, key=SOURCE_ORDER.get):
+			amounts = [totals[source_type][node.name][f] for f in fields]
+			if not any(amounts):
+				continue
+			row = _plan_row(node.name, source_type, amounts, month_dates)
+			row.update({
+				"indent": node.depth,
+				"parent_cost_center": node.parent_mpit_cost_center if node.name != root else None,
+				"is_group": cint(node.is_group),
+			})
+			rows.append(row)
+	return rows
 
-		if period_start <= month_end and period_end >= month_start:
-			months.append(month)
 
-	return months
+def _plan_row(cc: str, source_type: str, amounts: list[float], month_dates: list[date]) -> dict:
+	multi_year = len({month.year for month in month_dates}) > 1
+	row = {
+		"cost_center": cc,
+		"source_type": source_type,
+		"total": 0,
+	}
+	for i, (month, amount) in enumerate(zip(month_dates, amounts), 1):
+		row[f"month_{i}"] = amount
+		row["total"] += amount
+		if multi_year:
+			row[f"total_{month.year}"] = flt(row.get(f"total_{month.year}", 0) + amount, 2)
+	row["total"] = flt(row["total"], 2)
+	return row
 
 
-def _get_total_months(start: date, end: date) -> int:
-	"""Return total months in the item period (inclusive)."""
-	return (end.year - start.year) * 12 + end.month - start.month + 1
+def _month_label(month: date) -> str:
+	return f"{_(MONTH_NAMES[month.month - 1])} {month.year}"
 
 
-def _build_chart(data: list[dict]) -> dict:
+def _build_chart(data: list[dict], month_dates: list[date]) -> dict:
 	"""Build stacked bar chart showing monthly amounts by source type."""
 	if not data:
 		return {}
 
-	month_names = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
-
 	# Aggregate by source type
-	contract_totals = [0.0] * 12
-	planned_totals = [0.0] * 12
+	contract_totals = [0.0] * len(month_dates)
+	planned_totals = [0.0] * len(month_dates)
 
+	# Include Children: the root rows already hold the whole subtree (nested rows would double count).
 	for row in data:
-		for m in range(1, 13):
+		if row.get("indent"):
+			continue
+		for m in range(1, len(month_dates) + 1):
 			amount = flt(row.get(f"month_{m}", 0))
-			if row.get("source_type") == "Contract":
+			if row.get("source_type") == CONTRACT:
 				contract_totals[m - 1] += amount
 			else:
 				planned_totals[m - 1] += amount
 
 	return {
 		"data": {
-			"labels": month_names,
+			"labels": [_month_label(month) for month in month_dates],
 			"datasets": [
 				{"name": _("Contracts"), "values": contract_totals},
 				{"name": _("Planned Items"), "values": planned_totals},
@@ -313,5 +206,3 @@ def _build_chart(data: list[dict]) -> dict:
 		"barOptions": {"stacked": True},
 		"fieldtype": "Currency",
 	}
-
-
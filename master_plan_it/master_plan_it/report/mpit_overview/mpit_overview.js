@@ -35,6 +35,12 @@ frappe.query_reports["MPIT Overview"] = {
             options: "MPIT Cost Center",
             reqd: 0
         },
+        {
+            fieldname: "include_children",
+            label: __("Include Children"),
+            fieldtype: "Check",
+            default: 0
+        },
         {
             fieldname: "vendor",
             label: __("Vendor"),
@@ -44,7 +50,23 @@ frappe.query_reports["MPIT Overview"] = {
         }
     ],
 
+    formatter: function (value, row, column, data, default_formatter) {
+        value = default_formatter(value, row, column, data);
+        // Include Children: indent subtree rows and bold group rollups
+        if (data && column.fieldname === "cost_center" && data.indent) {
+            value = `<span style="padding-left: ${data.indent * 16}px">${value}</span>`;
+        }
+        if (data && data.is_group) {
+            value = `<b>${value}</b>`;
+        }
+        return value;
+    },
+
     onload: function (report) {
+        // Streaming export of every matching row (CSV or Excel)
+        report.page.add_inner_button(__("CSV"), () => this.export_rows(report, "CSV"), __("Export Lines"));
+        report.page.add_inner_button(__("Excel"), () => this.export_rows(report, "Excel"), __("Export Lines"));
+
         // Create container for extra charts below report
         if (!document.getElementById("mpit-extra-charts")) {
             let container = document.createElement("div");
@@ -89,5 +111,23 @@ frappe.query_reports["MPIT Overview"] = {
                 }
             }
         }
+    },
+
+    export_rows: function (report, file_format) {
+        let filters = report.get_filter_values();
+        let args = { kind: "budget_lines", filters: JSON.stringify(filters), file_format: file_format };
+        frappe.call({
+            method: "master_plan_it.exports.start_export",
+            args: args,
+            freeze: true
+        }).then((r) => {
+            if (r.message.queued) {
+                frappe.msgprint(
+                    __("{0} rows: the export runs in background, a download link will be sent when it is ready.", [r.message.rows])
+                );
+                return;
+            }
+            window.open("/api/method/master_plan_it.exports.download?" + $.param(args));
+        });
     }
 };
@@ -7,6 +7,8 @@ MPIT Overview Report
 A Script Report that serves as Budget Control Center:
 - Default mode (no budget filter): Year-level comparison of all cost centers
 - Budget mode (budget selected): Detail view of selected budget's lines
+- Include Children: Cost Center filter covers its subtree; in comparison mode rows
+  follow the tree with group nodes carrying rolled-up totals
 
 KPIs via report_summary, charts via primary chart and message payload.
 """
@@ -18,12 +20,18 @@ import datetime
 import frappe
 from frappe import _
 from frappe.utils import cint, flt
+from master_plan_it.master_plan_it.doctype.mpit_year import mpit_year
+from master_plan_it.master_plan_it.utils import cost_center_scope
+from master_plan_it import slow_trace
 
 
+@slow_trace.traced("Report")
 def execute(filters=None):
     filters = frappe._dict(filters or {})
     year = _resolve_year(filters)
     cost_center = filters.get("cost_center")
+    include_children = cint(filters.get("include_children"))
+    cost_centers = cost_center_scope.resolve_cost_centers(cost_center, include_children)
     budget = filters.get("budget")
     vendor = filters.get("vendor")
 
@@ -38,14 +46,14 @@ def execute(filters=None):
     # Get data based on mode
     if budget:
         # Budget detail mode - show lines from selected budget
-        data = get_budget_detail_data(budget, cost_center, vendor)
+        data = get_budget_detail_data(budget, cost_centers, vendor)
     else:
         # Default mode - year-level comparison
-        data = get_year_comparison_data(year, cost_center)
+        data = get_year_comparison_data(year, cost_centers, rollup_root=cost_center if include_children else None)
 
-    report_summary = get_report_summary(year, cost_center, data, budget, budget_type)
+    report_summary = get_report_summary(year, cost_centers, data, budget, budget_type)
     chart = get_chart(data, budget_type)
-    message = get_extra_charts(year, cost_center) if not budget else {}
+    message = get_extra_charts(year, cost_centers) if not budget else {}
 
     return columns, data, None, chart, report_summary, message
 
@@ -94,14 +102,17 @@ def get_columns(budget_type: str | None = None):
         ]
 
 
-def get_budget_detail_data(budget: str, cost_center: str | None = None, vendor: str | None = None) -> list[dict]:
+def _cc_filter(cost_centers: list[str] | None) -> dict:
+    """ORM filter for a resolved cost center scope (None = no filter)."""
+    return {"cost_center": ["in", cost_centers]} if cost_centers else {}
+
+
+def get_budget_detail_data(budget: str, cost_centers: list[str] | None = None, vendor: str | None = None) -> list[dict]:
     """
     Return line-level data from a selected budget.
     Shows all lines grouped by cost center and vendor.
     """
-    filters = {"parent": budget}
-    if cost_center:
-        filters["cost_center"] = cost_center
+    filters = {"parent": budget, **_cc_filter(cost_centers)}
     if vendor:
         filters["vendor"] = vendor
 
@@ -134,10 +145,14 @@ def get_budget_detail_data(budget: str, cost_center: str | None = None, vendor:
     ]
 
 
-def get_year_comparison_data(year: str | None, cost_center: str | None = None) -> list[dict]:
+def get_year_comparison_data(
+    year: str | None, cost_centers: list[str] | None = None, rollup_root: str | None = None
+) -> list[dict]:
     """
     Aggregate Plan, Snapshot, Addendum, Actual per Cost Center for a year.
     This is the default view showing cross-budget comparison.
+    With rollup_root, rows follow the subtree in tree order and group nodes
+    carry the totals of their descendants (indent = depth below the root).
     """
     if not year:
         return []
@@ -145,27 +160,16 @@ def get_year_comparison_data(year: str | None, cost_center: str | None = None) -
     # Get all cost centers used in budgets for this year
     all_cc = set()
 
-    # Get Live budget for this year
-    live_budget_name = frappe.db.get_value(
-        "MPIT Budget",
-        {"year": year, "budget_type": "Live", "docstatus": 0},
-        "name",
-    )
-
-    # Get approved Snapshot for this year
-    snapshot_budget_name = frappe.db.get_value(
-        "MPIT Budget",
-        {"year": year, "budget_type": "Snapshot", "docstatus": 1},
-        "name",
-        order_by="modified desc",
-    )
+    # Live budget and current approved Snapshot for this year (MPIT Year pointers)
+    live_budget_name = mpit_year.get_live_budget(year)
+    snapshot_budget_name = mpit_year.get_current_snapshot(year)
 
     # 1. Plan (Live)
     plan_map = {}
     if live_budget_name:
         lines = frappe.db.get_all(
             "MPIT Budget Line",
-            filters={"parent": live_budget_name, **({"cost_center": cost_center} if cost_center else {})},
+            filters={"parent": live_budget_name, **_cc_filter(cost_centers)},
             fields=["cost_center", "sum(annual_net) as total"],
             group_by="cost_center",
         )
@@ -179,7 +183,7 @@ def get_year_comparison_data(year: str | None, cost_center: str | None = None) -
     if snapshot_budget_name:
         lines = frappe.db.get_all(
             "MPIT Budget Line",
-            filters={"parent": snapshot_budget_name, **({"cost_center": cost_center} if cost_center else {})},
+            filters={"parent": snapshot_budget_name, **_cc_filter(cost_centers)},
             fields=["cost_center", "sum(annual_net) as total"],
             group_by="cost_center",
         )
@@ -189,9 +193,7 @@ def get_year_comparison_data(year: str | None, cost_center: str | None = None) -
                 all_cc.add(row.cost_center)
 
     # Addendums
-    addendum_filters = {"year": year, "docstatus": 1}
-    if cost_center:
-        addendum_filters["cost_center"] = cost_center
+    addendum_filters = {"year": year, "docstatus": 1, **_cc_filter(cost_centers)}
     addendum_data = frappe.db.get_all(
         "MPIT Budget Addendum",
         filters=addendum_filters,
@@ -205,9 +207,7 @@ def get_year_comparison_data(year: str | None, cost_center: str | None = None) -
             all_cc.add(row.cost_center)
 
     # Actuals (Verified)
-    actual_filters = {"year": year, "status": "Verified"}
-    if cost_center:
-        actual_filters["cost_center"] = cost_center
+    actual_filters = {"year": year, "status": "Verified", **_cc_filter(cost_centers)}
     actual_data = frappe.db.get_all(
         "MPIT Actual Entry",
         filters=actual_filters,
@@ -220,32 +220,65 @@ def get_year_comparison_data(year: str | None, cost_center: str | None = None) -
             actual_map[row.cost_center] = flt(row.total)
             all_cc.add(row.cost_center)
 
-    # Build rows
+    values_by_cc = {
+        cc: {
+            "plan_live": plan_map.get(cc, 0),
+            "snapshot": snapshot_map.get(cc, 0),
+            "addendum": addendum_map.get(cc, 0),
+            "actual": actual_map.get(cc, 0),
+        }
+        for cc in all_cc
+    }
+    if rollup_root:
+        return _build_rollup_rows(rollup_root, values_by_cc)
+
+    return [_comparison_row(cc, values_by_cc[cc]) for cc in sorted(all_cc)]
+
+
+def _build_rollup_rows(root: str, values_by_cc: dict[str, dict]) -> list[dict]:
+    """Tree-ordered rows for the subtree of root; empty branches are skipped."""
+    subtree = cost_center_scope.get_subtree(root)
+    totals = cost_center_scope.rollup(subtree, values_by_cc, ["plan_live", "snapshot", "addendum", "actual"])
+
     data = []
-    for cc in sorted(all_cc):
-        plan = flt(plan_map.get(cc, 0), 2)
-        snapshot = flt(snapshot_map.get(cc, 0), 2)
-        addendum = flt(addendum_map.get(cc, 0), 2)
-        cap = flt(snapshot + addendum, 2)
-        actual = flt(actual_map.get(cc, 0), 2)
-        remaining = flt(max(cap - actual, 0), 2)
-        over_cap = flt(max(actual - cap, 0), 2)
-
-        data.append({
-            "cost_center": cc,
-            "plan_live": plan,
-            "snapshot": snapshot,
-            "addendum": addendum,
-            "cap": cap,
-            "actual": actual,
-            "remaining": remaining,
-            "over_cap": over_cap,
+    for node in subtree:
+        values = totals[node.name]
+        if node.name != root and not any(values.values()):
+            continue
+        row = _comparison_row(node.name, values)
+        row.update({
+            "indent": node.depth,
+            "parent_cost_center": node.parent_mpit_cost_center if node.name != root else None,
+            "is_group": cint(node.is_group),
         })
-
+        data.append(row)
     return data
 
 
-def get_report_summary(year: str | None, cost_center: str | None, data: list[dict], budget: str | None = None, budget_type: str | None = None) -> list[dict]:
+def _comparison_row(cc: str, values: dict) -> dict:
+    plan = flt(values.get("plan_live", 0), 2)
+    snapshot = flt(values.get("snapshot", 0), 2)
+    addendum = flt(values.get("addendum", 0), 2)
+    cap = flt(snapshot + addendum, 2)
+    actual = flt(values.get("actual", 0), 2)
+    return {
+        "cost_center": cc,
+        "plan_live": plan,
+        "snapshot": snapshot,
+        "addendum": addendum,
+        "cap": cap,
+        "actual": actual,
+        "remaining": flt(max(cap - actual, 0), 2),
+        "over_cap": flt(max(actual - cap, 0), 2),
+    }
+
+
+def _top_level_rows(data: list[dict]) -> list[dict]:
+    """Rows whose sum is the scope total (nested rollup rows would double count)."""
+    return [row for row in data if not row.get("indent")]
+
+
+def get_report_summary(year: str | None, cost_centers: list[str] | None, data: list[dict], budget: str | None = None, budget_type: str | None = None) -> list[dict]:
     """
     Generate KPI cards for the report summary.
     Shows different cards based on mode (budget detail vs year comparison).
@@ -298,7 +331,7 @@ def get_report_summary(year: str | None, cost_center: str | None, data: list[dic
     else:
         # Year comparison mode - show counts and totals
         year_filter = {"year": year} if year else {}
-        cc_filter_direct = {"cost_center": cost_center} if cost_center else {}
+        cc_filter_direct = _cc_filter(cost_centers)
 
         def count_docs(doctype, filters):
             return frappe.db.count(doctype, filters)
@@ -336,7 +369,7 @@ def get_report_summary(year: str | None, cost_center: str | None, data: list[dic
         })
 
         # Plan Live Total
-        annual_plan_live = sum(flt(row.get("plan_live", 0)) for row in data)
+        annual_plan_live = sum(flt(row.get("plan_live", 0)) for row in _top_level_rows(data))
         summary.append({
             "label": _("Plan Live (Annual)"),
             "value": annual_plan_live,
@@ -345,7 +378,7 @@ def get_report_summary(year: str | None, cost_center: str | None, data: list[dic
         })
 
         # Snapshot Total
-        annual_snapshot = sum(flt(row.get("snapshot", 0)) for row in data)
+        annual_snapshot = sum(flt(row.get("snapshot", 0)) for row in _top_level_rows(data))
         summary.append({
             "label": _("Snapshot (Annual)"),
             "value": annual_snapshot,
@@ -386,6 +419,8 @@ def get_chart(data: list[dict], budget_type: str | None = None) -> dict:
         }
     else:
         # Year comparison mode - Plan vs Snapshot vs Actual
+        # (rollup mode: one bar per direct child of the selected node)
+        data = [row for row in data if row.get("indent") == 1] or _top_level_rows(data)
         labels = [row["cost_center"] for row in data]
         plan_values = [row["plan_live"] for row in data]
         snapshot_values = [row["snapshot"] for row in data]
@@ -406,7 +441,7 @@ def get_chart(data: list[dict], budget_type: str | None = None) -> dict:
         }
 
 
-def get_extra_charts(year: str | None, cost_center: str | None) -> dict:
+def get_extra_charts(year: str | None, cost_centers: list[str] | None) -> dict:
     """
     Additional charts returned via message payload.
     Rendered by JS using frappe.Chart.
@@ -433,7 +468,7 @@ def get_extra_charts(year: str | None, cost_center: str | None) -> dict:
     # Contracts by Status (Pie)
     contract_statuses = frappe.db.get_all(
         "MPIT Contract",
-        filters={"cost_center": cost_center} if cost_center else {},
+        filters=_cc_filter(cost_centers),
         fields=["status", "count(name) as total"],
         group_by="status",
     )
@@ -450,7 +485,7 @@ def get_extra_charts(year: str | None, cost_center: str | None) -> dict:
     # Projects by Status (Pie)
     project_statuses = frappe.db.get_all(
         "MPIT Project",
-        filters={"cost_center": cost_center} if cost_center else {},
+        filters=_cc_filter(cost_centers),
         fields=["workflow_state", "count(name) as total"],
         group_by="workflow_state",
     )
@@ -466,8 +501,7 @@ def get_extra_charts(year: str | None, cost_center: str | None) -> dict:
 
     # Actual Entries by Status (Percentage)
     actual_filters = {"year": year} if year else {}
-    if cost_center:
-        actual_filters["cost_center"] = cost_center
+    actual_filters.update(_cc_filter(cost_centers))
     actual_statuses = frappe.db.get_all(
         "MPIT Actual Entry",
         filters=actual_filters,
@@ -15,8 +15,10 @@ import frappe
 from frappe import _
 from frappe.utils import flt
 from master_plan_it.master_plan_it.utils.dashboard_utils import normalize_dashboard_filters
+from master_plan_it import slow_trace
 
 
+@slow_trace.traced("Report")
 def execute(filters=None):
     filters = normalize_dashboard_filters(filters)
     filters = frappe._dict(filters or {})
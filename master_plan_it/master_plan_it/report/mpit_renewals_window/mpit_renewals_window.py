@@ -6,13 +6,16 @@ import datetime
 import frappe
 from frappe import _
 from frappe.utils import add_days, cint, getdate, nowdate
+from master_plan_it.master_plan_it.utils.cost_center_scope import resolve_cost_centers
 from master_plan_it.master_plan_it.utils.dashboard_utils import normalize_dashboard_filters
+from master_plan_it import slow_trace
 
 
+@slow_trace.traced("Report")
 def execute(filters=None):
 	filters = normalize_dashboard_filters(filters)
 	filters = frappe._dict(filters or {})
-	filters.allowed_cost_centers = _resolve_cost_centers(filters.get("cost_center"), cint(filters.get("include_children")))
+	filters.allowed_cost_centers = resolve_cost_centers(filters.get("cost_center"), cint(filters.get("include_children")))
 	rows, summary = _get_data(filters)
 
 	columns = [
@@ -63,7 +66,16 @@ def _get_data(filters):
 			Contract.status,
 			Contract.end_date,
 		)
-		.where(renewal_date.isnotnull())
+	)
+
+	# Sargable window on (next_renewal_date, end_date) so the composite index applies;
+	# the Python loop below still classifies expired/in-window rows.
+	def in_window(field):
+		return field <= end_date if include_past else field[start_date:end_date]
+
+	query = query.where(
+		(Contract.next_renewal_date.isnotnull() & in_window(Contract.next_renewal_date))
+		| (Contract.next_renewal_date.isnull() & in_window(Contract.end_date))
 	)
 
 	if auto_renew_only:
@@ -132,20 +144,3 @@ def _build_chart(rows: list[dict]) -> dict | None:
 		"type": "bar",
 		"axis_options": {"x_axis_mode": "tick", "y_axis_mode": "tick"},
 	}
-
-
-def _resolve_cost_centers(cost_center: str | None, include_children: int = 0) -> list[str] | None:
-	if not cost_center:
-		return None
-	if not include_children:
-		return [cost_center]
-
-	row = frappe.db.get_value("MPIT Cost Center", cost_center, ["lft", "rgt"], as_dict=True)
-	if not row or row.lft is None or row.rgt is None:
-		frappe.throw(_("Cost Center {0} is missing tree bounds (lft/rgt).").format(cost_center))
-
-	return frappe.db.get_all(
-		"MPIT Cost Center",
-		filters={"lft": [">=", row.lft], "rgt": ["<=", row.rgt]},
-		pluck="name",
-	)
@@ -0,0 +1,31 @@
+// Copyright (c) 2026, DOT and contributors
+// For license information, please see license.txt
+
+frappe.query_reports["MPIT Scenario Comparison"] = {
+	filters: [
+		{
+			fieldname: "scenario",
+			label: __("Scenario"),
+			fieldtype: "Link",
+			options: "MPIT Scenario",
+			reqd: 1
+		},
+		{
+			fieldname: "compare_with",
+			label: __("Compare With"),
+			fieldtype: "Link",
+			options: "MPIT Scenario",
+			get_query: () => {
+				const scenario = frappe.query_report.get_filter_value("scenario");
+				return scenario ? { filters: { name: ["!=", scenario] } } : {};
+			}
+		},
+		{
+			fieldname: "group_by",
+			label: __("Group By"),
+			fieldtype: "Select",
+			options: "Cost Center\nMonth",
+			default: "Cost Center"
+		}
+	]
+};
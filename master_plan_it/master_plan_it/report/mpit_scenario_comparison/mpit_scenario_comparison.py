@@ -0,0 +1,103 @@
+from __future__ import annotations
+
+import frappe
+from frappe import _
+from frappe.utils import flt
+
+from master_plan_it import scenarios, slow_trace
+from master_plan_it.master_plan_it.utils.dashboard_utils import normalize_dashboard_filters
+
+# Report: what-if scenarios side by side with the Live budget of their year (nothing is written).
+# Inputs: scenario (required), compare_with (a second scenario of the same year), group_by (Cost Center or Month).
+# Outputs: Live and scenario annual net per row with the delta of each scenario; monthly chart and total cards.
+
+MONTH_NAMES = ["Jan", "Feb", "Mar", "Apr", "May", "Jun", "Jul", "Aug", "Sep", "Oct", "Nov", "Dec"]
+
+
+@slow_trace.traced("Report")
+def execute(filters=None):
+	filters = normalize_dashboard_filters(filters)
+	filters = frappe._dict(filters or {})
+	if not filters.get("scenario"):
+		return [], []
+
+	names = [filters.scenario]
+	if filters.get("compare_with") and filters.compare_with != filters.scenario:
+		names.append(filters.compare_with)
+	comparison = scenarios.compare(names)
+
+	group_by = filters.get("group_by") or "Cost Center"
+	columns = _get_columns(comparison["scenarios"], group_by)
+	data = _get_data(comparison, group_by)
+	message = {"live_budget": comparison["live_budget"], "year": comparison["year"]}
+	return columns, data, message, _build_chart(comparison), _build_summary(comparison)
+
+
+def _get_columns(names: list[str], group_by: str) -> list[dict]:
+	if group_by == "Month":
+		columns = [{"label": _("Month"), "fieldname": "month", "fieldtype": "Data", "width": 110}]
+	else:
+		columns = [
+			{"label": _("Cost Center"), "fieldname": "cost_center", "fieldtype": "Link", "options": "MPIT Cost Center", "width": 200}
+		]
+	columns.append({"label": _("Live"), "fieldname": "live", "fieldtype": "Currency", "width": 140})
+	for i, name in enumerate(names, start=1):
+		columns.extend(
+			[
+				{"label": name, "fieldname": f"s{i}", "fieldtype": "Currency", "width": 140},
+				{"label": _("Delta {0}").format(name), "fieldname": f"s{i}_delta", "fieldtype": "Currency", "width": 130},
+			]
+		)
+	return columns
+
+
+def _get_data(comparison: dict, group_by: str) -> list[dict]:
+	entries = comparison["months"] if group_by == "Month" else comparison["cost_centers"]
+	rows = []
+	for entry in entries:
+		if group_by == "Month":
+			year, month = entry["month"].split("-")
+			row = {"month": f"{_(MONTH_NAMES[int(month) - 1])} {year}"}
+		else:
+			row = {"cost_center": entry["cost_center"]}
+		row["live"] = entry[scenarios.LIVE]
+		for i, name in enumerate(comparison["scenarios"], start=1):
+			row[f"s{i}"] = entry[name]
+			row[f"s{i}_delta"] = flt(entry[name] - entry[scenarios.LIVE], 2)
+		rows.append(row)
+	return rows
+
+
+def _build_chart(comparison: dict) -> dict:
+	if not comparison["months"]:
+		return {}
+	keys = [scenarios.LIVE, *comparison["scenarios"]]
+	return {
+		"data": {
+			"labels": [
+				f"{_(MONTH_NAMES[int(entry['month'][5:]) - 1])} {entry['month'][:4]}" for entry in comparison["months"]
+			],
+			"datasets": [
+				{"name": _(key) if key == scenarios.LIVE else key, "values": [entry[key] for entry in comparison["months"]]}
+				for key in keys
+			],
+		},
+		"type": "line",
+		"fieldtype": "Currency",
+	}
+
+
+def _build_summary(comparison: dict) -> list[dict]:
+	totals = comparison["totals"]
+	live = totals[scenarios.LIVE]
+	summary = [{"label": _("Live"), "value": frappe.utils.fmt_money(live), "indicator": "blue"}]
+	for name in comparison["scenarios"]:
+		delta = flt(totals[name] - live, 2)
+		summary.append(
+			{
+				"label": name,
+				"value": frappe.utils.fmt_money(totals[name]),
+				"indicator": "red" if delta > 0 else "green" if delta < 0 else "grey",
+			}
+		)
+	return summary
@@ -0,0 +1,80 @@
+"""
+FILE: master_plan_it/utils/cost_center_scope.py
+SCOPO: Risolve lo scope di un Cost Center (nodo singolo o sottoalbero via Nested Set lft/rgt) per report e chart source, e calcola i rollup dei nodi gruppo.
+INPUT: Nome Cost Center + flag include_children; mappe valori per cost center da aggregare.
+OUTPUT/SIDE EFFECTS: Cache Redis del sottoalbero per nodo (invalidata dai doc_events su MPIT Cost Center); nessuna scrittura su DB.
+"""
+
+from __future__ import annotations
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt
+
+from master_plan_it import metrics
+
+CACHE_KEY = "mpit_cost_center_subtree"
+
+
+def resolve_cost_centers(cost_center: str | None, include_children: int | bool = 0) -> list[str] | None:
+	"""Return the cost centers a filter covers: None (no filter), the node itself, or its whole subtree."""
+	if not cost_center:
+		return None
+	if not cint(include_children):
+		return [cost_center]
+	return [node.name for node in get_subtree(cost_center)]
+
+
+def get_subtree(cost_center: str) -> list[frappe._dict]:
+	"""Return the node and its descendants in tree order (lft) with depth relative to the node.
+
+	Read with a single nested-set range query and cached per node until the tree changes.
+	"""
+	cached = frappe.cache().hget(CACHE_KEY, cost_center)
+	if cached is not None:
+		metrics.inc("mpit_cache_requests_total", cache="cost_center_subtree", result="hit")
+		return [frappe._dict(node) for node in cached]
+	metrics.inc("mpit_cache_requests_total", cache="cost_center_subtree", result="miss")
+
+	bounds = frappe.db.get_value("MPIT Cost Center", cost_center, ["lft", "rgt"], as_dict=True)
+	if not bounds or bounds.lft is None or bounds.rgt is None:
+		frappe.throw(_("Cost Center {0} is missing tree bounds (lft/rgt).").format(cost_center))
+
+	nodes = frappe.db.get_all(
+		"MPIT Cost Center",
+		filters={"lft": [">=", bounds.lft], "rgt": ["<=", bounds.rgt]},
+		fields=["name", "lft", "rgt", "is_group", "parent_mpit_cost_center"],
+		order_by="lft asc",
+	)
+	# Depth from the lft order: pop ancestors whose range closed before this node.
+	stack: list[int] = []
+	for node in nodes:
+		while stack and stack[-1] < node.lft:
+			stack.pop()
+		node.depth = len(stack)
+		stack.append(node.rgt)
+
+	frappe.cache().hset(CACHE_KEY, cost_center, [dict(node) for node in nodes])
+	return nodes
+
+
+def rollup(
+	subtree: list[frappe._dict], values_by_cc: dict[str, dict[str, float]], fields: list[str]
+) -> dict[str, dict[str, float]]:
+	"""Sum node values into every ancestor within the subtree (single bottom-up pass).
+
+	Returns {cost_center: {field: rolled-up total}} for every node in the subtree.
+	"""
+	totals = {node.name: {f: flt((values_by_cc.get(node.name) or {}).get(f)) for f in fields} for node in subtree}
+	for node in reversed(subtree):
+		parent = node.parent_mpit_cost_center
+		if parent in totals and node is not subtree[0]:
+			for f in fields:
+				totals[parent][f] += totals[node.name][f]
+	return {cc: {f: flt(value, 2) for f, value in row.items()} for cc, row in totals.items()}
+
+
+def clear_cache(doc=None, method: str | None = None) -> None:
+	"""doc_events handler: any tree change (insert, move, rename, delete) can shift lft/rgt of other nodes."""
+	frappe.cache().delete_value(CACHE_KEY)
+	frappe.db.after_rollback.add(lambda: frappe.cache().delete_value(CACHE_KEY))
@@ -0,0 +1,257 @@
+"""
+FILE: master_plan_it/metrics.py
+SCOPO: Metriche di salute del motore MPIT in formato Prometheus (counter e histogram) aggregate tra worker via Redis.
+INPUT: inc()/observe() dai punti strumentati (refresh Budget, report, chart, doc_events, cache); flush() negli hook after_request/after_job; scrape via export().
+OUTPUT/SIDE EFFECTS: Buffer in-process per sito, svuotato sull'hash Redis dello stesso sito (HINCRBYFLOAT in pipeline); export() restituisce il testo di esposizione Prometheus con gauge calcolati allo scrape (coda refresh, freschezza dei budget Live da budget_freshness).
+"""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+
+import frappe
+from frappe.utils import flt
+
+CACHE_KEY = "mpit_metrics"
+FLUSH_INTERVAL = 10.0
+REFRESH_JOB_PREFIX = "mpit-budget-refresh-"
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+LINE_BUCKETS = (10, 50, 100, 250, 500, 1000, 2500, 5000, 10000, 50000)
+STALENESS_BUCKETS = (1, 5, 15, 30, 60, 120, 300, 600, 1800, 3600, 21600, 86400)
+
+# name: (type, help, buckets)
+METRICS = {
+	"mpit_refresh_duration_seconds": ("histogram", "Live budget refresh_from_sources duration.", DURATION_BUCKETS),
+	"mpit_refresh_lines": ("histogram", "Generated lines per Live budget refresh.", LINE_BUCKETS),
+	"mpit_refresh_total": ("counter", "Live budget refreshes by outcome.", None),
+	"mpit_refresh_staleness_seconds": (
+		"histogram",
+		"Time from the first unprocessed source change to the Live budget refresh that includes it.",
+		STALENESS_BUCKETS,
+	),
+	"mpit_report_duration_seconds": ("histogram", "Script Report execute duration.", DURATION_BUCKETS),
+	"mpit_chart_duration_seconds": ("histogram", "Dashboard chart source get_data duration.", DURATION_BUCKETS),
+	"mpit_doc_event_duration_seconds": ("histogram", "MPIT doc_event handler duration.", DURATION_BUCKETS),
+	"mpit_cache_requests_total": ("counter", "MPIT cache lookups by cache and result (hit/miss).", None),
+}
+GAUGES = {
+	"mpit_refresh_queue_depth": "Budget refresh jobs waiting in the queue.",
+	"mpit_refresh_queue_oldest_age_seconds": "Age of the oldest queued budget refresh job.",
+	"mpit_budget_pending_changes": "Source changes not yet incorporated by the Live budget.",
+	"mpit_budget_freshness_lag_seconds": "Age of the oldest source change not yet incorporated by the Live budget.",
+}
+
+# Per site: a process (threaded web worker, multi-site job worker) serves several sites, and each
+# site's samples must only reach that site's Redis hash.
+_lock = threading.Lock()
+_buffers: dict[str, dict[str, float]] = {}
+_last_flush: dict[str, float] = {}
+
+
+def inc(name: str, amount: float = 1.0, **labels) -> None:
+	"""Increment a counter (buffered in-process)."""
+	_add(_field(name, "", labels), amount)
+
+
+def observe(name: str, value: float, **labels) -> None:
+	"""Record a histogram observation (buffered in-process, cumulative buckets)."""
+	buckets = METRICS[name][2]
+	site = _site()
+	with _lock:
+		buffer = _buffers.setdefault(site, {})
+		for bound in buckets:
+			# Empty buckets are written too, so every series exposes the full bucket set.
+			_add_locked(buffer, _field(name, "_bucket", {**labels, "le": _format_number(bound)}), 1 if value <= bound else 0)
+		_add_locked(buffer, _field(name, "_bucket", {**labels, "le": "+Inf"}), 1)
+		_add_locked(buffer, _field(name, "_sum", labels), value)
+		_add_locked(buffer, _field(name, "_count", labels), 1)
+	_maybe_flush(site)
+
+
+def observe_call(kind: str, target: str, args: tuple, seconds: float) -> None:
+	"""Duration of an instrumented entry point (see slow_trace.traced)."""
+	if kind == "Report":
+		observe("mpit_report_duration_seconds", seconds, report=target)
+	elif kind == "Chart":
+		observe("mpit_chart_duration_seconds", seconds, chart=target)
+	elif kind == "Doc Event":
+		doctype = getattr(args[0], "doctype", None) if args else None
+		observe("mpit_doc_event_duration_seconds", seconds, doctype=doctype or "", handler=target)
+
+
+def observe_refresh(line_count: int | None, seconds: float) -> None:
+	"""Outcome, duration and line count of a Live budget refresh (None lines = skipped)."""
+	if line_count is None:
+		inc("mpit_refresh_total", outcome="skipped")
+		return
+	inc("mpit_refresh_total", outcome="ok")
+	observe("mpit_refresh_duration_seconds", seconds)
+	observe("mpit_refresh_lines", line_count)
+
+
+def flush() -> None:
+	"""Push the current site's in-process buffer to its Redis hash (hook: after_request / after_job)."""
+	site = _site()
+	with _lock:
+		pending = _buffers.pop(site, None)
+		_last_flush[site] = time.monotonic()
+	if not pending:
+		return
+	try:
+		cache = frappe.cache()
+		key = cache.make_key(CACHE_KEY)
+		pipe = cache.pipeline()
+		for field, amount in pending.items():
+			pipe.hincrbyfloat(key, field, amount)
+		pipe.execute()
+	except Exception:
+		# Metrics are best effort: a Redis hiccup must not fail the request.
+		pass
+
+
+@frappe.whitelist()
+def export():
+	"""Prometheus scrape endpoint (text exposition format). Use token auth of a System Manager."""
+	frappe.only_for(("System Manager", "vCIO Manager"))
+	from werkzeug.wrappers import Response
+
+	return Response(render(), mimetype="text/plain", headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"})
+
+
+def render() -> str:
+	"""Exposition text for all metrics aggregated in Redis plus scrape-time gauges."""
+	flush()
+	cache = frappe.cache()
+	raw = _raw(cache, "hgetall", cache.make_key(CACHE_KEY)) or {}
+	samples: dict[str, list[tuple[str, dict, float]]] = {}
+	for field, value in raw.items():
+		name, suffix, labels = json.loads(field)
+		samples.setdefault(name, []).append((suffix, dict(labels), flt(_text(value))))
+
+	lines = []
+	for name, (metric_type, help_text, _buckets) in METRICS.items():
+		lines.append(f"# HELP {name} {help_text}")
+		lines.append(f"# TYPE {name} {metric_type}")
+		for suffix, labels, value in sorted(samples.get(name, []), key=_sample_sort_key):
+			lines.append(f"{name}{suffix}{_format_labels(labels)} {_format_number(value)}")
+
+	for name, values in _gauges().items():
+		lines.append(f"# HELP {name} {GAUGES[name]}")
+		lines.append(f"# TYPE {name} gauge")
+		for labels, value in values:
+			lines.append(f"{name}{_format_labels(labels)} {_format_number(value)}")
+	return "\n".join(lines) + "\n"
+
+
+def reset() -> None:
+	"""Drop all aggregated metrics of the current site (tests / manual reset)."""
+	with _lock:
+		_buffers.pop(_site(), None)
+	frappe.cache().delete_value(CACHE_KEY)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Internals
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def _gauges() -> dict[str, list[tuple[dict, float]]]:
+	from master_plan_it import budget_freshness
+
+	depth, oldest = _refresh_queue_state()
+	freshness = budget_freshness.get_live_freshness()
+	return {
+		"mpit_refresh_queue_depth": [({}, depth)],
+		"mpit_refresh_queue_oldest_age_seconds": [({}, oldest)],
+		"mpit_budget_pending_changes": [
+			({"budget": row["budget"], "year": row["year"]}, row["pending"]) for row in freshness
+		],
+		"mpit_budget_freshness_lag_seconds": [
+			({"budget": row["budget"], "year": row["year"]}, row["lag_seconds"]) for row in freshness
+		],
+	}
+
+
+def _refresh_queue_state() -> tuple[int, float]:
+	"""Queued budget refresh jobs of this site and the age of the oldest one."""
+	try:
+		from frappe.utils.background_jobs import get_queue
+		from rq.job import Job
+
+		queue = get_queue("short")
+		# Job ids are "<site>::<job id>" (frappe.utils.background_jobs.create_job_id).
+		site_prefix = f"{frappe.local.site}::"
+		job_ids = [
+			job_id
+			for job_id in queue.get_job_ids()
+			if job_id.startswith(site_prefix) and REFRESH_JOB_PREFIX in job_id[len(site_prefix) :]
+		]
+		jobs = [job for job in Job.fetch_many(job_ids, connection=queue.connection) if job]
+	except Exception:
+		return 0, 0.0
+	enqueued = [job.enqueued_at.timestamp() for job in jobs if job.enqueued_at]
+	return len(jobs), (max(0.0, time.time() - min(enqueued)) if enqueued else 0.0)
+
+
+def _raw(cache, command: str, *args):
+	"""Run a plain Redis command: RedisWrapper's hash helpers pickle values and cache them per request."""
+	pipe = cache.pipeline()
+	getattr(pipe, command)(*args)
+	return pipe.execute()[0]
+
+
+def _site() -> str:
+	return getattr(frappe.local, "site", None) or ""
+
+
+def _add(field: str, amount: float) -> None:
+	site = _site()
+	with _lock:
+		_add_locked(_buffers.setdefault(site, {}), field, amount)
+	_maybe_flush(site)
+
+
+def _add_locked(buffer: dict[str, float], field: str, amount: float) -> None:
+	buffer[field] = buffer.get(field, 0.0) + amount
+
+
+def _maybe_flush(site: str) -> None:
+	# Long-running jobs flush periodically; requests and jobs also flush when they end.
+	# Only this site's buffer is flushed: it is the site frappe.cache() keys are made for.
+	last = _last_flush.setdefault(site, time.monotonic())
+	if time.monotonic() - last >= FLUSH_INTERVAL:
+		flush()
+
+
+def _field(name: str, suffix: str, labels: dict) -> str:
+	return json.dumps([name, suffix, sorted((k, str(v)) for k, v in labels.items())], separators=(",", ":"))
+
+
+def _format_labels(labels: dict) -> str:
+	if not labels:
+		return ""
+	escaped = (
+		f'{key}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34)).replace(chr(10), "")}"'
+		for key, value in labels.items()
+	)
+	return "{" + ",".join(escaped) + "}"
+
+
+def _format_number(value: float) -> str:
+	value = float(value)
+	return str(int(value)) if value.is_integer() else repr(value)
+
+
+def _sample_sort_key(sample: tuple[str, dict, float]):
+	suffix, labels, _value = sample
+	le = labels.get("le")
+	bound = float("inf") if le == "+Inf" else flt(le) if le is not None else 0.0
+	other = sorted((k, v) for k, v in labels.items() if k != "le")
+	return (other, suffix, bound)
+
+
+def _text(value) -> str:
+	return value.decode() if isinstance(value, bytes) else str(value)
@@ -0,0 +1,157 @@
+"""
+FILE: master_plan_it/monthly_projection.py
+SCOPO: Proiezione mensile pluriennale (netto) di contratti e Planned Item per i report MPIT Monthly Plan e MPIT Contract Projection, calcolata con core.projection e messa in cache per versione dei dati sorgente.
+INPUT: Primo mese e numero di mesi della finestra; raggruppamento (cost center, tipo sorgente, vendor), indicizzazione dei rinnovi, sorgenti; get_contract_projection() whitelisted (anni futuri, mese × cost center × vendor).
+OUTPUT/SIDE EFFECTS: Letture set-based (una query per contratti, termini, Planned Item, progetti); cache Redis per (versione dati, finestra, raggruppamento), invalidata implicitamente da qualsiasi modifica delle sorgenti.
+"""
+
+from __future__ import annotations
+
+import datetime
+import hashlib
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt, getdate, nowdate
+
+from master_plan_it import metrics
+from master_plan_it.core import lines as core_lines
+from master_plan_it.core import projection as core_projection
+from master_plan_it.master_plan_it.utils.cost_center_scope import resolve_cost_centers
+
+CACHE_KEY = "mpit_monthly_projection"
+CACHE_TTL = 6 * 3600
+MAX_PROJECTION_YEARS = 10
+# Every change of a projected source moves its table's row count or latest `modified`.
+SOURCE_DOCTYPES = ("MPIT Contract", "MPIT Contract Term", "MPIT Planned Item", "MPIT Project")
+
+
+def get_projection(
+	first_month: datetime.date,
+	months: int,
+	group_by: tuple[str, ...] = ("cost_center", "source_type"),
+	indexation: float = 0.0,
+	sources: tuple[str, ...] = (core_projection.CONTRACT, core_projection.PLANNED_ITEM),
+) -> dict[tuple, list[float]]:
+	"""Monthly net amounts per group over `months` months from `first_month` (core.projection.project)."""
+	first = core_projection.month_index(first_month)
+	months = cint(months)
+	indexation = flt(indexation, 4)
+	cache_key = f"{CACHE_KEY}:{data_version()}:{first}:{months}:{','.join(group_by)}:{indexation}:{','.join(sources)}"
+	cached = frappe.cache().get_value(cache_key)
+	if cached is not None:
+		metrics.inc("mpit_cache_requests_total", cache="monthly_projection", result="hit")
+		return cached
+	metrics.inc("mpit_cache_requests_total", cache="monthly_projection", result="miss")
+
+	contracts, terms_by_contract = load_contracts() if core_projection.CONTRACT in sources else ([], {})
+	items, projects = load_planned_items() if core_projection.PLANNED_ITEM in sources else ([], {})
+	result = core_projection.project(
+		contracts, terms_by_contract, items, projects, first, months, group_by, indexation, sources
+	)
+	frappe.cache().set_value(cache_key, result, expires_in_sec=CACHE_TTL)
+	return result
+
+
+@frappe.whitelist()
+def get_contract_projection(
+	from_year: int | None = None,
+	years: int = 3,
+	indexation: float = 0,
+	cost_center: str | None = None,
+	include_children: int = 0,
+) -> list[dict]:
+	"""Recurring contract spend for future years: one row per month, cost center and vendor.
+
+	Auto-renew contracts are renewed by their cycle past `end_date` with `indexation`% per
+	renewal; defaults to the 3 years after the current one. Only non-zero amounts are returned.
+	"""
+	frappe.has_permission("MPIT Contract", "read", throw=True)
+	first_month, months = projection_window(from_year, years)
+	cost_centers = resolve_cost_centers(cost_center, include_children)
+	projection = get_projection(
+		first_month, months, ("cost_center", "vendor"), indexation, (core_projection.CONTRACT,)
+	)
+	first = core_projection.month_index(first_month)
+	rows = []
+	for (row_cost_center, vendor), amounts in sorted(projection.items(), key=lambda item: (item[0][0], item[0][1] or "")):
+		if cost_centers and row_cost_center not in cost_centers:
+			continue
+		rows.extend(
+			{
+				"month": core_projection.month_start(first + i).strftime("%Y-%m"),
+				"cost_center": row_cost_center,
+				"vendor": vendor,
+				"amount": amount,
+			}
+			for i, amount in enumerate(amounts)
+			if amount
+		)
+	return rows
+
+
+def projection_window(from_year: int | None, years: int) -> tuple[datetime.date, int]:
+	"""January of `from_year` (default: next year) and the window length for `years` years."""
+	years = cint(years) or 3
+	if not 1 <= years <= MAX_PROJECTION_YEARS:
+		frappe.throw(_("Years must be between 1 and {0}.").format(MAX_PROJECTION_YEARS))
+	from_year = cint(from_year) or getdate(nowdate()).year + 1
+	return datetime.date(from_year, 1, 1), years * 12
+
+
+def data_version() -> str:
+	"""Fingerprint of the projected sources: row count and latest `modified` of each table."""
+	selects = ", ".join(
+		f"(SELECT CONCAT(COUNT(*), '@', COALESCE(MAX(modified), '')) FROM `tab{doctype}`)" for doctype in SOURCE_DOCTYPES
+	)
+	row = frappe.db.sql(f"SELECT {selects}")[0]
+	return hashlib.sha1("|".join(str(value) for value in row).encode()).hexdigest()[:16]
+
+
+def load_contracts() -> tuple[list[core_lines.ContractRecord], dict[str, list[core_lines.ContractTermRecord]]]:
+	"""Validated contracts and their terms (ordered by from_date), one query each."""
+	statuses = list(core_lines.CONTRACT_STATUSES)
+	contracts = [
+		core_lines.from_row(core_lines.ContractRecord, row)
+		for row in frappe.get_all(
+			"MPIT Contract",
+			filters={"status": ["in", statuses]},
+			fields=core_lines.record_fields(core_lines.ContractRecord),
+		)
+	]
+	term_fields = ", ".join(f"term.`{field}`" for field in core_lines.record_fields(core_lines.ContractTermRecord))
+	terms_by_contract: dict[str, list] = {}
+	for row in frappe.db.sql(
+		f"""
+		SELECT {term_fields}
+		FROM `tabMPIT Contract Term` term
+		JOIN `tabMPIT Contract` contract ON contract.name = term.parent
+		WHERE term.parenttype = 'MPIT Contract' AND contract.status IN %(statuses)s
+		ORDER BY term.parent, term.from_date
+		""",
+		{"statuses": tuple(statuses)},
+		as_dict=True,
+	):
+		terms_by_contract.setdefault(row.parent, []).append(core_lines.from_row(core_lines.ContractTermRecord, row))
+	return contracts, terms_by_contract
+
+
+def load_planned_items() -> tuple[list[core_lines.PlannedItemRecord], dict[str, core_lines.ProjectRecord]]:
+	"""Submitted, uncovered Planned Items (in or out of the budget horizon) and the Approved projects."""
+	items = [
+		core_lines.from_row(core_lines.PlannedItemRecord, row)
+		for row in frappe.get_all(
+			"MPIT Planned Item",
+			filters={"docstatus": 1, "is_covered": 0},
+			fields=core_lines.record_fields(core_lines.PlannedItemRecord),
+		)
+	]
+	projects = {
+		row.name: core_lines.from_row(core_lines.ProjectRecord, row)
+		for row in frappe.get_all(
+			"MPIT Project",
+			filters={"workflow_state": core_lines.APPROVED_PROJECT_STATE},
+			fields=core_lines.record_fields(core_lines.ProjectRecord),
+		)
+	}
+	return items, projects
@@ -0,0 +1,14 @@
+"""
+FILE: master_plan_it/patches/v0_2/add_actual_entry_keyset_index.py
+SCOPO: Crea l'indice (posting_date, name) usato dalla paginazione keyset del report MPIT Actual Entries per i siti esistenti.
+INPUT: on_doctype_update di MPIT Actual Entry (stessa definizione usata al sync del DocType).
+OUTPUT/SIDE EFFECTS: ALTER TABLE ADD INDEX solo se l'indice manca (idempotente).
+"""
+
+from __future__ import annotations
+
+from master_plan_it.master_plan_it.doctype.mpit_actual_entry import mpit_actual_entry
+
+
+def execute():
+	mpit_actual_entry.on_doctype_update()
@@ -0,0 +1,18 @@
+"""
+FILE: master_plan_it/patches/v0_2/add_hot_path_indexes.py
+SCOPO: Crea gli indici compositi sui percorsi caldi (Budget Line, Actual Entry, Planned Item, Contract) per i siti esistenti.
+INPUT: on_doctype_update dei controller (stessa definizione usata al sync dei DocType).
+OUTPUT/SIDE EFFECTS: ALTER TABLE ADD INDEX solo se l'indice manca (idempotente).
+"""
+
+from __future__ import annotations
+
+from master_plan_it.master_plan_it.doctype.mpit_actual_entry import mpit_actual_entry
+from master_plan_it.master_plan_it.doctype.mpit_budget_line import mpit_budget_line
+from master_plan_it.master_plan_it.doctype.mpit_contract import mpit_contract
+from master_plan_it.master_plan_it.doctype.mpit_planned_item import mpit_planned_item
+
+
+def execute():
+	for module in (mpit_budget_line, mpit_actual_entry, mpit_planned_item, mpit_contract):
+		module.on_doctype_update()
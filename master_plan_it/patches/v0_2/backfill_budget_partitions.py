@@ -0,0 +1,24 @@
+"""
+FILE: master_plan_it/patches/v0_2/backfill_budget_partitions.py
+SCOPO: Crea le MPIT Budget Partition (subtotali per Cost Center) dei budget Live esistenti, refreshati prima dell'introduzione delle partizioni.
+INPUT: Budget Live e le loro righe salvate; sequenza e data dell'ultimo refresh completo dalla testata.
+OUTPUT/SIDE EFFECTS: Sync completo di ogni budget Live (partizioni e totali di testata dalle righe, idempotente); i refresh parziali successivi applicano delta corretti.
+"""
+
+from __future__ import annotations
+
+import frappe
+from frappe.utils import cint, now_datetime
+
+from master_plan_it import budget_partitions
+
+
+def execute():
+	for budget in frappe.get_all(
+		"MPIT Budget",
+		filters={"budget_type": "Live"},
+		fields=["name", "year", "refreshed_change_seq", "last_refreshed_at"],
+	):
+		budget_partitions.sync(
+			budget, None, cint(budget.refreshed_change_seq), budget.last_refreshed_at or now_datetime()
+		)
@@ -0,0 +1,14 @@
+"""
+FILE: master_plan_it/patches/v0_2/backfill_cap_counters.py
+SCOPO: Popola MPIT Cap Counter (allowance/addendum/actual per year+cost_center) per i dati esistenti.
+INPUT: Puntatori current_snapshot su MPIT Year (backfill_year_budget_pointers), Addendum submitted, Actual Entry Verified.
+OUTPUT/SIDE EFFECTS: Crea/aggiorna i contatori (idempotente); da qui in poi sono mantenuti dai doc_events in cap_counters.
+"""
+
+from __future__ import annotations
+
+from master_plan_it import cap_counters
+
+
+def execute():
+	cap_counters.rebuild_all()
@@ -0,0 +1,18 @@
+"""
+FILE: master_plan_it/patches/v0_2/backfill_cashflow_entries.py
+SCOPO: Materializza le MPIT Cashflow Entry dei budget Live esistenti, refreshati prima dell'introduzione del calendario di cassa.
+INPUT: Budget Live, limiti del loro anno fiscale e sorgenti correnti (contratti con termini, Planned Item con progetti).
+OUTPUT/SIDE EFFECTS: Fatti di cassa di ogni budget Live ricostruiti da zero (idempotente); righe e totali dei budget invariati.
+"""
+
+from __future__ import annotations
+
+import frappe
+
+from master_plan_it import annualization, budget_refresh_pipeline
+
+
+def execute():
+	for budget in frappe.get_all("MPIT Budget", filters={"budget_type": "Live"}, fields=["name", "year"]):
+		year_start, year_end = annualization.get_year_bounds(budget.year)
+		budget_refresh_pipeline.rebuild_cashflow(budget.name, budget.year, year_start, year_end)
@@ -0,0 +1,19 @@
+"""
+FILE: master_plan_it/patches/v0_2/backfill_year_budget_pointers.py
+SCOPO: Popola i puntatori `live_budget` / `current_snapshot` su MPIT Year per i dati esistenti.
+INPUT: Budget Live e Snapshot submitted già presenti.
+OUTPUT/SIDE EFFECTS: Aggiorna MPIT Year (idempotente); i budget creati dopo la migrazione sono gestiti dagli hook di MPIT Budget.
+"""
+
+from __future__ import annotations
+
+import frappe
+
+from master_plan_it.master_plan_it.doctype.mpit_year import mpit_year
+
+
+def execute():
+	for year in frappe.get_all("MPIT Year", pluck="name"):
+		live = frappe.db.get_value("MPIT Budget", {"year": year, "budget_type": "Live", "docstatus": 0}, "name")
+		mpit_year.set_budget_pointer(year, mpit_year.LIVE_BUDGET_FIELD, live)
+		mpit_year.recompute_current_snapshot(year)
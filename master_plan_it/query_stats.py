@@ -0,0 +1,166 @@
+"""
+FILE: master_plan_it/query_stats.py
+SCOPO: Conta gli statement SQL e il tempo DB per request HTTP, background job o blocco di codice (rilevazione di pattern N+1).
+INPUT: Hook before_request/after_request e before_job/after_job (attivi con site_config `mpit_query_stats`); context manager track() per test e devtools.
+OUTPUT/SIDE EFFECTS: Wrapper temporaneo su frappe.db.sql finché un tracker è attivo; header X-MPIT-Query-Count/X-MPIT-DB-Time-Ms sulle response e log "mpit_query_stats" oltre soglia (`mpit_query_stats_threshold`).
+"""
+
+from __future__ import annotations
+
+import time
+from contextlib import contextmanager
+
+import frappe
+
+DEFAULT_LOG_THRESHOLD = 100
+
+
+class QueryStats:
+	"""Statement count and DB time collected while a tracker is active."""
+
+	__slots__ = ("label", "count", "selects", "db_time", "record_queries", "queries")
+
+	def __init__(self, label: str | None = None, record_queries: bool = False) -> None:
+		self.label = label
+		self.count = 0
+		self.selects = 0
+		self.db_time = 0.0
+		self.record_queries = record_queries
+		self.queries: list[tuple[str, float]] = []
+
+	def add(self, query, elapsed: float) -> None:
+		self.count += 1
+		self.db_time += elapsed
+		text = str(query).lstrip()
+		if text[:6].upper() == "SELECT":
+			self.selects += 1
+		if self.record_queries:
+			self.queries.append((text, elapsed))
+
+	def as_dict(self) -> dict:
+		return {
+			"label": self.label,
+			"count": self.count,
+			"selects": self.selects,
+			"db_ms": round(self.db_time * 1000, 2),
+		}
+
+
+@contextmanager
+def track(label: str | None = None, record_queries: bool = False):
+	"""Count every statement run through frappe.db.sql inside the block (trackers can be nested)."""
+	stats = start(label, record_queries)
+	try:
+		yield stats
+	finally:
+		stop(stats)
+
+
+def start(label: str | None = None, record_queries: bool = False) -> QueryStats:
+	stats = QueryStats(label, record_queries)
+	_stack().append(stats)
+	_install()
+	return stats
+
+
+def stop(stats: QueryStats) -> QueryStats:
+	stack = _stack()
+	if stats in stack:
+		stack.remove(stats)
+	if not stack:
+		_uninstall()
+	return stats
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Hooks (request / job)
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def before_request() -> None:
+	if not frappe.conf.get("mpit_query_stats"):
+		return
+	frappe.local.mpit_request_stats = start(frappe.form_dict.get("cmd") or _request_path())
+
+
+def after_request(response=None, request=None) -> None:
+	stats = getattr(frappe.local, "mpit_request_stats", None)
+	if not stats:
+		return
+	frappe.local.mpit_request_stats = None
+	stop(stats)
+	if response is not None:
+		response.headers["X-MPIT-Query-Count"] = str(stats.count)
+		response.headers["X-MPIT-DB-Time-Ms"] = str(round(stats.db_time * 1000, 2))
+	_log(stats, "request")
+
+
+def before_job(method: str | None = None, kwargs: dict | None = None, transaction_type: str | None = None) -> None:
+	if not frappe.conf.get("mpit_query_stats"):
+		return
+	frappe.local.mpit_job_stats = start(method)
+
+
+def after_job(method: str | None = None, kwargs: dict | None = None, result=None) -> None:
+	stats = getattr(frappe.local, "mpit_job_stats", None)
+	if not stats:
+		return
+	frappe.local.mpit_job_stats = None
+	stop(stats)
+	_log(stats, "job")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Internals
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def _stack() -> list[QueryStats]:
+	if getattr(frappe.local, "mpit_query_stats", None) is None:
+		frappe.local.mpit_query_stats = []
+	return frappe.local.mpit_query_stats
+
+
+def _install() -> None:
+	db = frappe.db
+	if not db or getattr(db.sql, "_mpit_query_stats", False):
+		return
+	original_sql = db.sql
+
+	def counting_sql(query, *args, **kwargs):
+		started = time.perf_counter()
+		try:
+			return original_sql(query, *args, **kwargs)
+		finally:
+			elapsed = time.perf_counter() - started
+			for stats in _stack():
+				stats.add(query, elapsed)
+
+	counting_sql._mpit_query_stats = True
+	counting_sql._mpit_original = original_sql
+	db.sql = counting_sql
+
+
+def _uninstall() -> None:
+	db = frappe.db
+	wrapper = getattr(db, "sql", None) if db else None
+	if not getattr(wrapper, "_mpit_query_stats", False):
+		return
+	original_sql = wrapper._mpit_original
+	# Drop the instance attribute when the original was the bound class method.
+	if getattr(original_sql, "__self__", None) is db and "sql" in db.__dict__:
+		del db.__dict__["sql"]
+	else:
+		db.sql = original_sql
+
+
+def _request_path() -> str | None:
+	request = getattr(frappe.local, "request", None)
+	return request.path if request else None
+
+
+def _log(stats: QueryStats, kind: str) -> None:
+	threshold = frappe.conf.get("mpit_query_stats_threshold") or DEFAULT_LOG_THRESHOLD
+	if stats.count < int(threshold):
+		return
+	frappe.logger("mpit_query_stats").info({"kind": kind, **stats.as_dict()})
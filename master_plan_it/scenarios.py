@@ -0,0 +1,305 @@
+"""
+FILE: master_plan_it/scenarios.py
+SCOPO: Scenari what-if sul budget Live: le sorgenti dell'anno (contratti con termini, Planned Item, progetti) sono caricate una volta in un modello in memoria, gli override di uno scenario (stato, importi, date, approvazione progetto, copertura) sono applicati ai record e righe e totali per Cost Center / mese sono ricalcolati come nel refresh, senza scritture.
+INPUT: Documenti MPIT Scenario (override per sorgente e campo); compare() whitelisted con uno o più scenari dello stesso anno.
+OUTPUT/SIDE EFFECTS: Solo letture (una query per tabella sorgente, una per le righe del budget Live); modello in cache Redis per (anno, versione dati sorgente); nessuna modifica a sorgenti o budget.
+"""
+
+from __future__ import annotations
+
+import datetime
+from dataclasses import dataclass, field, replace
+
+import frappe
+from frappe import _
+from frappe.utils import cint, flt, getdate
+
+from master_plan_it import annualization, metrics, monthly_projection, mpit_defaults
+from master_plan_it.budget_refresh_pipeline import FIELD_DEFAULTS
+from master_plan_it.core import lines as core_lines
+from master_plan_it.core import projection as core_projection
+from master_plan_it.core.errors import CoreValidationError
+from master_plan_it.master_plan_it.doctype.mpit_budget import mpit_budget
+from master_plan_it.master_plan_it.doctype.mpit_year.mpit_year import get_live_budget
+
+CACHE_KEY = "mpit_scenario_model"
+CACHE_TTL = 3600
+LIVE = "Live"
+
+CONTRACT = "MPIT Contract"
+PLANNED_ITEM = "MPIT Planned Item"
+PROJECT = "MPIT Project"
+# Fields a scenario may override, per source DocType, with the type used to read the value.
+OVERRIDE_FIELDS = {
+	CONTRACT: {
+		"status": "Select",
+		"current_amount": "Currency",
+		"start_date": "Date",
+		"end_date": "Date",
+		"billing_cycle": "Select",
+		"cost_center": "Link",
+	},
+	PLANNED_ITEM: {
+		"amount_net": "Currency",
+		"start_date": "Date",
+		"end_date": "Date",
+		"spend_date": "Date",
+		"is_covered": "Check",
+	},
+	PROJECT: {
+		"workflow_state": "Data",
+		"cost_center": "Link",
+	},
+}
+_LINK_OPTIONS = {"cost_center": "MPIT Cost Center"}
+
+
+@dataclass
+class SourceModel:
+	"""Every source that can produce Live lines for a year, including those excluded today.
+
+	Contracts of any status, submitted Planned Items whether covered or not and all projects,
+	so that an override can bring a source into the budget as well as take it out.
+	"""
+
+	year: str
+	year_start: datetime.date
+	year_end: datetime.date
+	contracts: dict[str, core_lines.ContractRecord] = field(default_factory=dict)
+	terms_by_contract: dict[str, list[core_lines.ContractTermRecord]] = field(default_factory=dict)
+	items: dict[str, core_lines.PlannedItemRecord] = field(default_factory=dict)
+	covered: frozenset[str] = frozenset()
+	projects: dict[str, core_lines.ProjectRecord] = field(default_factory=dict)
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Model
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def get_model(year: str) -> SourceModel:
+	"""Source model of a year, cached until any contract, term, Planned Item or project changes."""
+	cache_key = f"{CACHE_KEY}:{year}:{monthly_projection.data_version()}"
+	cached = frappe.cache().get_value(cache_key)
+	if cached is not None:
+		metrics.inc("mpit_cache_requests_total", cache="scenario_model", result="hit")
+		return cached
+	metrics.inc("mpit_cache_requests_total", cache="scenario_model", result="miss")
+	model = load_model(year)
+	frappe.cache().set_value(cache_key, model, expires_in_sec=CACHE_TTL)
+	return model
+
+
+def load_model(year: str) -> SourceModel:
+	year_start, year_end = annualization.get_year_bounds(year)
+	model = SourceModel(str(year), year_start, year_end)
+
+	model.contracts = {
+		row.name: core_lines.from_row(core_lines.ContractRecord, row)
+		for row in frappe.get_all("MPIT Contract", fields=core_lines.record_fields(core_lines.ContractRecord))
+	}
+	for row in frappe.get_all(
+		"MPIT Contract Term",
+		filters={"parenttype": "MPIT Contract"},
+		fields=core_lines.record_fields(core_lines.ContractTermRecord),
+		order_by="parent, from_date asc",
+	):
+		model.terms_by_contract.setdefault(row.parent, []).append(core_lines.from_row(core_lines.ContractTermRecord, row))
+
+	covered = set()
+	for row in frappe.get_all(
+		"MPIT Planned Item",
+		filters={"docstatus": 1},
+		fields=[*core_lines.record_fields(core_lines.PlannedItemRecord), "is_covered"],
+	):
+		model.items[row.name] = core_lines.from_row(core_lines.PlannedItemRecord, row)
+		if cint(row.is_covered):
+			covered.add(row.name)
+	model.covered = frozenset(covered)
+
+	model.projects = {
+		row.name: core_lines.from_row(core_lines.ProjectRecord, row)
+		for row in frappe.get_all("MPIT Project", fields=core_lines.record_fields(core_lines.ProjectRecord))
+	}
+	return model
+
+
+def apply_overrides(model: SourceModel, overrides: list) -> SourceModel:
+	"""A copy of the model with the overrides applied (the cached model is never mutated).
+
+	An amount override on a contract prices it flat from current_amount: its terms are dropped.
+	Overrides of sources missing from the model (deleted, Planned Items not submitted) are ignored.
+	"""
+	contracts, terms_by_contract = dict(model.contracts), dict(model.terms_by_contract)
+	items, projects, covered = dict(model.items), dict(model.projects), set(model.covered)
+	for override in overrides:
+		value = parse_value(override.source_type, override.field, override.value)
+		if override.source_type == CONTRACT and override.source_name in contracts:
+			contracts[override.source_name] = replace(contracts[override.source_name], **{override.field: value})
+			if override.field == "current_amount":
+				terms_by_contract.pop(override.source_name, None)
+		elif override.source_type == PLANNED_ITEM and override.source_name in items:
+			if override.field == "is_covered":
+				(covered.add if value else covered.discard)(override.source_name)
+			elif override.field == "amount_net":
+				# The gross amount is only a fallback for a missing net amount: keep them aligned.
+				items[override.source_name] = replace(items[override.source_name], amount=value, amount_net=value)
+			else:
+				items[override.source_name] = replace(items[override.source_name], **{override.field: value})
+		elif override.source_type == PROJECT and override.source_name in projects:
+			projects[override.source_name] = replace(projects[override.source_name], **{override.field: value})
+	return replace(
+		model,
+		contracts=contracts,
+		terms_by_contract=terms_by_contract,
+		items=items,
+		covered=frozenset(covered),
+		projects=projects,
+	)
+
+
+def evaluate(model: SourceModel) -> list[frappe._dict]:
+	"""Live lines the model would generate, with amounts computed as in the refresh (not saved)."""
+	contracts = [
+		contract for contract in model.contracts.values() if contract.status in core_lines.CONTRACT_STATUSES
+	]
+	items = [item for name, item in model.items.items() if name not in model.covered]
+	try:
+		payloads = core_lines.generate_contract_lines(
+			contracts, model.terms_by_contract, model.year_start, model.year_end
+		) + core_lines.generate_planned_item_lines(items, model.projects, model.year_start, model.year_end)
+	except CoreValidationError as exc:
+		frappe.throw(_(exc.message).format(*exc.format_args))
+
+	lines = []
+	for payload in payloads:
+		line = frappe._dict(FIELD_DEFAULTS)
+		line.update({key: value for key, value in payload.items() if value is not None or key not in FIELD_DEFAULTS})
+		lines.append(line)
+	mpit_budget.compute_lines_amounts(
+		lines, model.year, model.year_start, model.year_end, mpit_defaults.get_default_vat_rate()
+	)
+	return lines
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Overrides
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def parse_value(source_type: str, fieldname: str, value):
+	"""Override value as the record field type (empty clears dates and links)."""
+	fieldtype = OVERRIDE_FIELDS.get(source_type, {}).get(fieldname)
+	if not fieldtype:
+		frappe.throw(_("Field {0} cannot be overridden on {1}.").format(fieldname, _(source_type or "")))
+	if fieldtype == "Currency":
+		return flt(value)
+	if fieldtype == "Check":
+		return cint(value)
+	if value in (None, ""):
+		return None
+	if fieldtype == "Date":
+		try:
+			return getdate(value)
+		except Exception:
+			frappe.throw(_("Invalid date {0} for field {1}.").format(value, fieldname))
+	return str(value).strip()
+
+
+def validate_overrides(overrides: list) -> None:
+	"""Allowed fields and valid values; one override per source and field."""
+	seen = set()
+	for row in overrides:
+		key = (row.source_type, row.source_name, row.field)
+		if key in seen:
+			frappe.throw(
+				_("Row {0}: {1} of {2} is overridden more than once.").format(row.idx, row.field, row.source_name)
+			)
+		seen.add(key)
+		value = parse_value(row.source_type, row.field, row.value)
+		fieldtype = OVERRIDE_FIELDS[row.source_type][row.field]
+		if fieldtype == "Select":
+			options = (frappe.get_meta(row.source_type).get_options(row.field) or "").split("\n")
+			if value not in options:
+				frappe.throw(_("Row {0}: {1} is not a valid value for {2}.").format(row.idx, value, row.field))
+		elif fieldtype == "Link" and value and not frappe.db.exists(_LINK_OPTIONS[row.field], value):
+			frappe.throw(
+				_("Row {0}: {1} {2} not found.").format(row.idx, _(_LINK_OPTIONS[row.field]), value)
+			)
+		elif fieldtype == "Data" and not value:
+			frappe.throw(_("Row {0}: a value is required for {1}.").format(row.idx, row.field))
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Comparison
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def live_totals(year: str, year_start: datetime.date, year_end: datetime.date) -> frappe._dict:
+	"""Totals of the stored lines of the year's Live budget (empty without a Live budget)."""
+	budget = get_live_budget(year)
+	lines = []
+	if budget:
+		lines = frappe.get_all(
+			"MPIT Budget Line",
+			filters={"parent": budget, "parenttype": "MPIT Budget", "parentfield": "lines"},
+			fields=["cost_center", "annual_net", "period_start_date", "period_end_date"],
+		)
+	result = frappe._dict(core_projection.line_totals(lines, year_start, year_end))
+	result.budget = budget
+	return result
+
+
+def compare_scenarios(scenarios: list[str]) -> dict:
+	"""Live budget and each scenario side by side: totals per cost center and month.
+
+	All scenarios must belong to the same year; the source model is loaded once for all of them.
+	"""
+	docs = [frappe.get_cached_doc("MPIT Scenario", name) for name in scenarios]
+	years = {str(doc.year) for doc in docs}
+	if len(years) != 1:
+		frappe.throw(_("Compared scenarios must belong to the same year."))
+	model = get_model(years.pop())
+	live = live_totals(model.year, model.year_start, model.year_end)
+	results = {LIVE: live}
+	for doc in docs:
+		results[doc.name] = frappe._dict(
+			core_projection.line_totals(evaluate(apply_overrides(model, doc.overrides)), model.year_start, model.year_end)
+		)
+
+	cost_centers = sorted({cost_center for result in results.values() for cost_center in result.cost_centers})
+	first = core_projection.month_index(model.year_start)
+	return {
+		"year": model.year,
+		"live_budget": live.budget,
+		"scenarios": [doc.name for doc in docs],
+		"cost_centers": [
+			{
+				"cost_center": cost_center,
+				**{key: result.cost_centers.get(cost_center, 0.0) for key, result in results.items()},
+			}
+			for cost_center in cost_centers
+		],
+		"months": [
+			{
+				"month": core_projection.month_start(first + offset).strftime("%Y-%m"),
+				**{key: result.months[offset] for key, result in results.items()},
+			}
+			for offset in range(len(live.months))
+		],
+		"totals": {key: result.total for key, result in results.items()},
+	}
+
+
+@frappe.whitelist()
+def compare(scenarios) -> dict:
+	"""Compare one or more scenarios (name or JSON list) with the Live budget of their year."""
+	if isinstance(scenarios, str):
+		scenarios = frappe.parse_json(scenarios) if scenarios.startswith("[") else [scenarios]
+	scenarios = [name for name in scenarios or [] if name]
+	if not scenarios:
+		frappe.throw(_("Select at least one scenario."))
+	frappe.has_permission("MPIT Budget", "read", throw=True)
+	for name in scenarios:
+		frappe.has_permission("MPIT Scenario", "read", name, throw=True)
+	return compare_scenarios(scenarios)
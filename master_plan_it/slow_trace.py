@@ -0,0 +1,167 @@
+"""
+FILE: master_plan_it/slow_trace.py
+SCOPO: Campionatore dei percorsi lenti: misura report, chart source, doc_events e refresh del Budget e registra le chiamate oltre soglia in MPIT Slow Trace.
+INPUT: Decoratore traced() / context manager trace(); MPIT Settings (slow_trace_enabled, threshold, sample rate, retention).
+OUTPUT/SIDE EFFECTS: Sulle chiamate campionate attiva query_stats e cProfile; oltre soglia accoda l'inserimento di MPIT Slow Trace (filtri, durata, query con tempi, top frame). Purge giornaliero per retention.
+"""
+
+from __future__ import annotations
+
+import cProfile
+import functools
+import json
+import pstats
+import random
+import time
+from contextlib import contextmanager
+from typing import Callable
+
+import frappe
+from frappe.model.document import Document
+from frappe.utils import add_days, cint, flt, now_datetime
+
+from master_plan_it import metrics, query_stats
+
+TRACE_DOCTYPE = "MPIT Slow Trace"
+MAX_QUERIES = 200
+MAX_QUERY_LENGTH = 1000
+TOP_FRAMES = 20
+
+
+def traced(kind: str, target: str | None = None) -> Callable:
+	"""Decorate a report execute, chart get_data or doc_event handler with the slow-path sampler and duration metrics."""
+
+	def decorator(fn: Callable) -> Callable:
+		name = target or f"{fn.__module__.rsplit('.', 1)[-1]}.{fn.__name__}"
+
+		@functools.wraps(fn)
+		def wrapper(*args, **kwargs):
+			started = time.perf_counter()
+			try:
+				with trace(kind, name, lambda: _describe_call(args, kwargs)):
+					return fn(*args, **kwargs)
+			finally:
+				# Every call feeds the duration histograms; only sampled ones are profiled.
+				metrics.observe_call(kind, name, args, time.perf_counter() - started)
+
+		return wrapper
+
+	return decorator
+
+
+@contextmanager
+def trace(kind: str, target: str, filters=None):
+	"""Sample the enclosed call; record it when it runs longer than the configured threshold.
+
+	`filters` may be a value or a callable, evaluated only for recorded calls. Nested traces
+	(e.g. a refresh run inside a traced doc event) are covered by the outermost one.
+	"""
+	settings = _settings()
+	if not settings or getattr(frappe.local, "mpit_slow_trace_active", False) or not _sampled(settings):
+		yield
+		return
+
+	frappe.local.mpit_slow_trace_active = True
+	stats = query_stats.start(target, record_queries=True)
+	profiler = cProfile.Profile()
+	try:
+		profiler.enable()
+	except ValueError:
+		# Another profiler is active (e.g. the Frappe recorder): keep timings and queries only.
+		profiler = None
+	started = time.perf_counter()
+	try:
+		yield
+	finally:
+		if profiler:
+			profiler.disable()
+		duration_ms = (time.perf_counter() - started) * 1000
+		query_stats.stop(stats)
+		frappe.local.mpit_slow_trace_active = False
+		if duration_ms >= settings["threshold_ms"]:
+			_record(kind, target, filters() if callable(filters) else filters, duration_ms, stats, profiler)
+
+
+def insert_trace(payload: dict) -> None:
+	"""Background job: persist a recorded trace in its own transaction."""
+	frappe.get_doc({"doctype": TRACE_DOCTYPE, **payload}).insert(ignore_permissions=True)
+	frappe.db.commit()
+
+
+def purge_expired() -> None:
+	"""Scheduler entry point: delete traces older than the retention window."""
+	days = cint(frappe.db.get_single_value("MPIT Settings", "slow_trace_retention_days")) or 14
+	frappe.db.delete(TRACE_DOCTYPE, {"creation": ("<", add_days(now_datetime(), -days))})
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Internals
+# ─────────────────────────────────────────────────────────────────────────────
+
+
+def _settings() -> dict | None:
+	"""Sampler settings, or None when disabled (read from the cached Settings singleton)."""
+	try:
+		settings = frappe.get_cached_doc("MPIT Settings")
+	except Exception:
+		return None
+	if not cint(settings.get("slow_trace_enabled")):
+		return None
+	return {
+		"threshold_ms": flt(settings.get("slow_trace_threshold_ms")) or 2000.0,
+		"sample_rate": flt(settings.get("slow_trace_sample_rate")),
+	}
+
+
+def _sampled(settings: dict) -> bool:
+	return random.random() * 100 < settings["sample_rate"]
+
+
+def _record(kind: str, target: str, filters, duration_ms: float, stats: query_stats.QueryStats, profiler) -> None:
+	payload = {
+		"trace_kind": kind,
+		"target": target,
+		"trace_user": frappe.session.user if getattr(frappe.local, "session", None) else None,
+		"duration_ms": flt(duration_ms, 2),
+		"query_count": stats.count,
+		"db_time_ms": flt(stats.db_time * 1000, 2),
+		"filters": json.dumps(filters, default=str, indent=1) if filters is not None else None,
+		"queries": json.dumps(
+			[
+				{"ms": flt(elapsed * 1000, 3), "query": query[:MAX_QUERY_LENGTH]}
+				for query, elapsed in stats.queries[:MAX_QUERIES]
+			],
+			indent=1,
+		),
+		"frames": _top_frames(profiler),
+	}
+	try:
+		frappe.enqueue("master_plan_it.slow_trace.insert_trace", queue="short", payload=payload)
+	except Exception:
+		# Tracing must never break the traced call.
+		frappe.log_error(frappe.get_traceback(), "MPIT Slow Trace enqueue failed")
+
+
+def _top_frames(profiler) -> str | None:
+	"""Functions with the highest cumulative time, one per line: cumulative ms, own ms, calls, location."""
+	if not profiler:
+		return None
+	stats = pstats.Stats(profiler)
+	rows = sorted(stats.stats.items(), key=lambda item: item[1][3], reverse=True)
+	lines = []
+	for (filename, lineno, func), (_cc, calls, own, cumulative, _callers) in rows:
+		if filename == __file__ or "contextlib" in filename:
+			continue
+		lines.append(f"{cumulative * 1000:10.1f} {own * 1000:10.1f} {calls:8d}  {filename}:{lineno}({func})")
+		if len(lines) >= TOP_FRAMES:
+			break
+	return "\n".join(lines)
+
+
+def _describe_call(args: tuple, kwargs: dict):
+	"""Filters of a report/chart call, or the document of a doc_event handler."""
+	first = args[0] if args else kwargs.get("filters", kwargs.get("doc"))
+	if isinstance(first, Document):
+		method = kwargs.get("method") or (args[1] if len(args) > 1 else None)
+		return {"doctype": first.doctype, "name": first.name, "method": method}
+	return first
@@ -6,67 +6,16 @@ Tax/VAT calculation helpers for MPIT.
 
 Provides strict VAT normalization with 2-decimal precision.
 All Currency fields must be split into net/vat/gross components.
+
+The arithmetic lives in master_plan_it.core.tax (no Frappe import); this module adds
+the strict VAT validation error raised to the user.
 """
 
 from __future__ import annotations
 
 import frappe
-from frappe.utils import flt
-
 
-def split_net_vat_gross(
-	amount: float,
-	vat_rate_pct: float | None,
-	includes_vat: bool,
-	precision: int = 2
-) -> tuple[float, float, float]:
-	"""
-	Split an amount into net, vat, and gross components.
-	
-	Args:
-		amount: The input amount (can be net or gross depending on includes_vat)
-		vat_rate_pct: VAT rate as percentage (e.g., 22.0 for 22%). Can be None if amount is 0.
-		includes_vat: True if amount includes VAT (gross), False if amount is net
-		precision: Decimal precision for rounding (default: 2)
-	
-	Returns:
-		tuple: (net, vat, gross) all rounded to specified precision
-	
-	Examples:
-		>>> split_net_vat_gross(100.0, 22.0, False, 2)
-		(100.0, 22.0, 122.0)  # Input is net
-		
-		>>> split_net_vat_gross(122.0, 22.0, True, 2)
-		(100.0, 22.0, 122.0)  # Input is gross
-		
-		>>> split_net_vat_gross(0.0, None, False, 2)
-		(0.0, 0.0, 0.0)  # Zero amount
-	"""
-	# Handle zero amount
-	if not amount or flt(amount, precision) == 0:
-		return (0.0, 0.0, 0.0)
-	
-	# VAT rate is required for non-zero amounts (will be validated in controller)
-	if vat_rate_pct is None:
-		# This will be caught by strict VAT validation in validate()
-		# For calculation purposes, treat as 0
-		vat_rate_pct = 0.0
-	
-	# Convert percentage to decimal
-	vat_rate = flt(vat_rate_pct, precision) / 100.0
-	
-	if includes_vat:
-		# Input is gross, extract net and vat
-		gross = flt(amount, precision)
-		net = flt(gross / (1 + vat_rate), precision)
-		vat = flt(gross - net, precision)
-	else:
-		# Input is net, calculate gross and vat
-		net = flt(amount, precision)
-		gross = flt(net * (1 + vat_rate), precision)
-		vat = flt(gross - net, precision)
-	
-	return (net, vat, gross)
+from master_plan_it.core.tax import resolve_vat_rate, split_net_vat_gross  # noqa: F401
 
 
 def validate_strict_vat(
@@ -95,21 +44,10 @@ def validate_strict_vat(
 	Raises:
 		frappe.ValidationError: If strict VAT rules are violated
 	"""
-	# If amount is zero, VAT rate is optional (default to 0)
-	if not amount or flt(amount, 2) == 0:
-		if vat_rate is not None:
-			return flt(vat_rate, 2)
-		if default_vat_rate is not None:
-			return flt(default_vat_rate, 2)
-		return 0.0
-	
-	# Amount is non-zero: VAT rate is REQUIRED
-	# Priority: row vat_rate > user default > ERROR
-	if vat_rate is not None:
-		return flt(vat_rate, 2)
-	
-	if default_vat_rate is not None:
-		return flt(default_vat_rate, 2)
+	# Zero amount: VAT rate optional. Non-zero: row vat_rate > user default > ERROR
+	rate = resolve_vat_rate(amount, vat_rate, default_vat_rate)
+	if rate is not None:
+		return rate
 	
 	# No VAT rate found: BLOCK save
 	frappe.throw(
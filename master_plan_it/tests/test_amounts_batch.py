@@ -0,0 +1,135 @@
+"""
+Columnar money kernel (core.amounts.compute_line_amounts_batch) against results captured from the
+scalar compute_line_amounts before the batch refactor, plus consistency with core.tax over
+randomized inputs covering every recurrence rule, entry path, VAT rate and overlap.
+
+Frappe-free (imports master_plan_it.core only):
+    python -m pytest -q master_plan_it/tests/test_amounts_batch.py
+"""
+
+from __future__ import annotations
+
+import random
+import unittest
+
+from master_plan_it.core import amounts, numbers, tax
+
+SEEDS = range(20)
+CASES_PER_SEED = 500
+RECURRENCE_RULES = ["Monthly", "Quarterly", "Annual", "None", None, "Unknown"]
+VAT_RATES = [None, 0, 4, 5.5, 10, 21.5, 22]
+
+# (compute_line_amounts arguments, LINE_AMOUNT_FIELDS values) captured from the pre-batch scalar code
+# (master_plan_it/amounts.py before the columnar API) with the default Banker's Rounding (legacy).
+EXPECTED = [
+    ((None, None, None, None, None, False, "Monthly", 12), (0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0, 0.0)),
+    ((1, 100, None, None, 22, False, "Monthly", 12), (100.0, 1200.0, 1200.0, 264.0, 1464.0, 1200.0, 264.0, 1464.0)),
+    ((3, 33.335, None, None, 22, False, "Monthly", 12), (100.005, 1200.06, 1200.06, 264.01, 1464.07, 1200.06, 264.01, 1464.07)),
+    ((2, 0.125, None, None, 10, False, "Monthly", 12), (0.25, 3.0, 3.0, 0.3, 3.3, 3.0, 0.3, 3.3)),
+    ((None, 250.5, None, None, 22, True, "Quarterly", 12), (83.5, 1002.0, 821.31, 180.69, 1002.0, 821.31, 180.69, 1002.0)),
+    ((1, 1000.01, None, None, 22, True, "Annual", 12), (83.33, 1000.01, 819.68, 180.33, 1000.01, 819.68, 180.33, 1000.01)),
+    ((1, 100.005, None, None, 4, False, "Annual", 7), (8.33, 100.01, 100.01, 4.0, 104.01, 58.34, 2.33, 60.67)),
+    ((12, 1.005, None, None, 5.5, False, "None", 5), (12.06, 12.06, 12.06, 0.66, 12.72, 12.06, 0.66, 12.72)),
+    ((1, 99.99, None, None, 21.5, True, "Unknown", 12), (8.33, 99.99, 82.3, 17.69, 99.99, 82.3, 17.69, 99.99)),
+    ((1, 10, None, None, 22, False, None, 0), (0.83, 10.0, 10.0, 2.2, 12.2, 10.0, 2.2, 12.2)),
+    ((None, None, 83.335, None, 22, False, "Monthly", 12), (83.335, 1000.02, 1000.02, 220.0, 1220.02, 1000.02, 220.0, 1220.02)),
+    ((None, None, 0.005, None, None, False, "Monthly", 12), (0.005, 0.06, 0.06, 0.0, 0.06, 0.06, 0.0, 0.06)),
+    ((None, None, 150.25, None, 22, True, "None", 6), (150.25, 150.25, 123.16, 27.09, 150.25, 123.16, 27.09, 150.25)),
+    ((None, None, None, 1000.06, 22, False, "Monthly", 12), (83.34, 1000.06, 1000.06, 220.01, 1220.07, 1000.06, 220.01, 1220.07)),
+    ((None, None, None, 100.01, 22, True, "Monthly", 11), (8.33, 100.01, 81.98, 18.03, 100.01, 75.15, 16.53, 91.68)),
+    ((None, None, None, 0.3, 10, False, "Quarterly", 1), (0.03, 0.3, 0.3, 0.03, 0.33, 0.03, 0.0, 0.03)),
+    ((None, None, None, 1234.565, 22, True, "None", 2), (1234.57, 1234.565, 1011.94, 222.63, 1234.57, 1011.94, 222.63, 1234.57)),
+    ((None, None, 90, 1000, 22, False, "Monthly", 12), (83.33, 1000.0, 1000.0, 220.0, 1220.0, 1000.0, 220.0, 1220.0)),
+    ((None, None, 90, 1000, None, True, "None", 12), (1000.0, 1000.0, 1000.0, 0.0, 1000.0, 1000.0, 0.0, 1000.0)),
+    ((1, 0, 41.665, None, 0, False, "Monthly", 12), (41.665, 499.98, 499.98, 0.0, 499.98, 499.98, 0.0, 499.98)),
+    ((1, -5, None, 600, 22, False, "Monthly", 12), (50.0, 600.0, 600.0, 132.0, 732.0, 600.0, 132.0, 732.0)),
+    ((None, None, None, 2.675, 22, False, "Annual", 12), (0.22, 2.675, 2.68, 0.59, 3.27, 2.68, 0.59, 3.27)),
+    ((None, None, None, 1.015, 22, True, "Monthly", 5), (0.08, 1.015, 0.84, 0.18, 1.02, 0.35, 0.08, 0.43)),
+    ((3.5, 12.345, None, None, 22, False, "Quarterly", 11), (14.4, 172.83, 172.83, 38.02, 210.85, 158.43, 34.85, 193.28)),
+]
+
+
+def _random_amount(rng: random.Random):
+    roll = rng.random()
+    if roll < 0.1:
+        return None
+    if roll < 0.2:
+        return 0
+    # Up to 4 decimals so the 2-decimal rounding (including .xx5 ties) is exercised.
+    return round(rng.uniform(0, 100_000), rng.choice([0, 1, 2, 3, 4]))
+
+
+def _random_rows(seed: int) -> list[tuple]:
+    rng = random.Random(seed)
+    return [
+        (
+            rng.choice([None, 0, 1, 2, 3.5, 12]),
+            _random_amount(rng),
+            _random_amount(rng),
+            _random_amount(rng),
+            rng.choice(VAT_RATES),
+            rng.random() < 0.5,
+            rng.choice(RECURRENCE_RULES),
+            rng.choice([0, 1, 2, 5, 11, 12]),
+        )
+        for _ in range(CASES_PER_SEED)
+    ]
+
+
+class TestAmountsBatch(unittest.TestCase):
+    def setUp(self):
+        # The expected values were recorded with the Frappe default, whatever the site uses.
+        numbers.set_rounding_method(numbers.BANKERS_LEGACY)
+
+    def tearDown(self):
+        numbers.set_rounding_method(None)
+
+    def test_batch_matches_pre_refactor_results(self):
+        batch = amounts.compute_line_amounts_batch(*zip(*(args for args, _expected in EXPECTED)))
+        for i, (args, expected) in enumerate(EXPECTED):
+            got = tuple(batch[field][i] for field in amounts.LINE_AMOUNT_FIELDS)
+            # repr() equality: same float bits, not just equal within tolerance.
+            self.assertEqual(repr(got), repr(expected), f"args={args}")
+
+    def test_scalar_matches_pre_refactor_results(self):
+        for args, expected in EXPECTED:
+            result = amounts.compute_line_amounts(*args)
+            got = tuple(result[field] for field in amounts.LINE_AMOUNT_FIELDS)
+            self.assertEqual(repr(got), repr(expected), f"args={args}")
+
+    def test_vat_columns_match_tax_helpers(self):
+        for seed in SEEDS:
+            rows = _random_rows(seed)
+            batch = amounts.compute_line_amounts_batch(*zip(*rows))
+            for i, row in enumerate(rows):
+                net, vat, gross = tax.split_net_vat_gross(batch["annual_amount"][i], row[4], row[5])
+                got = (batch["amount_net"][i], batch["amount_vat"][i], batch["amount_gross"][i])
+                if row[5]:
+                    # Gross input: both modules derive net by division, then VAT as the difference.
+                    self.assertEqual(got, (net, vat, gross), f"seed={seed} row={row}")
+                else:
+                    # Net input: tax rounds gross, amounts rounds VAT first; they may differ by a cent.
+                    self.assertEqual(got[0], net, f"seed={seed} row={row}")
+                    self.assertAlmostEqual(got[2], gross, delta=0.01, msg=f"seed={seed} row={row}")
+
+    def test_accepts_numpy_columns(self):
+        try:
+            import numpy
+        except ImportError:
+            self.skipTest("numpy not installed")
+        rows = _random_rows(0)
+        columns = list(zip(*rows))
+        numeric = [numpy.array([value or 0 for value in column], dtype=float) for column in columns[:4]]
+        batch = amounts.compute_line_amounts_batch(*numeric, *columns[4:])
+        expected = amounts.compute_line_amounts_batch(*[column.tolist() for column in numeric], *columns[4:])
+        self.assertEqual(batch, expected)
+
+    def test_empty_and_mismatched_columns(self):
+        empty = amounts.compute_line_amounts_batch([], [], [], [], [], [], [], [])
+        self.assertEqual(empty, {field: [] for field in amounts.LINE_AMOUNT_FIELDS})
+        with self.assertRaises(ValueError):
+            amounts.compute_line_amounts_batch([1], [1], [0], [0], [22], [False], ["Monthly"], [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,82 @@
+"""
+Tests for the line-level budget diff by source_key (master_plan_it.budget_diff) and the
+Source / N-way modes of the MPIT Budget Diff report.
+
+Run via Docker:
+    docker exec -it master_plan_it-frappe-1 bench --site $SITE_NAME run-tests \
+        --module master_plan_it.tests.test_budget_diff
+"""
+
+from __future__ import annotations
+
+import uuid
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from master_plan_it import budget_diff
+from master_plan_it.master_plan_it.doctype.mpit_budget.mpit_budget import create_snapshot
+from master_plan_it.master_plan_it.report.mpit_budget_diff import mpit_budget_diff
+from master_plan_it.tests.utils import insert_contract, insert_cost_center, insert_live_budget, insert_year
+
+
+class TestBudgetDiff(FrappeTestCase):
+	def setUp(self):
+		test_id = str(uuid.uuid4())[:8]
+		self.year = insert_year()
+		self.vendor = frappe.get_doc({"doctype": "MPIT Vendor", "vendor_name": f"_Test Diff Vendor {test_id}"}).insert().name
+		self.cost_center = insert_cost_center(f"_Test Diff CC {test_id}")
+		self.kept = insert_contract(self.year, self.cost_center, 100, "Kept", self.vendor)
+		self.changed = insert_contract(self.year, self.cost_center, 200, "Changed", self.vendor)
+		self.live = insert_live_budget(self.year)
+		self.snapshot = create_snapshot(self.live.name)
+
+		# After the snapshot: one contract repriced, one cancelled and one added
+		frappe.db.set_value("MPIT Contract", self.changed, "current_amount", 250)
+		frappe.db.set_value("MPIT Contract", self.kept, "status", "Cancelled")
+		self.added = insert_contract(self.year, self.cost_center, 50, "Added", self.vendor)
+		self.live.refresh_from_sources(is_manual=1)
+
+	def test_lines_are_classified_against_the_baseline(self):
+		budgets = [self.snapshot, self.live.name]
+		records = {record["contract"]: record for record in budget_diff.diff(budgets)}
+
+		self.assertEqual(set(records), {self.kept, self.changed, self.added})
+		self.assertEqual(records[self.kept]["status"][self.live.name], budget_diff.REMOVED)
+		self.assertEqual(records[self.added]["status"][self.live.name], budget_diff.ADDED)
+		self.assertEqual(records[self.added]["annual_net"][self.snapshot], None)
+
+		changed = records[self.changed]
+		self.assertEqual(changed["status"][self.live.name], budget_diff.CHANGED)
+		self.assertEqual(changed["changes"][self.live.name]["annual_net"], [2400.0, 3000.0])
+		self.assertEqual(changed["changes"][self.live.name]["monthly_amount"], [200.0, 250.0])
+		self.assertNotIn("vendor", changed["changes"][self.live.name])
+
+	def test_matrix_of_live_and_snapshots(self):
+		second = create_snapshot(self.live.name)
+		budgets = budget_diff.resolve_budgets("Live vs Snapshots", year=self.year)
+		self.assertEqual(budgets, [self.live.name, self.snapshot, second])
+
+		[entry] = budget_diff.summarize(budgets)
+		self.assertEqual(entry["cost_center"], self.cost_center)
+		self.assertEqual(entry["annual_net"], {self.live.name: 3600.0, self.snapshot: 3600.0, second: 3600.0})
+		# Seen from the Live budget: the first snapshot still has the cancelled contract, lacks the new one
+		self.assertEqual((entry["added"][self.snapshot], entry["removed"][self.snapshot], entry["changed"][self.snapshot]), (1, 1, 1))
+		self.assertEqual((entry["added"][second], entry["removed"][second], entry["changed"][second]), (0, 0, 0))
+
+		lines = budget_diff.get_lines(frappe.as_json(budgets), cost_center=self.cost_center)
+		self.assertEqual({line["contract"] for line in lines}, {self.kept, self.changed, self.added})
+
+	def test_report_source_and_matrix_modes(self):
+		_columns, rows, *_ = mpit_budget_diff.execute({
+			"budget_a": self.snapshot, "budget_b": self.live.name, "group_by": "Source"
+		})
+		total = rows[-1]
+		self.assertTrue(total["is_total_row"])
+		self.assertEqual((total["budget_a_annual_net"], total["budget_b_annual_net"]), (3600.0, 3600.0))
+		self.assertEqual(len(rows), 4)
+
+		columns, rows, message, *_ = mpit_budget_diff.execute({"mode": "Live vs Snapshots", "year": self.year})
+		self.assertEqual(message, {"budgets": [self.live.name, self.snapshot]})
+		self.assertIn("b1_changes", [column["fieldname"] for column in columns])
+		self.assertEqual(rows[0]["b1_changes"], "+1 / -1 / ~1")
@@ -0,0 +1,69 @@
+"""
+Tests for Live budget freshness (master_plan_it.budget_freshness).
+
+Run via Docker:
+    docker exec -it master_plan_it-frappe-1 bench --site $SITE_NAME run-tests \
+        --module master_plan_it.tests.test_budget_freshness
+"""
+
+from __future__ import annotations
+
+import uuid
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from master_plan_it import budget_freshness, metrics
+from master_plan_it.tests.utils import insert_year
+
+
+class TestBudgetFreshness(FrappeTestCase):
+	def setUp(self):
+		test_id = str(uuid.uuid4())[:8]
+		self.year = insert_year()
+		self.live = frappe.get_doc({
+			"doctype": "MPIT Budget",
+			"year": self.year,
+			"budget_type": "Live",
+			"workflow_state": "Draft",
+		}).insert()
+		metrics.reset()
+
+	def tearDown(self):
+		cache = frappe.cache()
+		cache.delete(budget_freshness._changes_key(cache, self.year))
+		metrics.reset()
+
+	def test_pending_changes_until_refreshed(self):
+		self.assertEqual(budget_freshness.get_budget_freshness(self.live.name)["status"], "Up to date")
+
+		# Stamps normally run after the source transaction commits.
+		budget_freshness._stamp([self.year])
+		budget_freshness._stamp([self.year])
+		info = budget_freshness.get_budget_freshness(self.live.name)
+		self.assertEqual(info["status"], "Pending")
+		self.assertEqual(info["pending"], 2)
+		self.assertGreaterEqual(info["lag_seconds"], 0)
+
+		self.live.reload()
+		self.live.refresh_from_sources(is_manual=1)
+		info = budget_freshness.get_budget_freshness(self.live.name)
+		self.assertEqual(info["status"], "Up to date")
+		self.assertEqual(info["refreshed_change_seq"], budget_freshness.current_seq())
+		self.assertTrue(info["last_refreshed_at"])
+
+	def test_change_after_refresh_start_stays_pending(self):
+		budget_freshness._stamp([self.year])
+		seq = budget_freshness.current_seq()
+		budget_freshness._stamp([self.year])
+
+		budget_freshness._trim(self.year, seq)
+		frappe.db.set_value("MPIT Budget", self.live.name, "refreshed_change_seq", seq, update_modified=False)
+
+		info = budget_freshness.get_budget_freshness(self.live.name)
+		self.assertEqual(info["pending"], 1)
+		self.assertIn("mpit_refresh_staleness_seconds_count 1\n", metrics.render())
+
+	def test_snapshot_is_not_applicable(self):
+		info = budget_freshness.get_budget_freshness(frappe._dict(name="X", year=self.year, budget_type="Snapshot"))
+		self.assertEqual(info["status"], "Not Applicable")
@@ -0,0 +1,138 @@
+"""
+Tests for cost center partitions of Live budgets (master_plan_it.budget_partitions):
+targeted refresh, subtotals and header totals from the lines, per-partition freshness.
+
+Run via Docker:
+    docker exec -it master_plan_it-frappe-1 bench --site $SITE_NAME run-tests \
+        --module master_plan_it.tests.test_budget_partitions
+"""
+
+from __future__ import annotations
+
+import uuid
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import flt
+
+from master_plan_it import budget_freshness, budget_partitions
+from master_plan_it.tests.utils import insert_contract, insert_cost_center, insert_live_budget, insert_year
+
+
+class TestBudgetPartitions(FrappeTestCase):
+	def setUp(self):
+		test_id = str(uuid.uuid4())[:8]
+		self.year = insert_year()
+		self.vendor = frappe.get_doc({"doctype": "MPIT Vendor", "vendor_name": f"_Test Partition Vendor {test_id}"}).insert().name
+		self.cc_a, self.cc_b = (insert_cost_center(f"_Test Partition CC {suffix} {test_id}") for suffix in ("A", "B"))
+		self.contract_a = insert_contract(self.year, self.cc_a, 100, vendor=self.vendor)
+		self.contract_b = insert_contract(self.year, self.cc_b, 200, vendor=self.vendor)
+		self.live = insert_live_budget(self.year)
+
+	def tearDown(self):
+		cache = frappe.cache()
+		cache.delete(budget_freshness._changes_key(cache, self.year))
+
+	def _line_net(self, contract: str) -> float:
+		return flt(frappe.db.get_value("MPIT Budget Line", {"parent": self.live.name, "contract": contract}, "annual_net"), 2)
+
+	def _assert_totals_consistent(self):
+		partitions = frappe.get_all(
+			budget_partitions.PARTITION_DOCTYPE, filters={"budget": self.live.name}, fields=list(budget_partitions.TOTAL_FIELDS)
+		)
+		header = frappe.db.get_value("MPIT Budget", self.live.name, list(budget_partitions.TOTAL_FIELDS), as_dict=True)
+		lines = frappe.get_all("MPIT Budget Line", filters={"parent": self.live.name}, fields=["annual_net", "annual_gross"])
+		for field in budget_partitions.TOTAL_FIELDS:
+			self.assertEqual(flt(header[field], 2), flt(sum(flt(row[field], 2) for row in partitions), 2))
+		self.assertEqual(flt(header.total_amount_net, 2), flt(sum(flt(line.annual_net, 2) for line in lines), 2))
+		self.assertEqual(flt(header.total_amount_gross, 2), flt(sum(flt(line.annual_gross, 2) for line in lines), 2))
+
+	def test_full_refresh_creates_one_partition_per_cost_center(self):
+		partitions = {
+			row.cost_center: row
+			for row in frappe.get_all(
+				budget_partitions.PARTITION_DOCTYPE,
+				filters={"budget": self.live.name},
+				fields=["name", "cost_center", "line_count", "total_amount_net"],
+			)
+		}
+		self.assertEqual(set(partitions), {self.cc_a, self.cc_b})
+		self.assertEqual(partitions[self.cc_a].name, budget_partitions.partition_name(self.live.name, self.cc_a))
+		self.assertEqual(partitions[self.cc_a].line_count, 1)
+		self.assertEqual(flt(partitions[self.cc_b].total_amount_net, 2), 2400)
+		self._assert_totals_consistent()
+
+	def test_targeted_refresh_only_touches_its_cost_center(self):
+		frappe.db.set_value("MPIT Contract", self.contract_a, "current_amount", 150)
+		frappe.db.set_value("MPIT Contract", self.contract_b, "current_amount", 250)
+
+		self.live.refresh_from_sources(is_manual=1, cost_centers=[self.cc_a])
+		self.assertEqual(self._line_net(self.contract_a), 1800)
+		self.assertEqual(self._line_net(self.contract_b), 2400)
+		self.assertEqual(flt(self.live.total_amount_net, 2), 4200)
+		self._assert_totals_consistent()
+
+		self.live.refresh_from_sources(is_manual=1, cost_centers=[self.cc_b])
+		self.assertEqual(self._line_net(self.contract_b), 3000)
+		self.assertEqual(flt(self.live.total_amount_net, 2), 4800)
+		self._assert_totals_consistent()
+
+	def test_partial_refresh_without_partitions_keeps_header_totals(self):
+		# A Live budget refreshed before partitions existed: header totals set, no partition rows.
+		frappe.db.delete(budget_partitions.PARTITION_DOCTYPE, {"budget": self.live.name})
+		frappe.db.set_value("MPIT Contract", self.contract_a, "current_amount", 150)
+
+		self.live.refresh_from_sources(is_manual=1, cost_centers=[self.cc_a])
+		self.assertEqual(flt(self.live.total_amount_net, 2), 1800 + 2400)
+		header = frappe.db.get_value("MPIT Budget", self.live.name, "total_amount_net")
+		self.assertEqual(flt(header, 2), 4200)
+
+		# The backfill patch rebuilds every partition; later partial refreshes keep them consistent.
+		from master_plan_it.patches.v0_2 import backfill_budget_partitions
+
+		backfill_budget_partitions.execute()
+		self._assert_totals_consistent()
+		frappe.db.set_value("MPIT Contract", self.contract_b, "current_amount", 250)
+		self.live.refresh_from_sources(is_manual=1, cost_centers=[self.cc_b])
+		self.assertEqual(flt(self.live.total_amount_net, 2), 4800)
+		self._assert_totals_consistent()
+
+	def test_partial_refresh_after_contract_deletion_keeps_header_totals(self):
+		# on_trash deletes the generated lines and recomputes the header, leaving the partition subtotal stale.
+		with patch.object(frappe.db, "commit"):
+			frappe.delete_doc("MPIT Contract", self.contract_a)
+		self.assertEqual(flt(frappe.db.get_value("MPIT Budget", self.live.name, "total_amount_net"), 2), 2400)
+
+		self.live.refresh_from_sources(is_manual=1, cost_centers=[self.cc_a])
+		self.assertEqual(flt(frappe.db.get_value("MPIT Budget", self.live.name, "total_amount_net"), 2), 2400)
+		self.live.refresh_from_sources(is_manual=1, cost_centers=[self.cc_b])
+		self.assertEqual(flt(frappe.db.get_value("MPIT Budget", self.live.name, "total_amount_net"), 2), 2400)
+		self._assert_totals_consistent()
+
+	def test_full_refresh_drops_empty_partitions(self):
+		frappe.db.set_value("MPIT Contract", self.contract_b, "status", "Cancelled")
+		self.live.refresh_from_sources(is_manual=1)
+		self.assertFalse(
+			frappe.db.exists(budget_partitions.PARTITION_DOCTYPE, budget_partitions.partition_name(self.live.name, self.cc_b))
+		)
+		self._assert_totals_consistent()
+
+	def test_freshness_tracks_partitions(self):
+		# Stamps normally run after the source transaction commits.
+		budget_freshness._stamp([self.year], [self.cc_a])
+		budget_freshness._stamp([self.year], [self.cc_b])
+		self.assertEqual(budget_freshness.get_budget_freshness(self.live.name)["pending"], 2)
+
+		self.live.refresh_from_sources(is_manual=1, cost_centers=[self.cc_a])
+		info = budget_freshness.get_budget_freshness(self.live.name)
+		self.assertEqual(info["status"], "Pending")
+		self.assertEqual(info["pending"], 1)
+
+		# A change without cost centers is only incorporated by a full refresh.
+		budget_freshness._stamp([self.year])
+		self.live.refresh_from_sources(is_manual=1, cost_centers=[self.cc_b])
+		self.assertEqual(budget_freshness.get_budget_freshness(self.live.name)["pending"], 1)
+
+		self.live.refresh_from_sources(is_manual=1)
+		self.assertEqual(budget_freshness.get_budget_freshness(self.live.name)["status"], "Up to date")
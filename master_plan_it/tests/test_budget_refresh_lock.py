@@ -0,0 +1,65 @@
+"""
+Tests for per-budget refresh locking and coalescing (master_plan_it.budget_refresh_lock).
+
+Run via Docker:
+    docker exec -it master_plan_it-frappe-1 bench --site $SITE_NAME run-tests \
+        --module master_plan_it.tests.test_budget_refresh_lock
+"""
+
+from __future__ import annotations
+
+import uuid
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from master_plan_it import budget_refresh_lock
+
+
+class TestBudgetRefreshLock(FrappeTestCase):
+	def setUp(self):
+		self.budget = f"_Test-{uuid.uuid4().hex[:8]}-LIVE"
+		self.cache = frappe.cache()
+
+	def tearDown(self):
+		for prefix in (budget_refresh_lock.LOCK_KEY, budget_refresh_lock.RERUN_KEY):
+			self.cache.delete(self.cache.make_key(f"{prefix}:{self.budget}"))
+
+	def _rerun_requested(self) -> bool:
+		return bool(budget_refresh_lock._raw(
+			self.cache, "exists", self.cache.make_key(f"{budget_refresh_lock.RERUN_KEY}:{self.budget}")
+		))
+
+	def test_refresh_runs_and_releases_the_lock(self):
+		calls = []
+		self.assertTrue(budget_refresh_lock.run_coalesced(self.budget, None, lambda: calls.append(1)))
+		self.assertEqual(calls, [1])
+		self.assertFalse(budget_refresh_lock.is_running(self.budget))
+		self.assertFalse(budget_refresh_lock.request_rerun(self.budget))
+		self.assertFalse(self._rerun_requested())
+
+	def test_second_caller_is_coalesced_into_the_running_refresh(self):
+		calls = []
+
+		def refresh():
+			calls.append("holder")
+			if len(calls) == 1:
+				# Two more requests while running: served by a single rerun.
+				self.assertFalse(budget_refresh_lock.run_coalesced(self.budget, None, lambda: calls.append("other")))
+				self.assertTrue(budget_refresh_lock.request_rerun(self.budget))
+
+		with patch.object(frappe.db, "commit") as commit:
+			self.assertTrue(budget_refresh_lock.run_coalesced(self.budget, None, refresh))
+		self.assertEqual(calls, ["holder", "holder"])
+		commit.assert_called_once()
+		self.assertFalse(budget_refresh_lock.is_running(self.budget))
+		self.assertFalse(self._rerun_requested())
+
+	def test_partitions_lock_independently(self):
+		def refresh():
+			self.assertTrue(budget_refresh_lock.is_running(self.budget))
+			self.assertFalse(budget_refresh_lock.is_running(self.budget, ["CC-B"]))
+
+		self.assertTrue(budget_refresh_lock.run_coalesced(self.budget, None, refresh))
+		self.assertEqual(budget_refresh_lock.scope_key(self.budget, ["B", "A"]), f"{self.budget}:cc:A,B")
@@ -0,0 +1,148 @@
+"""
+Tests for the chunked Live budget refresh (master_plan_it.budget_refresh_pipeline):
+keyset streaming across chunks, diff against stored lines, stale line removal, SQL totals,
+cash-out facts materialized in the same pass (MPIT Cashflow report).
+
+Run via Docker:
+    docker exec -it master_plan_it-frappe-1 bench --site $SITE_NAME run-tests \
+        --module master_plan_it.tests.test_budget_refresh_pipeline
+"""
+
+from __future__ import annotations
+
+import uuid
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import flt
+
+from master_plan_it import budget_refresh_pipeline
+from master_plan_it.tests.utils import insert_contract, insert_cost_center, insert_live_budget, insert_year
+
+
+class TestBudgetRefreshPipeline(FrappeTestCase):
+	def setUp(self):
+		test_id = str(uuid.uuid4())[:8]
+		self.year = insert_year()
+		self.cost_center = insert_cost_center(f"_Test Pipeline CC {test_id}")
+		self.vendor = frappe.get_doc({"doctype": "MPIT Vendor", "vendor_name": f"_Test Pipeline Vendor {test_id}"}).insert().name
+		self.contracts = [
+			insert_contract(self.year, self.cost_center, 100 * (i + 1), vendor=self.vendor) for i in range(5)
+		]
+		self.live = insert_live_budget(self.year, refresh=False)
+		# Several chunks even for this small portfolio.
+		frappe.local.conf["mpit_refresh_chunk_size"] = 2
+
+	def tearDown(self):
+		frappe.local.conf.pop("mpit_refresh_chunk_size", None)
+
+	def _own_lines(self) -> dict:
+		self.live.reload()
+		return {line.contract: line for line in self.live.lines if line.contract in self.contracts}
+
+	def test_refresh_streams_every_chunk_and_matches_document_amounts(self):
+		self.live.refresh_from_sources(is_manual=1)
+		lines = self._own_lines()
+		self.assertEqual(set(lines), set(self.contracts))
+		for i, name in enumerate(self.contracts):
+			line = lines[name]
+			self.assertEqual(line.source_key, f"CONTRACT::{name}")
+			self.assertEqual(flt(line.annual_net, 2), flt(100 * (i + 1) * 12, 2))
+			self.assertEqual(flt(line.annual_gross, 2), flt(100 * (i + 1) * 12 * 1.22, 2))
+
+		# A full document save recomputes the same amounts and totals (no drift with validate()).
+		totals = {field: self.live.get(field) for field in ("total_amount_net", "total_amount_vat", "total_amount_gross")}
+		self.live.save()
+		self.assertEqual(totals, {field: self.live.get(field) for field in totals})
+
+	def test_second_refresh_only_touches_changed_lines(self):
+		self.live.refresh_from_sources(is_manual=1)
+		idx_before = {name: line.idx for name, line in self._own_lines().items()}
+
+		frappe.db.set_value("MPIT Contract", self.contracts[0], "current_amount", 999)
+		stats = budget_refresh_pipeline.run(self.live, *self._year_bounds())
+		self.assertEqual(stats["updated"], 1)
+		self.assertEqual(stats["inserted"], 0)
+		self.assertGreaterEqual(stats["chunks"], 3)
+
+		lines = self._own_lines()
+		self.assertEqual(flt(lines[self.contracts[0]].monthly_amount), 999)
+		self.assertEqual({name: line.idx for name, line in lines.items()}, idx_before)
+
+	def test_lines_of_removed_sources_are_deleted(self):
+		self.live.refresh_from_sources(is_manual=1)
+		frappe.db.set_value("MPIT Contract", self.contracts[-1], "status", "Cancelled")
+		self.live.refresh_from_sources(is_manual=1)
+
+		lines = self._own_lines()
+		self.assertNotIn(self.contracts[-1], lines)
+		self.assertEqual(len(lines), len(self.contracts) - 1)
+		self.assertEqual(
+			flt(self.live.total_amount_net, 2), flt(sum(flt(line.annual_net, 2) for line in self.live.lines), 2)
+		)
+
+	def test_refresh_materializes_cash_out_by_payment_month(self):
+		quarterly = frappe.get_doc({
+			"doctype": "MPIT Contract",
+			"description": "Quarterly pipeline contract",
+			"vendor": self.vendor,
+			"cost_center": self.cost_center,
+			"status": "Active",
+			"start_date": f"{int(self.year) - 1}-11-15",
+			"billing_cycle": "Quarterly",
+			"current_amount": 300,
+			"current_amount_includes_vat": 0,
+			"vat_rate": 22,
+		}).insert().name
+		stats = budget_refresh_pipeline.run(self.live, *self._year_bounds())
+		self.assertEqual(stats["payments"], len(self.contracts) * 12 + 4)
+
+		payments = frappe.get_all(
+			"MPIT Cashflow Entry",
+			filters={"budget": self.live.name, "contract": quarterly},
+			fields=["month", "amount_net", "source_key"],
+			order_by="month asc",
+		)
+		self.assertEqual([payment.month.month for payment in payments], [2, 5, 8, 11])
+		self.assertEqual({flt(payment.amount_net) for payment in payments}, {300})
+		self.assertEqual({payment.source_key for payment in payments}, {f"CONTRACT::{quarterly}"})
+
+		# A second refresh replaces the facts instead of adding to them
+		budget_refresh_pipeline.run(self.live, *self._year_bounds())
+		self.assertEqual(frappe.db.count("MPIT Cashflow Entry", {"budget": self.live.name, "contract": quarterly}), 4)
+
+		from master_plan_it.master_plan_it.report.mpit_cashflow import mpit_cashflow
+
+		_columns, rows, _message, chart, _summary = mpit_cashflow.execute(
+			{"year": self.year, "cost_center": self.cost_center, "source_type": "Contract"}
+		)
+		[row] = rows
+		self.assertEqual((row["month_1"], row["month_2"]), (1500, 1800))
+		self.assertEqual(row["total"], 1500 * 12 + 1200)
+		# The monthly equivalent spreads the quarterly amount: 100 per month
+		self.assertEqual(chart["data"]["datasets"][1]["values"][0], 1600)
+
+	def _year_bounds(self):
+		from master_plan_it import annualization
+
+		return annualization.get_year_bounds(self.year)
+
+	def test_backfill_rebuilds_cash_out_of_existing_budgets(self):
+		from master_plan_it.patches.v0_2 import backfill_cashflow_entries
+
+		budget_refresh_pipeline.run(self.live, *self._year_bounds())
+		fields = ["month", "source_key", "contract", "cost_center", "amount_net"]
+		expected = frappe.get_all(
+			"MPIT Cashflow Entry", filters={"budget": self.live.name}, fields=fields, order_by="source_key, month"
+		)
+		# A budget refreshed before the cash-out facts existed
+		frappe.db.delete("MPIT Cashflow Entry", {"budget": self.live.name})
+
+		backfill_cashflow_entries.execute()
+		self.assertEqual(
+			frappe.get_all(
+				"MPIT Cashflow Entry", filters={"budget": self.live.name}, fields=fields, order_by="source_key, month"
+			),
+			expected,
+		)
+		self.assertEqual(frappe.db.count("MPIT Budget Line", {"parent": self.live.name}), len(self._own_lines()))
@@ -0,0 +1,391 @@
+"""
+Frappe-free budget engine core (master_plan_it.core): line generation from plain records,
+period math and rounding. These tests need no site and also run with plain pytest.
+
+Run via Docker:
+    docker exec -it master_plan_it-frappe-1 bench --site $SITE_NAME run-tests \
+        --module master_plan_it.tests.test_core
+"""
+
+from __future__ import annotations
+
+import datetime
+import os
+import pickle
+import random
+import subprocess
+import sys
+import threading
+import unittest
+from collections import namedtuple
+from dataclasses import replace
+
+from master_plan_it.core import cashflow, lines, numbers, parallel, periods, projection
+from master_plan_it.core.errors import CoreValidationError
+from master_plan_it.core.tax import resolve_vat_rate
+
+D = datetime.date
+YEAR_START, YEAR_END = D(2025, 1, 1), D(2025, 12, 31)
+
+
+def _contract(**kwargs):
+    values = {"name": "CT-1", "cost_center": "CC-1", "current_amount": 1200, "billing_cycle": "Monthly"}
+    values.update(kwargs)
+    return lines.ContractRecord(**values)
+
+
+def _project(**kwargs):
+    values = {"name": "PRJ-1", "title": "Project", "workflow_state": "Approved", "cost_center": "CC-1"}
+    values.update(kwargs)
+    return lines.ProjectRecord(**values)
+
+
+def _item(**kwargs):
+    values = {"name": "PI-1", "project": "PRJ-1", "amount": 1200, "amount_net": 1200,
+              "start_date": D(2025, 1, 1), "end_date": D(2025, 12, 31), "distribution": "all"}
+    values.update(kwargs)
+    return lines.PlannedItemRecord(**values)
+
+
+class TestCoreContractLines(unittest.TestCase):
+    def test_flat_billing_cycles(self):
+        cases = {"Monthly": ("Monthly", 1200), "Quarterly": ("Quarterly", 400), "Annual": ("Annual", 100)}
+        for billing, (rule, monthly) in cases.items():
+            with self.subTest(billing=billing):
+                [line] = lines.generate_contract_lines([_contract(billing_cycle=billing)], {}, YEAR_START, YEAR_END)
+                self.assertEqual(line["recurrence_rule"], rule)
+                self.assertEqual(line["monthly_amount"], monthly)
+                self.assertEqual(line["source_key"], "CONTRACT::CT-1")
+
+    def test_flat_line_clipped_to_contract_dates(self):
+        contract = _contract(start_date=D(2024, 6, 1), end_date=D(2025, 3, 15))
+        [line] = lines.generate_contract_lines([contract], {}, YEAR_START, YEAR_END)
+        self.assertEqual((line["period_start_date"], line["period_end_date"]), (YEAR_START, D(2025, 3, 15)))
+
+    def test_contract_outside_year_has_no_lines(self):
+        contract = _contract(start_date=D(2023, 1, 1), end_date=D(2024, 12, 31))
+        self.assertEqual(lines.generate_contract_lines([contract], {}, YEAR_START, YEAR_END), [])
+
+    def test_terms_split_and_open_term_ends_before_next(self):
+        terms = [
+            lines.ContractTermRecord(name="T1", parent="CT-1", from_date=D(2025, 1, 1), monthly_amount_net=100),
+            lines.ContractTermRecord(name="T2", parent="CT-1", from_date=D(2025, 7, 1), amount_net=150),
+        ]
+        result = lines.generate_contract_lines([_contract()], {"CT-1": terms}, YEAR_START, YEAR_END)
+        self.assertEqual([line["source_key"] for line in result], ["CONTRACT::CT-1::TERM::T1", "CONTRACT::CT-1::TERM::T2"])
+        self.assertEqual(result[0]["period_end_date"], D(2025, 6, 30))
+        self.assertEqual([line["monthly_amount"] for line in result], [100, 150])
+
+    def test_terms_outside_year_fall_back_to_current_amount(self):
+        terms = [lines.ContractTermRecord(name="T1", parent="CT-1", from_date=D(2023, 1, 1), to_date=D(2023, 12, 31))]
+        [line] = lines.generate_contract_lines([_contract()], {"CT-1": terms}, YEAR_START, YEAR_END)
+        self.assertEqual(line["source_key"], "CONTRACT::CT-1")
+
+    def test_missing_cost_center_raises(self):
+        with self.assertRaises(CoreValidationError) as ctx:
+            lines.generate_contract_lines([_contract(cost_center=None)], {}, YEAR_START, YEAR_END)
+        self.assertEqual(ctx.exception.format_args, ("CT-1",))
+        self.assertIn("{0}", ctx.exception.message)
+
+    def test_from_row_ignores_extra_columns(self):
+        record = lines.from_row(lines.ProjectRecord, {"name": "PRJ-1", "cost_center": "CC-1", "owner": "x"})
+        self.assertEqual(record, lines.ProjectRecord(name="PRJ-1", cost_center="CC-1"))
+
+
+class TestCorePlannedItemLines(unittest.TestCase):
+    def _generate(self, item, project=None):
+        project = project or _project()
+        return lines.generate_planned_item_lines([item], {project.name: project}, YEAR_START, YEAR_END)
+
+    def test_all_distribution_spreads_over_item_months(self):
+        [line] = self._generate(_item(start_date=D(2024, 7, 1), end_date=D(2025, 6, 30)))
+        self.assertEqual(line["monthly_amount"], 100)
+        self.assertEqual((line["period_start_date"], line["period_end_date"]), (YEAR_START, D(2025, 6, 30)))
+        self.assertEqual(line["recurrence_rule"], "Monthly")
+
+    def test_start_and_end_distributions(self):
+        item = dict(start_date=D(2025, 3, 10), end_date=D(2025, 8, 5))
+        [start] = self._generate(_item(distribution="start", **item))
+        [end] = self._generate(_item(distribution="end", **item))
+        self.assertEqual((start["period_start_date"], start["period_end_date"]), (D(2025, 3, 1), D(2025, 3, 31)))
+        self.assertEqual((end["period_start_date"], end["period_end_date"]), (D(2025, 8, 1), D(2025, 8, 31)))
+        self.assertEqual((start["recurrence_rule"], start["monthly_amount"]), ("None", 1200))
+
+    def test_spend_date_wins_and_is_clipped_to_year(self):
+        [line] = self._generate(_item(spend_date=D(2025, 2, 14)))
+        self.assertEqual(line["source_key"], "PLANNED_ITEM::PI-1::2025-02-01")
+        self.assertEqual(self._generate(_item(spend_date=D(2026, 2, 14))), [])
+
+    def test_not_approved_project_is_skipped(self):
+        self.assertEqual(self._generate(_item(), _project(workflow_state="Proposed")), [])
+
+    def test_missing_project_or_cost_center_raises(self):
+        with self.assertRaises(CoreValidationError):
+            lines.generate_planned_item_lines([_item()], {}, YEAR_START, YEAR_END)
+        with self.assertRaises(CoreValidationError):
+            self._generate(_item(), _project(cost_center=None))
+
+
+class TestCorePeriods(unittest.TestCase):
+    def test_overlap_months_closed_form_matches_month_walk(self):
+        def walk(start, end, year_start, year_end):
+            start, end = max(start, year_start), min(end, year_end)
+            months = set()
+            while start <= end:
+                months.add((start.year, start.month))
+                start += datetime.timedelta(days=1)
+            return len(months)
+
+        dates = [D(2024, 11, 30), D(2025, 1, 1), D(2025, 1, 31), D(2025, 2, 28), D(2025, 7, 15), D(2025, 12, 31), D(2026, 2, 1)]
+        for start in dates:
+            for end in dates:
+                with self.subTest(start=start, end=end):
+                    self.assertEqual(
+                        periods.overlap_months(start, end, YEAR_START, YEAR_END), walk(start, end, YEAR_START, YEAR_END)
+                    )
+
+    def test_overlap_months_accepts_iso_strings(self):
+        self.assertEqual(periods.overlap_months("2025-03-15", "2025-05-01", YEAR_START, YEAR_END), 3)
+
+    def test_month_bounds_leap_year(self):
+        self.assertEqual(periods.month_bounds(D(2024, 2, 15)), (D(2024, 2, 1), D(2024, 2, 29)))
+
+
+class TestCoreNumbers(unittest.TestCase):
+    def tearDown(self):
+        numbers.set_rounding_method(None)
+        numbers.set_rounding_method_resolver(None)
+
+    def test_rounding_methods(self):
+        expected = {
+            numbers.BANKERS_LEGACY: (2.0, 0.13),
+            numbers.BANKERS: (2.0, 0.12),
+            numbers.COMMERCIAL: (3.0, 0.13),
+        }
+        for method, (half_int, half_cent) in expected.items():
+            with self.subTest(method=method):
+                numbers.set_rounding_method(method)
+                self.assertEqual(numbers.flt(2.5, 0), half_int)
+                self.assertEqual(numbers.flt(0.125, 2), half_cent)
+
+    def test_unknown_method_falls_back_to_default(self):
+        numbers.set_rounding_method("Nonsense")
+        self.assertEqual(numbers.get_rounding_method(), numbers.BANKERS_LEGACY)
+        self.assertEqual(numbers.flt("1,234.5"), 1234.5)
+        self.assertEqual(numbers.flt("n/a"), 0.0)
+
+    def test_resolver_is_asked_on_every_call_unless_pinned(self):
+        site_methods = iter([numbers.COMMERCIAL, numbers.BANKERS, None])
+        numbers.set_rounding_method_resolver(lambda: next(site_methods))
+        self.assertEqual(numbers.flt(2.5, 0), 3.0)
+        self.assertEqual(numbers.flt(0.125, 2), 0.12)
+        # No site context: Frappe default.
+        self.assertEqual(numbers.get_rounding_method(), numbers.BANKERS_LEGACY)
+        numbers.set_rounding_method(numbers.COMMERCIAL)
+        self.assertEqual(numbers.get_rounding_method(), numbers.COMMERCIAL)
+
+    def test_pinned_method_is_per_thread(self):
+        numbers.set_rounding_method(numbers.COMMERCIAL)
+        seen = []
+        thread = threading.Thread(target=lambda: seen.append(numbers.get_rounding_method()))
+        thread.start()
+        thread.join()
+        self.assertEqual(seen, [numbers.BANKERS_LEGACY])
+        self.assertEqual(numbers.get_rounding_method(), numbers.COMMERCIAL)
+
+
+        self.assertEqual(resolve_vat_rate(100, 0, 22), 0.0)
+        self.assertEqual(resolve_vat_rate(100, None, 22), 22.0)
+        self.assertEqual(resolve_vat_rate(0, None, None), 0.0)
+        self.assertIsNone(resolve_vat_rate(100, None, None))
+
+
+class TestCoreProjection(unittest.TestCase):
+    FIRST = projection.month_index(D(2025, 1, 1))
+
+    def _project(self, contracts=(), terms=None, items=(), months=24, **kwargs):
+        return projection.project(list(contracts), terms or {}, list(items), {"PRJ-1": _project()}, self.FIRST, months, **kwargs)
+
+    def test_month_index_round_trip(self):
+        self.assertEqual(projection.month_start(projection.month_index(D(2025, 12, 31)) + 1), D(2026, 1, 1))
+
+    def test_terms_then_auto_renew_continuation(self):
+        contract = _contract(start_date=D(2025, 1, 1), end_date=D(2025, 12, 31), auto_renew=1, status="Active", monthly_amount_net=90)
+        terms = {"CT-1": [
+            lines.ContractTermRecord(name="T1", parent="CT-1", from_date=D(2025, 1, 1), monthly_amount_net=100),
+            lines.ContractTermRecord(name="T2", parent="CT-1", from_date=D(2025, 7, 1), monthly_amount_net=150),
+        ]}
+        [values] = self._project([contract], terms).values()
+        self.assertEqual(values[:6], [100] * 6)
+        self.assertEqual(values[6:], [150] * 18)
+
+        [values] = self._project([replace(contract, auto_renew=0)], terms).values()
+        self.assertEqual(values[12:], [0] * 12)
+
+    def test_flat_contract_and_skipped_statuses(self):
+        contracts = [
+            _contract(start_date=D(2025, 4, 10), end_date=D(2026, 3, 31), status="Active", monthly_amount_net=50, vendor="V-1"),
+            _contract(name="CT-2", start_date=D(2025, 1, 1), status="Cancelled", monthly_amount_net=999),
+        ]
+        result = self._project(contracts, group_by=("cost_center", "source_type", "vendor"))
+        self.assertEqual(list(result), [("CC-1", "Contract", "V-1")])
+        values = result[("CC-1", "Contract", "V-1")]
+        self.assertEqual((values[2], values[3], values[14], values[15]), (0, 50, 50, 0))
+        self.assertEqual(sum(values), 600)
+
+    def test_planned_items_match_live_line_distribution(self):
+        items = [
+            _item(start_date=D(2025, 7, 1), end_date=D(2026, 6, 30)),
+            _item(name="PI-2", start_date=D(2026, 3, 5), end_date=D(2026, 9, 1), distribution="end", amount_net=700),
+            _item(name="PI-3", spend_date=D(2027, 1, 15)),
+        ]
+        values = self._project(items=items)[("CC-1", "Planned Item")]
+        self.assertEqual(values[6:18], [100] * 12)
+        self.assertEqual(values[20], 700)
+        self.assertEqual(sum(values), 1900)
+
+    def test_renewal_cycles_with_indexation(self):
+        contract = _contract(start_date=D(2024, 7, 1), end_date=D(2025, 6, 30), auto_renew=1, status="Active",
+                             monthly_amount_net=100, vendor="V-1")
+        self.assertEqual(projection.renewal_months(contract), 12)
+        self.assertEqual(projection.renewal_months(_contract(billing_cycle="Quarterly")), 3)
+
+        values = self._project([contract], months=36, group_by=("cost_center", "vendor"), indexation=10)[("CC-1", "V-1")]
+        self.assertEqual((values[5], values[6], values[17], values[18], values[35]), (100, 110, 110, 121, 133.1))
+
+        segments = projection.contract_segments(contract, [], indexation=10, until_month=self.FIRST + 35)
+        self.assertEqual([s.first_month - self.FIRST for s in segments[1:]], [6, 18, 30])
+
+    def test_line_totals_spread_annual_net_over_line_months(self):
+        Line = namedtuple("Line", "cost_center annual_net period_start_date period_end_date")
+        result = projection.line_totals(
+            [
+                Line("CC-1", 1200, None, None),
+                Line("CC-1", 300, D(2025, 10, 15), D(2026, 3, 31)),
+                Line("CC-2", 100, D(2025, 6, 1), D(2025, 6, 30)),
+            ],
+            D(2025, 1, 1),
+            D(2025, 12, 31),
+        )
+        self.assertEqual(result["cost_centers"], {"CC-1": 1500, "CC-2": 100})
+        self.assertEqual(result["total"], 1600)
+        self.assertEqual((result["months"][0], result["months"][5], result["months"][9]), (100, 200, 200))
+        self.assertEqual(sum(result["months"]), 1600)
+
+    def test_sources_limit_projected_kinds(self):
+        contract = _contract(start_date=D(2025, 1, 1), status="Active", monthly_amount_net=10)
+        result = self._project([contract], items=[_item()], sources=(projection.CONTRACT,))
+        self.assertEqual(list(result), [("CC-1", "Contract")])
+
+
+def _random_portfolio(rng: random.Random, size: int):
+    def day():
+        return D(2024, 1, 1) + datetime.timedelta(days=rng.randrange(3 * 365))
+
+    contracts, terms, items = [], {}, []
+    projects = {f"PRJ-{p}": _project(name=f"PRJ-{p}", workflow_state=rng.choice(["Approved", "Proposed"])) for p in range(20)}
+    for n in range(size):
+        start = day()
+        contract = _contract(
+            name=f"CT-{n}", start_date=start, end_date=rng.choice([None, start + datetime.timedelta(days=400)]),
+            billing_cycle=rng.choice(["Monthly", "Quarterly", "Annual", "Other", None]),
+            current_amount=round(rng.uniform(0, 5000), 3),
+        )
+        contracts.append(contract)
+        if rng.random() < 0.4:
+            terms[contract.name] = [
+                lines.ContractTermRecord(name=f"T-{n}-{t}", parent=contract.name, from_date=D(2024 + t, 1, 1),
+                                         amount_net=round(rng.uniform(0, 900), 2))
+                for t in range(rng.randint(1, 3))
+            ]
+        start = day()
+        items.append(_item(
+            name=f"PI-{n}", project=f"PRJ-{rng.randrange(20)}", amount_net=round(rng.uniform(0, 9000), 2),
+            start_date=start, end_date=start + datetime.timedelta(days=rng.randrange(700)),
+            spend_date=rng.choice([None, None, day()]), distribution=rng.choice(["all", "start", "end"]),
+        ))
+    return contracts, terms, items, projects
+
+
+class TestCoreCashflow(unittest.TestCase):
+    def _months(self, payments):
+        return [(payment["month"].month, payment["amount_net"]) for payment in payments]
+
+    def test_payments_follow_billing_cycle_from_start_date(self):
+        quarterly = _contract(start_date=D(2024, 11, 15), billing_cycle="Quarterly", current_amount=366, vat_rate=22, current_amount_includes_vat=1)
+        payments = cashflow.generate_contract_payments([quarterly], {}, YEAR_START, YEAR_END)
+        self.assertEqual(self._months(payments), [(2, 300), (5, 300), (8, 300), (11, 300)])
+        self.assertEqual(payments[0]["source_key"], "CONTRACT::CT-1")
+
+        annual = _contract(start_date=D(2023, 6, 1), end_date=D(2025, 9, 30), billing_cycle="Annual", current_amount=1200)
+        self.assertEqual(self._months(cashflow.generate_contract_payments([annual], {}, YEAR_START, YEAR_END)), [(6, 1200)])
+
+        monthly = _contract(start_date=D(2025, 10, 20))
+        self.assertEqual(len(cashflow.generate_contract_payments([monthly], {}, YEAR_START, YEAR_END)), 3)
+
+    def test_term_boundaries_restart_the_cycle(self):
+        contract = _contract(start_date=D(2025, 1, 1), end_date=D(2025, 12, 31))
+        terms = {"CT-1": [
+            lines.ContractTermRecord(name="T1", parent="CT-1", from_date=D(2025, 1, 1), amount_net=300, billing_cycle="Quarterly"),
+            lines.ContractTermRecord(name="T2", parent="CT-1", from_date=D(2025, 8, 1), amount_net=1000, billing_cycle="Annual"),
+        ]}
+        payments = cashflow.generate_contract_payments([contract], terms, YEAR_START, YEAR_END)
+        self.assertEqual(self._months(payments), [(1, 300), (4, 300), (7, 300), (8, 1000)])
+        self.assertEqual(payments[-1]["source_key"], "CONTRACT::CT-1::TERM::T2")
+
+    def test_planned_items_are_paid_as_distributed(self):
+        items = [
+            lines.PlannedItemRecord(name="PI-1", project="PRJ-1", amount_net=600, spend_date=D(2025, 5, 20)),
+            lines.PlannedItemRecord(name="PI-2", project="PRJ-1", amount_net=300, start_date=D(2025, 1, 1), end_date=D(2025, 3, 31)),
+            lines.PlannedItemRecord(name="PI-3", project="PRJ-2", amount_net=999, spend_date=D(2025, 5, 20)),
+        ]
+        projects = {"PRJ-1": _project(), "PRJ-2": _project(name="PRJ-2", workflow_state="Draft")}
+        payments = cashflow.generate_planned_item_payments(items, projects, YEAR_START, YEAR_END)
+        self.assertEqual(self._months(payments), [(5, 600), (1, 100), (2, 100), (3, 100)])
+
+
+@unittest.skipUnless(parallel.can_fork(), "process pool uses fork")
+class TestCoreParallel(unittest.TestCase):
+    def test_parallel_output_identical_to_serial(self):
+        contracts, terms, items, projects = _random_portfolio(random.Random(7), 600)
+        serial = lines.generate_contract_lines(contracts, terms, YEAR_START, YEAR_END)
+        serial += lines.generate_planned_item_lines(items, projects, YEAR_START, YEAR_END)
+        result = parallel.generate_lines(contracts, terms, items, projects, YEAR_START, YEAR_END, workers=3, chunk_size=50)
+        self.assertTrue(serial)
+        self.assertEqual(result, serial)
+
+    def test_shared_pool_is_reused_across_calls(self):
+        contracts, terms, items, projects = _random_portfolio(random.Random(11), 200)
+        serial = lines.generate_contract_lines(contracts, terms, YEAR_START, YEAR_END)
+        with parallel.process_pool(2) as pool:
+            first = parallel.generate_lines(contracts, terms, [], {}, YEAR_START, YEAR_END, workers=2, chunk_size=40, executor=pool)
+            workers = set(pool._processes)
+            second = parallel.generate_lines(contracts, terms, [], {}, YEAR_START, YEAR_END, workers=2, chunk_size=40, executor=pool)
+            self.assertEqual(set(pool._processes), workers)
+        self.assertEqual((first, second), (serial, serial))
+
+    def test_worker_error_keeps_untranslated_template(self):
+        contracts = [_contract(name=f"CT-{n}") for n in range(10)] + [_contract(name="CT-BAD", cost_center=None)]
+        with self.assertRaises(CoreValidationError) as ctx:
+            parallel.generate_lines(contracts, {}, [], {}, YEAR_START, YEAR_END, workers=2, chunk_size=3)
+        self.assertEqual(ctx.exception.format_args, ("CT-BAD",))
+        self.assertIn("{0}", ctx.exception.message)
+
+    def test_error_pickles_with_template(self):
+        exc = pickle.loads(pickle.dumps(CoreValidationError("Planned Item {0}: linked project missing.", "PI-1")))
+        self.assertEqual((exc.message, exc.format_args), ("Planned Item {0}: linked project missing.", ("PI-1",)))
+
+
+class TestCoreIsFrappeFree(unittest.TestCase):
+    def test_import_does_not_load_frappe(self):
+        code = (
+            "import sys\n"
+            "import master_plan_it.core.amounts, master_plan_it.core.cashflow, master_plan_it.core.lines, master_plan_it.core.projection, master_plan_it.core.tax\n"
+            "sys.exit(1 if 'frappe' in sys.modules else 0)\n"
+        )
+        env = {**os.environ, "PYTHONPATH": os.pathsep.join(path for path in sys.path if path)}
+        self.assertEqual(subprocess.run([sys.executable, "-c", code], env=env).returncode, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
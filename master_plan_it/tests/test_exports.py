@@ -0,0 +1,107 @@
+"""
+Tests for streaming exports of budget lines and actual entries (master_plan_it.exports).
+
+Run via Docker:
+    docker exec -it master_plan_it-frappe-1 bench --site $SITE_NAME run-tests \
+        --module master_plan_it.tests.test_exports
+"""
+
+from __future__ import annotations
+
+import csv
+import io
+import uuid
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import flt
+
+from master_plan_it import exports
+from master_plan_it.tests.utils import insert_year
+
+
+class TestExports(FrappeTestCase):
+	def setUp(self):
+		test_id = str(uuid.uuid4())[:8]
+		self.year = insert_year()
+		self.cost_center = frappe.get_doc({
+			"doctype": "MPIT Cost Center", "cost_center_name": f"_Test Export CC {test_id}", "is_group": 0
+		}).insert().name
+		self.entries = [
+			frappe.get_doc({
+				"doctype": "MPIT Actual Entry",
+				"posting_date": f"{self.year}-0{i + 1}-15",
+				"entry_kind": "Allowance Spend",
+				"cost_center": self.cost_center,
+				"amount": 12.5 * (i + 1),
+				"vat_rate": 0,
+			}).insert().name
+			for i in range(4)
+		]
+
+	def test_actual_entries_csv_matches_report_order(self):
+		spec = exports._get_spec("actual_entries", frappe._dict(year=self.year), "CSV")
+		buffer = io.BytesIO()
+		self.assertEqual(exports.write(spec, buffer), 4)
+
+		rows = list(csv.reader(io.StringIO(buffer.getvalue().decode("utf-8"))))
+		self.assertEqual(rows[0][0], "ID")
+		self.assertEqual([row[0] for row in rows[1:]], list(reversed(self.entries)))
+		amounts = [row[8] for row in rows[1:]]
+		self.assertEqual(amounts, ["50", "37.5", "25", "12.5"])
+		self.assertTrue(spec.file_name.endswith(".csv"))
+
+	def test_budget_lines_excel(self):
+		from openpyxl import load_workbook
+
+		budget = frappe.get_doc({
+			"doctype": "MPIT Budget",
+			"year": self.year,
+			"budget_type": "Snapshot",
+			"workflow_state": "Draft",
+			"lines": [
+				{
+					"doctype": "MPIT Budget Line",
+					"cost_center": self.cost_center,
+					"line_kind": "Allowance",
+					"monthly_amount": monthly_amount,
+					"amount_includes_vat": 0,
+					"vat_rate": 22,
+					"recurrence_rule": "Monthly",
+				}
+				for monthly_amount in (100, 200)
+			],
+		}).insert()
+
+		spec = exports._get_spec("budget_lines", frappe._dict(budget=budget.name, cost_center=self.cost_center), "Excel")
+		buffer = io.BytesIO()
+		self.assertEqual(exports.write(spec, buffer), 2)
+
+		sheet = load_workbook(io.BytesIO(buffer.getvalue()), read_only=True).active
+		rows = list(sheet.iter_rows(values_only=True))
+		header = rows[0]
+		self.assertEqual(header[0], "Cost Center")
+		net = header.index("Annual Net")
+		self.assertEqual([flt(row[net], 2) for row in rows[1:]], [1200, 2400])
+
+	def test_large_exports_run_in_background(self):
+		frappe.local.conf["mpit_export_inline_rows"] = 2
+		try:
+			with patch.object(frappe, "enqueue") as enqueue:
+				result = exports.start_export("actual_entries", frappe.as_json({"year": self.year}), "CSV")
+				self.assertEqual(result, {"queued": True, "rows": 4})
+				self.assertEqual(enqueue.call_args.kwargs["kind"], "actual_entries")
+
+				result = exports.start_export("actual_entries", {"year": self.year, "status": "Verified"}, "CSV")
+				self.assertEqual(result, {"queued": False, "rows": 0})
+
+			# The direct download cannot bypass the background job
+			with self.assertRaises(frappe.ValidationError):
+				exports.download("actual_entries", {"year": self.year}, "CSV")
+		finally:
+			frappe.local.conf.pop("mpit_export_inline_rows", None)
+
+	def test_budget_lines_require_a_budget(self):
+		with self.assertRaises(frappe.ValidationError):
+			exports._get_spec("budget_lines", frappe._dict(), "CSV")
@@ -0,0 +1,51 @@
+import os
+import unittest
+from unittest.mock import patch
+
+from master_plan_it.devtools import kernel_benchmark
+
+
+class TestKernelBenchmarks(unittest.TestCase):
+    def test_compare_flags_only_regressions_beyond_threshold(self):
+        baselines = {"a": {"ratio": 1.0}, "b": {"ratio": 2.0}}
+        results = {"a": {"ratio": 1.2}, "b": {"ratio": 2.6}, "c": {"ratio": 9.0}}
+        # a: +20% (within 25%), b: +30% (regression), c: no baseline yet
+        self.assertEqual(kernel_benchmark.compare(results, baselines, 0.25), ["b"])
+
+    def test_check_requires_every_attempt_to_regress(self):
+        baselines = {"a": {"ratio": 1.0}, "b": {"ratio": 1.0}}
+        first = {"a": {"ratio": 1.8}, "b": {"ratio": 1.8}}
+        # a was a one-off slow pass, b stays slow: only b is re-measured and reported.
+        remeasured = [{"a": {"ratio": 1.1}, "b": {"ratio": 1.7}}, {"b": {"ratio": 1.9}}]
+
+        def fake_measure(rounds, names):
+            return {name: row for name, row in remeasured.pop(0).items() if name in names}
+
+        with patch.object(kernel_benchmark, "measure", side_effect=fake_measure) as measure:
+            regressions = kernel_benchmark.check(baselines, 0.5, attempts=3, first=first)
+        self.assertEqual(regressions, ["b"])
+        self.assertEqual([c.kwargs["names"] for c in measure.call_args_list], [["a", "b"], ["b"]])
+
+    def test_baselines_cover_every_kernel(self):
+        # A missing or stale kernel_baselines.json would silently turn the timing gate into a no-op.
+        baselines = kernel_benchmark.load_baselines()
+        self.assertTrue(baselines, f"{kernel_benchmark.BASELINE_PATH} is missing or empty")
+        self.assertEqual(sorted(baselines), sorted(kernel_benchmark._kernels()))
+        self.assertTrue(kernel_benchmark._read_baseline_file().get("environment"), "baselines do not record their environment")
+
+    @unittest.skipUnless(os.environ.get("MPIT_BENCHMARK"), "set MPIT_BENCHMARK=1 to run timing checks")
+    def test_kernels_within_baseline(self):
+        baselines = kernel_benchmark.load_baselines()
+        self.assertTrue(baselines, f"{kernel_benchmark.BASELINE_PATH} is missing or empty")
+        mismatch = kernel_benchmark.environment_mismatch()
+        if mismatch:
+            self.skipTest(f"baselines recorded in another environment ({mismatch})")
+        threshold = float(os.environ.get("MPIT_BENCHMARK_THRESHOLD") or kernel_benchmark.DEFAULT_THRESHOLD)
+        regressions = kernel_benchmark.check(baselines, threshold)
+        self.assertFalse(
+            regressions,
+            "Kernel regressions beyond {0:.0%} in every attempt: {1}".format(threshold, ", ".join(regressions)),
+        )
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,104 @@
+"""
+Tests for the Prometheus engine metrics (master_plan_it.metrics).
+
+Run via Docker:
+    docker exec -it master_plan_it-frappe-1 bench --site $SITE_NAME run-tests \
+        --module master_plan_it.tests.test_metrics
+"""
+
+from __future__ import annotations
+
+from unittest.mock import MagicMock, patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from master_plan_it import metrics
+
+
+class TestMetrics(FrappeTestCase):
+	def setUp(self):
+		metrics.reset()
+
+	def tearDown(self):
+		metrics.reset()
+
+	def test_histogram_buckets_are_cumulative(self):
+		metrics.observe("mpit_refresh_duration_seconds", 0.3)
+		metrics.observe("mpit_refresh_duration_seconds", 4)
+		text = metrics.render()
+
+		self.assertIn('mpit_refresh_duration_seconds_bucket{le="0.25"} 0\n', text)
+		self.assertIn('mpit_refresh_duration_seconds_bucket{le="0.5"} 1\n', text)
+		self.assertIn('mpit_refresh_duration_seconds_bucket{le="5"} 2\n', text)
+		self.assertIn('mpit_refresh_duration_seconds_bucket{le="+Inf"} 2\n', text)
+		self.assertIn("mpit_refresh_duration_seconds_count 2\n", text)
+		self.assertIn("mpit_refresh_duration_seconds_sum 4.3\n", text)
+		self.assertIn("# TYPE mpit_refresh_duration_seconds histogram\n", text)
+
+	def test_counters_keep_labels_apart(self):
+		metrics.inc("mpit_cache_requests_total", cache="cap_counters", result="hit")
+		metrics.inc("mpit_cache_requests_total", cache="cap_counters", result="hit")
+		metrics.inc("mpit_cache_requests_total", cache="cap_counters", result="miss")
+		text = metrics.render()
+
+		self.assertIn('mpit_cache_requests_total{cache="cap_counters",result="hit"} 2\n', text)
+		self.assertIn('mpit_cache_requests_total{cache="cap_counters",result="miss"} 1\n', text)
+
+	def test_report_execution_is_observed(self):
+		from master_plan_it.master_plan_it.report.mpit_actual_entries import mpit_actual_entries
+
+		mpit_actual_entries.execute({"status": "Verified"})
+		text = metrics.render()
+
+		self.assertIn('mpit_report_duration_seconds_count{report="mpit_actual_entries.execute"} 1\n', text)
+
+	def test_refresh_outcomes(self):
+		metrics.observe_refresh(12, 0.1)
+		metrics.observe_refresh(None, 0.0)
+		text = metrics.render()
+
+		self.assertIn('mpit_refresh_lines_bucket{le="50"} 1\n', text)
+		self.assertIn('mpit_refresh_lines_bucket{le="10"} 0\n', text)
+		self.assertIn('mpit_refresh_total{outcome="ok"} 1\n', text)
+		self.assertIn('mpit_refresh_total{outcome="skipped"} 1\n', text)
+		self.assertIn("mpit_refresh_duration_seconds_count 1\n", text)
+
+	def test_buffers_are_kept_per_site(self):
+		site = frappe.local.site
+		other = f"other-{site}"
+		frappe.local.site = other
+		try:
+			metrics.inc("mpit_refresh_total", outcome="ok")
+		finally:
+			frappe.local.site = site
+		try:
+			self.assertNotIn('mpit_refresh_total{outcome="ok"}', metrics.render())
+			self.assertIn(other, metrics._buffers)
+		finally:
+			metrics._buffers.pop(other, None)
+			metrics._last_flush.pop(other, None)
+
+	def test_queue_depth_counts_only_this_site(self):
+		site = frappe.local.site
+		job_ids = [
+			f"{site}::{metrics.REFRESH_JOB_PREFIX}B1",
+			f"a{site}::{metrics.REFRESH_JOB_PREFIX}B2",
+			f"{site}::other-job",
+		]
+		queue = MagicMock()
+		queue.get_job_ids.return_value = job_ids
+		with (
+			patch("frappe.utils.background_jobs.get_queue", return_value=queue),
+			patch("rq.job.Job.fetch_many", side_effect=lambda ids, connection: [MagicMock(enqueued_at=None) for _ in ids]) as fetch,
+		):
+			self.assertEqual(metrics._refresh_queue_state(), (1, 0.0))
+		self.assertEqual(fetch.call_args.args[0], job_ids[:1])
+
+	def test_export_requires_manager_role(self):
+		frappe.set_user("Guest")
+		try:
+			with self.assertRaises(frappe.PermissionError):
+				metrics.export()
+		finally:
+			frappe.set_user("Administrator")
@@ -0,0 +1,227 @@
+"""
+Query-count budgets for MPIT reports, chart sources, budget engine and document saves.
+
+The same scenario is seeded at two sizes (own year and cost center each) and every entry
+point is measured with query_stats.track(). Each case must stay under an absolute ceiling
+at the small size, and the statement count may grow between sizes only by the per-row
+allowance of the case: 0 for reads (reports, charts, summaries), a small constant for
+document writes where Frappe itself issues one INSERT/UPDATE and link checks per child row.
+SELECTs on MPIT Budget Line must never grow with the number of lines.
+
+Run via Docker:
+    docker exec -it master_plan_it-frappe-1 bench --site $SITE_NAME run-tests \
+        --module master_plan_it.tests.test_query_budgets
+"""
+
+from __future__ import annotations
+
+import uuid
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from master_plan_it import query_stats
+from master_plan_it.tests.utils import unused_year
+
+SMALL, LARGE = 2, 8
+# Constant noise between runs (cache warm-up, series, timeline comments).
+GROWTH_SLACK = 3
+# Per-row statement allowance for document writes (child INSERT/UPDATE + link validation).
+WRITE_PER_ROW = 8
+
+# case: (ceiling at SMALL, per-row growth allowance)
+QUERY_BUDGETS = {
+	"report.mpit_overview": (40, 0),
+	"report.mpit_monthly_plan": (25, 0),
+	"report.mpit_actual_entries": (15, 0),
+	"report.mpit_budget_diff": (15, 0),
+	"report.mpit_projects_planned_vs_exceptions": (30, 0),
+	"report.mpit_renewals_window": (15, 0),
+	"chart.mpit_actual_entries_by_kind": (10, 0),
+	"chart.mpit_actual_entries_by_status": (10, 0),
+	"chart.mpit_budget_totals": (10, 0),
+	"chart.mpit_budgets_by_type": (10, 0),
+	"chart.mpit_cap_vs_actual_by_cost_center": (15, 0),
+	"chart.mpit_contracts_by_status": (10, 0),
+	"chart.mpit_monthly_plan_vs_actual": (10, 0),
+	"chart.mpit_planned_items_coverage": (10, 0),
+	"chart.mpit_projects_by_status": (10, 0),
+	"api.get_cost_center_summaries": (20, 0),
+	"save.mpit_actual_entry": (60, 0),
+	"save.mpit_planned_item": (60, 0),
+	"save.mpit_contract": (60, 0),
+	"save.mpit_budget": (120, WRITE_PER_ROW),
+	"engine.refresh_from_sources": (200, WRITE_PER_ROW),
+	"engine.create_snapshot": (200, WRITE_PER_ROW),
+}
+
+
+class TestQueryBudgets(FrappeTestCase):
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		test_id = str(uuid.uuid4())[:8]
+		base_year = unused_year(span=2)
+		cls.vendor = frappe.get_doc({"doctype": "MPIT Vendor", "vendor_name": f"_QB Vendor {test_id}"}).insert().name
+		cls.results = {
+			size: _measure(_seed(size, str(base_year + offset), f"{test_id}-{size}", cls.vendor))
+			for offset, size in enumerate((SMALL, LARGE))
+		}
+
+	def test_ceilings_at_small_size(self):
+		for case, (ceiling, _per_row) in QUERY_BUDGETS.items():
+			with self.subTest(case=case):
+				stats = self.results[SMALL][case]
+				self.assertLessEqual(stats.count, ceiling, _describe(case, stats))
+
+	def test_query_count_does_not_grow_with_data(self):
+		rows = LARGE - SMALL
+		for case, (_ceiling, per_row) in QUERY_BUDGETS.items():
+			with self.subTest(case=case):
+				small, large = self.results[SMALL][case], self.results[LARGE][case]
+				allowed = small.count + per_row * rows + GROWTH_SLACK
+				self.assertLessEqual(
+					large.count,
+					allowed,
+					f"{case}: {small.count} statements at {SMALL} rows, {large.count} at {LARGE} rows\n"
+					+ _describe(case, large),
+				)
+
+	def test_budget_line_selects_are_constant(self):
+		for case in QUERY_BUDGETS:
+			with self.subTest(case=case):
+				small = _selects_on(self.results[SMALL][case], "tabMPIT Budget Line")
+				large = _selects_on(self.results[LARGE][case], "tabMPIT Budget Line")
+				self.assertLessEqual(large, small + GROWTH_SLACK, _describe(case, self.results[LARGE][case]))
+
+
+def _seed(size: int, year: str, tag: str, vendor: str) -> frappe._dict:
+	"""Create `size` contracts, planned items and actual entries in a dedicated year and cost center."""
+	frappe.get_doc({"doctype": "MPIT Year", "year": year, "start_date": f"{year}-01-01", "end_date": f"{year}-12-31"}).insert()
+	cost_center = frappe.get_doc({"doctype": "MPIT Cost Center", "cost_center_name": f"_QB CC {tag}", "is_group": 0}).insert().name
+	project = frappe.get_doc({
+		"doctype": "MPIT Project",
+		"title": f"_QB Project {tag}",
+		"cost_center": cost_center,
+		"start_date": f"{year}-01-01",
+		"end_date": f"{year}-12-31",
+	}).insert().name
+
+	contracts, planned_items, actuals = [], [], []
+	for i in range(size):
+		contracts.append(frappe.get_doc({
+			"doctype": "MPIT Contract",
+			"description": f"_QB Contract {tag} {i}",
+			"vendor": vendor,
+			"cost_center": cost_center,
+			"status": "Active",
+			"start_date": f"{year}-01-01",
+			"end_date": f"{year}-12-31",
+			"current_amount": 100 + i,
+			"current_amount_includes_vat": 0,
+			"vat_rate": 0,
+			"billing_cycle": "Monthly",
+		}).insert().name)
+		item = frappe.get_doc({
+			"doctype": "MPIT Planned Item",
+			"project": project,
+			"description": f"_QB Item {tag} {i}",
+			"amount": 1000 + i,
+			"vat_rate": 0,
+			"item_type": "Estimate",
+			"start_date": f"{year}-01-01",
+			"end_date": f"{year}-12-31",
+			"distribution": "all",
+		}).insert()
+		item.submit()
+		planned_items.append(item.name)
+		actuals.append(frappe.get_doc({
+			"doctype": "MPIT Actual Entry",
+			"posting_date": f"{year}-03-{i % 28 + 1:02d}",
+			"entry_kind": "Delta",
+			"status": "Recorded",
+			"project": project,
+			"amount": 50 + i,
+			"vat_rate": 0,
+		}).insert().name)
+
+	live = frappe.get_doc({"doctype": "MPIT Budget", "year": year, "budget_type": "Live", "workflow_state": "Draft"}).insert()
+	live.refresh_from_sources(is_manual=1)
+
+	from master_plan_it.master_plan_it.doctype.mpit_budget.mpit_budget import create_snapshot
+
+	return frappe._dict(
+		year=year,
+		cost_center=cost_center,
+		project=project,
+		contract=contracts[0],
+		planned_item=planned_items[0],
+		actual=actuals[0],
+		live=live.name,
+		snapshot=create_snapshot(live.name),
+	)
+
+
+def _measure(seed: frappe._dict) -> dict[str, query_stats.QueryStats]:
+	"""Run every budgeted entry point once against `seed` and return its statement stats."""
+	from master_plan_it.master_plan_it.doctype.mpit_budget import mpit_budget
+	from master_plan_it.master_plan_it.report.mpit_actual_entries import mpit_actual_entries
+	from master_plan_it.master_plan_it.report.mpit_budget_diff import mpit_budget_diff
+	from master_plan_it.master_plan_it.report.mpit_monthly_plan import mpit_monthly_plan
+	from master_plan_it.master_plan_it.report.mpit_overview import mpit_overview
+	from master_plan_it.master_plan_it.report.mpit_projects_planned_vs_exceptions import (
+		mpit_projects_planned_vs_exceptions,
+	)
+	from master_plan_it.master_plan_it.report.mpit_renewals_window import mpit_renewals_window
+
+	year = seed.year
+	cases = {
+		"report.mpit_overview": lambda: mpit_overview.execute({"year": year}),
+		"report.mpit_monthly_plan": lambda: mpit_monthly_plan.execute({"year": year}),
+		"report.mpit_actual_entries": lambda: mpit_actual_entries.execute({"year": year}),
+		"report.mpit_budget_diff": lambda: mpit_budget_diff.execute(
+			{"budget_a": seed.snapshot, "budget_b": seed.live, "group_by": "CostCenter+Vendor"}
+		),
+		"report.mpit_projects_planned_vs_exceptions": lambda: mpit_projects_planned_vs_exceptions.execute({"year": year}),
+		"report.mpit_renewals_window": lambda: mpit_renewals_window.execute(
+			{"from_date": f"{year}-01-01", "days": 365, "cost_center": seed.cost_center}
+		),
+		"api.get_cost_center_summaries": lambda: mpit_budget.get_cost_center_summaries(year, cost_centers=[seed.cost_center]),
+	}
+	for case in QUERY_BUDGETS:
+		if case.startswith("chart."):
+			source = case.split(".", 1)[1]
+			module = frappe.get_module(f"master_plan_it.master_plan_it.dashboard_chart_source.{source}.{source}")
+			cases[case] = lambda m=module: m.get_data(frappe._dict(year=year))
+
+	# Writes last, so reads see the seeded state.
+	cases.update({
+		"save.mpit_actual_entry": lambda: _resave("MPIT Actual Entry", seed.actual, description="re-saved"),
+		"save.mpit_planned_item": lambda: _resave("MPIT Planned Item", seed.planned_item),
+		"save.mpit_contract": lambda: _resave("MPIT Contract", seed.contract, description="re-saved"),
+		"save.mpit_budget": lambda: _resave("MPIT Budget", seed.live),
+		"engine.refresh_from_sources": lambda: mpit_budget.refresh_from_sources(seed.live),
+		"engine.create_snapshot": lambda: mpit_budget.create_snapshot(seed.live),
+	})
+
+	results = {}
+	for case, fn in cases.items():
+		with query_stats.track(case, record_queries=True) as stats:
+			fn()
+		results[case] = stats
+	frappe.clear_messages()
+	return results
+
+
+def _resave(doctype: str, name: str, **changes) -> None:
+	doc = frappe.get_doc(doctype, name)
+	doc.update(changes)
+	doc.save()
+
+
+def _selects_on(stats: query_stats.QueryStats, table: str) -> int:
+	return sum(1 for query, _elapsed in stats.queries if query[:6].upper() == "SELECT" and f"`{table}`" in query)
+
+
+def _describe(case: str, stats: query_stats.QueryStats) -> str:
+	return f"{case}: {stats.count} statements\n" + "\n".join(query[:200] for query, _elapsed in stats.queries)
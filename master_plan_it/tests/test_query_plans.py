@@ -0,0 +1,119 @@
+"""
+Query-plan regression tests for MPIT hot paths.
+
+Every SELECT issued by the budget engine, the Script Reports and the chart sources is
+captured and re-run with EXPLAIN. A test fails when a filtered query on a hot table has
+no usable index (type=ALL and no possible_keys). Small test tables may still be scanned
+by the optimizer, so the check is on index availability, not on the chosen plan.
+
+Run via Docker:
+    docker exec -it master_plan_it-frappe-1 bench --site $SITE_NAME run-tests \
+        --module master_plan_it.tests.test_query_plans
+"""
+
+from __future__ import annotations
+
+import re
+from contextlib import contextmanager
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+HOT_TABLES = {
+	"tabMPIT Budget Line",
+	"tabMPIT Actual Entry",
+	"tabMPIT Planned Item",
+	"tabMPIT Contract",
+}
+CHART_SOURCES = (
+	"mpit_actual_entries_by_kind",
+	"mpit_actual_entries_by_status",
+	"mpit_budget_totals",
+	"mpit_budgets_by_type",
+	"mpit_cap_vs_actual_by_cost_center",
+	"mpit_contracts_by_status",
+	"mpit_monthly_plan_vs_actual",
+	"mpit_planned_items_coverage",
+	"mpit_projects_by_status",
+)
+
+
+@contextmanager
+def capture_selects():
+	"""Record (query, values) for every SELECT run through frappe.db.sql."""
+	captured: list[tuple[str, object]] = []
+	original_sql = frappe.db.sql
+
+	def recording_sql(query, values=None, *args, **kwargs):
+		text = str(query).strip()
+		if text[:6].upper() == "SELECT":
+			captured.append((text, values))
+		if values is None:
+			return original_sql(query, *args, **kwargs)
+		return original_sql(query, values, *args, **kwargs)
+
+	with patch.object(frappe.db, "sql", side_effect=recording_sql):
+		yield captured
+
+
+class TestHotPathQueryPlans(FrappeTestCase):
+	@classmethod
+	def setUpClass(cls):
+		super().setUpClass()
+		from master_plan_it.tests.acceptance_seed import run_seed
+
+		cls.seed = run_seed()
+		cls.seed["year"] = frappe.db.get_value("MPIT Budget", cls.seed["live_budget"], "year")
+		cls.seed["cost_center"] = "ACCEPT_CC"
+
+	def assert_indexed(self, captured: list[tuple[str, object]]) -> None:
+		self.assertTrue(captured, "No SELECT captured")
+		offenders = []
+		for query, values in captured:
+			if not re.search(r"\bwhere\b", query, re.IGNORECASE):
+				continue
+			if not any(f"`{table}`" in query for table in HOT_TABLES):
+				continue
+			plan = frappe.db.sql(f"EXPLAIN {query}", values, as_dict=True)
+			for row in plan:
+				if row.get("table") in HOT_TABLES and row.get("type") == "ALL" and not row.get("possible_keys"):
+					offenders.append(f"{row.get('table')}: {query}")
+		self.assertFalse(offenders, "Full table scan without usable index:\n" + "\n".join(offenders))
+
+	def test_budget_engine_refresh(self):
+		budget = frappe.get_doc("MPIT Budget", self.seed["live_budget"])
+		with capture_selects() as captured:
+			budget.refresh_from_sources(is_manual=1)
+		self.assert_indexed(captured)
+
+	def test_reports(self):
+		from master_plan_it.master_plan_it.report.mpit_actual_entries import mpit_actual_entries
+		from master_plan_it.master_plan_it.report.mpit_monthly_plan import mpit_monthly_plan
+		from master_plan_it.master_plan_it.report.mpit_overview import mpit_overview
+		from master_plan_it.master_plan_it.report.mpit_renewals_window import mpit_renewals_window
+
+		year = self.seed["year"]
+		for module, filters in (
+			(mpit_overview, {"year": year}),
+			(mpit_monthly_plan, {"year": year}),
+			(mpit_actual_entries, {"year": year, "status": "Verified"}),
+			(mpit_renewals_window, {"days": 365}),
+		):
+			with self.subTest(report=module.__name__), capture_selects() as captured:
+				module.execute(filters)
+				self.assert_indexed(captured)
+
+	def test_chart_sources(self):
+		for source in CHART_SOURCES:
+			module = frappe.get_module(f"master_plan_it.master_plan_it.dashboard_chart_source.{source}.{source}")
+			with self.subTest(chart_source=source), capture_selects() as captured:
+				module.get_data(frappe._dict(year=self.seed["year"]))
+				self.assert_indexed(captured)
+
+	def test_cost_center_summary(self):
+		from master_plan_it.master_plan_it.doctype.mpit_budget.mpit_budget import get_cost_center_summaries
+
+		with capture_selects() as captured:
+			get_cost_center_summaries(self.seed["year"], cost_centers=[self.seed["cost_center"]])
+		self.assert_indexed(captured)
@@ -10,6 +10,9 @@ from __future__ import annotations
 
 import frappe
 from frappe.tests.utils import FrappeTestCase
+from frappe.utils import flt
+
+from master_plan_it.tests.utils import insert_year
 
 
 class TestMpitBudgetDiffReport(FrappeTestCase):
@@ -52,3 +55,217 @@ class TestMpitRenewalsWindowReport(FrappeTestCase):
 
 		self.assertIsInstance(columns, list)
 		self.assertIsInstance(data, list)
+
+
+class TestMpitActualEntriesReport(FrappeTestCase):
+	"""Test keyset pages and SQL aggregates of the Actual Entries report."""
+
+	def setUp(self):
+		self.year = insert_year()
+		cost_center = frappe.get_doc({
+			"doctype": "MPIT Cost Center", "cost_center_name": f"_Test Actuals CC {self.year}", "is_group": 0
+		}).insert().name
+		self.entries = [
+			frappe.get_doc({
+				"doctype": "MPIT Actual Entry",
+				"posting_date": f"{self.year}-{i % 3 + 1:02d}-{i % 2 + 10}",
+				"entry_kind": "Allowance Spend",
+				"status": "Verified" if i % 2 else "Recorded",
+				"cost_center": cost_center,
+				"amount": 10 * (i + 1),
+				"vat_rate": 0,
+			}).insert().name
+			for i in range(7)
+		]
+		frappe.local.conf["mpit_report_page_size"] = 3
+
+	def tearDown(self):
+		frappe.local.conf.pop("mpit_report_page_size", None)
+
+	def test_pages_cover_every_entry_once_in_order(self):
+		from master_plan_it.master_plan_it.report.mpit_actual_entries import mpit_actual_entries
+
+		filters = {"year": self.year}
+		_columns, rows, _msg, chart, summary, message = mpit_actual_entries.execute(filters)
+		self.assertEqual(len(rows), 3)
+		while message["next_cursor"]:
+			message = mpit_actual_entries.get_page(
+				frappe.as_json(filters), *message["next_cursor"]
+			)
+			rows += message["rows"]
+
+		self.assertEqual(sorted(row.name for row in rows), sorted(self.entries))
+		keys = [(str(row.posting_date), row.name) for row in rows]
+		self.assertEqual(keys, sorted(keys, reverse=True))
+
+		# Cards and charts cover every entry, not only the first page
+		cards = {card["label"]: card["value"] for card in summary}
+		self.assertEqual(cards["Total Entries"], 7)
+		self.assertEqual(cards["Verified"], 3)
+		self.assertEqual(flt(cards["Total Net"], 2), 280)
+		self.assertEqual(chart["data"]["labels"], [f"{self.year}-01", f"{self.year}-02", f"{self.year}-03"])
+		self.assertEqual(flt(sum(chart["data"]["datasets"][0]["values"]), 2), 280)
+
+
+class TestMpitMonthlyPlanReport(FrappeTestCase):
+	"""Test the rolling multi-year window and the data-version cache of the Monthly Plan report."""
+
+	def setUp(self):
+		self.year = insert_year()
+		self.cost_center = frappe.get_doc({
+			"doctype": "MPIT Cost Center", "cost_center_name": f"_Test Plan CC {self.year}", "is_group": 0
+		}).insert().name
+		self.contract = frappe.get_doc({
+			"doctype": "MPIT Contract",
+			"description": "Rolling plan contract",
+			"cost_center": self.cost_center,
+			"status": "Active",
+			"start_date": f"{self.year}-07-01",
+			"end_date": f"{self.year}-12-31",
+			"auto_renew": 1,
+			"billing_cycle": "Quarterly",
+			"current_amount": 300,
+			"current_amount_includes_vat": 0,
+			"vat_rate": 22,
+		}).insert()
+
+	def test_window_spans_years_and_follows_source_changes(self):
+		from master_plan_it.master_plan_it.report.mpit_monthly_plan import mpit_monthly_plan
+
+		filters = {"from_month": f"{self.year}-07-01", "months": 24, "cost_center": self.cost_center}
+		columns, rows, _msg, chart = mpit_monthly_plan.execute(filters)
+		fieldnames = [column["fieldname"] for column in columns]
+		self.assertIn("month_24", fieldnames)
+		self.assertIn(f"total_{int(self.year) + 2}", fieldnames)
+		self.assertEqual(len(chart["data"]["labels"]), 24)
+
+		# Quarterly 300 net = 100 per month, continued after end_date by auto-renew
+		[row] = rows
+		self.assertEqual((row["month_1"], row["month_24"]), (100, 100))
+		self.assertEqual(row[f"total_{self.year}"], 600)
+		self.assertEqual(row["total"], 2400)
+
+		self.contract.auto_renew = 0
+		self.contract.save()
+		[row] = mpit_monthly_plan.execute(filters)[1]
+		self.assertEqual((row["month_6"], row["month_7"], row["total"]), (100, 0, 600))
+
+
+class TestMpitContractProjectionReport(FrappeTestCase):
+	"""Test auto-renew projection past end_date with indexation, by cost center and vendor."""
+
+	def test_projection_renews_with_indexation(self):
+		from master_plan_it import monthly_projection
+		from master_plan_it.master_plan_it.report.mpit_contract_projection import mpit_contract_projection
+
+		year = int(insert_year())
+		cost_center = frappe.get_doc({
+			"doctype": "MPIT Cost Center", "cost_center_name": f"_Test Projection CC {year}", "is_group": 0
+		}).insert().name
+		vendor = frappe.get_doc({"doctype": "MPIT Vendor", "vendor_name": f"_Test Projection Vendor {year}"}).insert().name
+		frappe.get_doc({
+			"doctype": "MPIT Contract",
+			"description": "Projected contract",
+			"vendor": vendor,
+			"cost_center": cost_center,
+			"status": "Active",
+			"start_date": f"{year - 1}-01-01",
+			"end_date": f"{year - 1}-12-31",
+			"auto_renew": 1,
+			"billing_cycle": "Annual",
+			"current_amount": 1200,
+			"current_amount_includes_vat": 0,
+			"vat_rate": 22,
+		}).insert()
+
+		filters = {"from_year": year, "years": 2, "indexation": 5, "cost_center": cost_center}
+		columns, rows, _msg, chart, summary = mpit_contract_projection.execute(filters)
+		self.assertEqual([c["fieldname"] for c in columns][2:], [f"y_{year}", f"y_{year + 1}", "total"])
+		[row] = rows
+		self.assertEqual(row["vendor"], vendor)
+		self.assertEqual((row[f"y_{year}"], row[f"y_{year + 1}"]), (1260, 1323))
+		self.assertEqual([card["label"] for card in summary], [str(year), str(year + 1)])
+
+		facts = monthly_projection.get_contract_projection(year, 2, 5, cost_center)
+		self.assertEqual(len(facts), 24)
+		self.assertEqual(facts[0], {"month": f"{year}-01", "cost_center": cost_center, "vendor": vendor, "amount": 105})
+
+
+class TestCostCenterScope(FrappeTestCase):
+	"""Test the shared include_children resolver and nested-set rollup."""
+
+	def _make_cost_center(self, name: str, parent: str | None = None, is_group: int = 0) -> str:
+		return frappe.get_doc({
+			"doctype": "MPIT Cost Center",
+			"cost_center_name": name,
+			"parent_mpit_cost_center": parent,
+			"is_group": is_group,
+		}).insert().name
+
+	def test_subtree_resolution_and_rollup(self):
+		from master_plan_it.master_plan_it.utils import cost_center_scope
+
+		group = self._make_cost_center("_Test Scope Group", is_group=1)
+		child = self._make_cost_center("_Test Scope Child", parent=group)
+
+		self.assertEqual(cost_center_scope.resolve_cost_centers(group), [group])
+		self.assertEqual(set(cost_center_scope.resolve_cost_centers(group, 1)), {group, child})
+
+		# Tree changes invalidate the cached subtree
+		late_child = self._make_cost_center("_Test Scope Late Child", parent=group)
+		self.assertIn(late_child, cost_center_scope.resolve_cost_centers(group, 1))
+
+		subtree = cost_center_scope.get_subtree(group)
+		self.assertEqual(subtree[0].name, group)
+		self.assertEqual(subtree[0].depth, 0)
+		totals = cost_center_scope.rollup(
+			subtree, {group: {"actual": 5}, child: {"actual": 10}, late_child: {"actual": 2.5}}, ["actual"]
+		)
+		self.assertEqual(totals[group]["actual"], 17.5)
+		self.assertEqual(totals[child]["actual"], 10)
+
+	def test_monthly_plan_and_actual_entries_roll_up_group_nodes(self):
+		from master_plan_it.master_plan_it.report.mpit_actual_entries import mpit_actual_entries
+		from master_plan_it.master_plan_it.report.mpit_monthly_plan import mpit_monthly_plan
+
+		year = insert_year()
+		root = self._make_cost_center(f"_Test Rollup Root {year}", is_group=1)
+		branch = self._make_cost_center(f"_Test Rollup Branch {year}", parent=root, is_group=1)
+		leaf = self._make_cost_center(f"_Test Rollup Leaf {year}", parent=branch)
+		other_leaf = self._make_cost_center(f"_Test Rollup Other Leaf {year}", parent=root)
+		frappe.get_doc({
+			"doctype": "MPIT Contract",
+			"description": "Rollup contract",
+			"cost_center": leaf,
+			"status": "Active",
+			"start_date": f"{year}-01-01",
+			"end_date": f"{year}-12-31",
+			"billing_cycle": "Monthly",
+			"current_amount": 100,
+			"current_amount_includes_vat": 0,
+			"vat_rate": 22,
+		}).insert()
+		for cost_center, amount in ((leaf, 50), (other_leaf, 30)):
+			frappe.get_doc({
+				"doctype": "MPIT Actual Entry",
+				"posting_date": f"{year}-03-10",
+				"entry_kind": "Allowance Spend",
+				"status": "Verified",
+				"cost_center": cost_center,
+				"amount": amount,
+				"vat_rate": 0,
+			}).insert()
+
+		filters = {"year": year, "cost_center": root, "include_children": 1}
+		_columns, rows, _msg, chart = mpit_monthly_plan.execute(filters)
+		self.assertEqual(
+			[(row["cost_center"], row["indent"], row["month_1"]) for row in rows],
+			[(root, 0, 100), (branch, 1, 100), (leaf, 2, 100)],
+		)
+		# Group rows must not be counted twice in the chart
+		self.assertEqual(chart["data"]["datasets"][0]["values"][0], 100)
+
+		message = mpit_actual_entries.execute(filters)[5]
+		chart = message["charts"]["entries_by_cost_center"]
+		totals = dict(zip(chart["data"]["labels"], chart["data"]["datasets"][0]["values"]))
+		self.assertEqual(totals, {root: 80, branch: 50, leaf: 50, other_leaf: 30})
@@ -0,0 +1,75 @@
+"""
+Tests for the in-memory what-if scenarios (master_plan_it.scenarios) and the MPIT Scenario
+Comparison report.
+
+Run via Docker:
+    docker exec -it master_plan_it-frappe-1 bench --site $SITE_NAME run-tests \
+        --module master_plan_it.tests.test_scenarios
+"""
+
+from __future__ import annotations
+
+import uuid
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from master_plan_it import scenarios
+from master_plan_it.master_plan_it.report.mpit_scenario_comparison import mpit_scenario_comparison
+from master_plan_it.tests.utils import insert_contract, insert_cost_center, insert_live_budget, insert_year
+
+
+class TestScenarios(FrappeTestCase):
+	def setUp(self):
+		test_id = str(uuid.uuid4())[:8]
+		self.year = insert_year()
+		self.cost_center = insert_cost_center(f"_Test Scenario CC {test_id}")
+		self.cancelled = insert_contract(self.year, self.cost_center, 100, "Cancelled in scenario")
+		self.repriced = insert_contract(self.year, self.cost_center, 200, "Repriced in scenario")
+		self.draft = insert_contract(self.year, self.cost_center, 50, "Activated in scenario", status="Draft")
+		self.live = insert_live_budget(self.year)
+		self.scenario = frappe.get_doc({
+			"doctype": "MPIT Scenario",
+			"scenario_name": f"_Test Scenario {test_id}",
+			"year": self.year,
+			"overrides": [
+				{"source_type": "MPIT Contract", "source_name": self.cancelled, "field": "status", "value": "Cancelled"},
+				{"source_type": "MPIT Contract", "source_name": self.repriced, "field": "current_amount", "value": "300"},
+				{"source_type": "MPIT Contract", "source_name": self.draft, "field": "status", "value": "Active"},
+				{"source_type": "MPIT Contract", "source_name": self.draft, "field": "start_date", "value": f"{self.year}-07-01"},
+			],
+		}).insert()
+
+	def test_scenario_is_compared_without_writes(self):
+		lines_before = frappe.get_all("MPIT Budget Line", filters={"parent": self.live.name}, fields=["name", "modified"])
+
+		comparison = scenarios.compare(self.scenario.name)
+		self.assertEqual(comparison["live_budget"], self.live.name)
+		self.assertEqual(comparison["totals"], {scenarios.LIVE: 3600.0, self.scenario.name: 3900.0})
+		[entry] = comparison["cost_centers"]
+		self.assertEqual((entry[scenarios.LIVE], entry[self.scenario.name]), (3600.0, 3900.0))
+		months = comparison["months"]
+		self.assertEqual(len(months), 12)
+		self.assertEqual((months[0][self.scenario.name], months[6][self.scenario.name]), (300.0, 350.0))
+
+		self.assertEqual(frappe.db.get_value("MPIT Contract", self.cancelled, "status"), "Active")
+		self.assertEqual(frappe.db.get_value("MPIT Contract", self.draft, "status"), "Draft")
+		lines_after = frappe.get_all("MPIT Budget Line", filters={"parent": self.live.name}, fields=["name", "modified"])
+		self.assertEqual(lines_after, lines_before)
+
+	def test_invalid_overrides_are_rejected(self):
+		self.scenario.append(
+			"overrides", {"source_type": "MPIT Contract", "source_name": self.repriced, "field": "spend_date", "value": "x"}
+		)
+		self.assertRaises(frappe.ValidationError, self.scenario.save)
+
+		self.scenario.overrides[-1].update({"field": "status", "value": "Unknown"})
+		self.assertRaises(frappe.ValidationError, self.scenario.save)
+
+	def test_report_shows_scenario_next_to_live(self):
+		columns, rows, message, chart, summary = mpit_scenario_comparison.execute({"scenario": self.scenario.name})
+		self.assertEqual([column["fieldname"] for column in columns], ["cost_center", "live", "s1", "s1_delta"])
+		self.assertEqual(rows[0]["s1_delta"], 300.0)
+		self.assertEqual(message["live_budget"], self.live.name)
+		self.assertEqual(len(chart["data"]["datasets"]), 2)
+		self.assertEqual(summary[1]["indicator"], "red")
@@ -0,0 +1,85 @@
+"""
+Tests for the slow-path sampler (master_plan_it.slow_trace).
+
+Run via Docker:
+    docker exec -it master_plan_it-frappe-1 bench --site $SITE_NAME run-tests \
+        --module master_plan_it.tests.test_slow_trace
+"""
+
+from __future__ import annotations
+
+from unittest.mock import patch
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import add_days, now_datetime
+
+from master_plan_it import slow_trace
+
+
+SETTINGS_FIELDS = ("slow_trace_enabled", "slow_trace_threshold_ms", "slow_trace_sample_rate", "slow_trace_retention_days")
+
+
+class TestSlowTrace(FrappeTestCase):
+	def setUp(self):
+		self._saved_settings = {field: frappe.db.get_single_value("MPIT Settings", field) for field in SETTINGS_FIELDS}
+
+	def tearDown(self):
+		# Tracing must not stay enabled for the tests that run after these.
+		settings = frappe.get_single("MPIT Settings")
+		settings.update(self._saved_settings)
+		settings.save(ignore_permissions=True)
+
+	def _configure(self, enabled=1, threshold_ms=0, sample_rate=100):
+		settings = frappe.get_single("MPIT Settings")
+		settings.slow_trace_enabled = enabled
+		settings.slow_trace_threshold_ms = threshold_ms
+		settings.slow_trace_sample_rate = sample_rate
+		settings.save(ignore_permissions=True)
+
+	def _run_report(self):
+		from master_plan_it.master_plan_it.report.mpit_actual_entries import mpit_actual_entries
+
+		with patch.object(frappe, "enqueue") as enqueue:
+			mpit_actual_entries.execute({"status": "Verified"})
+		return enqueue
+
+	def test_slow_call_is_recorded_with_queries_and_frames(self):
+		self._configure(threshold_ms=0, sample_rate=100)
+		enqueue = self._run_report()
+
+		self.assertEqual(enqueue.call_count, 1)
+		payload = enqueue.call_args.kwargs["payload"]
+		self.assertEqual(payload["trace_kind"], "Report")
+		self.assertEqual(payload["target"], "mpit_actual_entries.execute")
+		self.assertIn("Verified", payload["filters"])
+		self.assertGreater(payload["query_count"], 0)
+		self.assertIn("tabMPIT Actual Entry", payload["queries"])
+
+		# The job commits its own transaction: keep the trace inside the test transaction instead.
+		with patch.object(frappe.db, "commit") as commit:
+			slow_trace.insert_trace(payload)
+		self.assertTrue(commit.called)
+		self.assertTrue(frappe.db.exists("MPIT Slow Trace", {"target": "mpit_actual_entries.execute"}))
+
+	def test_unsampled_or_fast_calls_are_not_recorded(self):
+		self._configure(threshold_ms=0, sample_rate=0)
+		self.assertFalse(self._run_report().called)
+
+		self._configure(threshold_ms=10_000_000, sample_rate=100)
+		self.assertFalse(self._run_report().called)
+
+		self._configure(enabled=0)
+		self.assertFalse(self._run_report().called)
+
+	def test_purge_expired_keeps_recent_traces(self):
+		self._configure(threshold_ms=0, sample_rate=100)
+		frappe.db.set_single_value("MPIT Settings", "slow_trace_retention_days", 7)
+		old = frappe.get_doc({"doctype": "MPIT Slow Trace", "trace_kind": "Report", "target": "old"}).insert()
+		recent = frappe.get_doc({"doctype": "MPIT Slow Trace", "trace_kind": "Report", "target": "recent"}).insert()
+		frappe.db.set_value("MPIT Slow Trace", old.name, "creation", add_days(now_datetime(), -30), update_modified=False)
+
+		slow_trace.purge_expired()
+
+		self.assertFalse(frappe.db.exists("MPIT Slow Trace", old.name))
+		self.assertTrue(frappe.db.exists("MPIT Slow Trace", recent.name))
@@ -0,0 +1,77 @@
+"""
+Helper condivisi dai test di sito: anni MPIT dedicati, scelti in modo deterministico, e le fixture
+ricorrenti del motore budget (Cost Center, contratto mensile sull'intero anno, budget Live).
+Gli anni partono da FIRST_TEST_YEAR e saltano quelli già presenti (anche lasciati da run precedenti),
+così un test non collide con un MPIT Year esistente.
+"""
+
+from __future__ import annotations
+
+import frappe
+
+FIRST_TEST_YEAR = 3000
+
+
+def unused_year(span: int = 1) -> int:
+	"""Lowest year from FIRST_TEST_YEAR such that no MPIT Year exists for it and the following span - 1 years."""
+	taken = {int(name) for name in frappe.get_all("MPIT Year", pluck="name") if str(name).isdigit()}
+	year = FIRST_TEST_YEAR
+	while any(year + offset in taken for offset in range(span)):
+		year += 1
+	return year
+
+
+def insert_year(year: int | str | None = None) -> str:
+	"""Insert a calendar MPIT Year (an unused one by default) and return its name."""
+	year = str(year or unused_year())
+	frappe.get_doc({
+		"doctype": "MPIT Year",
+		"year": year,
+		"start_date": f"{year}-01-01",
+		"end_date": f"{year}-12-31",
+	}).insert()
+	return year
+
+
+def insert_cost_center(name: str, parent: str | None = None, is_group: int = 0) -> str:
+	"""Insert an MPIT Cost Center (a top-level leaf by default) and return its name."""
+	return frappe.get_doc({
+		"doctype": "MPIT Cost Center",
+		"cost_center_name": name,
+		"parent_mpit_cost_center": parent,
+		"is_group": is_group,
+	}).insert().name
+
+
+def insert_contract(
+	year: str,
+	cost_center: str,
+	amount: float,
+	description: str | None = None,
+	vendor: str | None = None,
+	status: str = "Active",
+) -> str:
+	"""Insert a Monthly contract over the whole year (amount net of 22% VAT) and return its name."""
+	return frappe.get_doc({
+		"doctype": "MPIT Contract",
+		"description": description or f"Test contract {amount}",
+		"vendor": vendor,
+		"cost_center": cost_center,
+		"status": status,
+		"start_date": f"{year}-01-01",
+		"end_date": f"{year}-12-31",
+		"billing_cycle": "Monthly",
+		"current_amount": amount,
+		"current_amount_includes_vat": 0,
+		"vat_rate": 22,
+	}).insert().name
+
+
+def insert_live_budget(year: str, refresh: bool = True):
+	"""Insert the Draft Live budget of the year, refreshed from the sources unless refresh is False."""
+	budget = frappe.get_doc({
+		"doctype": "MPIT Budget", "year": year, "budget_type": "Live", "workflow_state": "Draft"
+	}).insert()
+	if refresh:
+		budget.refresh_from_sources(is_manual=1)
+	return budget